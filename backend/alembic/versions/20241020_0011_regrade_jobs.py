@@ -0,0 +1,47 @@
+"""Таблица задач массовой перепроверки решений."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0011"
+down_revision = "20241014_0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Создаём таблицу regrade_jobs."""
+
+    op.create_table(
+        "regrade_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("target", sa.Enum("coding", "python", name="regradetarget"), nullable=False),
+        sa.Column("challenge_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("pending", "running", "completed", "failed", name="regradejobstatus"),
+            nullable=False,
+        ),
+        sa.Column("total_attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("processed_attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("unique_programs", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("changed_attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_attempt_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("newly_passed_ids", sa.JSON(), nullable=False, server_default="[]"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_regrade_jobs_challenge_id", "regrade_jobs", ["challenge_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Удаляем таблицу regrade_jobs."""
+
+    op.drop_index("ix_regrade_jobs_challenge_id", table_name="regrade_jobs")
+    op.drop_table("regrade_jobs")
@@ -0,0 +1,68 @@
+"""Сводная таблица прогресса пилотов по кодовым заданиям."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0012"
+down_revision = "20241020_0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Создаём coding_progress и заполняем её из истории попыток."""
+
+    op.create_table(
+        "coding_progress",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "challenge_id",
+            sa.Integer(),
+            sa.ForeignKey("coding_challenges.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("first_passed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "best_attempt_id",
+            sa.Integer(),
+            sa.ForeignKey("coding_attempts.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("user_id", "challenge_id", name="uq_coding_progress_user_challenge"),
+    )
+    op.create_index("ix_coding_progress_challenge_id", "coding_progress", ["challenge_id"], unique=False)
+
+    op.execute(
+        """
+        INSERT INTO coding_progress (user_id, challenge_id, attempts, best_attempt_id)
+        SELECT user_id,
+               challenge_id,
+               COUNT(id),
+               MIN(CASE WHEN is_passed THEN id END)
+        FROM coding_attempts
+        GROUP BY user_id, challenge_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE coding_progress
+        SET first_passed_at = (
+            SELECT created_at FROM coding_attempts WHERE coding_attempts.id = coding_progress.best_attempt_id
+        )
+        WHERE best_attempt_id IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Удаляем coding_progress."""
+
+    op.drop_index("ix_coding_progress_challenge_id", table_name="coding_progress")
+    op.drop_table("coding_progress")
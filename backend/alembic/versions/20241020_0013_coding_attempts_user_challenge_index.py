@@ -0,0 +1,28 @@
+"""Составной индекс попыток по пилоту и заданию."""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20241020_0013"
+down_revision = "20241020_0012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Создаём индекс (user_id, challenge_id) для выборки последних попыток."""
+
+    op.create_index(
+        "ix_coding_attempts_user_challenge",
+        "coding_attempts",
+        ["user_id", "challenge_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Удаляем индекс."""
+
+    op.drop_index("ix_coding_attempts_user_challenge", table_name="coding_attempts")
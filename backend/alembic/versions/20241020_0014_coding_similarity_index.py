@@ -0,0 +1,70 @@
+"""Индекс похожести успешных решений (MinHash-подписи и корзины LSH)."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0014"
+down_revision = "20241020_0013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Создаём таблицы подписей и корзин; заполняет их фоновая задача."""
+
+    op.create_table(
+        "coding_attempt_signatures",
+        sa.Column(
+            "attempt_id",
+            sa.Integer(),
+            sa.ForeignKey("coding_attempts.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("challenge_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("token_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("minhash", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_coding_attempt_signatures_challenge_id",
+        "coding_attempt_signatures",
+        ["challenge_id"],
+        unique=False,
+    )
+
+    op.create_table(
+        "coding_attempt_lsh",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "attempt_id",
+            sa.Integer(),
+            sa.ForeignKey("coding_attempts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("challenge_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("band", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.String(length=16), nullable=False),
+    )
+    op.create_index("ix_coding_attempt_lsh_attempt_id", "coding_attempt_lsh", ["attempt_id"], unique=False)
+    op.create_index(
+        "ix_coding_attempt_lsh_lookup",
+        "coding_attempt_lsh",
+        ["challenge_id", "band", "bucket"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Удаляем индекс похожести."""
+
+    op.drop_index("ix_coding_attempt_lsh_lookup", table_name="coding_attempt_lsh")
+    op.drop_index("ix_coding_attempt_lsh_attempt_id", table_name="coding_attempt_lsh")
+    op.drop_table("coding_attempt_lsh")
+    op.drop_index("ix_coding_attempt_signatures_challenge_id", table_name="coding_attempt_signatures")
+    op.drop_table("coding_attempt_signatures")
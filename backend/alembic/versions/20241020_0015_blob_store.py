@@ -0,0 +1,53 @@
+"""Контентно-адресуемое хранилище вложений и таблица ссылок на файлы."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0015"
+down_revision = "20241020_0014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Создаём stored_blobs и blob_references."""
+
+    op.create_table(
+        "stored_blobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("mime_type", sa.String(length=128), nullable=True),
+        sa.Column("extension", sa.String(length=16), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("released_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("sha256"),
+    )
+    op.create_index("ix_stored_blobs_ref_count", "stored_blobs", ["ref_count"], unique=False)
+
+    op.create_table(
+        "blob_references",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("blob_id", sa.Integer(), sa.ForeignKey("stored_blobs.id"), nullable=False),
+        sa.Column("owner_type", sa.String(length=32), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("field", sa.String(length=32), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("owner_type", "owner_id", "field", name="uq_blob_reference_owner_field"),
+    )
+    op.create_index("ix_blob_references_blob_id", "blob_references", ["blob_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Удаляем таблицы хранилища (файлы на диске остаются)."""
+
+    op.drop_index("ix_blob_references_blob_id", table_name="blob_references")
+    op.drop_table("blob_references")
+    op.drop_index("ix_stored_blobs_ref_count", table_name="stored_blobs")
+    op.drop_table("stored_blobs")
@@ -0,0 +1,41 @@
+"""Сессии возобновляемой загрузки вложений."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0016"
+down_revision = "20241020_0015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Создаём upload_sessions."""
+
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(length=32), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=True),
+        sa.Column("total_size", sa.Integer(), nullable=False),
+        sa.Column("received", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("expected_sha256", sa.String(length=64), nullable=True),
+        sa.Column("relative_path", sa.String(length=512), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_upload_sessions_user_id", "upload_sessions", ["user_id"], unique=False)
+    op.create_index("ix_upload_sessions_expires_at", "upload_sessions", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Удаляем upload_sessions (незавершённые части на диске подчистит очистка хранилища)."""
+
+    op.drop_index("ix_upload_sessions_expires_at", table_name="upload_sessions")
+    op.drop_index("ix_upload_sessions_user_id", table_name="upload_sessions")
+    op.drop_table("upload_sessions")
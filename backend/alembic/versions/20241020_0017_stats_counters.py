@@ -0,0 +1,121 @@
+"""Счётчики HR-панели, которые ведут триггеры SQLite."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0017"
+down_revision = "20241020_0016"
+branch_labels = None
+depends_on = None
+
+
+# Копия определений из app/models/stats.py на момент миграции.
+def _bump(key: str, delta: str, *, source: str = "", where: str = "true") -> str:
+    select = " ".join(part for part in (f"SELECT {key}, {delta}", source, f"WHERE {where}") if part)
+    return (
+        f"INSERT INTO stats_counters (key, value) {select} "
+        "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value;"
+    )
+
+
+def _submission_effects(row: str, sign: str) -> list[str]:
+    approved = f"{row}.status = 'APPROVED'"
+    user_approved = (
+        "(SELECT count(*) FROM mission_submissions "
+        f"WHERE user_id = {row}.user_id AND status = 'APPROVED')"
+    )
+    threshold = "1" if sign == "+" else "0"
+    return [
+        _bump(f"'submissions:' || lower({row}.status)", f"{sign}1"),
+        _bump("'active_pilots'", f"{sign}1", where=f"{approved} AND {user_approved} = {threshold}"),
+        _bump(
+            "'branch_approved:' || branch_id",
+            f"{sign}1",
+            source="FROM branch_missions",
+            where=f"mission_id = {row}.mission_id AND {approved}",
+        ),
+    ]
+
+
+def _branch_mission_effects(row: str, sign: str) -> list[str]:
+    approved = (
+        "(SELECT count(*) FROM mission_submissions "
+        f"WHERE mission_id = {row}.mission_id AND status = 'APPROVED')"
+    )
+    return [
+        _bump(f"'branch_missions:' || {row}.branch_id", f"{sign}1"),
+        _bump(f"'branch_approved:' || {row}.branch_id", f"{sign}{approved}"),
+    ]
+
+
+def _pilot_effects(row: str, sign: str) -> list[str]:
+    return [_bump("'pilots'", f"{sign}1", where=f"{row}.role = 'PILOT'")]
+
+
+def _trigger(name: str, event_clause: str, statements: list[str]) -> str:
+    body = "\n    ".join(statements)
+    return f"CREATE TRIGGER IF NOT EXISTS {name} {event_clause}\nBEGIN\n    {body}\nEND"
+
+
+TRIGGERS = (
+    ("stats_submission_insert", "AFTER INSERT ON mission_submissions", _submission_effects("NEW", "+")),
+    (
+        "stats_submission_update",
+        "AFTER UPDATE OF status ON mission_submissions WHEN OLD.status IS NOT NEW.status",
+        _submission_effects("OLD", "-") + _submission_effects("NEW", "+"),
+    ),
+    ("stats_submission_delete", "AFTER DELETE ON mission_submissions", _submission_effects("OLD", "-")),
+    ("stats_user_insert", "AFTER INSERT ON users", _pilot_effects("NEW", "+")),
+    (
+        "stats_user_update",
+        "AFTER UPDATE OF role ON users WHEN OLD.role IS NOT NEW.role",
+        _pilot_effects("OLD", "-") + _pilot_effects("NEW", "+"),
+    ),
+    ("stats_user_delete", "AFTER DELETE ON users", _pilot_effects("OLD", "-")),
+    ("stats_branch_mission_insert", "AFTER INSERT ON branch_missions", _branch_mission_effects("NEW", "+")),
+    (
+        "stats_branch_mission_update",
+        "AFTER UPDATE OF branch_id, mission_id ON branch_missions",
+        _branch_mission_effects("OLD", "-") + _branch_mission_effects("NEW", "+"),
+    ),
+    ("stats_branch_mission_delete", "AFTER DELETE ON branch_missions", _branch_mission_effects("OLD", "-")),
+)
+
+# Начальные значения по уже накопленным данным.
+SEED = (
+    "INSERT INTO stats_counters (key, value) SELECT 'pilots', count(*) FROM users WHERE role = 'PILOT'",
+    "INSERT INTO stats_counters (key, value) SELECT 'active_pilots', count(DISTINCT user_id) "
+    "FROM mission_submissions WHERE status = 'APPROVED'",
+    "INSERT INTO stats_counters (key, value) SELECT 'submissions:' || lower(status), count(*) "
+    "FROM mission_submissions GROUP BY status",
+    "INSERT INTO stats_counters (key, value) SELECT 'branch_missions:' || branch_id, count(*) "
+    "FROM branch_missions GROUP BY branch_id",
+    "INSERT INTO stats_counters (key, value) SELECT 'branch_approved:' || bm.branch_id, count(ms.id) "
+    "FROM branch_missions AS bm JOIN mission_submissions AS ms "
+    "ON ms.mission_id = bm.mission_id AND ms.status = 'APPROVED' GROUP BY bm.branch_id",
+)
+
+
+def upgrade() -> None:
+    """Создаём stats_counters, заполняем её и вешаем триггеры."""
+
+    op.create_table(
+        "stats_counters",
+        sa.Column("key", sa.String(length=64), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+    )
+    for statement in SEED:
+        op.execute(statement)
+    for name, event_clause, statements in TRIGGERS:
+        op.execute(_trigger(name, event_clause, statements))
+
+
+def downgrade() -> None:
+    """Удаляем триггеры и stats_counters."""
+
+    for name, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table("stats_counters")
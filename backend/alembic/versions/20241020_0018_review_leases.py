@@ -0,0 +1,34 @@
+"""Закрепление отправок за проверяющим HR (аренда) и индекс очереди модерации."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0018"
+down_revision = "20241020_0017"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Без batch-режима: пересоздание таблицы удалило бы триггеры счётчиков
+    # (20241020_0017), а ALTER TABLE ADD COLUMN их сохраняет.
+    op.add_column("mission_submissions", sa.Column("review_claimed_by_id", sa.Integer(), nullable=True))
+    op.add_column(
+        "mission_submissions",
+        sa.Column("review_lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_mission_submissions_queue",
+        "mission_submissions",
+        ["status", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_mission_submissions_queue", table_name="mission_submissions")
+    op.drop_column("mission_submissions", "review_lease_expires_at")
+    op.drop_column("mission_submissions", "review_claimed_by_id")
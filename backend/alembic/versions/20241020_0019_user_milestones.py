@@ -0,0 +1,40 @@
+"""Вехи пилотов для воронки и когортного удержания."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0019"
+down_revision = "20241020_0018"
+branch_labels = None
+depends_on = None
+
+MILESTONES = ("REGISTERED", "ONBOARDING_COMPLETED", "FIRST_SUBMISSION", "FIRST_APPROVAL", "SECOND_RANK")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_milestones",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column(
+            "milestone",
+            sa.Enum(*MILESTONES, name="usermilestonekind"),
+            primary_key=True,
+        ),
+        sa.Column("reached_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_user_milestones_milestone_reached",
+        "user_milestones",
+        ["milestone", "reached_at"],
+        unique=False,
+    )
+    # Историю переносит `python -m app.services.milestones backfill`: на большой
+    # базе это долго, а миграция должна оставаться быстрой.
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_milestones_milestone_reached", table_name="user_milestones")
+    op.drop_table("user_milestones")
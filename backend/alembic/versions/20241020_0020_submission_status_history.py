@@ -0,0 +1,64 @@
+"""История статусов отправок и гистограммы времени до решения HR."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0020"
+down_revision = "20241020_0019"
+branch_labels = None
+depends_on = None
+
+STATUSES = ("PENDING", "APPROVED", "REJECTED")
+
+
+def upgrade() -> None:
+    # Без batch-режима: пересоздание mission_submissions удалило бы триггеры счётчиков.
+    op.add_column("mission_submissions", sa.Column("status_changed_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE mission_submissions SET status_changed_at = updated_at")
+    op.create_index(
+        "ix_mission_submissions_status_age",
+        "mission_submissions",
+        ["status", "status_changed_at"],
+        unique=False,
+    )
+
+    op.create_table(
+        "submission_status_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "submission_id",
+            sa.Integer(),
+            sa.ForeignKey("mission_submissions.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("from_status", sa.Enum(*STATUSES, name="submissionstatus"), nullable=True),
+        sa.Column("to_status", sa.Enum(*STATUSES, name="submissionstatus"), nullable=False),
+        sa.Column("actor_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("waited_seconds", sa.Float(), nullable=True),
+        sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_submission_status_events_submission_id",
+        "submission_status_events",
+        ["submission_id"],
+        unique=False,
+    )
+
+    op.create_table(
+        "review_time_buckets",
+        sa.Column("scope", sa.String(length=16), primary_key=True),
+        sa.Column("scope_id", sa.Integer(), primary_key=True),
+        sa.Column("bucket", sa.Integer(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("review_time_buckets")
+    op.drop_index("ix_submission_status_events_submission_id", table_name="submission_status_events")
+    op.drop_table("submission_status_events")
+    op.drop_index("ix_mission_submissions_status_age", table_name="mission_submissions")
+    op.drop_column("mission_submissions", "status_changed_at")
@@ -0,0 +1,47 @@
+"""Сводная статистика попыток по заданиям."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241020_0021"
+down_revision = "20241020_0020"
+branch_labels = None
+depends_on = None
+
+KINDS = ("CODING", "PYTHON")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "challenge_stats",
+        sa.Column("kind", sa.Enum(*KINDS, name="challengekind"), primary_key=True),
+        sa.Column("challenge_id", sa.Integer(), primary_key=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("passed_attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("users", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("passed_users", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_attempt_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_table(
+        "challenge_stat_counts",
+        sa.Column("kind", sa.Enum(*KINDS, name="challengekind"), primary_key=True),
+        sa.Column("challenge_id", sa.Integer(), primary_key=True),
+        sa.Column("metric", sa.String(length=16), primary_key=True),
+        sa.Column("key", sa.String(length=64), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_python_submissions_progress_challenge",
+        "python_submissions",
+        ["progress_id", "challenge_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_python_submissions_progress_challenge", table_name="python_submissions")
+    op.drop_table("challenge_stat_counts")
+    op.drop_table("challenge_stats")
@@ -0,0 +1,61 @@
+"""Триггеры, снимающие ссылки на файлы удалённых отправок и пользователей."""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20241020_0022"
+down_revision = "20241020_0021"
+branch_labels = None
+depends_on = None
+
+OWNERS = (("submission", "mission_submissions"), ("user", "users"))
+
+
+# Копия определений из app/models/blob.py на момент миграции.
+def _release_owner_references(owner_type: str) -> list[str]:
+    references = f"blob_references WHERE owner_type = '{owner_type}' AND owner_id = OLD.id"
+    released = f"(SELECT count(*) FROM {references} AND blob_id = stored_blobs.id)"
+    return [
+        "UPDATE stored_blobs SET "
+        f"ref_count = max(ref_count - {released}, 0), "
+        f"released_at = CASE WHEN ref_count <= {released} THEN CURRENT_TIMESTAMP ELSE released_at END "
+        f"WHERE id IN (SELECT blob_id FROM {references});",
+        f"DELETE FROM {references};",
+    ]
+
+
+def _trigger(name: str, event_clause: str, statements: list[str]) -> str:
+    body = "\n    ".join(statements)
+    return f"CREATE TRIGGER IF NOT EXISTS {name} {event_clause}\nBEGIN\n    {body}\nEND"
+
+
+TRIGGERS = (
+    ("blob_refs_submission_delete", "AFTER DELETE ON mission_submissions", _release_owner_references("submission")),
+    ("blob_refs_user_delete", "AFTER DELETE ON users", _release_owner_references("user")),
+)
+
+
+def upgrade() -> None:
+    """Снимаем уже повисшие ссылки, пересчитываем счётчики и вешаем триггеры."""
+
+    for owner_type, table in OWNERS:
+        op.execute(
+            f"DELETE FROM blob_references WHERE owner_type = '{owner_type}' "
+            f"AND owner_id NOT IN (SELECT id FROM {table})"
+        )
+    op.execute(
+        "UPDATE stored_blobs SET ref_count = "
+        "(SELECT count(*) FROM blob_references WHERE blob_id = stored_blobs.id)"
+    )
+    op.execute(
+        "UPDATE stored_blobs SET released_at = coalesce(released_at, CURRENT_TIMESTAMP) WHERE ref_count = 0"
+    )
+    for name, event_clause, statements in TRIGGERS:
+        op.execute(_trigger(name, event_clause, statements))
+
+
+def downgrade() -> None:
+    for name, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
@@ -2,15 +2,21 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import func
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import Session, selectinload
 
 from app.api.deps import require_hr
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import SessionLocal, get_db
 from app.models.artifact import Artifact
 from app.models.branch import Branch, BranchMission
+from app.models.challenge_stats import ChallengeKind
+from app.models.coding import CodingAttempt, CodingChallenge
 from app.models.mission import (
     Mission,
     MissionCompetencyReward,
@@ -18,15 +24,20 @@ from app.models.mission import (
     MissionSubmission,
     SubmissionStatus,
 )
+from app.models.python import PythonChallenge
 from app.models.rank import Rank, RankCompetencyRequirement, RankMissionRequirement
+from app.models.regrade import RegradeJob, RegradeJobStatus, RegradeTarget
 from app.models.store import StoreItem
-from app.models.user import Competency, User, UserRole
+from app.models.user import Competency
 from app.schemas.artifact import ArtifactCreate, ArtifactRead, ArtifactUpdate
+from app.schemas.catalog import CatalogBundle, CatalogImportReport
+from app.schemas.challenge_stats import ChallengeStatsRead
 from app.schemas.branch import BranchCreate, BranchMissionRead, BranchRead, BranchUpdate
 from app.schemas.mission import (
     MissionBase,
     MissionCreate,
     MissionDetail,
+    MissionParticipationRead,
     MissionSubmissionRead,
     MissionUpdate,
 )
@@ -38,21 +49,63 @@ from app.schemas.rank import (
     RankRequirementMission,
     RankUpdate,
 )
+from app.schemas.competency_analytics import CompetencyHeatmap
+from app.schemas.milestones import FunnelReport, RetentionReport
+from app.schemas.moderation import (
+    BulkReviewItem,
+    BulkReviewReport,
+    BulkReviewRequest,
+    ModerationQueueItem,
+    ModerationQueuePage,
+    ModerationSlaReport,
+)
+from app.schemas.regrade import RegradeJobRead
+from app.schemas.similarity import SimilarAttemptRead, SimilarityClusterRead
 from app.schemas.user import CompetencyBase
 from app.schemas.store import StoreItemCreate, StoreItemRead, StoreItemUpdate
 
+from app.services.admin_stats import dashboard_stats_snapshot
+from app.services.catalog import export_catalog, import_catalog
+from app.services.challenge_stats import challenge_stats_report
+from app.services.competency_analytics import Dimension, competency_heatmap
+from app.services.document_export import collect_export_entries, stream_documents_zip
 from app.services.mission import approve_submission, registration_is_open, reject_submission
-from app.schemas.admin_stats import AdminDashboardStats, BranchCompletionStat, SubmissionStats
+from app.services.milestones import funnel_report, retention_report
+from app.services.moderation import (
+    bulk_review_submissions,
+    claim_submissions,
+    ensure_review_lease,
+    list_queue_page,
+    release_submission,
+)
+from app.services.moderation_sla import moderation_sla_report
+from app.services.participation import (
+    MissionParticipation,
+    mission_participation,
+    participation_by_mission,
+)
+from app.services.regrade import (
+    claim_regrade_job_for_resume,
+    create_regrade_job,
+    mark_regrade_job_failed,
+    run_regrade_job,
+)
+from app.services.similarity import (
+    DEFAULT_THRESHOLD,
+    backfill_signatures,
+    find_similar_attempts,
+    find_suspicious_clusters,
+)
+from app.schemas.admin_stats import AdminDashboardStats
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
+logger = logging.getLogger(__name__)
 
 
-def _mission_to_detail(mission: Mission) -> MissionDetail:
+def _mission_to_detail(mission: Mission, participation: MissionParticipation) -> MissionDetail:
     """Формируем детальную схему миссии."""
 
-    participant_count = sum(
-        1 for submission in mission.submissions if submission.status != SubmissionStatus.REJECTED
-    )
+    participant_count = participation.registered_participants
     is_registration_open = registration_is_open(mission, participant_count=participant_count)
 
     return MissionDetail(
@@ -89,6 +142,7 @@ def _mission_to_detail(mission: Mission) -> MissionDetail:
         updated_at=mission.updated_at,
         registered_participants=participant_count,
         registration_open=is_registration_open,
+        participation=MissionParticipationRead.model_validate(participation),
     )
 
 
@@ -173,7 +227,6 @@ def _load_mission(db: Session, mission_id: int) -> Mission:
             selectinload(Mission.prerequisites),
             selectinload(Mission.competency_rewards).selectinload(MissionCompetencyReward.competency),
             selectinload(Mission.branches),
-            selectinload(Mission.submissions),
         )
         .filter(Mission.id == mission_id)
         .one()
@@ -185,7 +238,15 @@ def admin_missions(*, db: Session = Depends(get_db), current_user=Depends(requir
     """Список всех миссий для HR."""
 
     missions = db.query(Mission).order_by(Mission.title).all()
-    return [MissionBase.model_validate(mission) for mission in missions]
+    participation = participation_by_mission(db)
+    response: list[MissionBase] = []
+    for mission in missions:
+        dto = MissionBase.model_validate(mission)
+        stats = participation.get(mission.id, MissionParticipation())
+        dto.registered_participants = stats.registered_participants
+        dto.registration_open = registration_is_open(mission, participant_count=stats.registered_participants)
+        response.append(dto)
+    return response
 
 
 @router.get("/store/items", response_model=list[StoreItemRead], summary="Товары магазина (HR)")
@@ -296,14 +357,13 @@ def admin_mission_detail(
             selectinload(Mission.prerequisites),
             selectinload(Mission.competency_rewards).selectinload(MissionCompetencyReward.competency),
             selectinload(Mission.branches),
-            selectinload(Mission.submissions),
         )
         .filter(Mission.id == mission_id)
         .first()
     )
     if not mission:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Миссия не найдена")
-    return _mission_to_detail(mission)
+    return _mission_to_detail(mission, mission_participation(db, mission.id))
 
 
 @router.get("/branches", response_model=list[BranchRead], summary="Ветки миссий")
@@ -390,67 +450,9 @@ def list_artifacts(
 def dashboard_stats(
     *, db: Session = Depends(get_db), current_user=Depends(require_hr)
 ) -> AdminDashboardStats:
-    """Основные метрики прогресса и активности пользователей."""
-
-    total_pilots = db.query(User).filter(User.role == UserRole.PILOT).count()
-    approved_submissions = db.query(MissionSubmission).filter(
-        MissionSubmission.status == SubmissionStatus.APPROVED
-    )
-    active_pilots = (
-        approved_submissions.with_entities(MissionSubmission.user_id).distinct().count()
-    )
-
-    completed_counts = approved_submissions.with_entities(
-        MissionSubmission.user_id, func.count(MissionSubmission.id)
-    ).group_by(MissionSubmission.user_id)
-
-    total_completed = sum(row[1] for row in completed_counts)
-    average_completed = total_completed / active_pilots if active_pilots else 0.0
+    """Основные метрики прогресса и активности пользователей (снимок с коротким сроком жизни)."""
 
-    submission_stats = SubmissionStats(
-        pending=db.query(MissionSubmission).filter(MissionSubmission.status == SubmissionStatus.PENDING).count(),
-        approved=approved_submissions.count(),
-        rejected=db.query(MissionSubmission).filter(MissionSubmission.status == SubmissionStatus.REJECTED).count(),
-    )
-
-    branches = (
-        db.query(Branch)
-        .options(selectinload(Branch.missions))
-        .order_by(Branch.title)
-        .all()
-    )
-    branch_stats: list[BranchCompletionStat] = []
-    for branch in branches:
-        total_missions = len(branch.missions)
-        if total_missions == 0 or total_pilots == 0:
-            branch_stats.append(
-                BranchCompletionStat(branch_id=branch.id, branch_title=branch.title, completion_rate=0.0)
-            )
-            continue
-
-        approved_count = (
-            db.query(func.count(MissionSubmission.id))
-            .join(Mission, Mission.id == MissionSubmission.mission_id)
-            .join(BranchMission, BranchMission.mission_id == Mission.id)
-            .filter(
-                BranchMission.branch_id == branch.id,
-                MissionSubmission.status == SubmissionStatus.APPROVED,
-            )
-            .scalar()
-        )
-        denominator = total_missions * total_pilots
-        rate = min(1.0, approved_count / denominator) if denominator else 0.0
-        branch_stats.append(
-            BranchCompletionStat(branch_id=branch.id, branch_title=branch.title, completion_rate=rate)
-        )
-
-    return AdminDashboardStats(
-        total_users=total_pilots,
-        active_pilots=active_pilots,
-        average_completed_missions=round(average_completed, 2),
-        submission_stats=submission_stats,
-        branch_completion=branch_stats,
-    )
+    return dashboard_stats_snapshot(db)
 
 
 @router.post("/artifacts", response_model=ArtifactRead, summary="Создать артефакт")
@@ -583,7 +585,7 @@ def create_mission_endpoint(
 
     mission = _load_mission(db, mission.id)
 
-    return _mission_to_detail(mission)
+    return _mission_to_detail(mission, mission_participation(db, mission.id))
 
 
 @router.put("/missions/{mission_id}", response_model=MissionDetail, summary="Обновить миссию")
@@ -671,7 +673,7 @@ def update_mission_endpoint(
     db.commit()
 
     mission = _load_mission(db, mission.id)
-    return _mission_to_detail(mission)
+    return _mission_to_detail(mission, mission_participation(db, mission.id))
 
 
 @router.get("/ranks", response_model=list[RankBase], summary="Список рангов")
@@ -801,6 +803,147 @@ def moderation_queue(
     return [MissionSubmissionRead.model_validate(submission) for submission in submissions]
 
 
+@router.get(
+    "/submissions/queue",
+    response_model=ModerationQueuePage,
+    summary="Очередь модерации постранично",
+)
+def moderation_queue_page(
+    status_filter: SubmissionStatus = SubmissionStatus.PENDING,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> ModerationQueuePage:
+    """Страница очереди с кандидатом и миссией; ``next_cursor`` ведёт на следующую."""
+
+    items, next_cursor = list_queue_page(db, status_filter=status_filter, limit=limit, cursor=cursor)
+    return ModerationQueuePage(
+        items=[ModerationQueueItem.model_validate(item) for item in items],
+        next_cursor=next_cursor,
+    )
+
+
+@router.post(
+    "/submissions/claim",
+    response_model=list[ModerationQueueItem],
+    summary="Взять отправки на проверку",
+)
+def claim_submissions_endpoint(
+    limit: int = Query(default=10, ge=1),
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> list[ModerationQueueItem]:
+    """Закрепляем за HR следующие отправки из очереди на время аренды."""
+
+    claimed = claim_submissions(db, reviewer=current_user, limit=min(limit, settings.review_claim_max))
+    return [ModerationQueueItem.model_validate(item) for item in claimed]
+
+
+@router.post(
+    "/submissions/bulk",
+    response_model=BulkReviewReport,
+    summary="Одобрить или отклонить отправки пакетом",
+)
+def bulk_review_endpoint(
+    payload: BulkReviewRequest,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> BulkReviewReport:
+    """Решение сразу по многим отправкам (например, по участникам мероприятия) с отчётом по каждой."""
+
+    outcomes, rank_ups = bulk_review_submissions(
+        db,
+        reviewer=current_user,
+        submission_ids=payload.submission_ids,
+        decision=payload.decision,
+        comment=payload.comment,
+    )
+    results = [BulkReviewItem.model_validate(outcome) for outcome in outcomes]
+    return BulkReviewReport(
+        decision=payload.decision,
+        processed=sum(item.result in ("approved", "rejected") for item in results),
+        rank_ups=rank_ups,
+        results=results,
+    )
+
+
+@router.get(
+    "/submissions/sla",
+    response_model=ModerationSlaReport,
+    summary="SLA модерации: время до решения и возраст очереди",
+)
+def moderation_sla_endpoint(
+    *, db: Session = Depends(get_db), current_user=Depends(require_hr)
+) -> ModerationSlaReport:
+    """p50/p90/p99 времени до решения в целом, по миссиям и по проверяющим."""
+
+    return moderation_sla_report(db)
+
+
+@router.post(
+    "/submissions/{submission_id}/release",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Вернуть отправку в очередь",
+)
+def release_submission_endpoint(
+    submission_id: int,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> Response:
+    """Снимаем закрепление, не дожидаясь конца аренды."""
+
+    submission = db.get(MissionSubmission, submission_id)
+    if not submission:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Отправка не найдена")
+    release_submission(db, submission, reviewer=current_user)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/submissions/documents.zip",
+    summary="Выгрузить документы кандидатов архивом",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/zip": {}}}},
+)
+def export_submission_documents(
+    submission_ids: list[int] = Query(default=[]),
+    mission_id: int | None = None,
+    status_filter: SubmissionStatus | None = None,
+    registered_from: date | None = None,
+    registered_to: date | None = None,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> StreamingResponse:
+    """ZIP с паспортами, фото и резюме выбранных отправок, миссии или когорты и manifest.csv."""
+
+    if not submission_ids and mission_id is None and registered_from is None and registered_to is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Укажите отправки, миссию или период регистрации",
+        )
+
+    entries = collect_export_entries(
+        db,
+        submission_ids=submission_ids,
+        mission_id=mission_id,
+        status=status_filter,
+        registered_from=registered_from,
+        registered_to=registered_to,
+    )
+    filename = f"documents-{datetime.now(timezone.utc):%Y%m%d-%H%M}.zip"
+    return StreamingResponse(
+        stream_documents_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.post(
     "/submissions/{submission_id}/approve",
     response_model=MissionSubmissionRead,
@@ -817,7 +960,8 @@ def approve_submission_endpoint(
     submission = db.query(MissionSubmission).filter(MissionSubmission.id == submission_id).first()
     if not submission:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Отправка не найдена")
-    submission = approve_submission(db, submission)
+    ensure_review_lease(submission, current_user)
+    submission = approve_submission(db, submission, reviewer=current_user)
     return MissionSubmissionRead.model_validate(submission)
 
 
@@ -838,5 +982,258 @@ def reject_submission_endpoint(
     submission = db.query(MissionSubmission).filter(MissionSubmission.id == submission_id).first()
     if not submission:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Отправка не найдена")
-    submission = reject_submission(db, submission, comment)
+    ensure_review_lease(submission, current_user)
+    submission = reject_submission(db, submission, comment, reviewer=current_user)
     return MissionSubmissionRead.model_validate(submission)
+
+
+def _run_regrade_in_background(job_id: int) -> None:
+    """Выполняем перепроверку в отдельной сессии после ответа клиенту."""
+
+    session = SessionLocal()
+    try:
+        job = session.get(RegradeJob, job_id)
+        if job:
+            run_regrade_job(session, job)
+    except Exception as exc:  # noqa: BLE001 - фоновой задаче некому вернуть ошибку
+        logger.exception("Перепроверка %s завершилась с ошибкой", job_id)
+        mark_regrade_job_failed(session, job_id, str(exc))
+    finally:
+        session.close()
+
+
+@router.post(
+    "/coding/challenges/{challenge_id}/regrade",
+    response_model=RegradeJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Перепроверить попытки задания на программирование",
+)
+def regrade_coding_challenge(
+    challenge_id: int,
+    background_tasks: BackgroundTasks,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> RegradeJobRead:
+    """Запускаем фоновую перепроверку после правки эталонного ответа."""
+
+    if not db.get(CodingChallenge, challenge_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задание не найдено")
+    job = create_regrade_job(db, target=RegradeTarget.CODING, challenge_id=challenge_id)
+    background_tasks.add_task(_run_regrade_in_background, job.id)
+    return RegradeJobRead.model_validate(job)
+
+
+@router.post(
+    "/python/challenges/{challenge_id}/regrade",
+    response_model=RegradeJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Перепроверить решения задачи Python-миссии",
+)
+def regrade_python_challenge(
+    challenge_id: int,
+    background_tasks: BackgroundTasks,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> RegradeJobRead:
+    """Запускаем фоновую перепроверку решений Python-миссии."""
+
+    if not db.get(PythonChallenge, challenge_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задание не найдено")
+    job = create_regrade_job(db, target=RegradeTarget.PYTHON, challenge_id=challenge_id)
+    background_tasks.add_task(_run_regrade_in_background, job.id)
+    return RegradeJobRead.model_validate(job)
+
+
+@router.get("/regrade-jobs/{job_id}", response_model=RegradeJobRead, summary="Прогресс перепроверки")
+def get_regrade_job(
+    job_id: int,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> RegradeJobRead:
+    """Возвращаем прогресс задачи перепроверки."""
+
+    job = db.get(RegradeJob, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+    return RegradeJobRead.model_validate(job)
+
+
+@router.post(
+    "/regrade-jobs/{job_id}/resume",
+    response_model=RegradeJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Продолжить перепроверку",
+)
+def resume_regrade_job(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    *,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> RegradeJobRead:
+    """Продолжаем прерванную задачу с последней контрольной точки."""
+
+    job = db.get(RegradeJob, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+    if job.status == RegradeJobStatus.COMPLETED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Задача уже завершена")
+    if not claim_regrade_job_for_resume(db, job.id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Задача уже выполняется")
+    db.refresh(job)
+    background_tasks.add_task(_run_regrade_in_background, job.id)
+    return RegradeJobRead.model_validate(job)
+
+
+def _backfill_similarity_in_background() -> None:
+    """Достраиваем индекс похожести в отдельной сессии."""
+
+    session = SessionLocal()
+    try:
+        backfill_signatures(session)
+    finally:
+        session.close()
+
+
+@router.post(
+    "/coding/similarity/rebuild",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Достроить индекс похожих решений",
+)
+def rebuild_similarity_index(
+    background_tasks: BackgroundTasks,
+    *,
+    current_user=Depends(require_hr),
+) -> Response:
+    """Индексируем успешные попытки, у которых ещё нет подписи."""
+
+    background_tasks.add_task(_backfill_similarity_in_background)
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
+@router.get(
+    "/coding/challenges/{challenge_id}/similarity",
+    response_model=list[SimilarityClusterRead],
+    summary="Подозрительно похожие решения задания",
+)
+def similarity_clusters(
+    challenge_id: int,
+    *,
+    threshold: float = Query(default=DEFAULT_THRESHOLD, ge=0.5, le=1.0),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> list[SimilarityClusterRead]:
+    """Группы почти одинаковых решений, присланных разными пилотами."""
+
+    if not db.get(CodingChallenge, challenge_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задание не найдено")
+    clusters = find_suspicious_clusters(db, challenge_id=challenge_id, threshold=threshold)
+    return [SimilarityClusterRead.model_validate(cluster) for cluster in clusters]
+
+
+@router.get(
+    "/coding/attempts/{attempt_id}/similar",
+    response_model=list[SimilarAttemptRead],
+    summary="Похожие решения других пилотов",
+)
+def similar_attempts(
+    attempt_id: int,
+    *,
+    threshold: float = Query(default=DEFAULT_THRESHOLD, ge=0.5, le=1.0),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> list[SimilarAttemptRead]:
+    """Ищем кандидатов в списывание для конкретной попытки."""
+
+    if not db.get(CodingAttempt, attempt_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Попытка не найдена")
+    matches = find_similar_attempts(db, attempt_id=attempt_id, threshold=threshold)
+    return [SimilarAttemptRead.model_validate(match) for match in matches]
+
+
+@router.get("/catalog/export", response_model=CatalogBundle, summary="Выгрузить каталог")
+def export_catalog_endpoint(
+    *, db: Session = Depends(get_db), current_user=Depends(require_hr)
+) -> CatalogBundle:
+    """Миссии, ветки, ранги, артефакты, товары и задания одним пакетом."""
+
+    return export_catalog(db)
+
+
+@router.post("/catalog/import", response_model=CatalogImportReport, summary="Загрузить каталог")
+def import_catalog_endpoint(
+    bundle: CatalogBundle,
+    *,
+    dry_run: bool = Query(default=False, description="Только проверить пакет и показать изменения"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> CatalogImportReport:
+    """Применяем пакет целиком или не применяем ничего; ошибки проверки — 422."""
+
+    return import_catalog(db, bundle, dry_run=dry_run)
+
+
+@router.get("/analytics/funnel", response_model=FunnelReport, summary="Воронка пилотов")
+def funnel_endpoint(
+    *,
+    date_from: date | None = Query(default=None, description="Начало периода регистрации (по умолчанию 12 недель назад)"),
+    date_to: date | None = Query(default=None, description="Конец периода регистрации включительно"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> FunnelReport:
+    """Регистрация → онбординг → первая отправка → одобрение → второй ранг."""
+
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(weeks=12)
+    if date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Начало периода позже конца")
+    return funnel_report(db, date_from=date_from, date_to=date_to)
+
+
+@router.get("/analytics/retention", response_model=RetentionReport, summary="Удержание по недельным когортам")
+def retention_endpoint(
+    *,
+    cohorts: int = Query(default=12, ge=1, le=104),
+    weeks: int = Query(default=8, ge=1, le=52),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> RetentionReport:
+    """Сколько пилотов каждой недели регистрации дошли до каждой вехи за 1..N недель."""
+
+    return retention_report(db, cohorts=cohorts, weeks=weeks)
+
+
+@router.get(
+    "/analytics/competencies",
+    response_model=CompetencyHeatmap,
+    summary="Тепловая карта уровней компетенций",
+)
+def competency_heatmap_endpoint(
+    *,
+    dimension: Dimension = Query(default="rank", description="rank, branch или cohort (месяц регистрации)"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> CompetencyHeatmap:
+    """Среднее, p50/p90 и гистограмма уровней каждой компетенции по группам пилотов."""
+
+    return competency_heatmap(db, dimension)
+
+
+@router.get(
+    "/challenges/stats",
+    response_model=list[ChallengeStatsRead],
+    summary="Сложность заданий: попытки до решения и типичные ошибки",
+)
+def challenge_stats_endpoint(
+    *,
+    kind: ChallengeKind = Query(default=ChallengeKind.CODING, description="coding или python"),
+    mission_id: int | None = Query(default=None, description="Только задания миссии"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_hr),
+) -> list[ChallengeStatsRead]:
+    """Доля решивших, гистограмма номера первой успешной попытки и топ ошибок по заданиям."""
+
+    return challenge_stats_report(db, kind, mission_id=mission_id)
@@ -71,6 +71,8 @@ def register(user_in: UserRegister, db: Session = Depends(get_db)) -> Token | di
         is_email_confirmed=not settings.require_email_confirmation,
     )
     db.add(user)
+    db.flush()
+    record_milestone(db, user.id, UserMilestoneKind.REGISTERED)
     db.commit()
     db.refresh(user)
 
@@ -0,0 +1,94 @@
+"""Отдача файлов хранилища по подписанным ссылкам."""
+
+from __future__ import annotations
+
+from urllib.parse import quote
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.blobs import blob_relative_path
+from app.services.file_links import is_valid_sha256, verify_file_link
+from app.utils.http_ranges import RangeNotSatisfiableError, iter_file_range, parse_byte_range
+
+router = APIRouter(prefix="/api/files", tags=["files"])
+
+
+def _content_disposition(name: str) -> str:
+    quoted = quote(name)
+    if quoted != name:
+        return f"inline; filename*=utf-8''{quoted}"
+    return f'inline; filename="{name}"'
+
+
+@router.api_route("/{sha256}", methods=["GET", "HEAD"], summary="Скачиваем файл по подписанной ссылке")
+def download_signed_file(
+    sha256: str,
+    request: Request,
+    *,
+    expires: int = Query(...),
+    name: str = Query(..., max_length=255),
+    type: str = Query(..., max_length=127),  # noqa: A002 - имя параметра из ссылки
+    signature: str = Query(...),
+    range_header: str | None = Header(default=None, alias="Range"),
+    if_range: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """Проверяем подпись без обращения к базе и отдаём файл целиком или диапазоном.
+
+    Если настроен ``file_offload_header``, тело отдаёт обратный прокси: приложение
+    возвращает только заголовки и внутренний путь к файлу.
+    """
+
+    if not is_valid_sha256(sha256):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден")
+    if not verify_file_link(sha256, expires=expires, name=name, mime_type=type, signature=signature):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Ссылка недействительна или истекла")
+
+    relative_path = blob_relative_path(sha256)
+    path = settings.uploads_path / relative_path
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден") from error
+
+    # Содержимое файла определяется его sha256, поэтому ETag не меняется никогда.
+    etag = f'"{sha256}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600, immutable",
+        "Content-Disposition": _content_disposition(name),
+        "Accept-Ranges": "bytes",
+    }
+    if if_none_match and etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if settings.file_offload_header:
+        # Range, HEAD и условные запросы прокси обработает сам по внутреннему пути.
+        headers[settings.file_offload_header] = f"{settings.file_offload_prefix.rstrip('/')}/{relative_path}"
+        return Response(media_type=type, headers=headers)
+
+    byte_range = None
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except RangeNotSatisfiableError as error:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Диапазон за пределами файла",
+                headers={"Content-Range": f"bytes */{size}"},
+            ) from error
+
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    if request.method == "HEAD" or size == 0:
+        return Response(status_code=status_code, media_type=type, headers=headers)
+    return StreamingResponse(
+        iter_file_range(path, start, end), status_code=status_code, media_type=type, headers=headers
+    )
@@ -5,13 +5,13 @@ from __future__ import annotations
 from collections import defaultdict
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Response, UploadFile, status
 from fastapi.responses import FileResponse
-from sqlalchemy import func
 from sqlalchemy.orm import Session, selectinload
 
 from app.api.deps import get_current_user
 from app.db.session import get_db
+from app.models.blob import StoredBlob
 from app.models.coding import CodingAttempt, CodingChallenge
 from app.models.branch import Branch, BranchMission
 from app.models.mission import Mission, MissionSubmission, SubmissionStatus
@@ -22,17 +22,39 @@ from app.schemas.mission import (
     MissionBase,
     MissionDetail,
     MissionSubmissionRead,
+    SubmissionFileLink,
 )
 from app.schemas.coding import (
+    CodingAttemptPage,
+    CodingAttemptRead,
     CodingChallengeState,
     CodingMissionState,
     CodingRunRequest,
     CodingRunResponse,
+    CodingSessionRunResponse,
 )
-from app.services.coding import count_completed_challenges, evaluate_challenge
+from app.services.coding import (
+    count_completed_challenges,
+    evaluate_challenge,
+    latest_attempts_by_challenge,
+    list_attempts_page,
+    solved_challenge_ids,
+)
+from app.services.blobs import is_blob_path, sha256_from_path
+from app.services.file_links import sign_file_link
 from app.services.mission import UNSET, registration_is_open, submit_mission
-from app.services.storage import delete_submission_document, save_submission_document
+from app.services.participation import MissionParticipation, mission_participation, participation_by_mission
+from app.services.resumable_uploads import consume_upload
+from app.services.storage import (
+    UploadRejectedError,
+    UploadTooLargeError,
+    delete_submission_document,
+    register_upload,
+    save_submission_document,
+)
 from app.core.config import settings
+from app.utils.python_sessions import SessionsBusyError, get_session_manager, session_key
+from app.utils.runner_client import RunnerUnavailableError
 
 router = APIRouter(prefix="/api/missions", tags=["missions"])
 
@@ -137,19 +159,11 @@ def _ensure_mission_access(
 def _build_challenge_state(
     *,
     challenges: list[CodingChallenge],
-    attempts: list[CodingAttempt],
+    latest_attempts: dict[int, CodingAttempt],
+    completed_ids: set[int],
 ) -> tuple[list[CodingChallengeState], int, int, int | None]:
     """Формируем состояние каждого задания."""
 
-    latest_attempts: dict[int, CodingAttempt] = {}
-    completed_ids: set[int] = set()
-
-    for attempt in sorted(attempts, key=lambda item: item.created_at, reverse=True):
-        if attempt.challenge_id not in latest_attempts:
-            latest_attempts[attempt.challenge_id] = attempt
-        if attempt.is_passed:
-            completed_ids.add(attempt.challenge_id)
-
     completed_count = len(completed_ids)
     total = len(challenges)
 
@@ -295,18 +309,7 @@ def list_missions(
     )
 
     mission_ids = [mission.id for mission in missions]
-    registration_counts = {
-        mission_id: count
-        for mission_id, count in (
-            db.query(MissionSubmission.mission_id, func.count(MissionSubmission.id))
-            .filter(
-                MissionSubmission.mission_id.in_(mission_ids),
-                MissionSubmission.status != SubmissionStatus.REJECTED,
-            )
-            .group_by(MissionSubmission.mission_id)
-            .all()
-        )
-    }
+    participation = participation_by_mission(db, mission_ids)
 
     response: list[MissionBase] = []
     for mission in missions:
@@ -331,7 +334,7 @@ def list_missions(
         dto.coding_challenge_count = len(mission.coding_challenges)
         dto.completed_coding_challenges = coding_progress.get(mission.id, 0)
         dto.submission_status = submission_status_map.get(mission.id)
-        participants = registration_counts.get(mission.id, 0)
+        participants = participation.get(mission.id, MissionParticipation()).registered_participants
         dto.registered_participants = participants
         dto.registration_open = registration_is_open(
             mission,
@@ -427,14 +430,7 @@ def get_mission(
         (submission.status for submission in current_user.submissions if submission.mission_id == mission.id),
         None,
     )
-    participant_count = (
-        db.query(MissionSubmission)
-        .filter(
-            MissionSubmission.mission_id == mission.id,
-            MissionSubmission.status != SubmissionStatus.REJECTED,
-        )
-        .count()
-    )
+    participant_count = mission_participation(db, mission.id).registered_participants
     data.registered_participants = participant_count
     data.registration_open = registration_is_open(
         mission,
@@ -483,21 +479,10 @@ def get_coding_challenges(
     )
 
     challenge_ids = [challenge.id for challenge in mission.coding_challenges]
-    attempts: list[CodingAttempt] = []
-    if challenge_ids:
-        attempts = (
-            db.query(CodingAttempt)
-            .filter(
-                CodingAttempt.user_id == current_user.id,
-                CodingAttempt.challenge_id.in_(challenge_ids),
-            )
-            .order_by(CodingAttempt.created_at.desc())
-            .all()
-        )
-
     states, total, completed_count, current_id = _build_challenge_state(
         challenges=sorted(mission.coding_challenges, key=lambda item: item.order),
-        attempts=attempts,
+        latest_attempts=latest_attempts_by_challenge(db, user=current_user, challenge_ids=challenge_ids),
+        completed_ids=solved_challenge_ids(db, user=current_user, challenge_ids=challenge_ids),
     )
 
     if mission.id in completed_missions:
@@ -513,6 +498,39 @@ def get_coding_challenges(
     )
 
 
+@router.get(
+    "/{mission_id}/coding/challenges/{challenge_id}/attempts",
+    response_model=CodingAttemptPage,
+    summary="История попыток по заданию",
+)
+def list_coding_attempts(
+    mission_id: int,
+    challenge_id: int,
+    *,
+    limit: int = Query(default=20, ge=1, le=100),
+    before_id: int | None = Query(default=None, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> CodingAttemptPage:
+    """Возвращаем прошлые запуски пилота постранично, от новых к старым."""
+
+    challenge = (
+        db.query(CodingChallenge)
+        .filter(CodingChallenge.id == challenge_id, CodingChallenge.mission_id == mission_id)
+        .first()
+    )
+    if not challenge:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задание не найдено")
+
+    attempts, next_before_id = list_attempts_page(
+        db, user=current_user, challenge_id=challenge.id, limit=limit, before_id=before_id
+    )
+    return CodingAttemptPage(
+        items=[CodingAttemptRead.model_validate(attempt) for attempt in attempts],
+        next_before_id=next_before_id,
+    )
+
+
 @router.post(
     "/{mission_id}/coding/challenges/{challenge_id}/run",
     response_model=CodingRunResponse,
@@ -566,6 +584,74 @@ def run_coding_challenge(
     )
 
 
+@router.post(
+    "/{mission_id}/coding/session/run",
+    response_model=CodingSessionRunResponse,
+    summary="Выполняем фрагмент в интерактивной сессии",
+)
+def run_coding_session_snippet(
+    mission_id: int,
+    payload: CodingRunRequest,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> CodingSessionRunResponse:
+    """Запускаем фрагмент в долгоживущем интерпретаторе пилота.
+
+    Переменные сохраняются между запусками. Попытка не записывается и не
+    засчитывается: для проверки решения используется обычный запуск задания.
+    """
+
+    mission = (
+        db.query(Mission)
+        .options(selectinload(Mission.coding_challenges))
+        .filter(Mission.id == mission_id, Mission.is_active.is_(True))
+        .first()
+    )
+    if not mission or not mission.coding_challenges:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Миссия не найдена")
+
+    _ensure_mission_access(mission=mission, user=current_user, db=db)
+
+    try:
+        result, started = get_session_manager().run(session_key(current_user.id, mission_id), payload.code)
+    except SessionsBusyError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": str(RunnerUnavailableError.retry_after)},
+        ) from exc
+    except RunnerUnavailableError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    return CodingSessionRunResponse(
+        stdout=result.stdout,
+        stderr=result.stderr,
+        exit_code=result.exit_code,
+        timeout=result.timeout,
+        session_started=started,
+    )
+
+
+@router.delete(
+    "/{mission_id}/coding/session",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Завершаем интерактивную сессию",
+)
+def close_coding_session(
+    mission_id: int,
+    *,
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """Останавливаем интерпретатор пилота в этой миссии и освобождаем ресурсы."""
+
+    get_session_manager().close(session_key(current_user.id, mission_id))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.post("/{mission_id}/submit", response_model=MissionSubmissionRead, summary="Отправляем отчёт")
 async def submit(
     mission_id: int,
@@ -576,10 +662,16 @@ async def submit(
     passport: UploadFile | None = File(None),
     photo: UploadFile | None = File(None),
     resume_file: UploadFile | None = File(None),
+    passport_upload_id: str | None = Form(None),
+    photo_upload_id: str | None = Form(None),
+    resume_upload_id: str | None = Form(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> MissionSubmissionRead:
-    """Пилот отправляет доказательство выполнения миссии и сопроводительные документы."""
+    """Пилот отправляет доказательство выполнения миссии и сопроводительные документы.
+
+    Вместо файла можно передать id завершённой загрузки из ``/api/uploads``.
+    """
 
     mission = db.query(Mission).filter(Mission.id == mission_id, Mission.is_active.is_(True)).first()
     if not mission:
@@ -612,14 +704,7 @@ async def submit(
         .first()
     )
 
-    participant_count = (
-        db.query(MissionSubmission)
-        .filter(
-            MissionSubmission.mission_id == mission.id,
-            MissionSubmission.status != SubmissionStatus.REJECTED,
-        )
-        .count()
-    )
+    participant_count = mission_participation(db, mission.id).registered_participants
     registration_open_state = registration_is_open(
         mission,
         participant_count=participant_count,
@@ -631,20 +716,35 @@ async def submit(
             detail="Регистрация на офлайн-мероприятие закрыта.",
         )
 
-    def _has_upload(upload: UploadFile | None) -> bool:
-        return bool(upload and upload.filename)
-
+    def _has_upload(upload: UploadFile | None, upload_id: str | None = None) -> bool:
+        return bool(upload and upload.filename) or bool(upload_id)
+
+    async def _store(upload: UploadFile | None, kind: str, upload_id: str | None = None) -> str:
+        if not (upload and upload.filename):
+            return consume_upload(db, user=current_user, upload_id=upload_id, kind=kind)
+        try:
+            stored = await save_submission_document(upload=upload, kind=kind)
+        except UploadTooLargeError as error:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(error)
+            ) from error
+        except UploadRejectedError as error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)) from error
+        return register_upload(db, stored)
+
+    passport_provided = _has_upload(passport, passport_upload_id)
+    photo_provided = _has_upload(photo, photo_upload_id)
     passport_required = mission.id in REQUIRED_DOCUMENT_MISSIONS
     photo_required = mission.id in REQUIRED_DOCUMENT_MISSIONS
     resume_required = mission.id in REQUIRED_DOCUMENT_MISSIONS
 
     if passport_required and not (
-        (existing_submission and existing_submission.passport_path) or _has_upload(passport)
+        (existing_submission and existing_submission.passport_path) or passport_provided
     ):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Загрузите скан паспорта кандидата.")
 
     if photo_required and not (
-        (existing_submission and existing_submission.photo_path) or _has_upload(photo)
+        (existing_submission and existing_submission.photo_path) or photo_provided
     ):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Добавьте актуальную фотографию кандидата.")
 
@@ -653,7 +753,7 @@ async def submit(
         and (existing_submission.resume_path or existing_submission.resume_link)
     )
     resume_link_trimmed = (resume_link or "").strip()
-    resume_file_provided = _has_upload(resume_file)
+    resume_file_provided = _has_upload(resume_file, resume_upload_id)
     if resume_required and not (existing_resume_sources or resume_link_trimmed or resume_file_provided):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -665,29 +765,14 @@ async def submit(
     new_resume_path = None
 
     try:
-        if _has_upload(passport):
-            new_passport_path = save_submission_document(
-                upload=passport,
-                user_id=current_user.id,
-                mission_id=mission.id,
-                kind="passport",
-            )
+        if passport_provided:
+            new_passport_path = await _store(passport, "passport", passport_upload_id)
 
-        if _has_upload(photo):
-            new_photo_path = save_submission_document(
-                upload=photo,
-                user_id=current_user.id,
-                mission_id=mission.id,
-                kind="photo",
-            )
+        if photo_provided:
+            new_photo_path = await _store(photo, "photo", photo_upload_id)
 
         if resume_file_provided:
-            new_resume_path = save_submission_document(
-                upload=resume_file,
-                user_id=current_user.id,
-                mission_id=mission.id,
-                kind="resume",
-            )
+            new_resume_path = await _store(resume_file, "resume", resume_upload_id)
 
         submission = submit_mission(
             db=db,
@@ -732,18 +817,10 @@ def get_submission(
     return MissionSubmissionRead.model_validate(submission)
 
 
-@router.get(
-    "/submissions/{submission_id}/files/{document}",
-    summary="Скачиваем загруженные файлы",
-)
-def download_submission_file(
-    submission_id: int,
-    document: str,
-    *,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> FileResponse:
-    """Возвращаем файл паспорта, фото или резюме."""
+def _submission_document(
+    db: Session, submission_id: int, document: str, current_user: User
+) -> str:
+    """Путь документа отправки, если пользователь — её автор или HR."""
 
     submission = db.query(MissionSubmission).filter(MissionSubmission.id == submission_id).first()
     if not submission:
@@ -761,6 +838,52 @@ def download_submission_file(
     relative_path = attribute_map.get(document)
     if not relative_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден")
+    return relative_path
+
+
+@router.get(
+    "/submissions/{submission_id}/files/{document}/link",
+    response_model=SubmissionFileLink,
+    summary="Выдаём подписанную ссылку на документ",
+)
+def create_submission_file_link(
+    submission_id: int,
+    document: str,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> SubmissionFileLink:
+    """Проверяем доступ один раз; дальше файл отдаётся по ссылке без сессии и базы."""
+
+    relative_path = _submission_document(db, submission_id, document, current_user)
+    if not is_blob_path(relative_path):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Файл старого формата доступен только по прямой ссылке",
+        )
+
+    blob = db.query(StoredBlob).filter(StoredBlob.sha256 == sha256_from_path(relative_path)).first()
+    if not blob:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден")
+
+    link = sign_file_link(blob.sha256, name=f"{document}{blob.extension or ''}", mime_type=blob.mime_type)
+    return SubmissionFileLink(url=link.url, expires_at=datetime.fromtimestamp(link.expires, tz=timezone.utc))
+
+
+@router.get(
+    "/submissions/{submission_id}/files/{document}",
+    summary="Скачиваем загруженные файлы",
+)
+def download_submission_file(
+    submission_id: int,
+    document: str,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> FileResponse:
+    """Возвращаем файл паспорта, фото или резюме."""
+
+    relative_path = _submission_document(db, submission_id, document, current_user)
 
     file_path = settings.uploads_path / relative_path
     resolved = file_path.resolve()
@@ -771,4 +894,12 @@ def download_submission_file(
     if not resolved.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден")
 
+    if is_blob_path(relative_path):
+        blob = db.query(StoredBlob).filter(StoredBlob.sha256 == sha256_from_path(relative_path)).first()
+        return FileResponse(
+            resolved,
+            filename=f"{document}{(blob and blob.extension) or ''}",
+            media_type=blob.mime_type if blob else None,
+        )
+
     return FileResponse(resolved, filename=resolved.name)
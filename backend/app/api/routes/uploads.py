@@ -0,0 +1,116 @@
+"""Возобновляемая загрузка вложений по частям."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Header, Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.db.session import get_db
+from app.models.upload import UploadSession
+from app.models.user import User
+from app.schemas.upload import UploadSessionCreate, UploadSessionRead
+from app.services.resumable_uploads import (
+    append_chunk,
+    cancel_upload,
+    chunk_max_bytes,
+    complete_upload,
+    create_upload_session,
+    get_upload_session,
+)
+
+router = APIRouter(prefix="/api/uploads", tags=["uploads"])
+
+
+def _to_read(upload: UploadSession) -> UploadSessionRead:
+    return UploadSessionRead(
+        id=upload.id,
+        kind=upload.kind,
+        size=upload.total_size,
+        offset=upload.received,
+        completed=upload.relative_path is not None,
+        chunk_size=chunk_max_bytes(),
+        expires_at=upload.expires_at,
+    )
+
+
+@router.post(
+    "",
+    response_model=UploadSessionRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Начинаем загрузку по частям",
+)
+def create_upload(
+    payload: UploadSessionCreate,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> UploadSessionRead:
+    """Заводим сессию; дальше части отправляются через PUT с заголовком ``Upload-Offset``."""
+
+    upload = create_upload_session(
+        db,
+        user=current_user,
+        kind=payload.kind,
+        size=payload.size,
+        filename=payload.filename,
+        sha256=payload.sha256,
+    )
+    return _to_read(upload)
+
+
+@router.get("/{upload_id}", response_model=UploadSessionRead, summary="Сколько байт уже принято")
+def get_upload(
+    upload_id: str,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> UploadSessionRead:
+    """После обрыва клиент узнаёт смещение и продолжает с него."""
+
+    return _to_read(get_upload_session(db, user=current_user, upload_id=upload_id))
+
+
+@router.put("/{upload_id}", response_model=UploadSessionRead, summary="Отправляем часть файла")
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    *,
+    upload_offset: int = Header(..., ge=0),
+    x_chunk_sha256: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> UploadSessionRead:
+    """Тело запроса — сырые байты части; оно читается потоком, без разбора multipart."""
+
+    upload = get_upload_session(db, user=current_user, upload_id=upload_id)
+    upload = await append_chunk(
+        db, upload, offset=upload_offset, body=request.stream(), checksum=x_chunk_sha256
+    )
+    return _to_read(upload)
+
+
+@router.post("/{upload_id}/complete", response_model=UploadSessionRead, summary="Завершаем загрузку")
+async def complete(
+    upload_id: str,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> UploadSessionRead:
+    """Проверяем файл целиком и переносим в хранилище; id загрузки передаётся в отправку миссии."""
+
+    upload = get_upload_session(db, user=current_user, upload_id=upload_id)
+    return _to_read(await complete_upload(db, upload))
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Отменяем загрузку")
+def delete_upload(
+    upload_id: str,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """Удаляем принятые части."""
+
+    cancel_upload(db, get_upload_session(db, user=current_user, upload_id=upload_id))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
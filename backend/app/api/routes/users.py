@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import get_current_user
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.rank import Rank
 from app.models.user import User, UserRole, UserCompetency
@@ -19,14 +22,40 @@ from app.schemas.user import (
     UserProfile,
 )
 from app.services.rank import build_progress_snapshot
+from app.services.blobs import OWNER_USER, attach_blob, is_blob_path
+from app.services.images import (
+    DATA_URL_SIZE,
+    PHOTO_SIZES,
+    InvalidImageError,
+    discard_photo_variants,
+    generate_photo_variants,
+    photo_variant,
+)
 from app.services.storage import (
+    StoredUpload,
+    UploadRejectedError,
+    UploadTooLargeError,
     build_photo_data_url,
     delete_profile_photo,
+    register_upload,
     save_profile_photo,
 )
 
 router = APIRouter(prefix="/api", tags=["profile"])
 
+# Адрес миниатюры не меняется при замене фото, поэтому браузер перепроверяет её по ETag.
+PHOTO_CACHE_CONTROL = "private, no-cache"
+
+
+def _photo_data_url(relative_path: str) -> str:
+    """data URL со средней миниатюрой; если её не построить — с исходным файлом."""
+
+    try:
+        path, _ = photo_variant(relative_path, DATA_URL_SIZE)
+    except InvalidImageError:
+        return build_photo_data_url(relative_path)
+    return build_photo_data_url(path.relative_to(settings.uploads_path).as_posix())
+
 
 @router.get("/me", response_model=UserProfile, summary="Профиль пилота")
 def get_profile(
@@ -56,14 +85,14 @@ def get_profile(
 def get_profile_photo(
     *, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
 ) -> ProfilePhotoResponse:
-    """Читаем сохранённое изображение и возвращаем его в виде data URL."""
+    """Совместимый ответ с data URL; новым клиентам лучше брать ``/me/photo/{size}``."""
 
     db.refresh(current_user)
     if not current_user.profile_photo_path:
         return ProfilePhotoResponse(photo=None, detail="Фотография не загружена")
 
     try:
-        photo = build_photo_data_url(current_user.profile_photo_path)
+        photo = _photo_data_url(current_user.profile_photo_path)
     except FileNotFoundError:
         # Если файл удалили вручную, сбрасываем ссылку в базе, чтобы не мешать пользователю загрузить новую.
         current_user.profile_photo_path = None
@@ -74,33 +103,75 @@ def get_profile_photo(
     return ProfilePhotoResponse(photo=photo)
 
 
+@router.get(
+    "/me/photo/{size}",
+    summary="Фото профиля нужного размера (WebP)",
+    responses={200: {"content": {"image/webp": {}}}, 304: {"description": "Не изменилось"}},
+)
+def get_profile_photo_variant(
+    size: int,
+    *,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """Отдаём готовую миниатюру с ETag, чтобы браузер кэшировал её между визитами."""
+
+    if size not in PHOTO_SIZES or not current_user.profile_photo_path:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Фотография не найдена")
+
+    try:
+        path, etag = photo_variant(current_user.profile_photo_path, size)
+    except (FileNotFoundError, InvalidImageError) as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Фотография не найдена") from error
+
+    headers = {"ETag": etag, "Cache-Control": PHOTO_CACHE_CONTROL}
+    if if_none_match and etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(path, media_type="image/webp", headers=headers)
+
+
+def _attach_profile_photo(db: Session, user: User, stored: StoredUpload) -> str:
+    """Регистрируем файл, привязываем его к профилю и коммитим; возвращаем путь."""
+
+    relative_path = register_upload(db, stored)
+    # Ссылку на прежний файл из хранилища снимает attach_blob, старый формат удаляем.
+    if not is_blob_path(user.profile_photo_path):
+        discard_photo_variants(user.profile_photo_path)
+        delete_profile_photo(user.profile_photo_path)
+    attach_blob(db, relative_path=relative_path, owner_type=OWNER_USER, owner_id=user.id, field="profile_photo")
+    user.profile_photo_path = relative_path
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return relative_path
+
+
 @router.post(
     "/me/photo",
     response_model=ProfilePhotoResponse,
     status_code=status.HTTP_200_OK,
     summary="Загружаем фото профиля",
 )
-def upload_profile_photo(
+async def upload_profile_photo(
     photo: UploadFile = File(...),
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> ProfilePhotoResponse:
-    """Сохраняем изображение и возвращаем обновлённый data URL."""
+    """Сохраняем изображение, готовим миниатюры и возвращаем data URL для совместимости."""
 
     try:
-        relative_path = save_profile_photo(upload=photo, user_id=current_user.id)
-    except ValueError as error:
+        stored = await save_profile_photo(upload=photo)
+        await run_in_threadpool(generate_photo_variants, stored.relative_path)
+    except UploadTooLargeError as error:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(error)) from error
+    except (UploadRejectedError, InvalidImageError) as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)) from error
+    # Запись в базу синхронная: выполняем её в пуле потоков, не блокируя цикл событий.
+    relative_path = await run_in_threadpool(_attach_profile_photo, db, current_user, stored)
 
-    delete_profile_photo(current_user.profile_photo_path)
-    current_user.profile_photo_path = relative_path
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-
-    photo_url = build_photo_data_url(relative_path)
-    return ProfilePhotoResponse(photo=photo_url, detail="Фотография обновлена")
+    return ProfilePhotoResponse(photo=_photo_data_url(relative_path), detail="Фотография обновлена")
 
 
 @router.delete(
@@ -116,7 +187,8 @@ def delete_profile_photo_endpoint(
     if not current_user.profile_photo_path:
         return ProfilePhotoResponse(photo=None, detail="Фотография уже удалена")
 
-    delete_profile_photo(current_user.profile_photo_path)
+    discard_photo_variants(current_user.profile_photo_path)
+    delete_profile_photo(current_user.profile_photo_path, db=db, user_id=current_user.id)
     current_user.profile_photo_path = None
     db.add(current_user)
     db.commit()
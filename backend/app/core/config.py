@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -33,6 +33,64 @@ class Settings(BaseSettings):
 
     sqlite_path: Path = Path("/data/app.db")
     uploads_path: Path = Path("./data/uploads")
+    # Лимиты размера вложений в мегабайтах по видам; "default" — для остальных.
+    upload_max_mb: Dict[str, int] = {
+        "passport": 10,
+        "photo": 10,
+        "resume": 20,
+        "profile_photo": 5,
+        "default": 10,
+    }
+    # Максимальный размер одной части при возобновляемой загрузке.
+    upload_chunk_max_mb: int = 8
+    # Файлы хранилища без ссылок удаляются не раньше, чем через льготный период.
+    blob_grace_seconds: float = 24 * 60 * 60
+    blob_sweep_interval_seconds: float = 60 * 60
+    # Очистка каталога загрузок от файлов без ссылок: «сироты» старше льготного
+    # периода уходят в карантин uploads/.quarantine и удаляются через N дней.
+    uploads_gc_interval_seconds: float = 24 * 60 * 60
+    uploads_gc_grace_seconds: float = 7 * 24 * 60 * 60
+    uploads_quarantine_days: float = 14
+    uploads_gc_workers: int = 4
+    # Подписанные ссылки на файлы: срок жизни и (опционально) отдача тела обратным прокси.
+    # Например, "X-Accel-Redirect" с префиксом "/" для Caddy из репозитория.
+    file_link_ttl_seconds: int = 5 * 60
+    file_offload_header: str | None = None
+    file_offload_prefix: str = "/"
+    # Очередь модерации: на сколько отправка закрепляется за HR и сколько можно взять за раз.
+    review_lease_seconds: float = 15 * 60
+    review_claim_max: int = 50
+    # Сколько секунд HR-панель показывает один и тот же снимок метрик.
+    admin_stats_ttl_seconds: float = 30
+    # Как часто сверять счётчики панели (stats_counters) с исходными таблицами.
+    stats_reconcile_interval_seconds: float = 60 * 60
+    # Воронка и когорты строятся по вехам и кэшируются на календарный день (UTC).
+    milestone_analytics_ttl_seconds: float = 24 * 60 * 60
+    # Матрица уровней компетенций для тепловой карты; сбрасывается и при начислении уровней.
+    competency_analytics_ttl_seconds: float = 10 * 60
+    # Выгрузка в Parquet для аналитиков (нужен pyarrow: pip install -e .[bi]); интервал 0 — только CLI.
+    bi_export_path: Path = Path("./data/bi_export")
+    bi_export_interval_seconds: float = 0
+    bi_export_batch_rows: int = 10_000
+    # Строки моложе отсечки ждут следующего запуска: запас на ещё не закоммиченные транзакции.
+    bi_export_lag_seconds: float = 60
+    # Фоновые периодические задачи в процессе API (очистка хранилища и т.п.).
+    scheduler_enabled: bool = True
+
+    # Внешние воркеры запуска кода: "unix:/run/runner.sock" или "tcp:runner:8765".
+    # Пустой список — код выполняется прямо в процессе API (режим разработки).
+    runner_endpoints: List[str] = []
+    runner_token: str | None = None
+    runner_connect_timeout: float = 1.0
+    runner_health_interval: float = 10.0
+    # Запускать код в процессе API, если все воркеры недоступны (не заняты). Только для отладки.
+    runner_local_fallback: bool = False
+
+    # Интерактивные сессии Python: общий лимит, вытеснение по простою и ресурсы процесса.
+    repl_max_sessions: int = 20
+    repl_idle_timeout_seconds: float = 300.0
+    repl_memory_limit_mb: int = 256
+    repl_cpu_limit_seconds: int = 60
 
     @property
     def database_url(self) -> str:
@@ -53,6 +111,10 @@ def get_settings() -> Settings:
     if not settings.uploads_path.is_absolute():
         settings.uploads_path = (BASE_DIR / settings.uploads_path).resolve()
 
+    # Планировщик и CLI запускаются из разных каталогов, а граница выгрузки одна.
+    if not settings.bi_export_path.is_absolute():
+        settings.bi_export_path = (BASE_DIR / settings.bi_export_path).resolve()
+
     settings.sqlite_path.parent.mkdir(parents=True, exist_ok=True)
     settings.uploads_path.mkdir(parents=True, exist_ok=True)
     return settings
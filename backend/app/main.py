@@ -13,12 +13,19 @@ from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 
 from app import models  # noqa: F401 - важно, чтобы Base знала обо всех моделях
-from app.api.routes import admin, auth, journal, missions, onboarding, store, users, python
+from app.api.routes import admin, auth, files, journal, missions, onboarding, store, uploads, users, python
 from app.core.config import settings
 from app.core.security import get_password_hash
 from app.db.session import SessionLocal, engine
 from app.models.rank import Rank
 from app.models.user import User, UserRole
+from app.services.admin_stats import reconcile_stats_counters
+from app.services.bi_export import scheduled_export
+from app.services.blobs import sweep_unreferenced_blobs
+from app.services.resumable_uploads import expire_upload_sessions
+from app.services.scheduler import scheduler
+from app.services.uploads_gc import collect_uploads_garbage
+from app.utils.python_sessions import get_session_manager
 
 ALEMBIC_CONFIG = Path(__file__).resolve().parents[1] / "alembic.ini"
 
@@ -167,6 +174,14 @@ def create_demo_users() -> None:
         session.close()
 
 
+scheduler.add_job("blob-sweep", settings.blob_sweep_interval_seconds, sweep_unreferenced_blobs, exclusive=True)
+scheduler.add_job("upload-sessions", settings.blob_sweep_interval_seconds, expire_upload_sessions)
+# Полный обход дерева загрузок: выполняет один процесс за интервал, остальные пропускают.
+scheduler.add_job("uploads-gc", settings.uploads_gc_interval_seconds, collect_uploads_garbage, exclusive=True)
+scheduler.add_job("stats-reconcile", settings.stats_reconcile_interval_seconds, reconcile_stats_counters)
+scheduler.add_job("bi-export", settings.bi_export_interval_seconds, scheduled_export)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.backend_cors_origins,
@@ -184,6 +199,8 @@ app.include_router(onboarding.router)
 app.include_router(store.router)
 app.include_router(python.router)
 app.include_router(admin.router)
+app.include_router(files.router)
+app.include_router(uploads.router)
 
 
 @app.on_event("startup")
@@ -193,6 +210,16 @@ async def on_startup() -> None:
     run_migrations()
     if settings.environment != "production":
         create_demo_users()
+    if settings.scheduler_enabled:
+        scheduler.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    """Останавливаем интерактивные сессии, чтобы не оставлять процессы-сироты."""
+
+    scheduler.stop()
+    get_session_manager().close_all()
 
 
 @app.get("/", summary="Проверка работоспособности")
@@ -1,23 +1,39 @@
 """Инициализация моделей для удобных импортов."""
 
 from .artifact import Artifact  # noqa: F401
+from .blob import BlobReference, StoredBlob  # noqa: F401
 from .branch import Branch, BranchMission  # noqa: F401
+from .challenge_stats import ChallengeStatCount, ChallengeStats  # noqa: F401
+from .job_lease import JobLease  # noqa: F401
 from .journal import JournalEntry  # noqa: F401
+from .milestone import UserMilestone  # noqa: F401
 from .mission import Mission, MissionCompetencyReward, MissionPrerequisite, MissionSubmission  # noqa: F401
-from .coding import CodingAttempt, CodingChallenge  # noqa: F401
+from .coding import CodingAttempt, CodingChallenge, CodingProgress  # noqa: F401
 from .onboarding import OnboardingSlide, OnboardingState  # noqa: F401
 from .python import PythonChallenge, PythonSubmission, PythonUserProgress  # noqa: F401
+from .regrade import RegradeJob  # noqa: F401
+from .similarity import CodingAttemptLshBucket, CodingAttemptSignature  # noqa: F401
 from .rank import Rank, RankCompetencyRequirement, RankMissionRequirement  # noqa: F401
+from .stats import StatsCounter  # noqa: F401
 from .store import Order, StoreItem  # noqa: F401
+from .submission_history import ReviewTimeBucket, SubmissionStatusEvent  # noqa: F401
+from .upload import UploadSession  # noqa: F401
 from .user import Competency, User, UserArtifact, UserCompetency  # noqa: F401
 
 __all__ = [
     "Artifact",
+    "BlobReference",
     "Branch",
     "BranchMission",
+    "ChallengeStatCount",
+    "ChallengeStats",
+    "JobLease",
     "JournalEntry",
     "CodingChallenge",
     "CodingAttempt",
+    "CodingProgress",
+    "CodingAttemptLshBucket",
+    "CodingAttemptSignature",
     "Mission",
     "MissionCompetencyReward",
     "MissionPrerequisite",
@@ -28,12 +44,19 @@ __all__ = [
     "PythonSubmission",
     "PythonUserProgress",
     "Rank",
+    "RegradeJob",
+    "ReviewTimeBucket",
     "RankCompetencyRequirement",
     "RankMissionRequirement",
     "Order",
+    "StatsCounter",
     "StoreItem",
+    "StoredBlob",
+    "SubmissionStatusEvent",
+    "UploadSession",
     "Competency",
     "User",
     "UserArtifact",
     "UserCompetency",
+    "UserMilestone",
 ]
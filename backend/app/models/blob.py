@@ -0,0 +1,78 @@
+"""Контентно-адресуемое хранилище загруженных файлов."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DDL, DateTime, ForeignKey, Integer, String, UniqueConstraint, event
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base, TimestampMixin
+
+
+class StoredBlob(Base, TimestampMixin):
+    """Файл в ``uploads/blobs/ab/cd/<sha256>``; одно содержимое хранится один раз."""
+
+    __tablename__ = "stored_blobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    mime_type: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    # Расширение из первой загрузки — для имени файла при скачивании.
+    extension: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, index=True)
+    # Когда счётчик ссылок упал до нуля; очистка ждёт льготный период от этого момента.
+    released_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class BlobReference(Base, TimestampMixin):
+    """Связь поля владельца (вложение отправки, фото профиля) с файлом."""
+
+    __tablename__ = "blob_references"
+    __table_args__ = (
+        UniqueConstraint("owner_type", "owner_id", "field", name="uq_blob_reference_owner_field"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    blob_id: Mapped[int] = mapped_column(ForeignKey("stored_blobs.id"), nullable=False, index=True)
+    owner_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    owner_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    field: Mapped[str] = mapped_column(String(32), nullable=False)
+
+    blob = relationship("StoredBlob")
+
+
+def _release_owner_references(owner_type: str) -> list[str]:
+    """Снимаем ссылки удалённого владельца ``OLD.id`` и уменьшаем счётчики их файлов."""
+
+    references = f"blob_references WHERE owner_type = '{owner_type}' AND owner_id = OLD.id"
+    released = f"(SELECT count(*) FROM {references} AND blob_id = stored_blobs.id)"
+    return [
+        "UPDATE stored_blobs SET "
+        f"ref_count = max(ref_count - {released}, 0), "
+        f"released_at = CASE WHEN ref_count <= {released} THEN CURRENT_TIMESTAMP ELSE released_at END "
+        f"WHERE id IN (SELECT blob_id FROM {references});",
+        f"DELETE FROM {references};",
+    ]
+
+
+def _trigger(name: str, event_clause: str, statements: list[str]) -> str:
+    body = "\n    ".join(statements)
+    return f"CREATE TRIGGER IF NOT EXISTS {name} {event_clause}\nBEGIN\n    {body}\nEND"
+
+
+# Отправку или пользователя могут удалить каскадом (вместе с миссией, профилем) —
+# ссылки на файлы снимаются в той же транзакции, какой бы путь ни привёл к удалению.
+BLOB_TRIGGERS: tuple[str, ...] = (
+    _trigger(
+        "blob_refs_submission_delete",
+        "AFTER DELETE ON mission_submissions",
+        _release_owner_references("submission"),
+    ),
+    _trigger("blob_refs_user_delete", "AFTER DELETE ON users", _release_owner_references("user")),
+)
+
+for _statement in BLOB_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
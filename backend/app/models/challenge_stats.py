@@ -0,0 +1,51 @@
+"""Сводная статистика попыток по заданиям для авторов контента."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import DateTime, Enum as SQLEnum, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class ChallengeKind(str, Enum):
+    """Вид задания: шаг миссии с кодом или задание Python-миссии."""
+
+    CODING = "coding"
+    PYTHON = "python"
+
+
+class ChallengeStats(Base):
+    """Счётчики попыток задания; обновляются при каждой записи попытки."""
+
+    __tablename__ = "challenge_stats"
+
+    kind: Mapped[ChallengeKind] = mapped_column(SQLEnum(ChallengeKind), primary_key=True)
+    challenge_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    passed_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Сколько пилотов пробовали задание и сколько из них его решили.
+    users: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    passed_users: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ChallengeStatCount(Base):
+    """Счётчик по ключу для задания.
+
+    ``metric`` — ``first_pass`` (ключ — номер попытки, с которой пилот впервые
+    решил задание, ``10+`` для всех дальше) или ``failure`` (ключ — класс
+    исключения из stderr, ``wrong_output`` или ``other``).
+    """
+
+    __tablename__ = "challenge_stat_counts"
+
+    kind: Mapped[ChallengeKind] = mapped_column(SQLEnum(ChallengeKind), primary_key=True)
+    challenge_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    metric: Mapped[str] = mapped_column(String(16), primary_key=True)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Boolean, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -31,12 +32,19 @@ class CodingChallenge(Base, TimestampMixin):
     attempts: Mapped[List["CodingAttempt"]] = relationship(
         "CodingAttempt", back_populates="challenge", cascade="all, delete-orphan"
     )
+    progress: Mapped[List["CodingProgress"]] = relationship(
+        "CodingProgress", back_populates="challenge", cascade="all, delete-orphan"
+    )
 
 
 class CodingAttempt(Base, TimestampMixin):
     """История запусков кода пилота для конкретного задания."""
 
     __tablename__ = "coding_attempts"
+    __table_args__ = (
+        # Последняя попытка и история по заданию выбираются по (user_id, challenge_id, id).
+        Index("ix_coding_attempts_user_challenge", "user_id", "challenge_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     challenge_id: Mapped[int] = mapped_column(ForeignKey("coding_challenges.id"), nullable=False)
@@ -50,3 +58,27 @@ class CodingAttempt(Base, TimestampMixin):
     challenge = relationship("CodingChallenge", back_populates="attempts")
     user = relationship("User", back_populates="coding_attempts")
 
+
+
+class CodingProgress(Base, TimestampMixin):
+    """Сводка попыток пилота по заданию: одна строка вместо сканирования истории."""
+
+    __tablename__ = "coding_progress"
+    __table_args__ = (
+        # Уникальный индекс (user_id, challenge_id) обслуживает все проверки прохождения.
+        UniqueConstraint("user_id", "challenge_id", name="uq_coding_progress_user_challenge"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    challenge_id: Mapped[int] = mapped_column(
+        ForeignKey("coding_challenges.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    first_passed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Первая успешная попытка; пусто, пока задание не решено.
+    best_attempt_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("coding_attempts.id", ondelete="SET NULL"), nullable=True
+    )
+
+    challenge = relationship("CodingChallenge", back_populates="progress")
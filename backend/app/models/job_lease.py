@@ -0,0 +1,24 @@
+"""Аренда периодических задач, которые должен выполнять только один процесс."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class JobLease(Base):
+    """Кто и до какого момента держит задачу ``name``.
+
+    Аренда не снимается после успешного запуска: до ``expires_at`` задачу не
+    возьмёт ни один процесс, так что за интервал она выполняется один раз.
+    """
+
+    __tablename__ = "job_leases"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(128), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
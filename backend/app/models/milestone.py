@@ -0,0 +1,32 @@
+"""Вехи пути пилота для воронки и когортного удержания."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import DateTime, Enum as SQLEnum, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class UserMilestoneKind(str, Enum):
+    """Шаги воронки в порядке прохождения."""
+
+    REGISTERED = "registered"
+    ONBOARDING_COMPLETED = "onboarding_completed"
+    FIRST_SUBMISSION = "first_submission"
+    FIRST_APPROVAL = "first_approval"
+    SECOND_RANK = "second_rank"
+
+
+class UserMilestone(Base):
+    """Момент, когда пилот впервые достиг вехи; повторные события игнорируются."""
+
+    __tablename__ = "user_milestones"
+    __table_args__ = (Index("ix_user_milestones_milestone_reached", "milestone", "reached_at"),)
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    milestone: Mapped[UserMilestoneKind] = mapped_column(SQLEnum(UserMilestoneKind), primary_key=True)
+    reached_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -11,6 +11,7 @@ from sqlalchemy import (
     DateTime,
     Enum as SQLEnum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -146,6 +147,8 @@ class MissionSubmission(Base, TimestampMixin):
     __tablename__ = "mission_submissions"
     __table_args__ = (
         UniqueConstraint("user_id", "mission_id", name="uq_user_mission_submission"),
+        Index("ix_mission_submissions_queue", "status", "id"),
+        Index("ix_mission_submissions_status_age", "status", "status_changed_at"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -162,6 +165,11 @@ class MissionSubmission(Base, TimestampMixin):
     resume_link: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     awarded_xp: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     awarded_mana: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Кто из HR взял отправку на проверку и до какого момента она за ним закреплена.
+    review_claimed_by_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
+    review_lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Когда отправка перешла в текущий статус: от этого момента считается возраст очереди.
+    status_changed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     mission = relationship("Mission", back_populates="submissions")
-    user = relationship("User", back_populates="submissions")
+    user = relationship("User", back_populates="submissions", foreign_keys=[user_id])
@@ -5,7 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -46,6 +46,10 @@ class PythonSubmission(Base, TimestampMixin):
     """Хранение попыток решения конкретной задачи."""
 
     __tablename__ = "python_submissions"
+    __table_args__ = (
+        # Номер попытки пилота по заданию считается при каждой отправке.
+        Index("ix_python_submissions_progress_challenge", "progress_id", "challenge_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     progress_id: Mapped[int] = mapped_column(ForeignKey("python_user_progress.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,56 @@
+"""Задачи массовой перепроверки решений."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Enum as SQLEnum, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, TimestampMixin
+
+
+class RegradeTarget(str, Enum):
+    """Какие попытки перепроверяем."""
+
+    CODING = "coding"
+    PYTHON = "python"
+
+
+class RegradeJobStatus(str, Enum):
+    """Состояние задачи перепроверки."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class RegradeJob(Base, TimestampMixin):
+    """Перепроверка всех попыток задания после правки эталонного ответа.
+
+    ``last_attempt_id`` — контрольная точка: попытки обходятся по возрастанию id,
+    поэтому прерванную задачу можно продолжить с того же места.
+    """
+
+    __tablename__ = "regrade_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    target: Mapped[RegradeTarget] = mapped_column(SQLEnum(RegradeTarget), nullable=False)
+    challenge_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    status: Mapped[RegradeJobStatus] = mapped_column(
+        SQLEnum(RegradeJobStatus), default=RegradeJobStatus.PENDING, nullable=False
+    )
+    total_attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    processed_attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    unique_programs: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    changed_attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_attempt_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Пользователи (для coding) или записи прогресса (для python), у которых появилось
+    # новое успешное решение. Храним в БД, чтобы не потерять их при возобновлении.
+    newly_passed_ids: Mapped[list] = mapped_column(JSON, default=list, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
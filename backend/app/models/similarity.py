@@ -0,0 +1,40 @@
+"""Индекс похожести решений для проверки на списывание."""
+
+from __future__ import annotations
+
+from sqlalchemy import JSON, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, TimestampMixin
+
+
+class CodingAttemptSignature(Base, TimestampMixin):
+    """MinHash-подпись успешной попытки."""
+
+    __tablename__ = "coding_attempt_signatures"
+
+    attempt_id: Mapped[int] = mapped_column(
+        ForeignKey("coding_attempts.id", ondelete="CASCADE"), primary_key=True
+    )
+    challenge_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    token_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    minhash: Mapped[list[int]] = mapped_column(JSON, nullable=False, default=list)
+
+
+class CodingAttemptLshBucket(Base):
+    """Корзина LSH: попытки с совпавшей полосой подписи — кандидаты в дубликаты."""
+
+    __tablename__ = "coding_attempt_lsh"
+    __table_args__ = (
+        Index("ix_coding_attempt_lsh_lookup", "challenge_id", "band", "bucket"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    attempt_id: Mapped[int] = mapped_column(
+        ForeignKey("coding_attempts.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    challenge_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    band: Mapped[int] = mapped_column(Integer, nullable=False)
+    bucket: Mapped[str] = mapped_column(String(16), nullable=False)
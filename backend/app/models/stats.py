@@ -0,0 +1,123 @@
+"""Счётчики для HR-панели, которые ведут триггеры SQLite."""
+
+from __future__ import annotations
+
+from sqlalchemy import DDL, Integer, String, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+# Ключи счётчиков. Статусы и роли в базе хранятся именами перечислений.
+PILOTS = "pilots"
+ACTIVE_PILOTS = "active_pilots"
+SUBMISSIONS_PREFIX = "submissions:"
+BRANCH_MISSIONS_PREFIX = "branch_missions:"
+BRANCH_APPROVED_PREFIX = "branch_approved:"
+
+
+class StatsCounter(Base):
+    """Значение одного счётчика; отсутствующий ключ означает ноль."""
+
+    __tablename__ = "stats_counters"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+def _bump(key: str, delta: str, *, source: str = "", where: str = "true") -> str:
+    select = " ".join(part for part in (f"SELECT {key}, {delta}", source, f"WHERE {where}") if part)
+    return (
+        f"INSERT INTO stats_counters (key, value) {select} "
+        "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value;"
+    )
+
+
+def _approved_count(user: str) -> str:
+    return (
+        "(SELECT count(*) FROM mission_submissions "
+        f"WHERE user_id = {user}.user_id AND status = 'APPROVED')"
+    )
+
+
+def _submission_effects(row: str, sign: str) -> list[str]:
+    """Изменения счётчиков, когда строка ``row`` входит (+) в выборку или выходит (-) из неё."""
+
+    approved = f"{row}.status = 'APPROVED'"
+    # Триггеры AFTER видят уже изменённую таблицу: пилот стал активным, если
+    # одобренная отправка у него теперь одна, и перестал — если их не осталось.
+    threshold = "1" if sign == "+" else "0"
+    return [
+        _bump(f"'{SUBMISSIONS_PREFIX}' || lower({row}.status)", f"{sign}1"),
+        _bump(f"'{ACTIVE_PILOTS}'", f"{sign}1", where=f"{approved} AND {_approved_count(row)} = {threshold}"),
+        _bump(
+            f"'{BRANCH_APPROVED_PREFIX}' || branch_id",
+            f"{sign}1",
+            source="FROM branch_missions",
+            where=f"mission_id = {row}.mission_id AND {approved}",
+        ),
+    ]
+
+
+def _branch_mission_effects(row: str, sign: str) -> list[str]:
+    approved = (
+        "(SELECT count(*) FROM mission_submissions "
+        f"WHERE mission_id = {row}.mission_id AND status = 'APPROVED')"
+    )
+    return [
+        _bump(f"'{BRANCH_MISSIONS_PREFIX}' || {row}.branch_id", f"{sign}1"),
+        _bump(f"'{BRANCH_APPROVED_PREFIX}' || {row}.branch_id", f"{sign}{approved}"),
+    ]
+
+
+def _pilot_effects(row: str, sign: str) -> list[str]:
+    return [_bump(f"'{PILOTS}'", f"{sign}1", where=f"{row}.role = 'PILOT'")]
+
+
+def _trigger(name: str, event_clause: str, statements: list[str]) -> str:
+    body = "\n    ".join(statements)
+    return f"CREATE TRIGGER IF NOT EXISTS {name} {event_clause}\nBEGIN\n    {body}\nEND"
+
+
+STATS_TRIGGERS: tuple[str, ...] = (
+    _trigger(
+        "stats_submission_insert",
+        "AFTER INSERT ON mission_submissions",
+        _submission_effects("NEW", "+"),
+    ),
+    _trigger(
+        "stats_submission_update",
+        "AFTER UPDATE OF status ON mission_submissions WHEN OLD.status IS NOT NEW.status",
+        _submission_effects("OLD", "-") + _submission_effects("NEW", "+"),
+    ),
+    _trigger(
+        "stats_submission_delete",
+        "AFTER DELETE ON mission_submissions",
+        _submission_effects("OLD", "-"),
+    ),
+    _trigger("stats_user_insert", "AFTER INSERT ON users", _pilot_effects("NEW", "+")),
+    _trigger(
+        "stats_user_update",
+        "AFTER UPDATE OF role ON users WHEN OLD.role IS NOT NEW.role",
+        _pilot_effects("OLD", "-") + _pilot_effects("NEW", "+"),
+    ),
+    _trigger("stats_user_delete", "AFTER DELETE ON users", _pilot_effects("OLD", "-")),
+    _trigger(
+        "stats_branch_mission_insert",
+        "AFTER INSERT ON branch_missions",
+        _branch_mission_effects("NEW", "+"),
+    ),
+    _trigger(
+        "stats_branch_mission_update",
+        "AFTER UPDATE OF branch_id, mission_id ON branch_missions",
+        _branch_mission_effects("OLD", "-") + _branch_mission_effects("NEW", "+"),
+    ),
+    _trigger(
+        "stats_branch_mission_delete",
+        "AFTER DELETE ON branch_missions",
+        _branch_mission_effects("OLD", "-"),
+    ),
+)
+
+# Триггеры ссылаются на несколько таблиц, поэтому создаём их после всей схемы.
+for _statement in STATS_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
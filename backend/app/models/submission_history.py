@@ -0,0 +1,44 @@
+"""История статусов отправок и гистограммы времени до решения HR."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Enum as SQLEnum, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+from app.models.mission import SubmissionStatus
+
+
+class SubmissionStatusEvent(Base):
+    """Переход отправки между статусами; ``from_status`` пуст для новой отправки."""
+
+    __tablename__ = "submission_status_events"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    submission_id: Mapped[int] = mapped_column(
+        ForeignKey("mission_submissions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    from_status: Mapped[Optional[SubmissionStatus]] = mapped_column(SQLEnum(SubmissionStatus), nullable=True)
+    to_status: Mapped[SubmissionStatus] = mapped_column(SQLEnum(SubmissionStatus), nullable=False)
+    actor_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    # Длительность в статусе «на проверке», если переход — решение по ожидающей отправке.
+    waited_seconds: Mapped[Optional[float]] = mapped_column(nullable=True)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ReviewTimeBucket(Base):
+    """Корзина гистограммы времени до решения (:class:`app.utils.sketch.LogHistogram`).
+
+    ``scope`` — ``all``, ``mission`` или ``reviewer``; ``scope_id`` — id миссии или
+    проверяющего (0 для ``all``).
+    """
+
+    __tablename__ = "review_time_buckets"
+
+    scope: Mapped[str] = mapped_column(String(16), primary_key=True)
+    scope_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,33 @@
+"""Сессии возобновляемой загрузки вложений."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, TimestampMixin
+
+
+class UploadSession(Base, TimestampMixin):
+    """Загрузка файла по частям: части дописываются в ``.incoming/<id>.part``.
+
+    ``received`` — сколько байт подряд от начала файла уже принято; клиент
+    продолжает с этого смещения. После завершения файл переносится в хранилище,
+    а ``relative_path`` указывает на него до привязки к отправке.
+    """
+
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    total_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    received: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Необязательная контрольная сумма всего файла от клиента.
+    expected_sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    relative_path: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
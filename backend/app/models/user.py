@@ -53,7 +53,10 @@ class User(Base, TimestampMixin):
         "UserCompetency", back_populates="user", cascade="all, delete-orphan"
     )
     submissions: Mapped[List["MissionSubmission"]] = relationship(
-        "MissionSubmission", back_populates="user", cascade="all, delete-orphan"
+        "MissionSubmission",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        foreign_keys="MissionSubmission.user_id",
     )
     orders: Mapped[List["Order"]] = relationship("Order", back_populates="user")
     journal_entries: Mapped[List["JournalEntry"]] = relationship(
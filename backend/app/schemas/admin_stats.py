@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -29,3 +31,4 @@ class AdminDashboardStats(BaseModel):
     average_completed_missions: float
     submission_stats: SubmissionStats
     branch_completion: list[BranchCompletionStat]
+    computed_at: datetime
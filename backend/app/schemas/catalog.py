@@ -0,0 +1,155 @@
+"""Схемы пакета каталога: миссии, ветки, ранги, артефакты, товары и задания.
+
+Сущности ссылаются друг на друга по естественным ключам (названию), а не по
+id, чтобы пакет можно было перенести между окружениями.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.models.artifact import ArtifactRarity
+from app.models.mission import MissionDifficulty, MissionFormat
+from app.models.user import CompetencyCategory
+
+CATALOG_VERSION = 1
+
+
+class CatalogCompetency(BaseModel):
+    """Компетенция."""
+
+    name: str
+    description: str = ""
+    category: CompetencyCategory
+
+
+class CatalogArtifact(BaseModel):
+    """Артефакт."""
+
+    name: str
+    description: str = ""
+    rarity: ArtifactRarity
+    image_url: Optional[str] = None
+
+
+class CatalogCompetencyLevel(BaseModel):
+    """Компетенция и уровень: награда миссии или требование ранга."""
+
+    competency: str
+    level: int = 1
+
+
+class CatalogRank(BaseModel):
+    """Ранг с обязательными миссиями и уровнями компетенций."""
+
+    title: str
+    description: str = ""
+    required_xp: int = 0
+    missions: list[str] = Field(default_factory=list)
+    competencies: list[CatalogCompetencyLevel] = Field(default_factory=list)
+
+
+class CatalogCodingChallenge(BaseModel):
+    """Шаг миссии с заданием на программирование."""
+
+    order: int
+    title: str
+    prompt: str
+    starter_code: Optional[str] = None
+    expected_output: str
+
+
+class CatalogPythonChallenge(BaseModel):
+    """Задание Python-миссии."""
+
+    order: int
+    title: str
+    description: str
+    input_data: Optional[str] = None
+    expected_output: str
+    starter_code: Optional[str] = None
+
+
+class CatalogMission(BaseModel):
+    """Миссия с зависимостями, наградами и заданиями."""
+
+    title: str
+    description: str = ""
+    xp_reward: int = 0
+    mana_reward: int = 0
+    difficulty: MissionDifficulty = MissionDifficulty.MEDIUM
+    format: MissionFormat = MissionFormat.ONLINE
+    event_location: Optional[str] = None
+    event_address: Optional[str] = None
+    event_starts_at: Optional[datetime] = None
+    event_ends_at: Optional[datetime] = None
+    registration_deadline: Optional[datetime] = None
+    registration_url: Optional[str] = None
+    registration_notes: Optional[str] = None
+    capacity: Optional[int] = None
+    contact_person: Optional[str] = None
+    contact_phone: Optional[str] = None
+    is_active: bool = True
+    minimum_rank: Optional[str] = None
+    artifact: Optional[str] = None
+    prerequisites: list[str] = Field(default_factory=list)
+    competency_rewards: list[CatalogCompetencyLevel] = Field(default_factory=list)
+    coding_challenges: list[CatalogCodingChallenge] = Field(default_factory=list)
+    python_challenges: list[CatalogPythonChallenge] = Field(default_factory=list)
+
+
+class CatalogBranchMission(BaseModel):
+    """Миссия в ветке и её порядок."""
+
+    mission: str
+    order: int = 1
+
+
+class CatalogBranch(BaseModel):
+    """Ветка миссий."""
+
+    title: str
+    description: str = ""
+    category: str = "quest"
+    missions: list[CatalogBranchMission] = Field(default_factory=list)
+
+
+class CatalogStoreItem(BaseModel):
+    """Товар магазина."""
+
+    name: str
+    description: str = ""
+    cost_mana: int
+    stock: int = 0
+    image_url: Optional[str] = None
+
+
+class CatalogBundle(BaseModel):
+    """Пакет каталога целиком."""
+
+    version: int = CATALOG_VERSION
+    competencies: list[CatalogCompetency] = Field(default_factory=list)
+    artifacts: list[CatalogArtifact] = Field(default_factory=list)
+    ranks: list[CatalogRank] = Field(default_factory=list)
+    missions: list[CatalogMission] = Field(default_factory=list)
+    branches: list[CatalogBranch] = Field(default_factory=list)
+    store_items: list[CatalogStoreItem] = Field(default_factory=list)
+
+
+class CatalogEntityDiff(BaseModel):
+    """Что изменится (или изменилось) для одного вида сущностей."""
+
+    created: list[str] = Field(default_factory=list)
+    updated: list[str] = Field(default_factory=list)
+    unchanged: int = 0
+
+
+class CatalogImportReport(BaseModel):
+    """Результат импорта или пробного прогона."""
+
+    dry_run: bool
+    applied: bool
+    diff: dict[str, CatalogEntityDiff]
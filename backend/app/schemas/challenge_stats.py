@@ -0,0 +1,37 @@
+"""Статистика сложности заданий для HR и авторов контента."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.challenge_stats import ChallengeKind
+
+
+class ChallengeFailureCount(BaseModel):
+    """Причина неудачных попыток: класс исключения, ``wrong_output`` или ``other``."""
+
+    reason: str
+    count: int
+
+
+class ChallengeStatsRead(BaseModel):
+    """Попытки, доля решивших и типичные ошибки по заданию."""
+
+    kind: ChallengeKind
+    challenge_id: int
+    mission_id: int
+    order: int
+    title: str
+    attempts: int
+    users: int
+    passed_users: int
+    # Доля пилотов, решивших задание, и доля успешных попыток.
+    pass_rate: float
+    attempt_pass_rate: float
+    # Номер попытки, с которой пилоты впервые решили задание ("1".."9", "10+") -> число пилотов.
+    first_pass_histogram: dict[str, int]
+    top_failures: list[ChallengeFailureCount]
+    last_attempt_at: Optional[datetime] = None
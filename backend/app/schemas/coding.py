@@ -53,3 +53,36 @@ class CodingRunResponse(BaseModel):
     mission_completed: bool
     expected_output: Optional[str] = None
 
+
+class CodingSessionRunResponse(BaseModel):
+    """Результат запуска фрагмента в интерактивной сессии."""
+
+    stdout: str
+    stderr: str
+    exit_code: int
+    timeout: bool = False
+    session_started: bool = False
+
+
+class CodingAttemptRead(BaseModel):
+    """Одна попытка из истории запусков."""
+
+    id: int
+    challenge_id: int
+    code: str
+    stdout: str
+    stderr: str
+    exit_code: int
+    is_passed: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CodingAttemptPage(BaseModel):
+    """Страница истории попыток, от новых к старым."""
+
+    items: list[CodingAttemptRead]
+    # Передайте значение в ``before_id``, чтобы получить следующую страницу.
+    next_before_id: Optional[int] = None
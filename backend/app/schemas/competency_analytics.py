@@ -0,0 +1,43 @@
+"""Тепловая карта уровней компетенций."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional, Union
+
+from pydantic import BaseModel
+
+from app.schemas.user import CompetencyBase
+
+
+class CompetencyHeatmapGroup(BaseModel):
+    """Группа пилотов: ранг, любимая ветка или месяц регистрации."""
+
+    index: int
+    # id ранга или ветки, "ГГГГ-ММ" для когорты; пусто для пилотов без группы.
+    key: Optional[Union[int, str]] = None
+    label: str
+    pilots: int
+
+
+class CompetencyHeatmapCell(BaseModel):
+    """Распределение уровня одной компетенции в одной группе."""
+
+    group: int
+    competency_id: int
+    mean: float
+    p50: int
+    p90: int
+    # Сколько пилотов группы на каждом уровне (индекс — уровень).
+    histogram: list[int]
+
+
+class CompetencyHeatmap(BaseModel):
+    """Уровни компетенций в разрезе одного измерения."""
+
+    dimension: str
+    levels: list[int]
+    competencies: list[CompetencyBase]
+    groups: list[CompetencyHeatmapGroup]
+    cells: list[CompetencyHeatmapCell]
+    loaded_at: datetime
@@ -0,0 +1,47 @@
+"""Воронка пилотов и удержание по недельным когортам."""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.milestone import UserMilestoneKind
+
+
+class FunnelStep(BaseModel):
+    """Шаг воронки."""
+
+    milestone: UserMilestoneKind
+    users: int
+    # Доля от предыдущего шага и от зарегистрировавшихся.
+    conversion_from_previous: float
+    conversion_from_start: float
+    # Среднее время от предыдущего шага у тех, кто прошёл оба.
+    average_hours_from_previous: Optional[float] = None
+
+
+class FunnelReport(BaseModel):
+    """Воронка для пилотов, зарегистрированных в интервале ``[date_from, date_to]``."""
+
+    date_from: date
+    date_to: date
+    steps: list[FunnelStep]
+    computed_at: datetime
+
+
+class RetentionCohort(BaseModel):
+    """Недельная когорта: сколько пилотов достигли вехи за первые 1..N недель."""
+
+    week_start: date
+    size: int
+    reached_by_week: dict[UserMilestoneKind, list[int]]
+
+
+class RetentionReport(BaseModel):
+    """Удержание по когортам регистрации."""
+
+    weeks: int
+    cohorts: list[RetentionCohort]
+    computed_at: datetime
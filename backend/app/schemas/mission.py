@@ -54,6 +54,18 @@ class MissionCompetencyRewardRead(BaseModel):
     level_delta: int
 
 
+class MissionParticipationRead(BaseModel):
+    """Отправки миссии по статусам (для HR)."""
+
+    registered_participants: int
+    pending: int
+    approved: int
+    rejected: int
+
+    class Config:
+        from_attributes = True
+
+
 class MissionDetail(MissionBase):
     """Полная карточка миссии."""
 
@@ -63,6 +75,7 @@ class MissionDetail(MissionBase):
     competency_rewards: list[MissionCompetencyRewardRead]
     created_at: datetime
     updated_at: datetime
+    participation: Optional[MissionParticipationRead] = None
 
 
 
@@ -181,3 +194,10 @@ class MissionSubmissionRead(BaseModel):
         if self.resume_path:
             return f"/api/missions/submissions/{self.id}/files/resume"
         return None
+
+
+class SubmissionFileLink(BaseModel):
+    """Подписанная ссылка на документ отправки."""
+
+    url: str
+    expires_at: datetime
@@ -0,0 +1,106 @@
+"""Схемы очереди модерации."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.mission import MissionSubmissionRead
+
+
+class ModerationPilot(BaseModel):
+    """Кандидат, приславший отчёт."""
+
+    id: int
+    full_name: str
+    email: str
+
+    class Config:
+        from_attributes = True
+
+
+class ModerationMission(BaseModel):
+    """Миссия, по которой прислан отчёт."""
+
+    id: int
+    title: str
+    xp_reward: int
+    mana_reward: int
+
+    class Config:
+        from_attributes = True
+
+
+class ModerationQueueItem(MissionSubmissionRead):
+    """Отправка в очереди вместе с кандидатом, миссией и закреплением за HR."""
+
+    created_at: datetime
+    user: ModerationPilot
+    mission: ModerationMission
+    review_claimed_by_id: Optional[int] = None
+    review_lease_expires_at: Optional[datetime] = None
+
+
+class ModerationQueuePage(BaseModel):
+    """Страница очереди и курсор следующей страницы."""
+
+    items: list[ModerationQueueItem]
+    next_cursor: Optional[str] = None
+
+
+class BulkReviewRequest(BaseModel):
+    """Пакетное решение по отправкам."""
+
+    submission_ids: list[int] = Field(min_length=1, max_length=5000)
+    decision: Literal["approve", "reject"]
+    comment: Optional[str] = None
+
+
+class BulkReviewItem(BaseModel):
+    """Итог по одной отправке: approved, rejected, skipped, conflict или not_found."""
+
+    submission_id: int
+    result: str
+    detail: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BulkReviewReport(BaseModel):
+    """Отчёт о пакетном решении."""
+
+    decision: str
+    processed: int
+    rank_ups: int
+    results: list[BulkReviewItem]
+
+
+class ReviewTimeStats(BaseModel):
+    """Время от отправки до решения HR (секунды, точность около 1%)."""
+
+    scope_id: Optional[int] = None
+    title: Optional[str] = None
+    decisions: int
+    p50_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+    p99_seconds: Optional[float] = None
+
+
+class ModerationQueueAge(BaseModel):
+    """Сколько отправок ждёт проверки и как давно ждёт самая старая."""
+
+    pending: int
+    oldest_pending_seconds: Optional[float] = None
+
+
+class ModerationSlaReport(BaseModel):
+    """SLA модерации: в целом, по миссиям и по проверяющим."""
+
+    overall: ReviewTimeStats
+    by_mission: list[ReviewTimeStats]
+    by_reviewer: list[ReviewTimeStats]
+    queue: ModerationQueueAge
+    computed_at: datetime
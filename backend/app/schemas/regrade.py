@@ -0,0 +1,31 @@
+"""Схемы задач перепроверки решений."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.regrade import RegradeJobStatus, RegradeTarget
+
+
+class RegradeJobRead(BaseModel):
+    """Состояние и прогресс задачи перепроверки."""
+
+    id: int
+    target: RegradeTarget
+    challenge_id: int
+    status: RegradeJobStatus
+    total_attempts: int
+    processed_attempts: int
+    unique_programs: int
+    changed_attempts: int
+    last_attempt_id: int
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,27 @@
+"""Схемы отчётов о похожих решениях."""
+
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class SimilarAttemptRead(BaseModel):
+    """Попытка другого пилота, похожая на выбранную."""
+
+    attempt_id: int
+    user_id: int
+    similarity: float
+
+    class Config:
+        from_attributes = True
+
+
+class SimilarityClusterRead(BaseModel):
+    """Группа похожих решений одного задания."""
+
+    attempt_ids: list[int]
+    user_ids: list[int]
+    max_similarity: float
+
+    class Config:
+        from_attributes = True
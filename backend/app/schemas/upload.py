@@ -0,0 +1,29 @@
+"""Схемы возобновляемой загрузки вложений."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class UploadSessionCreate(BaseModel):
+    """Начало загрузки: вид вложения и размер файла."""
+
+    kind: str
+    size: int = Field(gt=0)
+    filename: Optional[str] = Field(default=None, max_length=255)
+    sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")
+
+
+class UploadSessionRead(BaseModel):
+    """Состояние загрузки: принято ``offset`` байт из ``size``."""
+
+    id: str
+    kind: str
+    size: int
+    offset: int
+    completed: bool
+    chunk_size: int
+    expires_at: datetime
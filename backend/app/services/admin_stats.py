@@ -0,0 +1,154 @@
+"""Сводные метрики HR-панели.
+
+Итоги по отправкам, число пилотов и одобренные отправки по веткам ведут
+триггеры SQLite в таблице ``stats_counters`` (см. :mod:`app.models.stats`),
+поэтому чтение панели не зависит от объёма отправок. Готовый снимок живёт
+``admin_stats_ttl_seconds``; одновременные запросы панелей делят один пересчёт.
+Периодическая сверка (:func:`reconcile_stats_counters`) пересчитывает те же
+значения по исходным таблицам и исправляет разошедшиеся счётчики.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import case, delete, distinct, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.branch import Branch, BranchMission
+from app.models.mission import MissionSubmission, SubmissionStatus
+from app.models.stats import (
+    ACTIVE_PILOTS,
+    BRANCH_APPROVED_PREFIX,
+    BRANCH_MISSIONS_PREFIX,
+    PILOTS,
+    SUBMISSIONS_PREFIX,
+    StatsCounter,
+)
+from app.models.user import User, UserRole
+from app.schemas.admin_stats import AdminDashboardStats, BranchCompletionStat, SubmissionStats
+from app.utils.snapshot_cache import SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+
+def _submission_key(value: SubmissionStatus) -> str:
+    return f"{SUBMISSIONS_PREFIX}{value.name.lower()}"
+
+
+def compute_dashboard_stats(db: Session) -> AdminDashboardStats:
+    """Собираем метрики панели из счётчиков, без кэша."""
+
+    counters: dict[str, int] = dict(db.execute(select(StatsCounter.key, StatsCounter.value)).all())
+    pilots = counters.get(PILOTS, 0)
+    active_pilots = counters.get(ACTIVE_PILOTS, 0)
+    approved = counters.get(_submission_key(SubmissionStatus.APPROVED), 0)
+
+    branch_stats: list[BranchCompletionStat] = []
+    for branch_id, title in db.execute(select(Branch.id, Branch.title).order_by(Branch.title)):
+        denominator = counters.get(f"{BRANCH_MISSIONS_PREFIX}{branch_id}", 0) * pilots
+        approved_count = counters.get(f"{BRANCH_APPROVED_PREFIX}{branch_id}", 0)
+        rate = min(1.0, approved_count / denominator) if denominator else 0.0
+        branch_stats.append(BranchCompletionStat(branch_id=branch_id, branch_title=title, completion_rate=rate))
+
+    average_completed = approved / active_pilots if active_pilots else 0.0
+    return AdminDashboardStats(
+        total_users=pilots,
+        active_pilots=active_pilots,
+        average_completed_missions=round(average_completed, 2),
+        submission_stats=SubmissionStats(
+            pending=counters.get(_submission_key(SubmissionStatus.PENDING), 0),
+            approved=approved,
+            rejected=counters.get(_submission_key(SubmissionStatus.REJECTED), 0),
+        ),
+        branch_completion=branch_stats,
+        computed_at=datetime.now(timezone.utc),
+    )
+
+
+def count_stats_ground_truth(db: Session) -> dict[str, int]:
+    """Значения счётчиков, пересчитанные по исходным таблицам (нулевые не включаем)."""
+
+    approved_user = case(
+        (MissionSubmission.status == SubmissionStatus.APPROVED, MissionSubmission.user_id)
+    )
+    truth: dict[str, int] = {
+        PILOTS: db.scalar(select(func.count(User.id)).where(User.role == UserRole.PILOT)) or 0,
+        ACTIVE_PILOTS: db.scalar(select(func.count(distinct(approved_user)))) or 0,
+    }
+    for value, count in db.execute(
+        select(MissionSubmission.status, func.count(MissionSubmission.id)).group_by(MissionSubmission.status)
+    ):
+        truth[_submission_key(value)] = count
+
+    # Одобренные отправки по миссиям; ветка суммирует их по своим связкам.
+    approved_by_mission = (
+        select(MissionSubmission.mission_id, func.count(MissionSubmission.id).label("approved"))
+        .where(MissionSubmission.status == SubmissionStatus.APPROVED)
+        .group_by(MissionSubmission.mission_id)
+        .subquery()
+    )
+    for branch_id, missions, approved in db.execute(
+        select(
+            BranchMission.branch_id,
+            func.count(BranchMission.id),
+            func.coalesce(func.sum(approved_by_mission.c.approved), 0),
+        )
+        .outerjoin(approved_by_mission, approved_by_mission.c.mission_id == BranchMission.mission_id)
+        .group_by(BranchMission.branch_id)
+    ):
+        truth[f"{BRANCH_MISSIONS_PREFIX}{branch_id}"] = missions
+        truth[f"{BRANCH_APPROVED_PREFIX}{branch_id}"] = approved
+
+    return {key: value for key, value in truth.items() if value}
+
+
+def reconcile_stats_counters(db: Session) -> dict[str, tuple[int, int]]:
+    """Сверяем счётчики с исходными таблицами и исправляем расхождения.
+
+    Возвращает ``{ключ: (было, стало)}`` для исправленных счётчиков.
+    """
+
+    stored: dict[str, int] = dict(db.execute(select(StatsCounter.key, StatsCounter.value)).all())
+    truth = count_stats_ground_truth(db)
+    drift = {
+        key: (stored.get(key, 0), truth.get(key, 0))
+        for key in stored.keys() | truth.keys()
+        if stored.get(key, 0) != truth.get(key, 0)
+    }
+    # Нулевые записи (например, от удалённых веток) тоже убираем.
+    stale = [key for key, value in stored.items() if key not in truth]
+    if stale:
+        db.execute(delete(StatsCounter).where(StatsCounter.key.in_(stale)))
+    fixed = [{"key": key, "value": actual} for key, (_, actual) in drift.items() if actual]
+    if fixed:
+        statement = insert(StatsCounter).values(fixed)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[StatsCounter.key], set_={"value": statement.excluded.value}
+            )
+        )
+    db.commit()
+
+    if drift:
+        logger.warning("Счётчики HR-панели разошлись с данными и исправлены: %s", drift)
+        invalidate_dashboard_stats()
+    return drift
+
+
+_dashboard_cache: SnapshotCache[AdminDashboardStats] = SnapshotCache(
+    lambda: settings.admin_stats_ttl_seconds
+)
+
+
+def dashboard_stats_snapshot(db: Session) -> AdminDashboardStats:
+    """Снимок метрик из кэша; устаревший пересчитывает один запрос."""
+
+    return _dashboard_cache.get(lambda: compute_dashboard_stats(db))
+
+
+def invalidate_dashboard_stats() -> None:
+    _dashboard_cache.invalidate()
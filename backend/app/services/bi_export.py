@@ -0,0 +1,341 @@
+"""Выгрузка данных платформы в Parquet для офлайн-аналитики.
+
+Пользователи, отправки, журнал, заказы и попытки решений выгружаются в сжатые
+колоночные файлы ``<bi_export_path>/<таблица>/<таблица>-<метка>.parquet``.
+Выгрузка инкрементальная: для каждой таблицы в ``watermarks.json`` хранится
+граница по ``updated_at``, и следующий запуск берёт только строки, изменённые
+после неё. Строки читаются пачками по ``bi_export_batch_rows`` и сразу пишутся
+в файл, так что память не зависит от размера таблиц.
+
+Все таблицы читаются в одной транзакции SQLite — из одного снимка базы. В
+режиме WAL такая транзакция не мешает записи, поэтому перед выгрузкой журнал
+переводится в WAL (режим сохраняется в файле базы). Удаления строк выгрузка не
+отражает: в аналитике строки дедуплицируются по ``id`` с последним ``updated_at``.
+
+``pyarrow`` — необязательная зависимость: ``pip install -e .[bi]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import enum
+import json
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+try:  # pragma: no cover - модуль есть только на POSIX
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+from sqlalchemy import JSON, Boolean, Date, DateTime, Enum as SQLEnum, Float, Integer, Numeric, Table, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.coding import CodingAttempt
+from app.models.journal import JournalEntry
+from app.models.mission import MissionSubmission
+from app.models.python import PythonSubmission
+from app.models.store import Order
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+WATERMARKS_FILE = "watermarks.json"
+LOCK_FILE = ".lock"
+FILE_STAMP = "%Y%m%dT%H%M%S"
+COMPRESSION = "zstd"
+
+EXPORT_TABLES: dict[str, Table] = {
+    "users": User.__table__,
+    "mission_submissions": MissionSubmission.__table__,
+    "journal_entries": JournalEntry.__table__,
+    "orders": Order.__table__,
+    "coding_attempts": CodingAttempt.__table__,
+    "python_submissions": PythonSubmission.__table__,
+}
+# Секреты не покидают базу.
+EXCLUDED_COLUMNS = {"users": {"hashed_password", "email_confirmation_token"}}
+
+
+class BiExportUnavailableError(RuntimeError):
+    """Не установлен ``pyarrow``."""
+
+
+class BiExportBusyError(RuntimeError):
+    """Другая выгрузка в тот же каталог ещё идёт."""
+
+
+@dataclass
+class TableExport:
+    rows: int = 0
+    file: str | None = None
+    watermark: datetime | None = None
+
+
+@dataclass
+class BiExportReport:
+    cutoff: datetime
+    full: bool
+    tables: dict[str, TableExport] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "cutoff": self.cutoff.isoformat(),
+            "full": self.full,
+            "tables": {
+                name: {
+                    "rows": item.rows,
+                    "file": item.file,
+                    "watermark": item.watermark.isoformat() if item.watermark else None,
+                }
+                for name, item in self.tables.items()
+            },
+        }
+
+
+def _pyarrow():
+    try:
+        import pyarrow  # noqa: PLC0415 - необязательная зависимость
+        import pyarrow.parquet  # noqa: F401, PLC0415
+    except ImportError as exc:
+        raise BiExportUnavailableError(
+            "Для выгрузки в Parquet установите pyarrow: pip install -e .[bi]"
+        ) from exc
+    return pyarrow
+
+
+def _arrow_type(pa, column) -> Any:
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, (Float, Numeric)):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        # SQLite хранит время без пояса, а пишем мы всегда UTC.
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _converter(column):
+    if isinstance(column.type, SQLEnum):
+        return lambda value: value.value if isinstance(value, enum.Enum) else value
+    if isinstance(column.type, JSON):
+        return lambda value: None if value is None else json.dumps(value, ensure_ascii=False)
+    return None
+
+
+def _columns(name: str, table: Table) -> list:
+    excluded = EXCLUDED_COLUMNS.get(name, set())
+    return [column for column in table.columns if column.name not in excluded]
+
+
+def _read_watermarks(root: Path) -> dict[str, datetime]:
+    path = root / WATERMARKS_FILE
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {name: datetime.fromisoformat(value) for name, value in data.get("tables", {}).items()}
+
+
+def _write_watermarks(root: Path, watermarks: dict[str, datetime], cutoff: datetime) -> None:
+    payload = {
+        "exported_at": cutoff.isoformat(),
+        "tables": {name: value.isoformat() for name, value in sorted(watermarks.items())},
+    }
+    tmp = root / f"{WATERMARKS_FILE}.tmp"
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, root / WATERMARKS_FILE)
+
+
+@contextlib.contextmanager
+def _export_lock(root: Path) -> Iterator[None]:
+    """Не даём двум процессам (CLI и планировщику) писать в каталог одновременно."""
+
+    handle = (root / LOCK_FILE).open("a")
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError as exc:
+                raise BiExportBusyError(f"Выгрузка в {root} уже выполняется") from exc
+        yield
+    finally:
+        handle.close()
+
+
+@contextlib.contextmanager
+def _read_snapshot(engine: Engine) -> Iterator[Connection]:
+    """Соединение с открытой транзакцией чтения: все запросы видят один снимок базы."""
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if engine.dialect.name == "sqlite":
+            mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+            if str(mode).lower() != "wal":
+                # В режиме rollback-журнала долгое чтение блокирует коммиты приложения.
+                mode = connection.exec_driver_sql("PRAGMA journal_mode=WAL").scalar()
+                logger.info("Журнал SQLite переведён в режим %s для выгрузки", mode)
+        connection.exec_driver_sql("BEGIN")
+        try:
+            # В SQLite снимок фиксируется первым чтением, а не командой BEGIN.
+            connection.exec_driver_sql("SELECT count(*) FROM sqlite_master").scalar()
+            yield connection
+        finally:
+            connection.exec_driver_sql("ROLLBACK")
+
+
+def _export_table(
+    pa,
+    connection: Connection,
+    name: str,
+    table: Table,
+    *,
+    since: datetime | None,
+    cutoff: datetime,
+    root: Path,
+    stamp: str,
+    batch_rows: int,
+) -> TableExport:
+    columns = _columns(name, table)
+    schema = pa.schema([pa.field(column.name, _arrow_type(pa, column)) for column in columns])
+    converters = [_converter(column) for column in columns]
+    updated_at = table.c.updated_at
+
+    query = select(*columns).where(updated_at <= cutoff).order_by(updated_at, table.c.id)
+    if since is not None:
+        query = query.where(updated_at > since)
+    result = connection.execution_options(yield_per=batch_rows).execute(query)
+
+    target_dir = root / name
+    target = target_dir / f"{name}-{stamp}.parquet"
+    tmp = target.with_suffix(".parquet.tmp")
+    export = TableExport(watermark=since)
+    writer = None
+    try:
+        for batch in result.partitions():
+            if writer is None:
+                target_dir.mkdir(parents=True, exist_ok=True)
+                writer = pa.parquet.ParquetWriter(tmp, schema, compression=COMPRESSION)
+            data = {}
+            for index, (column, convert) in enumerate(zip(columns, converters)):
+                values = [row[index] for row in batch]
+                data[column.name] = [convert(value) for value in values] if convert else values
+            writer.write_batch(pa.RecordBatch.from_pydict(data, schema=schema))
+            export.rows += len(batch)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            tmp.unlink(missing_ok=True)
+        raise
+    if writer is not None:
+        writer.close()
+        # Аналитики видят только дописанные файлы.
+        os.replace(tmp, target)
+        export.file = str(target.relative_to(root))
+    # Граница сдвигается до отсечки, даже если новых строк не было.
+    export.watermark = cutoff
+    return export
+
+
+def export_snapshot(
+    db: Session,
+    *,
+    full: bool = False,
+    tables: Iterable[str] | None = None,
+    root: Path | None = None,
+    batch_rows: int | None = None,
+    now: datetime | None = None,
+) -> BiExportReport:
+    """Выгружаем изменения с прошлого запуска (или всё при ``full``) из одного снимка базы.
+
+    Отсечка ``now - bi_export_lag_seconds`` оставляет запас на транзакции, которые
+    проставили ``updated_at`` раньше, а закоммитились уже после снимка.
+    """
+
+    pa = _pyarrow()
+    names = list(tables) if tables is not None else list(EXPORT_TABLES)
+    unknown = sorted(set(names) - set(EXPORT_TABLES))
+    if unknown:
+        raise ValueError(f"Неизвестные таблицы: {', '.join(unknown)}")
+
+    root = Path(root or settings.bi_export_path)
+    root.mkdir(parents=True, exist_ok=True)
+    moment = now or datetime.now(timezone.utc)
+    cutoff = (moment - timedelta(seconds=settings.bi_export_lag_seconds)).replace(tzinfo=None)
+    stamp = moment.strftime(FILE_STAMP)
+    report = BiExportReport(cutoff=cutoff, full=full)
+
+    with _export_lock(root):
+        watermarks = {} if full else _read_watermarks(root)
+        with _read_snapshot(db.get_bind()) as connection:
+            for name in names:
+                report.tables[name] = _export_table(
+                    pa,
+                    connection,
+                    name,
+                    EXPORT_TABLES[name],
+                    since=watermarks.get(name),
+                    cutoff=cutoff,
+                    root=root,
+                    stamp=stamp,
+                    batch_rows=batch_rows or settings.bi_export_batch_rows,
+                )
+        stored = _read_watermarks(root)
+        stored.update({name: item.watermark for name, item in report.tables.items()})
+        _write_watermarks(root, stored, cutoff)
+
+    logger.info(
+        "Выгрузка для аналитики: %s",
+        ", ".join(f"{name}={item.rows}" for name, item in report.tables.items()),
+    )
+    return report
+
+
+def scheduled_export(db: Session) -> BiExportReport | None:
+    """Периодическая задача: выгрузку, начатую из CLI, не ждём и не считаем ошибкой."""
+
+    try:
+        return export_snapshot(db)
+    except BiExportBusyError as exc:
+        logger.info("%s, пропускаем запуск", exc)
+        return None
+
+
+def main() -> None:
+    """CLI: ``python -m app.services.bi_export [--full] [--tables users,orders]``."""
+
+    from app.db.session import SessionLocal  # noqa: PLC0415 - сессия нужна только CLI
+
+    parser = argparse.ArgumentParser(description="Выгрузка данных платформы в Parquet для аналитики")
+    parser.add_argument("--full", action="store_true", help="выгрузить всё заново, игнорируя границы")
+    parser.add_argument("--tables", help=f"через запятую, по умолчанию все: {', '.join(EXPORT_TABLES)}")
+    parser.add_argument("--output", type=Path, default=None, help="каталог выгрузки")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        report = export_snapshot(
+            session,
+            full=args.full,
+            tables=args.tables.split(",") if args.tables else None,
+            root=args.output,
+        )
+    finally:
+        session.close()
+    sys.stdout.write(json.dumps(report.as_dict(), ensure_ascii=False, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Контентно-адресуемое хранилище вложений со счётчиком ссылок.
+
+Файл лежит в ``uploads/blobs/ab/cd/<sha256>`` и пишется один раз, сколько бы
+отправок и профилей на него ни ссылалось. Поля владельцев связаны с файлами
+через ``blob_references``; когда ссылок не остаётся, файл удаляет фоновая
+очистка по истечении льготного периода. Счётчик меняется только атомарным
+``UPDATE ... SET ref_count = ref_count ± 1``, а ссылки удалённых отправок и
+пользователей снимают триггеры из :mod:`app.models.blob`.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.blob import BlobReference, StoredBlob
+
+BLOB_DIR = "blobs"
+INCOMING_DIR = ".incoming"
+# Производные файлы (миниатюры) лежат в thumbs/<sha256>/ и удаляются вместе с файлом.
+THUMBS_DIR = "thumbs"
+
+OWNER_SUBMISSION = "submission"
+OWNER_USER = "user"
+
+
+def blob_relative_path(sha256: str) -> str:
+    """Путь файла относительно ``uploads_path``."""
+
+    return f"{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def is_blob_path(relative_path: str | None) -> bool:
+    return bool(relative_path) and relative_path.startswith(f"{BLOB_DIR}/")
+
+
+def sha256_from_path(relative_path: str) -> str:
+    return relative_path.rsplit("/", 1)[-1]
+
+
+def blobs_root() -> Path:
+    return settings.uploads_path / BLOB_DIR
+
+
+def incoming_dir() -> Path:
+    """Каталог временных файлов: на том же разделе, чтобы ``os.replace`` был атомарным."""
+
+    return blobs_root() / INCOMING_DIR
+
+
+def register_blob(
+    db: Session,
+    *,
+    sha256: str,
+    size: int,
+    mime_type: str | None,
+    extension: str | None,
+) -> StoredBlob:
+    """Заводим запись о файле, если её ещё нет (ссылок пока ноль).
+
+    Параллельная загрузка того же содержимого не падает на уникальном
+    ``sha256``, а получает уже созданную запись. Если у записи нет ссылок,
+    ``released_at`` сдвигается на текущий момент: повторно загруженный файл
+    снова получает льготный период и очистка не удалит его до привязки.
+    """
+
+    now = datetime.now(timezone.utc)
+    statement = sqlite_insert(StoredBlob).values(
+        sha256=sha256,
+        size=size,
+        mime_type=mime_type,
+        extension=extension,
+        ref_count=0,
+        released_at=now,
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[StoredBlob.sha256],
+            set_={"released_at": statement.excluded.released_at},
+            where=StoredBlob.ref_count == 0,
+        )
+    )
+    return db.execute(select(StoredBlob).where(StoredBlob.sha256 == sha256)).scalar_one()
+
+
+def _acquire(db: Session, blob_id: int) -> None:
+    db.execute(
+        update(StoredBlob)
+        .where(StoredBlob.id == blob_id)
+        .values(ref_count=StoredBlob.ref_count + 1, released_at=None)
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def _release(db: Session, blob_id: int) -> None:
+    """Уменьшаем счётчик в самой базе, чтобы параллельные запросы не теряли изменения."""
+
+    db.execute(
+        update(StoredBlob)
+        .where(StoredBlob.id == blob_id)
+        .values(
+            ref_count=func.max(StoredBlob.ref_count - 1, 0),
+            released_at=case(
+                (StoredBlob.ref_count <= 1, datetime.now(timezone.utc)),
+                else_=StoredBlob.released_at,
+            ),
+        )
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def attach_blob(
+    db: Session,
+    *,
+    relative_path: str,
+    owner_type: str,
+    owner_id: int,
+    field: str,
+) -> None:
+    """Привязываем поле владельца к файлу; прежний файл поля теряет ссылку."""
+
+    blob_id = db.execute(
+        select(StoredBlob.id).where(StoredBlob.sha256 == sha256_from_path(relative_path))
+    ).scalar()
+    if blob_id is None:
+        raise ValueError("Файл не зарегистрирован в хранилище")
+
+    reference = (
+        db.query(BlobReference)
+        .filter(
+            BlobReference.owner_type == owner_type,
+            BlobReference.owner_id == owner_id,
+            BlobReference.field == field,
+        )
+        .first()
+    )
+    if reference and reference.blob_id == blob_id:
+        return
+    if reference:
+        _release(db, reference.blob_id)
+        reference.blob_id = blob_id
+    else:
+        db.add(BlobReference(blob_id=blob_id, owner_type=owner_type, owner_id=owner_id, field=field))
+    _acquire(db, blob_id)
+
+
+def detach_blob(db: Session, *, owner_type: str, owner_id: int, field: str) -> None:
+    """Снимаем ссылку поля владельца на файл."""
+
+    reference = (
+        db.query(BlobReference)
+        .filter(
+            BlobReference.owner_type == owner_type,
+            BlobReference.owner_id == owner_id,
+            BlobReference.field == field,
+        )
+        .first()
+    )
+    if not reference:
+        return
+    _release(db, reference.blob_id)
+    db.delete(reference)
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        return
+    for parent in (path.parent, path.parent.parent):
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+
+
+def sweep_unreferenced_blobs(db: Session, *, grace_seconds: float | None = None) -> int:
+    """Удаляем файлы без ссылок старше льготного периода и возвращаем их число.
+
+    Кроме записей с нулевым счётчиком убираем «сироты» — файлы в ``blobs/`` без
+    записи в базе (загрузка оборвалась до сохранения отправки). Льготный период
+    защищает файлы, которые прямо сейчас привязываются к новой отправке.
+    """
+
+    grace = settings.blob_grace_seconds if grace_seconds is None else grace_seconds
+    threshold = datetime.now(timezone.utc) - timedelta(seconds=grace)
+    removed = 0
+
+    cutoff = threshold.timestamp()
+
+    unreferenced = (StoredBlob.ref_count == 0, StoredBlob.released_at <= threshold)
+    candidates = db.execute(select(StoredBlob.sha256).where(*unreferenced)).scalars().all()
+    # Условие повторяется в DELETE: запись, которую после выборки взяли или
+    # зарегистрировали заново, остаётся, и её файл не трогаем.
+    deleted = [
+        sha256
+        for sha256 in candidates
+        if db.execute(
+            delete(StoredBlob)
+            .where(StoredBlob.sha256 == sha256, *unreferenced)
+            .returning(StoredBlob.sha256)
+            .execution_options(synchronize_session="fetch")
+        ).scalar()
+    ]
+    db.commit()
+    for sha256 in deleted:
+        path = settings.uploads_path / blob_relative_path(sha256)
+        # Свежее время изменения — файл только что записала или «освежила» новая
+        # загрузка того же содержимого; без записи его подберёт очистка сирот.
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+        except FileNotFoundError:
+            pass
+        _unlink(path)
+        shutil.rmtree(settings.uploads_path / THUMBS_DIR / sha256, ignore_errors=True)
+        removed += 1
+
+    root = blobs_root()
+    if not root.is_dir():
+        return removed
+
+    for first in os.scandir(root):
+        if not first.is_dir() or first.name == INCOMING_DIR:
+            continue
+        for second in os.scandir(first.path):
+            if not second.is_dir():
+                continue
+            prefix = f"{first.name}{second.name}"
+            known = set(
+                db.execute(select(StoredBlob.sha256).where(StoredBlob.sha256.like(f"{prefix}%")))
+                .scalars()
+                .all()
+            )
+            for entry in os.scandir(second.path):
+                if entry.name in known or entry.stat().st_mtime > cutoff:
+                    continue
+                _unlink(Path(entry.path))
+                removed += 1
+
+    incoming = incoming_dir()
+    if incoming.is_dir():
+        for entry in os.scandir(incoming):
+            if entry.stat().st_mtime <= cutoff:
+                Path(entry.path).unlink(missing_ok=True)
+
+    return removed
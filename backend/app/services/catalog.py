@@ -0,0 +1,602 @@
+"""Выгрузка и загрузка каталога одним пакетом.
+
+Пакет (:class:`app.schemas.catalog.CatalogBundle`) описывает компетенции,
+артефакты, ранги, миссии с зависимостями, наградами и заданиями, ветки и товары
+магазина. Сущности связаны по названиям, поэтому каталог переносится между
+окружениями без привязки к id.
+
+Импорт сначала проверяет пакет целиком: уникальность названий, ссылки (на
+сущности пакета или уже существующие), порядок заданий и отсутствие циклов в
+зависимостях миссий с учётом тех, что уже есть в базе. Затем сравнивает пакет с
+текущим состоянием и, если это не пробный прогон, применяет изменения одной
+транзакцией пакетными вставками и обновлениями. Сущности, которых нет в пакете,
+не удаляются; задания миссий обновляются по порядковому номеру, лишние задания
+остаются (на них ссылаются попытки пилотов).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.artifact import Artifact
+from app.models.branch import Branch, BranchMission
+from app.models.coding import CodingChallenge
+from app.models.mission import Mission, MissionCompetencyReward, MissionPrerequisite
+from app.models.python import PythonChallenge
+from app.models.rank import Rank, RankCompetencyRequirement, RankMissionRequirement
+from app.models.store import StoreItem
+from app.models.user import Competency
+from app.schemas.catalog import (
+    CatalogArtifact,
+    CatalogBranch,
+    CatalogBranchMission,
+    CatalogBundle,
+    CatalogCodingChallenge,
+    CatalogCompetency,
+    CatalogCompetencyLevel,
+    CatalogEntityDiff,
+    CatalogImportReport,
+    CatalogMission,
+    CatalogPythonChallenge,
+    CatalogRank,
+    CatalogStoreItem,
+)
+
+_MISSION_LINKS = {"minimum_rank", "artifact", "prerequisites", "competency_rewards"}
+_MISSION_NESTED = {"coding_challenges", "python_challenges"}
+_CHALLENGE_FIELDS = {
+    "coding_challenges": set(CatalogCodingChallenge.model_fields),
+    "python_challenges": set(CatalogPythonChallenge.model_fields),
+}
+
+
+# --- Выгрузка -----------------------------------------------------------------
+
+
+def _aware(moment: datetime | None) -> datetime | None:
+    # SQLite возвращает время без часового пояса, хотя пишем мы UTC.
+    if moment is None or moment.tzinfo:
+        return moment
+    return moment.replace(tzinfo=timezone.utc)
+
+
+def _mission_entry(mission: Mission, python_challenges: list[PythonChallenge]) -> CatalogMission:
+    scalars = {
+        field: getattr(mission, field)
+        for field in CatalogMission.model_fields
+        if field not in _MISSION_LINKS | _MISSION_NESTED
+    }
+    for field in ("event_starts_at", "event_ends_at", "registration_deadline"):
+        scalars[field] = _aware(scalars[field])
+    return CatalogMission(
+        **scalars,
+        minimum_rank=mission.minimum_rank.title if mission.minimum_rank else None,
+        artifact=mission.artifact.name if mission.artifact else None,
+        prerequisites=sorted(link.required_mission.title for link in mission.prerequisites),
+        competency_rewards=[
+            CatalogCompetencyLevel(competency=reward.competency.name, level=reward.level_delta)
+            for reward in sorted(mission.competency_rewards, key=lambda item: item.competency.name)
+        ],
+        coding_challenges=[
+            CatalogCodingChallenge.model_validate(challenge, from_attributes=True)
+            for challenge in mission.coding_challenges
+        ],
+        python_challenges=[
+            CatalogPythonChallenge.model_validate(challenge, from_attributes=True)
+            for challenge in sorted(python_challenges, key=lambda item: item.order)
+        ],
+    )
+
+
+def _rank_entry(rank: Rank) -> CatalogRank:
+    return CatalogRank(
+        title=rank.title,
+        description=rank.description,
+        required_xp=rank.required_xp,
+        missions=sorted(requirement.mission.title for requirement in rank.mission_requirements),
+        competencies=[
+            CatalogCompetencyLevel(competency=requirement.competency.name, level=requirement.required_level)
+            for requirement in sorted(rank.competency_requirements, key=lambda item: item.competency.name)
+        ],
+    )
+
+
+def _branch_entry(branch: Branch) -> CatalogBranch:
+    return CatalogBranch(
+        title=branch.title,
+        description=branch.description,
+        category=branch.category,
+        missions=[
+            CatalogBranchMission(mission=link.mission.title, order=link.order)
+            for link in sorted(branch.missions, key=lambda item: (item.order, item.mission.title))
+        ],
+    )
+
+
+class _CatalogState:
+    """Текущий каталог в базе: объекты по названиям и их представление в формате пакета."""
+
+    def __init__(self, db: Session) -> None:
+        self.competencies = list(db.scalars(select(Competency).order_by(Competency.name)))
+        self.artifacts = list(db.scalars(select(Artifact).order_by(Artifact.name)))
+        self.ranks = list(
+            db.scalars(
+                select(Rank)
+                .options(
+                    selectinload(Rank.mission_requirements).selectinload(RankMissionRequirement.mission),
+                    selectinload(Rank.competency_requirements).selectinload(RankCompetencyRequirement.competency),
+                )
+                .order_by(Rank.required_xp, Rank.title)
+            )
+        )
+        self.missions = list(
+            db.scalars(
+                select(Mission)
+                .options(
+                    selectinload(Mission.minimum_rank),
+                    selectinload(Mission.artifact),
+                    selectinload(Mission.prerequisites).selectinload(MissionPrerequisite.required_mission),
+                    selectinload(Mission.competency_rewards).selectinload(MissionCompetencyReward.competency),
+                    selectinload(Mission.coding_challenges),
+                )
+                .order_by(Mission.id)
+            )
+        )
+        self.python_challenges: dict[int, list[PythonChallenge]] = defaultdict(list)
+        for challenge in db.scalars(select(PythonChallenge)):
+            self.python_challenges[challenge.mission_id].append(challenge)
+        self.branches = list(
+            db.scalars(
+                select(Branch)
+                .options(selectinload(Branch.missions).selectinload(BranchMission.mission))
+                .order_by(Branch.title)
+            )
+        )
+        self.store_items = list(db.scalars(select(StoreItem).order_by(StoreItem.name)))
+
+    def bundle(self) -> CatalogBundle:
+        return CatalogBundle(
+            competencies=[CatalogCompetency.model_validate(item, from_attributes=True) for item in self.competencies],
+            artifacts=[CatalogArtifact.model_validate(item, from_attributes=True) for item in self.artifacts],
+            ranks=[_rank_entry(rank) for rank in self.ranks],
+            missions=[
+                _mission_entry(mission, self.python_challenges.get(mission.id, [])) for mission in self.missions
+            ],
+            branches=[_branch_entry(branch) for branch in self.branches],
+            store_items=[CatalogStoreItem.model_validate(item, from_attributes=True) for item in self.store_items],
+        )
+
+
+def export_catalog(db: Session) -> CatalogBundle:
+    """Выгружаем весь каталог в формате пакета."""
+
+    return _CatalogState(db).bundle()
+
+
+# --- Проверка -----------------------------------------------------------------
+
+
+def _group_by(items: Iterable[Any], key: str) -> dict[str, list[Any]]:
+    grouped: dict[str, list[Any]] = defaultdict(list)
+    for item in items:
+        grouped[getattr(item, key)].append(item)
+    return grouped
+
+
+def find_prerequisite_cycle(graph: dict[str, set[str]]) -> list[str] | None:
+    """Цикл в графе «миссия → обязательные миссии» или ``None``."""
+
+    visiting, done = set(), set()
+    for root in sorted(graph):
+        if root in done:
+            continue
+        path: list[str] = [root]
+        iterators = [iter(sorted(graph.get(root, ())))]
+        visiting.add(root)
+        while iterators:
+            node = next(iterators[-1], None)
+            if node is None:
+                iterators.pop()
+                finished = path.pop()
+                visiting.discard(finished)
+                done.add(finished)
+                continue
+            if node in visiting:
+                return path[path.index(node) :] + [node]
+            if node in done:
+                continue
+            visiting.add(node)
+            path.append(node)
+            iterators.append(iter(sorted(graph.get(node, ()))))
+    return None
+
+
+def _validate(bundle: CatalogBundle, state: _CatalogState) -> list[str]:
+    errors: list[str] = []
+
+    sections = (
+        ("competencies", "name"),
+        ("artifacts", "name"),
+        ("ranks", "title"),
+        ("missions", "title"),
+        ("branches", "title"),
+        ("store_items", "name"),
+    )
+    for section, key in sections:
+        counts = Counter(getattr(item, key) for item in getattr(bundle, section))
+        errors.extend(f"{section}: «{name}» встречается {count} раза" for name, count in counts.items() if count > 1)
+
+    # Существующие записи с одинаковыми названиями нельзя однозначно сопоставить с пакетом.
+    for section, key in (("missions", "title"), ("store_items", "name")):
+        existing = _group_by(getattr(state, section), key)
+        for item in getattr(bundle, section):
+            if len(existing.get(getattr(item, key), [])) > 1:
+                errors.append(f"{section}: в базе несколько записей «{getattr(item, key)}»")
+
+    competencies = {item.name for item in bundle.competencies} | {item.name for item in state.competencies}
+    artifacts = {item.name for item in bundle.artifacts} | {item.name for item in state.artifacts}
+    ranks = {item.title for item in bundle.ranks} | {item.title for item in state.ranks}
+    missions = {item.title for item in bundle.missions} | {item.title for item in state.missions}
+
+    def _check(kind: str, owner: str, names: Iterable[str | None], known: set[str]) -> None:
+        for name in names:
+            if name is not None and name not in known:
+                errors.append(f"{owner}: неизвестная {kind} «{name}»")
+
+    for mission in bundle.missions:
+        owner = f"миссия «{mission.title}»"
+        _check("ранг", owner, [mission.minimum_rank], ranks)
+        _check("артефакт", owner, [mission.artifact], artifacts)
+        _check("миссия", owner, mission.prerequisites, missions)
+        _check("компетенция", owner, [reward.competency for reward in mission.competency_rewards], competencies)
+        if mission.title in mission.prerequisites:
+            errors.append(f"{owner}: миссия не может зависеть от самой себя")
+        for section in ("coding_challenges", "python_challenges"):
+            orders = Counter(challenge.order for challenge in getattr(mission, section))
+            errors.extend(f"{owner}: {section} с порядком {order} повторяется" for order, n in orders.items() if n > 1)
+    for rank in bundle.ranks:
+        owner = f"ранг «{rank.title}»"
+        _check("миссия", owner, rank.missions, missions)
+        _check("компетенция", owner, [item.competency for item in rank.competencies], competencies)
+    for branch in bundle.branches:
+        _check("миссия", f"ветка «{branch.title}»", [link.mission for link in branch.missions], missions)
+
+    # Зависимости миссий из пакета заменяют существующие, остальные берём из базы.
+    graph: dict[str, set[str]] = defaultdict(set)
+    for mission in state.missions:
+        graph[mission.title].update(link.required_mission.title for link in mission.prerequisites)
+    for mission in bundle.missions:
+        graph[mission.title] = set(mission.prerequisites)
+    cycle = find_prerequisite_cycle(graph)
+    if cycle:
+        errors.append("Цикл в зависимостях миссий: " + " → ".join(cycle))
+    return errors
+
+
+# --- Сравнение ----------------------------------------------------------------
+
+
+def _normalized(value: Any) -> Any:
+    """Представление для сравнения: время в UTC, порядок списков не важен."""
+
+    if isinstance(value, dict):
+        return {key: _normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [_normalized(item) for item in value]
+        return sorted(items, key=lambda item: json.dumps(item, sort_keys=True, default=str))
+    if isinstance(value, datetime):
+        return _aware(value).astimezone(timezone.utc)
+    return value
+
+
+def _mission_comparable(entry: CatalogMission) -> dict:
+    return _normalized(entry.model_dump(mode="python"))
+
+
+def _diff_section(
+    items: list[Any], existing: dict[str, Any], key: str
+) -> tuple[CatalogEntityDiff, list[Any]]:
+    diff = CatalogEntityDiff()
+    changed: list[Any] = []
+    for item in items:
+        name = getattr(item, key)
+        current = existing.get(name)
+        if current is None:
+            diff.created.append(name)
+            changed.append(item)
+        elif _normalized(item.model_dump(mode="python")) != _normalized(current.model_dump(mode="python")):
+            diff.updated.append(name)
+            changed.append(item)
+        else:
+            diff.unchanged += 1
+    return diff, changed
+
+
+def _existing_missions_for_diff(bundle: CatalogBundle, state: _CatalogState) -> dict[str, CatalogMission]:
+    entries: dict[str, CatalogMission] = {}
+    incoming = {mission.title: mission for mission in bundle.missions}
+    for mission in state.missions:
+        if mission.title not in incoming:
+            continue
+        entry = _mission_entry(mission, state.python_challenges.get(mission.id, []))
+        # Лишние задания в базе остаются как есть и на сравнение не влияют.
+        for section in _MISSION_NESTED:
+            orders = {challenge.order for challenge in getattr(incoming[mission.title], section)}
+            setattr(entry, section, [item for item in getattr(entry, section) if item.order in orders])
+        entries[mission.title] = entry
+    return entries
+
+
+# --- Применение ---------------------------------------------------------------
+
+
+def _upsert(
+    db: Session,
+    model: type,
+    key: str,
+    rows: list[dict],
+    existing: dict[str, Any],
+) -> dict[str, int]:
+    """Вставляем новые строки и обновляем существующие пакетно; возвращаем id по названию."""
+
+    ids = {name: item.id for name, item in existing.items()}
+    new_rows = [row for row in rows if row[key] not in ids]
+    updated_rows = [{"id": ids[row[key]], **row} for row in rows if row[key] in ids]
+    if new_rows:
+        statement = insert(model).returning(model.id, getattr(model, key), sort_by_parameter_order=True)
+        ids.update((name, row_id) for row_id, name in db.execute(statement, new_rows))
+    if updated_rows:
+        db.execute(update(model), updated_rows)
+    return ids
+
+
+def _replace_links(db: Session, model: type, owner_column: str, owner_ids: list[int], rows: list[dict]) -> None:
+    if not owner_ids:
+        return
+    db.execute(delete(model).where(getattr(model, owner_column).in_(owner_ids)))
+    if rows:
+        db.execute(insert(model), rows)
+
+
+def _upsert_challenges(
+    db: Session, model: type, section: str, missions: list[CatalogMission], mission_ids: dict[str, int]
+) -> None:
+    ids = [mission_ids[mission.title] for mission in missions]
+    existing = {
+        (mission_id, order): challenge_id
+        for challenge_id, mission_id, order in db.execute(
+            select(model.id, model.mission_id, model.order).where(model.mission_id.in_(ids))
+        )
+    }
+    new_rows, updated_rows = [], []
+    for mission in missions:
+        mission_id = mission_ids[mission.title]
+        for challenge in getattr(mission, section):
+            row = {"mission_id": mission_id, **challenge.model_dump(include=_CHALLENGE_FIELDS[section])}
+            challenge_id = existing.get((mission_id, challenge.order))
+            if challenge_id is None:
+                new_rows.append(row)
+            else:
+                updated_rows.append({"id": challenge_id, **row})
+    if new_rows:
+        db.execute(insert(model), new_rows)
+    if updated_rows:
+        db.execute(update(model), updated_rows)
+
+
+def _apply(
+    db: Session,
+    state: _CatalogState,
+    *,
+    competencies: list[CatalogCompetency],
+    artifacts: list[CatalogArtifact],
+    ranks: list[CatalogRank],
+    missions: list[CatalogMission],
+    branches: list[CatalogBranch],
+    store_items: list[CatalogStoreItem],
+) -> None:
+    competency_ids = _upsert(
+        db,
+        Competency,
+        "name",
+        [item.model_dump() for item in competencies],
+        {item.name: item for item in state.competencies},
+    )
+    artifact_ids = _upsert(
+        db,
+        Artifact,
+        "name",
+        [item.model_dump() for item in artifacts],
+        {item.name: item for item in state.artifacts},
+    )
+    rank_ids = _upsert(
+        db,
+        Rank,
+        "title",
+        [item.model_dump(exclude={"missions", "competencies"}) for item in ranks],
+        {item.title: item for item in state.ranks},
+    )
+
+    mission_rows = []
+    for mission in missions:
+        row = mission.model_dump(exclude=_MISSION_LINKS | _MISSION_NESTED)
+        row["minimum_rank_id"] = rank_ids[mission.minimum_rank] if mission.minimum_rank else None
+        row["artifact_id"] = artifact_ids[mission.artifact] if mission.artifact else None
+        mission_rows.append(row)
+    mission_ids = _upsert(db, Mission, "title", mission_rows, {item.title: item for item in state.missions})
+
+    changed_mission_ids = [mission_ids[mission.title] for mission in missions]
+    _replace_links(
+        db,
+        MissionPrerequisite,
+        "mission_id",
+        changed_mission_ids,
+        [
+            {"mission_id": mission_ids[mission.title], "required_mission_id": mission_ids[required]}
+            for mission in missions
+            for required in dict.fromkeys(mission.prerequisites)
+        ],
+    )
+    _replace_links(
+        db,
+        MissionCompetencyReward,
+        "mission_id",
+        changed_mission_ids,
+        [
+            {
+                "mission_id": mission_ids[mission.title],
+                "competency_id": competency_ids[reward.competency],
+                "level_delta": reward.level,
+            }
+            for mission in missions
+            for reward in mission.competency_rewards
+        ],
+    )
+    _upsert_challenges(db, CodingChallenge, "coding_challenges", missions, mission_ids)
+    _upsert_challenges(db, PythonChallenge, "python_challenges", missions, mission_ids)
+
+    changed_rank_ids = [rank_ids[rank.title] for rank in ranks]
+    _replace_links(
+        db,
+        RankMissionRequirement,
+        "rank_id",
+        changed_rank_ids,
+        [
+            {"rank_id": rank_ids[rank.title], "mission_id": mission_ids[title]}
+            for rank in ranks
+            for title in dict.fromkeys(rank.missions)
+        ],
+    )
+    _replace_links(
+        db,
+        RankCompetencyRequirement,
+        "rank_id",
+        changed_rank_ids,
+        [
+            {
+                "rank_id": rank_ids[rank.title],
+                "competency_id": competency_ids[item.competency],
+                "required_level": item.level,
+            }
+            for rank in ranks
+            for item in rank.competencies
+        ],
+    )
+
+    branch_ids = _upsert(
+        db,
+        Branch,
+        "title",
+        [item.model_dump(exclude={"missions"}) for item in branches],
+        {item.title: item for item in state.branches},
+    )
+    _replace_links(
+        db,
+        BranchMission,
+        "branch_id",
+        [branch_ids[branch.title] for branch in branches],
+        [
+            {"branch_id": branch_ids[branch.title], "mission_id": mission_ids[link.mission], "order": link.order}
+            for branch in branches
+            for link in branch.missions
+        ],
+    )
+
+    _upsert(
+        db,
+        StoreItem,
+        "name",
+        [item.model_dump() for item in store_items],
+        {item.name: item for item in state.store_items},
+    )
+
+
+def import_catalog(db: Session, bundle: CatalogBundle, *, dry_run: bool = False) -> CatalogImportReport:
+    """Проверяем пакет, сравниваем с базой и (кроме пробного прогона) применяем одной транзакцией.
+
+    Ошибки проверки возвращаются списком в ответе 422, база при этом не меняется.
+    """
+
+    state = _CatalogState(db)
+    errors = _validate(bundle, state)
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
+
+    current = state.bundle()
+    diff: dict[str, CatalogEntityDiff] = {}
+    changed: dict[str, list[Any]] = {}
+    for section, key in (
+        ("competencies", "name"),
+        ("artifacts", "name"),
+        ("ranks", "title"),
+        ("branches", "title"),
+        ("store_items", "name"),
+    ):
+        existing = {getattr(item, key): item for item in getattr(current, section)}
+        diff[section], changed[section] = _diff_section(getattr(bundle, section), existing, key)
+    diff["missions"], changed["missions"] = _diff_section(
+        bundle.missions, _existing_missions_for_diff(bundle, state), "title"
+    )
+
+    report = CatalogImportReport(dry_run=dry_run, applied=False, diff=diff)
+    if dry_run or not any(changed.values()):
+        return report
+
+    try:
+        _apply(db, state, **changed)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    report.applied = True
+    return report
+
+
+def main() -> None:
+    """CLI: ``python -m app.services.catalog export [файл]`` / ``import файл [--dry-run]``."""
+
+    from app.db.session import SessionLocal  # noqa: PLC0415 - сессия нужна только CLI
+
+    parser = argparse.ArgumentParser(description="Выгрузка и загрузка каталога миссий")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="выгрузить каталог в JSON")
+    export_parser.add_argument("path", nargs="?", help="файл (по умолчанию stdout)")
+    import_parser = commands.add_parser("import", help="загрузить каталог из JSON")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--dry-run", action="store_true", help="только проверка и список изменений")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        if args.command == "export":
+            payload = export_catalog(session).model_dump_json(indent=2)
+            if args.path:
+                with open(args.path, "w", encoding="utf-8") as handle:
+                    handle.write(payload)
+            else:
+                sys.stdout.write(payload + "\n")
+            return
+
+        with open(args.path, encoding="utf-8") as handle:
+            bundle = CatalogBundle.model_validate_json(handle.read())
+        try:
+            report = import_catalog(session, bundle, dry_run=args.dry_run)
+        except HTTPException as error:
+            sys.stderr.write(json.dumps(error.detail, ensure_ascii=False, indent=2) + "\n")
+            raise SystemExit(1) from error
+        sys.stdout.write(report.model_dump_json(indent=2) + "\n")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
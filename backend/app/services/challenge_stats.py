@@ -0,0 +1,285 @@
+"""Статистика сложности заданий: попытки до решения и типичные ошибки.
+
+Счётчики в ``challenge_stats`` и ``challenge_stat_counts`` увеличиваются
+атомарными ``UPSERT`` при записи каждой попытки (:func:`record_attempt_stats`),
+поэтому HR-отчёт читает только их и не трогает таблицы попыток. Историю или
+задание после перепроверки можно пересчитать :func:`rebuild_challenge_stats` —
+одним потоковым проходом по попыткам в порядке (задание, пилот, id).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.challenge_stats import ChallengeKind, ChallengeStatCount, ChallengeStats
+from app.models.coding import CodingAttempt, CodingChallenge
+from app.models.python import PythonChallenge, PythonSubmission, PythonUserProgress
+from app.schemas.challenge_stats import ChallengeFailureCount, ChallengeStatsRead
+from app.utils.tracebacks import exception_class
+
+METRIC_FIRST_PASS = "first_pass"
+METRIC_FAILURE = "failure"
+WRONG_OUTPUT = "wrong_output"
+OTHER_FAILURE = "other"
+# Номера попыток до первого решения больше этого сводим в одну корзину «10+».
+FIRST_PASS_CAP = 10
+TOP_FAILURES = 5
+STREAM_BATCH = 1000
+
+
+def first_pass_key(attempts: int) -> str:
+    return str(attempts) if attempts < FIRST_PASS_CAP else f"{FIRST_PASS_CAP}+"
+
+
+def failure_key(*, stderr: str | None, exit_code: int) -> str:
+    """Причина неудачи: класс исключения, неверный вывод или прочее (таймаут, лимиты)."""
+
+    name = exception_class(stderr)
+    if name:
+        return name[:64]
+    return WRONG_OUTPUT if exit_code == 0 else OTHER_FAILURE
+
+
+@dataclass
+class _Tally:
+    attempts: int = 0
+    passed_attempts: int = 0
+    users: int = 0
+    passed_users: int = 0
+    last_attempt_at: datetime | None = None
+    counts: Counter = field(default_factory=Counter)
+
+
+def record_attempt_stats(
+    db: Session,
+    *,
+    kind: ChallengeKind,
+    challenge_id: int,
+    is_passed: bool,
+    exit_code: int,
+    stderr: str | None,
+    previous_attempts: int,
+    first_pass: bool,
+    at: datetime | None = None,
+) -> None:
+    """Учитываем одну попытку.
+
+    ``previous_attempts`` — сколько попыток пилот сделал по заданию до этой,
+    ``first_pass`` — эта попытка впервые решила задание. Коммит за вызывающим.
+    """
+
+    moment = at or datetime.now(timezone.utc)
+    statement = sqlite_insert(ChallengeStats).values(
+        kind=kind,
+        challenge_id=challenge_id,
+        attempts=1,
+        passed_attempts=int(is_passed),
+        users=int(previous_attempts == 0),
+        passed_users=int(first_pass),
+        last_attempt_at=moment,
+    )
+    excluded = statement.excluded
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["kind", "challenge_id"],
+            set_={
+                "attempts": ChallengeStats.attempts + 1,
+                "passed_attempts": ChallengeStats.passed_attempts + excluded.passed_attempts,
+                "users": ChallengeStats.users + excluded.users,
+                "passed_users": ChallengeStats.passed_users + excluded.passed_users,
+                "last_attempt_at": excluded.last_attempt_at,
+            },
+        )
+    )
+
+    counts = []
+    if first_pass:
+        counts.append((METRIC_FIRST_PASS, first_pass_key(previous_attempts + 1)))
+    if not is_passed:
+        counts.append((METRIC_FAILURE, failure_key(stderr=stderr, exit_code=exit_code)))
+    for metric, key in counts:
+        row = sqlite_insert(ChallengeStatCount).values(
+            kind=kind, challenge_id=challenge_id, metric=metric, key=key, count=1
+        )
+        db.execute(
+            row.on_conflict_do_update(
+                index_elements=["kind", "challenge_id", "metric", "key"],
+                set_={"count": ChallengeStatCount.count + 1},
+            )
+        )
+
+
+def _attempt_stream(db: Session, kind: ChallengeKind, challenge_ids: list[int] | None):
+    if kind == ChallengeKind.CODING:
+        query = select(
+            CodingAttempt.challenge_id,
+            CodingAttempt.user_id,
+            CodingAttempt.is_passed,
+            CodingAttempt.exit_code,
+            CodingAttempt.stderr,
+            CodingAttempt.created_at,
+        ).order_by(CodingAttempt.challenge_id, CodingAttempt.user_id, CodingAttempt.id)
+        column = CodingAttempt.challenge_id
+    else:
+        # У Python-заданий нет кода возврата: неудача без исключения — неверный вывод.
+        query = (
+            select(
+                PythonSubmission.challenge_id,
+                PythonUserProgress.user_id,
+                PythonSubmission.is_passed,
+                func.iif(PythonSubmission.stderr > "", 1, 0),
+                PythonSubmission.stderr,
+                PythonSubmission.created_at,
+            )
+            .join(PythonUserProgress, PythonUserProgress.id == PythonSubmission.progress_id)
+            .order_by(PythonSubmission.challenge_id, PythonUserProgress.user_id, PythonSubmission.id)
+        )
+        column = PythonSubmission.challenge_id
+    if challenge_ids is not None:
+        query = query.where(column.in_(challenge_ids))
+    return db.execute(query.execution_options(yield_per=STREAM_BATCH))
+
+
+def rebuild_challenge_stats(
+    db: Session, kind: ChallengeKind, challenge_ids: Iterable[int] | None = None
+) -> int:
+    """Пересчитываем статистику заданий по истории попыток; возвращаем число заданий.
+
+    Попытки читаются потоком пачками по ``STREAM_BATCH`` в порядке (задание,
+    пилот, id), так что в памяти держатся только счётчики текущего задания.
+    """
+
+    ids = list(challenge_ids) if challenge_ids is not None else None
+    tallies: dict[int, _Tally] = {}
+    current_key: tuple[int, int] | None = None
+    tried = passed = 0
+    for challenge_id, user_id, is_passed, exit_code, stderr, created_at in _attempt_stream(db, kind, ids):
+        tally = tallies.setdefault(challenge_id, _Tally())
+        if (challenge_id, user_id) != current_key:
+            current_key, tried, passed = (challenge_id, user_id), 0, False
+            tally.users += 1
+        tally.attempts += 1
+        tally.last_attempt_at = max(filter(None, [tally.last_attempt_at, created_at]), default=None)
+        if is_passed:
+            tally.passed_attempts += 1
+            if not passed:
+                passed = True
+                tally.passed_users += 1
+                tally.counts[(METRIC_FIRST_PASS, first_pass_key(tried + 1))] += 1
+        else:
+            tally.counts[(METRIC_FAILURE, failure_key(stderr=stderr, exit_code=exit_code))] += 1
+        tried += 1
+
+    for model in (ChallengeStats, ChallengeStatCount):
+        statement = delete(model).where(model.kind == kind)
+        if ids is not None:
+            statement = statement.where(model.challenge_id.in_(ids))
+        db.execute(statement)
+    if tallies:
+        db.execute(
+            insert(ChallengeStats),
+            [
+                {
+                    "kind": kind,
+                    "challenge_id": challenge_id,
+                    "attempts": tally.attempts,
+                    "passed_attempts": tally.passed_attempts,
+                    "users": tally.users,
+                    "passed_users": tally.passed_users,
+                    "last_attempt_at": tally.last_attempt_at,
+                }
+                for challenge_id, tally in tallies.items()
+            ],
+        )
+        counts = [
+            {"kind": kind, "challenge_id": challenge_id, "metric": metric, "key": key, "count": count}
+            for challenge_id, tally in tallies.items()
+            for (metric, key), count in tally.counts.items()
+        ]
+        if counts:
+            db.execute(insert(ChallengeStatCount), counts)
+    db.commit()
+    return len(tallies)
+
+
+def challenge_stats_report(
+    db: Session, kind: ChallengeKind, *, mission_id: int | None = None
+) -> list[ChallengeStatsRead]:
+    """Статистика заданий (по миссии или всех) только из сводных таблиц."""
+
+    challenge = CodingChallenge if kind == ChallengeKind.CODING else PythonChallenge
+    query = (
+        select(challenge.id, challenge.mission_id, challenge.order, challenge.title, ChallengeStats)
+        .outerjoin(ChallengeStats, (ChallengeStats.kind == kind) & (ChallengeStats.challenge_id == challenge.id))
+        .order_by(challenge.mission_id, challenge.order)
+    )
+    if mission_id is not None:
+        query = query.where(challenge.mission_id == mission_id)
+    rows = db.execute(query).all()
+
+    counts: dict[int, dict[str, Counter]] = {}
+    count_query = select(ChallengeStatCount).where(ChallengeStatCount.kind == kind)
+    if mission_id is not None:
+        count_query = count_query.where(ChallengeStatCount.challenge_id.in_([row[0] for row in rows]))
+    for item in db.scalars(count_query):
+        counts.setdefault(item.challenge_id, {}).setdefault(item.metric, Counter())[item.key] = item.count
+
+    report = []
+    for challenge_id, challenge_mission_id, order, title, stats in rows:
+        by_metric = counts.get(challenge_id, {})
+        first_pass = by_metric.get(METRIC_FIRST_PASS, Counter())
+        report.append(
+            ChallengeStatsRead(
+                kind=kind,
+                challenge_id=challenge_id,
+                mission_id=challenge_mission_id,
+                order=order,
+                title=title,
+                attempts=stats.attempts if stats else 0,
+                users=stats.users if stats else 0,
+                passed_users=stats.passed_users if stats else 0,
+                pass_rate=round(stats.passed_users / stats.users, 4) if stats and stats.users else 0.0,
+                attempt_pass_rate=round(stats.passed_attempts / stats.attempts, 4) if stats and stats.attempts else 0.0,
+                first_pass_histogram=dict(
+                    sorted(first_pass.items(), key=lambda item: int(item[0].rstrip("+")))
+                ),
+                top_failures=[
+                    ChallengeFailureCount(reason=key, count=count)
+                    for key, count in by_metric.get(METRIC_FAILURE, Counter()).most_common(TOP_FAILURES)
+                ],
+                last_attempt_at=stats.last_attempt_at if stats else None,
+            )
+        )
+    return report
+
+
+def main() -> None:
+    """CLI: ``python -m app.services.challenge_stats [--kind coding|python]``."""
+
+    from app.db.session import SessionLocal  # noqa: PLC0415 - сессия нужна только CLI
+
+    parser = argparse.ArgumentParser(description="Пересчитать статистику заданий по истории попыток")
+    parser.add_argument("--kind", choices=[item.value for item in ChallengeKind], help="по умолчанию оба вида")
+    args = parser.parse_args()
+
+    kinds = [ChallengeKind(args.kind)] if args.kind else list(ChallengeKind)
+    session = SessionLocal()
+    try:
+        for kind in kinds:
+            total = rebuild_challenge_stats(session, kind)
+            sys.stdout.write(f"{kind.value}: пересчитано заданий — {total}\n")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
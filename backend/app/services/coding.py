@@ -3,17 +3,23 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Iterable
 
 from fastapi import HTTPException, status
-from sqlalchemy import and_, func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
 
-from app.models.coding import CodingAttempt, CodingChallenge
+from app.models.challenge_stats import ChallengeKind
+from app.models.coding import CodingAttempt, CodingChallenge, CodingProgress
 from app.models.mission import Mission, MissionSubmission, SubmissionStatus
 from app.models.user import User
+from app.services.challenge_stats import record_attempt_stats
 from app.services.mission import approve_submission
-from app.utils.python_runner import PythonRunResult, run_user_python_code
+from app.services.similarity import index_attempt
+from app.utils.python_runner import PythonRunResult, precheck_user_code, run_user_python_code
+from app.utils.runner_client import RunnerUnavailableError
 
 
 @dataclass(slots=True)
@@ -30,6 +36,101 @@ def _normalize_output(raw: str) -> str:
     return raw.replace("\r\n", "\n").rstrip("\n")
 
 
+def _solved_filter(user: User):
+    """Условие соединения с ``coding_progress`` по решённым заданиям пилота."""
+
+    return and_(
+        CodingProgress.challenge_id == CodingChallenge.id,
+        CodingProgress.user_id == user.id,
+        CodingProgress.first_passed_at.is_not(None),
+    )
+
+
+def record_attempt_progress(db: Session, attempt: CodingAttempt) -> None:
+    """Учитываем попытку в сводке ``coding_progress`` одним upsert-запросом.
+
+    Попытка уже должна быть записана (нужен ``attempt.id``). Счётчик попыток
+    увеличиваем атомарно, а первую успешную попытку не перезаписываем.
+    Возвращённые upsert-ом значения сразу идут в статистику задания.
+    """
+
+    passed_at = datetime.now(timezone.utc) if attempt.is_passed else None
+    best_attempt_id = attempt.id if attempt.is_passed else None
+    statement = sqlite_insert(CodingProgress).values(
+        user_id=attempt.user_id,
+        challenge_id=attempt.challenge_id,
+        attempts=1,
+        first_passed_at=passed_at,
+        best_attempt_id=best_attempt_id,
+    )
+    excluded = statement.excluded
+    result = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[CodingProgress.user_id, CodingProgress.challenge_id],
+            set_={
+                "attempts": CodingProgress.attempts + 1,
+                "first_passed_at": func.coalesce(CodingProgress.first_passed_at, excluded.first_passed_at),
+                "best_attempt_id": func.coalesce(CodingProgress.best_attempt_id, excluded.best_attempt_id),
+                "updated_at": func.now(),
+            },
+        ).returning(CodingProgress.attempts, CodingProgress.best_attempt_id)
+    )
+    attempts, first_passed_id = result.one()
+    record_attempt_stats(
+        db,
+        kind=ChallengeKind.CODING,
+        challenge_id=attempt.challenge_id,
+        is_passed=attempt.is_passed,
+        exit_code=attempt.exit_code,
+        stderr=attempt.stderr,
+        previous_attempts=attempts - 1,
+        first_pass=first_passed_id == attempt.id,
+    )
+
+
+def rebuild_coding_progress(db: Session, *, challenge_id: int, user_ids: Iterable[int]) -> None:
+    """Пересчитываем сводку по истории попыток (после перепроверки решений)."""
+
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    first_passed = (
+        select(
+            CodingAttempt.user_id,
+            func.count(CodingAttempt.id).label("attempts"),
+            func.min(case((CodingAttempt.is_passed.is_(True), CodingAttempt.id))).label("best_attempt_id"),
+        )
+        .where(CodingAttempt.challenge_id == challenge_id, CodingAttempt.user_id.in_(user_ids))
+        .group_by(CodingAttempt.user_id)
+        .subquery()
+    )
+    best = aliased(CodingAttempt)
+    rows = db.execute(
+        select(first_passed, best.created_at).outerjoin(best, best.id == first_passed.c.best_attempt_id)
+    ).all()
+
+    for user_id, attempts, best_attempt_id, passed_at in rows:
+        statement = sqlite_insert(CodingProgress).values(
+            user_id=user_id,
+            challenge_id=challenge_id,
+            attempts=attempts,
+            first_passed_at=passed_at,
+            best_attempt_id=best_attempt_id,
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[CodingProgress.user_id, CodingProgress.challenge_id],
+                set_={
+                    "attempts": statement.excluded.attempts,
+                    "first_passed_at": statement.excluded.first_passed_at,
+                    "best_attempt_id": statement.excluded.best_attempt_id,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+
+
 def _ensure_previous_challenges_solved(
     db: Session,
     *,
@@ -38,37 +139,16 @@ def _ensure_previous_challenges_solved(
 ) -> None:
     """Проверяем, что все предыдущие задания завершены."""
 
-    previous_ids = (
-        db.execute(
-            select(CodingChallenge.id)
-            .where(
-                CodingChallenge.mission_id == challenge.mission_id,
-                CodingChallenge.order < challenge.order,
-            )
-            .order_by(CodingChallenge.order)
+    missing = db.scalar(
+        select(func.count(CodingChallenge.id))
+        .outerjoin(CodingProgress, _solved_filter(user))
+        .where(
+            CodingChallenge.mission_id == challenge.mission_id,
+            CodingChallenge.order < challenge.order,
+            CodingProgress.id.is_(None),
         )
-        .scalars()
-        .all()
     )
 
-    if not previous_ids:
-        return
-
-    solved_ids = set(
-        db.execute(
-            select(CodingAttempt.challenge_id)
-            .where(
-                CodingAttempt.user_id == user.id,
-                CodingAttempt.challenge_id.in_(previous_ids),
-                CodingAttempt.is_passed.is_(True),
-            )
-            .distinct()
-        )
-        .scalars()
-        .all()
-    )
-
-    missing = [challenge_id for challenge_id in previous_ids if challenge_id not in solved_ids]
     if missing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -85,25 +165,19 @@ def _finalize_mission_if_needed(
 ) -> bool:
     """Если пилот решил все задания, автоматически засчитываем миссию."""
 
-    challenge_ids = list(challenge_ids)
+    challenge_ids = set(challenge_ids)
     if not challenge_ids:
         return False
 
-    solved_ids = set(
-        db.execute(
-            select(CodingAttempt.challenge_id)
-            .where(
-                CodingAttempt.user_id == user.id,
-                CodingAttempt.challenge_id.in_(challenge_ids),
-                CodingAttempt.is_passed.is_(True),
-            )
-            .distinct()
+    solved_count = db.scalar(
+        select(func.count(CodingProgress.id)).where(
+            CodingProgress.user_id == user.id,
+            CodingProgress.challenge_id.in_(challenge_ids),
+            CodingProgress.first_passed_at.is_not(None),
         )
-        .scalars()
-        .all()
     )
 
-    if len(solved_ids) != len(set(challenge_ids)):
+    if solved_count != len(challenge_ids):
         return False
 
     submission = (
@@ -143,8 +217,17 @@ def evaluate_challenge(
 
     _ensure_previous_challenges_solved(db, challenge=challenge, user=user)
 
-    run_result: PythonRunResult = run_user_python_code(code)
     expected = _normalize_output(challenge.expected_output)
+    # Синтаксические ошибки и запрещённые импорты ловим без запуска интерпретатора,
+    # но попытку всё равно сохраняем, чтобы история оставалась полной.
+    try:
+        run_result: PythonRunResult = precheck_user_code(code) or run_user_python_code(code)
+    except RunnerUnavailableError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
     actual = _normalize_output(run_result.stdout)
 
     is_passed = run_result.exit_code == 0 and actual == expected
@@ -160,6 +243,9 @@ def evaluate_challenge(
     )
 
     db.add(attempt)
+    db.flush()
+    record_attempt_progress(db, attempt)
+    index_attempt(db, attempt)
     db.commit()
     db.refresh(attempt)
 
@@ -185,18 +271,89 @@ def count_completed_challenges(db: Session, *, mission_ids: Iterable[int], user:
         return {}
 
     rows = db.execute(
-        select(CodingChallenge.mission_id, func.count(func.distinct(CodingChallenge.id)))
-        .join(
-            CodingAttempt,
-            and_(
-                CodingAttempt.challenge_id == CodingChallenge.id,
-                CodingAttempt.user_id == user.id,
-                CodingAttempt.is_passed.is_(True),
-            ),
-        )
+        select(CodingChallenge.mission_id, func.count(CodingChallenge.id))
+        .join(CodingProgress, _solved_filter(user))
         .where(CodingChallenge.mission_id.in_(mission_ids))
         .group_by(CodingChallenge.mission_id)
     ).all()
 
     return {mission_id: count for mission_id, count in rows}
 
+
+
+def solved_challenge_ids(db: Session, *, user: User, challenge_ids: Iterable[int]) -> set[int]:
+    """Возвращаем задания, которые пилот уже решил."""
+
+    challenge_ids = list(challenge_ids)
+    if not challenge_ids:
+        return set()
+
+    return set(
+        db.execute(
+            select(CodingProgress.challenge_id).where(
+                CodingProgress.user_id == user.id,
+                CodingProgress.challenge_id.in_(challenge_ids),
+                CodingProgress.first_passed_at.is_not(None),
+            )
+        )
+        .scalars()
+        .all()
+    )
+
+
+def latest_attempts_by_challenge(
+    db: Session, *, user: User, challenge_ids: Iterable[int]
+) -> dict[int, CodingAttempt]:
+    """Возвращаем только последнюю попытку по каждому заданию.
+
+    Нумеруем попытки окном ``ROW_NUMBER()`` внутри задания и забираем полные строки
+    лишь для первых номеров, чтобы не тащить весь код и вывод из истории.
+    """
+
+    challenge_ids = list(challenge_ids)
+    if not challenge_ids:
+        return {}
+
+    ranked = (
+        select(
+            CodingAttempt.id.label("attempt_id"),
+            func.row_number()
+            .over(partition_by=CodingAttempt.challenge_id, order_by=CodingAttempt.id.desc())
+            .label("position"),
+        )
+        .where(CodingAttempt.user_id == user.id, CodingAttempt.challenge_id.in_(challenge_ids))
+        .subquery()
+    )
+    attempts = (
+        db.query(CodingAttempt)
+        .join(ranked, ranked.c.attempt_id == CodingAttempt.id)
+        .filter(ranked.c.position == 1)
+        .all()
+    )
+    return {attempt.challenge_id: attempt for attempt in attempts}
+
+
+def list_attempts_page(
+    db: Session,
+    *,
+    user: User,
+    challenge_id: int,
+    limit: int,
+    before_id: int | None = None,
+) -> tuple[list[CodingAttempt], int | None]:
+    """Страница истории попыток по ключу ``id`` (от новых к старым).
+
+    Возвращаем попытки и ``id`` для запроса следующей страницы (или ``None``).
+    """
+
+    query = db.query(CodingAttempt).filter(
+        CodingAttempt.user_id == user.id,
+        CodingAttempt.challenge_id == challenge_id,
+    )
+    if before_id is not None:
+        query = query.filter(CodingAttempt.id < before_id)
+
+    rows = query.order_by(CodingAttempt.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, rows[-1].id if has_more else None
@@ -0,0 +1,202 @@
+"""Распределение уровней компетенций по рангу, любимой ветке и когорте.
+
+Уровни всех пилотов один раз загружаются в плотную матрицу NumPy
+«пилот × компетенция» (отсутствующая запись — уровень 0) вместе с атрибутами
+пилота: ранг, ветка, в которой у него больше всего зачтённых миссий, и месяц
+регистрации. Матрица кэшируется и сбрасывается после коммита, изменившего
+уровни (:func:`invalidate_competency_frame_on_commit`). Тепловая карта — это
+``bincount`` по составному ключу «группа × компетенция × уровень», из которого
+берутся число пилотов, среднее и перцентили; на всю базу уходят миллисекунды.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Literal
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.branch import Branch, BranchMission
+from app.models.mission import MissionSubmission, SubmissionStatus
+from app.models.rank import Rank
+from app.models.user import Competency, User, UserCompetency, UserRole
+from app.schemas.competency_analytics import (
+    CompetencyHeatmap,
+    CompetencyHeatmapCell,
+    CompetencyHeatmapGroup,
+)
+from app.schemas.user import CompetencyBase
+from app.utils.snapshot_cache import SnapshotCache
+
+Dimension = Literal["rank", "branch", "cohort"]
+DIMENSIONS: tuple[Dimension, ...] = ("rank", "branch", "cohort")
+QUANTILES = (0.5, 0.9)
+# Метка группы для пилотов без ранга или без зачтённых миссий в ветках.
+NO_GROUP = "—"
+
+
+@dataclass(frozen=True)
+class CompetencyFrame:
+    """Столбцы по пилотам: уровни ``levels[пилот, компетенция]`` и коды групп."""
+
+    competencies: list[Competency]
+    levels: np.ndarray
+    # Для каждого измерения: код группы пилота и (ключ, подпись) группы по коду.
+    groups: dict[str, np.ndarray]
+    labels: dict[str, list[tuple[int | str | None, str]]]
+    loaded_at: datetime
+
+
+def _codes(
+    keys: np.ndarray, ordered: list[tuple[int, str]]
+) -> tuple[np.ndarray, list[tuple[int | None, str]]]:
+    """Код группы 1..k по порядку ``ordered`` (id, подпись); 0 — нет группы."""
+
+    lookup = np.zeros(max([key for key, _ in ordered] + [0]) + 2, dtype=np.int64)
+    for position, (key, _) in enumerate(ordered, start=1):
+        lookup[key] = position
+    codes = np.where(keys >= 0, lookup[np.clip(keys, 0, len(lookup) - 1)], 0)
+    return codes, [(None, NO_GROUP), *ordered]
+
+
+def load_competency_frame(db: Session) -> CompetencyFrame:
+    """Загружаем уровни и атрибуты всех пилотов: по запросу на таблицу, без обхода по пилотам."""
+
+    competencies = list(db.scalars(select(Competency).order_by(Competency.id)))
+    pilots = db.execute(
+        select(User.id, User.current_rank_id, func.strftime("%Y-%m", User.created_at))
+        .where(User.role == UserRole.PILOT)
+        .order_by(User.id)
+    ).all()
+    user_ids = np.fromiter((row[0] for row in pilots), dtype=np.int64, count=len(pilots))
+
+    levels = np.zeros((len(pilots), len(competencies)), dtype=np.int64)
+    rows = db.execute(
+        select(UserCompetency.user_id, UserCompetency.competency_id, UserCompetency.level)
+        .join(User, User.id == UserCompetency.user_id)
+        .where(User.role == UserRole.PILOT)
+    ).all()
+    if rows and competencies:
+        data = np.array(rows, dtype=np.int64)
+        competency_ids = np.array([item.id for item in competencies], dtype=np.int64)
+        pilot_index = np.searchsorted(user_ids, data[:, 0])
+        competency_index = np.searchsorted(competency_ids, data[:, 1])
+        levels[pilot_index, competency_index] = np.maximum(data[:, 2], 0)
+
+    # Любимая ветка — та, где у пилота больше всего зачтённых миссий (при равенстве — меньший id).
+    branch_counts = db.execute(
+        select(MissionSubmission.user_id, BranchMission.branch_id, func.count())
+        .join(BranchMission, BranchMission.mission_id == MissionSubmission.mission_id)
+        .where(MissionSubmission.status == SubmissionStatus.APPROVED)
+        .group_by(MissionSubmission.user_id, BranchMission.branch_id)
+    ).all()
+    favourite = np.full(len(pilots), -1, dtype=np.int64)
+    if branch_counts:
+        data = np.array(branch_counts, dtype=np.int64)
+        order = np.lexsort((data[:, 1], -data[:, 2], data[:, 0]))
+        data = data[order]
+        first = np.ones(len(data), dtype=bool)
+        first[1:] = data[1:, 0] != data[:-1, 0]
+        known = np.isin(data[first, 0], user_ids)
+        favourite[np.searchsorted(user_ids, data[first, 0][known])] = data[first, 1][known]
+
+    ranks = [(row.id, row.title) for row in db.execute(select(Rank.id, Rank.title).order_by(Rank.required_xp))]
+    branches = [(row.id, row.title) for row in db.execute(select(Branch.id, Branch.title).order_by(Branch.id))]
+    current_ranks = np.fromiter((row[1] or -1 for row in pilots), dtype=np.int64, count=len(pilots))
+    rank_codes, rank_labels = _codes(current_ranks, ranks)
+    branch_codes, branch_labels = _codes(favourite, branches)
+    registration_months = np.array([row[2] or NO_GROUP for row in pilots], dtype=str)
+    months, cohort_codes = np.unique(registration_months, return_inverse=True)
+
+    return CompetencyFrame(
+        competencies=competencies,
+        levels=levels,
+        groups={"rank": rank_codes, "branch": branch_codes, "cohort": cohort_codes.astype(np.int64)},
+        labels={
+            "rank": rank_labels,
+            "branch": branch_labels,
+            "cohort": [(str(month), str(month)) for month in months],
+        },
+        loaded_at=datetime.now(timezone.utc),
+    )
+
+
+def build_heatmap(frame: CompetencyFrame, dimension: Dimension) -> CompetencyHeatmap:
+    """Число пилотов, среднее, перцентили и гистограмма уровней по (группа, компетенция)."""
+
+    groups = frame.groups[dimension]
+    labels = frame.labels[dimension]
+    group_count, competency_count = len(labels), len(frame.competencies)
+    max_level = int(frame.levels.max()) if frame.levels.size else 0
+    width = max_level + 1
+
+    # Составной ключ ((группа * C) + компетенция) * (L + 1) + уровень для каждой ячейки матрицы.
+    cell = groups[:, None] * competency_count + np.arange(competency_count)[None, :]
+    histogram = np.bincount(
+        (cell * width + frame.levels).ravel(), minlength=group_count * competency_count * width
+    ).reshape(group_count, competency_count, width)
+
+    pilots = np.bincount(groups, minlength=group_count)
+    totals = histogram @ np.arange(width)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(pilots[:, None] > 0, totals / pilots[:, None], 0.0)
+    cumulative = histogram.cumsum(axis=2)
+    percentiles = []
+    for q in QUANTILES:
+        # Ближайший ранг: первый уровень, на котором накоплено больше q * (n - 1) пилотов.
+        threshold = np.floor(q * (pilots - 1))[:, None, None]
+        percentiles.append((cumulative > threshold).argmax(axis=2))
+
+    cells = [
+        CompetencyHeatmapCell(
+            group=group_index,
+            competency_id=competency.id,
+            mean=round(float(means[group_index, competency_index]), 3),
+            p50=int(percentiles[0][group_index, competency_index]),
+            p90=int(percentiles[1][group_index, competency_index]),
+            histogram=histogram[group_index, competency_index].tolist(),
+        )
+        for group_index in range(group_count)
+        for competency_index, competency in enumerate(frame.competencies)
+    ]
+    return CompetencyHeatmap(
+        dimension=dimension,
+        levels=list(range(width)),
+        competencies=[CompetencyBase.model_validate(item) for item in frame.competencies],
+        groups=[
+            CompetencyHeatmapGroup(index=index, key=key, label=label, pilots=int(pilots[index]))
+            for index, (key, label) in enumerate(labels)
+        ],
+        cells=cells,
+        loaded_at=frame.loaded_at,
+    )
+
+
+_frame_cache: SnapshotCache[CompetencyFrame] = SnapshotCache(
+    lambda: settings.competency_analytics_ttl_seconds
+)
+
+
+def competency_heatmap(db: Session, dimension: Dimension) -> CompetencyHeatmap:
+    return build_heatmap(_frame_cache.get(lambda: load_competency_frame(db)), dimension)
+
+
+def invalidate_competency_frame() -> None:
+    _frame_cache.invalidate()
+
+
+def invalidate_competency_frame_on_commit(db: Session) -> None:
+    """Сбрасываем матрицу после коммита: раньше другой запрос мог бы закэшировать старые уровни."""
+
+    if not db.info.get("competency_frame_invalidation"):
+        db.info["competency_frame_invalidation"] = True
+
+        def _invalidate(session: Session) -> None:
+            session.info.pop("competency_frame_invalidation", None)
+            invalidate_competency_frame()
+
+        event.listen(db, "after_commit", _invalidate, once=True)
@@ -0,0 +1,248 @@
+"""Потоковая выгрузка документов кандидатов одним ZIP-архивом.
+
+Архив собирается на лету: ``zipfile`` пишет в приёмник без ``seek``, а мы после
+каждого куска забираем накопленные байты и отдаём их клиенту. В памяти держим
+только текущий кусок файла, временный архив на диск не пишем. Документы (PDF,
+JPEG, PNG, WebP) уже сжаты, поэтому кладём их без сжатия: скорость упирается в
+чтение с диска, а не в процессор. Сжимаем только CSV-манифест.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.blob import StoredBlob
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.user import User
+from app.services.blobs import is_blob_path, sha256_from_path
+from app.services.storage import _ensure_within_base
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_FIELDS = ("passport", "photo", "resume")
+READ_CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = (
+    "submission_id",
+    "user_id",
+    "full_name",
+    "email",
+    "mission_id",
+    "mission_title",
+    "status",
+    "document",
+    "archive_path",
+    "size",
+    "sha256",
+    "included",
+)
+
+_UNSAFE_CHARS = re.compile(r"[^\w.\- ]+", re.UNICODE)
+
+
+@dataclass(slots=True)
+class ExportEntry:
+    """Один документ отправки и его место в архиве."""
+
+    submission_id: int
+    user_id: int
+    full_name: str
+    email: str
+    mission_id: int
+    mission_title: str
+    status: str
+    document: str
+    relative_path: str
+    archive_path: str
+    modified_at: datetime
+    sha256: str | None = None
+    size: int | None = None
+    included: bool = False
+
+
+class _ChunkSink(io.RawIOBase):
+    """Приёмник без ``seek``: копит записанное до следующего ``drain``."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _safe_name(value: str) -> str:
+    cleaned = _UNSAFE_CHARS.sub("_", value).strip(" ._")
+    return cleaned[:80] or "candidate"
+
+
+def collect_export_entries(
+    db: Session,
+    *,
+    submission_ids: list[int] | None = None,
+    mission_id: int | None = None,
+    status: SubmissionStatus | None = None,
+    registered_from: date | None = None,
+    registered_to: date | None = None,
+) -> list[ExportEntry]:
+    """Выбираем документы отправок по фильтрам одним запросом без загрузки ORM-объектов."""
+
+    query = (
+        select(
+            MissionSubmission.id,
+            MissionSubmission.user_id,
+            MissionSubmission.mission_id,
+            MissionSubmission.status,
+            MissionSubmission.updated_at,
+            MissionSubmission.passport_path,
+            MissionSubmission.photo_path,
+            MissionSubmission.resume_path,
+            User.full_name,
+            User.email,
+            Mission.title,
+        )
+        .join(User, User.id == MissionSubmission.user_id)
+        .join(Mission, Mission.id == MissionSubmission.mission_id)
+        .order_by(MissionSubmission.id)
+    )
+    if submission_ids:
+        query = query.where(MissionSubmission.id.in_(submission_ids))
+    if mission_id is not None:
+        query = query.where(MissionSubmission.mission_id == mission_id)
+    if status is not None:
+        query = query.where(MissionSubmission.status == status)
+    # Когорта — кандидаты, зарегистрировавшиеся в указанный период.
+    if registered_from is not None:
+        query = query.where(User.created_at >= datetime.combine(registered_from, time.min, timezone.utc))
+    if registered_to is not None:
+        query = query.where(
+            User.created_at < datetime.combine(registered_to + timedelta(days=1), time.min, timezone.utc)
+        )
+
+    entries: list[ExportEntry] = []
+    for row in db.execute(query):
+        folder = f"{row.id}_{_safe_name(row.full_name)}"
+        for document, relative_path in zip(
+            DOCUMENT_FIELDS, (row.passport_path, row.photo_path, row.resume_path)
+        ):
+            if not relative_path:
+                continue
+            # Путь из базы открываем только внутри каталога загрузок: ни ``..``, ни
+            # абсолютный путь, ни симлинк наружу не должны попасть в архив.
+            try:
+                _ensure_within_base(settings.uploads_path / relative_path)
+            except ValueError:
+                logger.warning("Отправка %s: путь %s вне каталога загрузок, пропускаем", row.id, document)
+                continue
+            entries.append(
+                ExportEntry(
+                    submission_id=row.id,
+                    user_id=row.user_id,
+                    full_name=row.full_name,
+                    email=row.email,
+                    mission_id=row.mission_id,
+                    mission_title=row.title,
+                    status=row.status.value,
+                    document=document,
+                    relative_path=relative_path,
+                    archive_path=f"{folder}/{document}",
+                    modified_at=row.updated_at,
+                )
+            )
+
+    # Расширения файлов хранилища лежат в отдельной таблице — подтягиваем их пачкой.
+    hashes = {sha256_from_path(entry.relative_path) for entry in entries if is_blob_path(entry.relative_path)}
+    extensions: dict[str, str | None] = {}
+    if hashes:
+        rows = db.execute(
+            select(StoredBlob.sha256, StoredBlob.extension).where(StoredBlob.sha256.in_(hashes))
+        )
+        extensions = dict(rows.all())
+    for entry in entries:
+        if is_blob_path(entry.relative_path):
+            entry.sha256 = sha256_from_path(entry.relative_path)
+            entry.archive_path += extensions.get(entry.sha256) or ""
+        else:
+            entry.archive_path += Path(entry.relative_path).suffix
+    return entries
+
+
+def _zip_info(name: str, moment: datetime, compress_type: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=moment.timetuple()[:6])
+    info.compress_type = compress_type
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def _manifest(entries: list[ExportEntry]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(MANIFEST_COLUMNS)
+    for entry in entries:
+        writer.writerow(
+            [
+                entry.submission_id,
+                entry.user_id,
+                entry.full_name,
+                entry.email,
+                entry.mission_id,
+                entry.mission_title,
+                entry.status,
+                entry.document,
+                entry.archive_path if entry.included else "",
+                entry.size if entry.size is not None else "",
+                entry.sha256 or "",
+                "yes" if entry.included else "no",
+            ]
+        )
+    # BOM, чтобы Excel открыл кириллицу без мастера импорта.
+    return ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+
+def stream_documents_zip(entries: list[ExportEntry]) -> Iterator[bytes]:
+    """Генерируем ZIP по кускам; пропавшие с диска файлы отмечаем в манифесте."""
+
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for entry in entries:
+            path = settings.uploads_path / entry.relative_path
+            try:
+                handle = path.open("rb")
+            except (FileNotFoundError, IsADirectoryError):
+                continue
+            with handle:
+                entry.size = path.stat().st_size
+                moment = entry.modified_at or datetime.now(timezone.utc)
+                info = _zip_info(entry.archive_path, moment, zipfile.ZIP_STORED)
+                with archive.open(info, mode="w", force_zip64=entry.size >= zipfile.ZIP64_LIMIT) as target:
+                    while chunk := handle.read(READ_CHUNK_SIZE):
+                        target.write(chunk)
+                        if data := sink.drain():
+                            yield data
+            entry.included = True
+            if data := sink.drain():
+                yield data
+
+        manifest = _zip_info(MANIFEST_NAME, datetime.now(timezone.utc), zipfile.ZIP_DEFLATED)
+        archive.writestr(manifest, _manifest(entries))
+    yield sink.drain()
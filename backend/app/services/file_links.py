@@ -0,0 +1,86 @@
+"""Подписанные короткоживущие ссылки на файлы хранилища.
+
+Ссылка несёт sha256 файла, срок действия, имя и тип для заголовков ответа и
+HMAC-подпись всех этих полей. Маршрут скачивания проверяет подпись без обращения
+к базе: права доступа уже проверил эндпоинт, который выдал ссылку.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import re
+import time
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from app.core.config import settings
+
+FILES_ROUTE = "/api/files"
+
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+@dataclass(slots=True)
+class SignedFileLink:
+    """Готовая ссылка и момент её истечения (unix-время)."""
+
+    url: str
+    expires: int
+
+
+def _signing_key() -> bytes:
+    # Отдельный ключ, производный от secret_key: подпись ссылки нельзя выдать за JWT и наоборот.
+    return hmac.new(settings.secret_key.encode("utf-8"), b"file-links", hashlib.sha256).digest()
+
+
+def _signature(sha256: str, expires: int, name: str, mime_type: str) -> str:
+    message = "\n".join((sha256, str(expires), name, mime_type)).encode("utf-8")
+    digest = hmac.new(_signing_key(), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def is_valid_sha256(value: str) -> bool:
+    return bool(_SHA256_RE.fullmatch(value))
+
+
+def sign_file_link(
+    sha256: str,
+    *,
+    name: str,
+    mime_type: str | None,
+    ttl_seconds: int | None = None,
+    now: float | None = None,
+) -> SignedFileLink:
+    """Выдаём ссылку на файл хранилища, действующую ``ttl_seconds`` секунд."""
+
+    ttl = settings.file_link_ttl_seconds if ttl_seconds is None else ttl_seconds
+    expires = int((time.time() if now is None else now) + ttl)
+    mime_type = mime_type or "application/octet-stream"
+    query = urlencode(
+        {
+            "expires": expires,
+            "name": name,
+            "type": mime_type,
+            "signature": _signature(sha256, expires, name, mime_type),
+        }
+    )
+    return SignedFileLink(url=f"{FILES_ROUTE}/{sha256}?{query}", expires=expires)
+
+
+def verify_file_link(
+    sha256: str,
+    *,
+    expires: int,
+    name: str,
+    mime_type: str,
+    signature: str,
+    now: float | None = None,
+) -> bool:
+    """Проверяем подпись и срок действия ссылки."""
+
+    if expires < (time.time() if now is None else now):
+        return False
+    expected = _signature(sha256, expires, name, mime_type)
+    return hmac.compare_digest(expected, signature)
@@ -0,0 +1,98 @@
+"""Нормализованные WebP-варианты фотографий профиля."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+from app.services.blobs import THUMBS_DIR, is_blob_path, sha256_from_path
+
+PHOTO_SIZES: tuple[int, ...] = (64, 256, 1024)
+# Размер, который отдаём в совместимом ответе с data URL.
+DATA_URL_SIZE = 256
+WEBP_QUALITY = 82
+
+# Защита от «бомб» распаковки: Pillow бросит исключение вместо предупреждения.
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+
+class InvalidImageError(ValueError):
+    """Файл не удалось прочитать как изображение."""
+
+
+def variant_key(relative_path: str) -> str:
+    """Ключ набора вариантов: sha256 файла из хранилища или отпечаток старого файла."""
+
+    if is_blob_path(relative_path):
+        return sha256_from_path(relative_path)
+    stat = (settings.uploads_path / relative_path).stat()
+    fingerprint = f"{relative_path}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def variants_dir(key: str) -> Path:
+    return settings.uploads_path / THUMBS_DIR / key
+
+
+def _save_webp(image: Image.Image, target: Path) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=target.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(temp_path, target)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def generate_photo_variants(relative_path: str) -> str:
+    """Создаём недостающие варианты фото и возвращаем их ключ.
+
+    Поворот по EXIF применяем сразу, метаданные не переносим, изображения меньше
+    целевого размера не растягиваем.
+    """
+
+    key = variant_key(relative_path)
+    directory = variants_dir(key)
+    missing = [size for size in PHOTO_SIZES if not (directory / f"{size}.webp").exists()]
+    if not missing:
+        return key
+
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        with Image.open(settings.uploads_path / relative_path) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as error:
+        raise InvalidImageError("Не удалось прочитать изображение") from error
+
+    for size in missing:
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+        _save_webp(variant, directory / f"{size}.webp")
+    return key
+
+
+def photo_variant(relative_path: str, size: int) -> tuple[Path, str]:
+    """Путь к варианту нужного размера и строгий ETag; варианты создаём при необходимости."""
+
+    key = generate_photo_variants(relative_path)
+    return variants_dir(key) / f"{size}.webp", f'"{key[:32]}-{size}"'
+
+
+def discard_photo_variants(relative_path: str | None) -> None:
+    """Удаляем варианты фото старого формата (для файлов хранилища это делает очистка)."""
+
+    if not relative_path or is_blob_path(relative_path):
+        return
+    try:
+        key = variant_key(relative_path)
+    except FileNotFoundError:
+        return
+    shutil.rmtree(variants_dir(key), ignore_errors=True)
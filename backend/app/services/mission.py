@@ -9,16 +9,41 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.models.journal import JournalEventType
+from app.models.milestone import UserMilestoneKind
 from app.models.mission import Mission, MissionFormat, MissionSubmission, SubmissionStatus
 from app.models.user import User, UserArtifact, UserCompetency
+from app.services.competency_analytics import invalidate_competency_frame_on_commit
 from app.services.journal import log_event
+from app.services.milestones import record_milestone
+from app.services.moderation_sla import change_status
 from app.services.rank import apply_rank_upgrade
+from app.services.blobs import OWNER_SUBMISSION, attach_blob, is_blob_path
 from app.services.storage import delete_submission_document
 
 
 UNSET: Any = object()
 
 
+def _replace_document(
+    db: Session, submission: MissionSubmission, kind: str, new_path: str | None
+) -> None:
+    """Меняем вложение отправки и освобождаем прежний файл."""
+
+    field = f"{kind}_path"
+    old_path = getattr(submission, field)
+    if old_path and old_path != new_path:
+        delete_submission_document(old_path, db=db, submission_id=submission.id, kind=kind)
+    if is_blob_path(new_path):
+        attach_blob(
+            db,
+            relative_path=new_path,
+            owner_type=OWNER_SUBMISSION,
+            owner_id=submission.id,
+            field=kind,
+        )
+    setattr(submission, field, new_path)
+
+
 def submit_mission(
     *,
     db: Session,
@@ -41,31 +66,28 @@ def submit_mission(
     if submission and submission.status == SubmissionStatus.APPROVED:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Миссия уже зачтена")
 
+    previous_status = submission.status if submission else None
     if not submission:
         submission = MissionSubmission(user_id=user.id, mission_id=mission.id)
 
     submission.comment = comment
     submission.proof_url = proof_url
 
-    if passport_path is not UNSET:
-        if isinstance(passport_path, str) and submission.passport_path and submission.passport_path != passport_path:
-            delete_submission_document(submission.passport_path)
-        submission.passport_path = passport_path if isinstance(passport_path, str) else None
-
-    if photo_path is not UNSET:
-        if isinstance(photo_path, str) and submission.photo_path and submission.photo_path != photo_path:
-            delete_submission_document(submission.photo_path)
-        submission.photo_path = photo_path if isinstance(photo_path, str) else None
+    if submission.id is None:
+        db.add(submission)
+        db.flush()
 
-    if resume_path is not UNSET:
-        if isinstance(resume_path, str) and submission.resume_path and submission.resume_path != resume_path:
-            delete_submission_document(submission.resume_path)
-        submission.resume_path = resume_path if isinstance(resume_path, str) else None
+    for kind, new_path in (("passport", passport_path), ("photo", photo_path), ("resume", resume_path)):
+        if new_path is not UNSET:
+            _replace_document(db, submission, kind, new_path if isinstance(new_path, str) else None)
 
     if resume_link is not UNSET:
         submission.resume_link = resume_link if isinstance(resume_link, str) else None
 
-    submission.status = SubmissionStatus.PENDING
+    change_status(
+        db, [submission], SubmissionStatus.PENDING, actor_id=user.id, previous={submission.id: previous_status}
+    )
+    record_milestone(db, user.id, UserMilestoneKind.FIRST_SUBMISSION)
 
     db.add(submission)
     db.commit()
@@ -86,6 +108,8 @@ def submit_mission(
 def _increase_competencies(db: Session, user: User, mission: Mission) -> None:
     """Повышаем уровни компетенций за миссию."""
 
+    if mission.competency_rewards:
+        invalidate_competency_frame_on_commit(db)
     for reward in mission.competency_rewards:
         user_competency = next(
             (uc for uc in user.competencies if uc.competency_id == reward.competency_id),
@@ -101,13 +125,26 @@ def _increase_competencies(db: Session, user: User, mission: Mission) -> None:
         db.add(user_competency)
 
 
-def approve_submission(db: Session, submission: MissionSubmission) -> MissionSubmission:
-    """Подтверждаем миссию, начисляем награды и проверяем ранг."""
+def _finish_review(submission: MissionSubmission) -> None:
+    """Решение принято — снимаем закрепление за проверяющим."""
+
+    submission.review_claimed_by_id = None
+    submission.review_lease_expires_at = None
+
+
+def approve_submission(
+    db: Session, submission: MissionSubmission, *, reviewer: User | None = None
+) -> MissionSubmission:
+    """Подтверждаем миссию, начисляем награды и проверяем ранг.
+
+    ``reviewer`` — HR, принявший решение; без него зачёт считается автоматическим.
+    """
 
     if submission.status == SubmissionStatus.APPROVED:
         return submission
 
-    submission.status = SubmissionStatus.APPROVED
+    change_status(db, [submission], SubmissionStatus.APPROVED, actor_id=reviewer.id if reviewer else None)
+    _finish_review(submission)
     submission.awarded_xp = submission.mission.xp_reward
     submission.awarded_mana = submission.mission.mana_reward
 
@@ -132,6 +169,7 @@ def approve_submission(db: Session, submission: MissionSubmission) -> MissionSub
                 payload={"artifact_id": submission.mission.artifact_id},
             )
 
+    record_milestone(db, user.id, UserMilestoneKind.FIRST_APPROVAL)
     db.add_all([submission, user])
     db.commit()
     db.refresh(submission)
@@ -152,10 +190,17 @@ def approve_submission(db: Session, submission: MissionSubmission) -> MissionSub
     return submission
 
 
-def reject_submission(db: Session, submission: MissionSubmission, comment: str | None = None) -> MissionSubmission:
+def reject_submission(
+    db: Session,
+    submission: MissionSubmission,
+    comment: str | None = None,
+    *,
+    reviewer: User | None = None,
+) -> MissionSubmission:
     """Отклоняем миссию."""
 
-    submission.status = SubmissionStatus.REJECTED
+    change_status(db, [submission], SubmissionStatus.REJECTED, actor_id=reviewer.id if reviewer else None)
+    _finish_review(submission)
     if comment:
         submission.comment = comment
     db.add(submission)
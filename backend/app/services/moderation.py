@@ -0,0 +1,326 @@
+"""Очередь модерации с закреплением отправок за проверяющими.
+
+HR берёт из очереди следующие N отправок одним ``UPDATE ... RETURNING``:
+свободные, с истёкшей арендой или уже закреплённые за ним самим. Пока аренда
+действует, другие проверяющие эти отправки не получают, а решение по чужой
+отправке отвечает 409. Истёкшая аренда просто снова делает отправку доступной.
+Страницы очереди листаются по ``id``: он растёт вместе со временем отправки, а
+в отличие от ``created_at`` (секундная точность SQLite) не даёт одинаковых ключей.
+Пакетное решение (:func:`bulk_review_submissions`) обрабатывает тысячи отправок
+за один запрос, например всех участников офлайн-мероприятия.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.config import settings
+from app.models.journal import JournalEntry, JournalEventType
+from app.models.milestone import UserMilestoneKind
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.user import User, UserArtifact, UserCompetency
+from app.services.competency_analytics import invalidate_competency_frame_on_commit
+from app.services.milestones import record_milestones
+from app.services.moderation_sla import change_status
+from app.services.rank import apply_rank_upgrades
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(moment: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса, хотя пишем мы UTC.
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(cursor)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор") from error
+
+
+def _with_context(query):
+    return query.options(joinedload(MissionSubmission.user), joinedload(MissionSubmission.mission))
+
+
+def list_queue_page(
+    db: Session,
+    *,
+    status_filter: SubmissionStatus,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[list[MissionSubmission], str | None]:
+    """Страница очереди с пилотом и миссией и курсор следующей страницы."""
+
+    query = select(MissionSubmission).where(MissionSubmission.status == status_filter)
+    if cursor:
+        query = query.where(MissionSubmission.id > decode_cursor(cursor))
+    query = _with_context(query.order_by(MissionSubmission.id).limit(limit + 1))
+    items = list(db.scalars(query).unique())
+    next_cursor = str(items[limit - 1].id) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+def claim_submissions(
+    db: Session,
+    *,
+    reviewer: User,
+    limit: int,
+    lease_seconds: float | None = None,
+    now: datetime | None = None,
+) -> list[MissionSubmission]:
+    """Закрепляем за проверяющим следующие ``limit`` отправок из очереди.
+
+    Свои действующие аренды продлеваются и входят в выдачу, поэтому повторный
+    вызов после обрыва связи возвращает ту же работу.
+    """
+
+    now = now or _now()
+    expires = now + timedelta(seconds=lease_seconds or settings.review_lease_seconds)
+    available = (
+        select(MissionSubmission.id)
+        .where(
+            MissionSubmission.status == SubmissionStatus.PENDING,
+            or_(
+                MissionSubmission.review_lease_expires_at.is_(None),
+                MissionSubmission.review_lease_expires_at < now,
+                MissionSubmission.review_claimed_by_id == reviewer.id,
+            ),
+        )
+        .order_by(MissionSubmission.id)
+        .limit(limit)
+    )
+    # Один оператор: SQLite сериализует запись, и двое HR не получат одну отправку.
+    claimed_ids = db.scalars(
+        update(MissionSubmission)
+        .where(MissionSubmission.id.in_(available.scalar_subquery()))
+        .values(review_claimed_by_id=reviewer.id, review_lease_expires_at=expires)
+        .returning(MissionSubmission.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    if not claimed_ids:
+        return []
+
+    query = _with_context(
+        select(MissionSubmission)
+        .where(MissionSubmission.id.in_(claimed_ids))
+        .order_by(MissionSubmission.id)
+        .execution_options(populate_existing=True)
+    )
+    return list(db.scalars(query).unique())
+
+
+def _held_by_other(submission: MissionSubmission, reviewer: User, now: datetime) -> bool:
+    return (
+        submission.review_claimed_by_id is not None
+        and submission.review_claimed_by_id != reviewer.id
+        and submission.review_lease_expires_at is not None
+        and _aware(submission.review_lease_expires_at) > now
+    )
+
+
+def ensure_review_lease(submission: MissionSubmission, reviewer: User, *, now: datetime | None = None) -> None:
+    """Решение по отправке, закреплённой за другим HR, запрещаем до конца аренды."""
+
+    if _held_by_other(submission, reviewer, now or _now()):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Отправку уже проверяет другой сотрудник",
+        )
+
+
+def release_submission(db: Session, submission: MissionSubmission, *, reviewer: User) -> None:
+    """Возвращаем отправку в очередь раньше срока аренды."""
+
+    ensure_review_lease(submission, reviewer)
+    submission.review_claimed_by_id = None
+    submission.review_lease_expires_at = None
+    db.add(submission)
+    db.commit()
+
+
+BULK_APPROVE = "approve"
+BULK_REJECT = "reject"
+# Сколько id подставляем в один IN (...): с запасом до лимита переменных SQLite.
+_ID_BATCH = 500
+
+
+@dataclass(slots=True)
+class BulkReviewOutcome:
+    """Итог по одной отправке из пакетного решения."""
+
+    submission_id: int
+    result: str
+    detail: str | None = None
+
+
+def _load_submissions(db: Session, ids: list[int]) -> dict[int, MissionSubmission]:
+    loaded: dict[int, MissionSubmission] = {}
+    for start in range(0, len(ids), _ID_BATCH):
+        query = (
+            select(MissionSubmission)
+            .where(MissionSubmission.id.in_(ids[start : start + _ID_BATCH]))
+            .options(selectinload(MissionSubmission.mission).selectinload(Mission.competency_rewards))
+        )
+        loaded.update((submission.id, submission) for submission in db.scalars(query))
+    return loaded
+
+
+def _load_users(db: Session, user_ids: set[int]) -> dict[int, User]:
+    ordered = sorted(user_ids)
+    users: dict[int, User] = {}
+    for start in range(0, len(ordered), _ID_BATCH):
+        query = (
+            select(User)
+            .where(User.id.in_(ordered[start : start + _ID_BATCH]))
+            .options(
+                selectinload(User.competencies),
+                selectinload(User.artifacts),
+                selectinload(User.submissions),
+            )
+        )
+        users.update((user.id, user) for user in db.scalars(query))
+    return users
+
+
+def _journal_row(user_id: int, title: str, description: str, payload: dict, **deltas: int) -> dict:
+    return {
+        "user_id": user_id,
+        "event_type": JournalEventType.MISSION_COMPLETED,
+        "title": title,
+        "description": description,
+        "payload": payload,
+        "xp_delta": deltas.get("xp_delta", 0),
+        "mana_delta": deltas.get("mana_delta", 0),
+    }
+
+
+def bulk_review_submissions(
+    db: Session,
+    *,
+    reviewer: User,
+    submission_ids: list[int],
+    decision: str,
+    comment: str | None = None,
+) -> tuple[list[BulkReviewOutcome], int]:
+    """Одобряем или отклоняем пачку отправок одной транзакцией.
+
+    Отправки, пилоты, миссии и награды загружаются несколькими запросами на всю
+    пачку, опыт, мана и компетенции начисляются в памяти, журнал пишется одной
+    вставкой, а ранг каждого затронутого пилота пересчитывается один раз.
+    Возвращает итог по каждому id (в порядке запроса) и число повышений ранга.
+    """
+
+    if decision not in (BULK_APPROVE, BULK_REJECT):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неизвестное решение")
+
+    ids = list(dict.fromkeys(submission_ids))
+    submissions = _load_submissions(db, ids)
+    now = _now()
+
+    outcomes: list[BulkReviewOutcome] = []
+    selected: list[MissionSubmission] = []
+    for submission_id in ids:
+        submission = submissions.get(submission_id)
+        if submission is None:
+            outcomes.append(BulkReviewOutcome(submission_id, "not_found", "Отправка не найдена"))
+        elif _held_by_other(submission, reviewer, now):
+            outcomes.append(
+                BulkReviewOutcome(submission_id, "conflict", "Отправку уже проверяет другой сотрудник")
+            )
+        elif submission.status == SubmissionStatus.APPROVED:
+            outcomes.append(BulkReviewOutcome(submission_id, "skipped", "Миссия уже зачтена"))
+        elif decision == BULK_REJECT and submission.status == SubmissionStatus.REJECTED:
+            outcomes.append(BulkReviewOutcome(submission_id, "skipped", "Отправка уже отклонена"))
+        else:
+            selected.append(submission)
+            outcomes.append(
+                BulkReviewOutcome(submission_id, "approved" if decision == BULK_APPROVE else "rejected")
+            )
+
+    journal: list[dict] = []
+    users: dict[int, User] = {}
+    if decision == BULK_APPROVE and selected:
+        users = _load_users(db, {submission.user_id for submission in selected})
+        competencies = {
+            (item.user_id, item.competency_id): item for user in users.values() for item in user.competencies
+        }
+        artifacts = {(item.user_id, item.artifact_id) for user in users.values() for item in user.artifacts}
+        invalidate_competency_frame_on_commit(db)
+
+        for submission in selected:
+            mission = submission.mission
+            user = users[submission.user_id]
+            submission.awarded_xp = mission.xp_reward
+            submission.awarded_mana = mission.mana_reward
+            user.xp += mission.xp_reward
+            user.mana += mission.mana_reward
+
+            for reward in mission.competency_rewards:
+                key = (user.id, reward.competency_id)
+                if key not in competencies:
+                    competencies[key] = UserCompetency(user_id=user.id, competency_id=reward.competency_id, level=0)
+                    user.competencies.append(competencies[key])
+                competencies[key].level += reward.level_delta
+
+            if mission.artifact_id and (user.id, mission.artifact_id) not in artifacts:
+                artifacts.add((user.id, mission.artifact_id))
+                user.artifacts.append(UserArtifact(user_id=user.id, artifact_id=mission.artifact_id))
+                journal.append(
+                    _journal_row(
+                        user.id,
+                        f"Получен артефакт за миссию «{mission.title}»",
+                        "Новый артефакт добавлен в коллекцию.",
+                        {"artifact_id": mission.artifact_id},
+                    )
+                )
+            journal.append(
+                _journal_row(
+                    user.id,
+                    f"Миссия «{mission.title}» подтверждена",
+                    "HR одобрил выполнение миссии.",
+                    {"mission_id": mission.id},
+                    xp_delta=mission.xp_reward,
+                    mana_delta=mission.mana_reward,
+                )
+            )
+    else:
+        for submission in selected:
+            if comment:
+                submission.comment = comment
+            journal.append(
+                _journal_row(
+                    submission.user_id,
+                    f"Миссия «{submission.mission.title}» отклонена",
+                    comment or "Проверьте отчёт и отправьте снова.",
+                    {"mission_id": submission.mission_id},
+                )
+            )
+
+    change_status(
+        db,
+        selected,
+        SubmissionStatus.APPROVED if decision == BULK_APPROVE else SubmissionStatus.REJECTED,
+        actor_id=reviewer.id,
+        now=now,
+    )
+    for submission in selected:
+        submission.review_claimed_by_id = None
+        submission.review_lease_expires_at = None
+    if journal:
+        db.execute(insert(JournalEntry), journal)
+    upgraded = {}
+    if users:
+        record_milestones(db, users, UserMilestoneKind.FIRST_APPROVAL)
+        # Ранги считаем до коммита, пока коллекции пилотов из _load_users ещё загружены.
+        upgraded = apply_rank_upgrades(users.values(), db)
+    db.commit()
+    return outcomes, len(upgraded)
@@ -0,0 +1,161 @@
+"""SLA модерации: история статусов отправок и перцентили времени до решения.
+
+Все смены статуса отправки проходят через :func:`change_status`: он пишет
+переход в ``submission_status_events`` и, если HR принял решение по ожидающей
+отправке, добавляет время ожидания в логарифмические гистограммы
+(:class:`app.utils.sketch.LogHistogram`) — общую, миссии и проверяющего.
+Корзины увеличиваются атомарным ``UPSERT ... count = count + excluded.count``,
+поэтому параллельные решения не теряют друг друга, а отчёт читает только
+корзины (сотни строк), не трогая историю.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.submission_history import ReviewTimeBucket, SubmissionStatusEvent
+from app.models.user import User
+from app.schemas.moderation import ModerationQueueAge, ModerationSlaReport, ReviewTimeStats
+from app.utils.sketch import LogHistogram
+
+SCOPE_ALL = "all"
+SCOPE_MISSION = "mission"
+SCOPE_REVIEWER = "reviewer"
+
+QUANTILES = (0.5, 0.9, 0.99)
+_DECISIONS = (SubmissionStatus.APPROVED, SubmissionStatus.REJECTED)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(moment: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса, хотя пишем мы UTC.
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def change_status(
+    db: Session,
+    submissions: Iterable[MissionSubmission],
+    to_status: SubmissionStatus,
+    *,
+    actor_id: int | None,
+    previous: dict[int, SubmissionStatus | None] | None = None,
+    now: datetime | None = None,
+) -> None:
+    """Переводим отправки в ``to_status`` и фиксируем переходы.
+
+    ``previous`` подменяет исходный статус (например, ``None`` для только что
+    созданной отправки, у которой после ``flush`` уже стоит статус по умолчанию).
+    Время до решения учитывается только для решений проверяющего
+    (``actor_id`` задан): автоматический зачёт не входит в SLA модерации.
+    Коммит остаётся за вызывающим кодом.
+    """
+
+    moment = now or _now()
+    previous = previous or {}
+    events: list[dict] = []
+    histogram = LogHistogram()
+    buckets: Counter[tuple[str, int, int]] = Counter()
+    for submission in submissions:
+        from_status = previous.get(submission.id, submission.status)
+        if from_status == to_status:
+            continue
+        waited = None
+        if (
+            from_status == SubmissionStatus.PENDING
+            and to_status in _DECISIONS
+            and actor_id is not None
+            and submission.status_changed_at is not None
+        ):
+            waited = max((moment - _aware(submission.status_changed_at)).total_seconds(), 0.0)
+            bucket = histogram.bucket(waited)
+            buckets[(SCOPE_ALL, 0, bucket)] += 1
+            buckets[(SCOPE_MISSION, submission.mission_id, bucket)] += 1
+            buckets[(SCOPE_REVIEWER, actor_id, bucket)] += 1
+        events.append(
+            {
+                "submission_id": submission.id,
+                "from_status": from_status,
+                "to_status": to_status,
+                "actor_id": actor_id,
+                "waited_seconds": waited,
+                "occurred_at": moment,
+            }
+        )
+        submission.status = to_status
+        submission.status_changed_at = moment
+
+    if events:
+        db.execute(insert(SubmissionStatusEvent), events)
+    if buckets:
+        statement = sqlite_insert(ReviewTimeBucket)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["scope", "scope_id", "bucket"],
+                set_={"count": ReviewTimeBucket.count + statement.excluded.count},
+            ),
+            [
+                {"scope": scope, "scope_id": scope_id, "bucket": bucket, "count": count}
+                for (scope, scope_id, bucket), count in buckets.items()
+            ],
+        )
+
+
+def _stats(histogram: LogHistogram) -> dict:
+    p50, p90, p99 = histogram.quantiles(QUANTILES)
+    return {"decisions": histogram.count, "p50_seconds": p50, "p90_seconds": p90, "p99_seconds": p99}
+
+
+def load_histograms(db: Session, scope: str, scope_ids: Iterable[int] | None = None) -> dict[int, LogHistogram]:
+    """Гистограммы области ``scope`` по ``scope_id`` (все или только из ``scope_ids``)."""
+
+    query = select(ReviewTimeBucket.scope_id, ReviewTimeBucket.bucket, ReviewTimeBucket.count).where(
+        ReviewTimeBucket.scope == scope
+    )
+    if scope_ids is not None:
+        query = query.where(ReviewTimeBucket.scope_id.in_(list(scope_ids)))
+    histograms: dict[int, LogHistogram] = {}
+    for scope_id, bucket, count in db.execute(query):
+        histograms.setdefault(scope_id, LogHistogram()).counts[bucket] = count
+    return histograms
+
+
+def moderation_sla_report(db: Session, *, now: datetime | None = None) -> ModerationSlaReport:
+    """Перцентили времени до решения (всего, по миссиям, по проверяющим) и возраст очереди."""
+
+    moment = now or _now()
+    overall = load_histograms(db, SCOPE_ALL).get(0, LogHistogram())
+    by_mission = load_histograms(db, SCOPE_MISSION)
+    by_reviewer = load_histograms(db, SCOPE_REVIEWER)
+    mission_titles = dict(db.execute(select(Mission.id, Mission.title).where(Mission.id.in_(list(by_mission)))).all())
+    reviewer_names = dict(db.execute(select(User.id, User.full_name).where(User.id.in_(list(by_reviewer)))).all())
+
+    pending, oldest = db.execute(
+        select(func.count(), func.min(MissionSubmission.status_changed_at)).where(
+            MissionSubmission.status == SubmissionStatus.PENDING
+        )
+    ).one()
+    oldest_seconds = max((moment - _aware(oldest)).total_seconds(), 0.0) if oldest else None
+
+    return ModerationSlaReport(
+        overall=ReviewTimeStats(**_stats(overall)),
+        by_mission=[
+            ReviewTimeStats(scope_id=mission_id, title=mission_titles.get(mission_id), **_stats(histogram))
+            for mission_id, histogram in sorted(by_mission.items())
+        ],
+        by_reviewer=[
+            ReviewTimeStats(scope_id=reviewer_id, title=reviewer_names.get(reviewer_id), **_stats(histogram))
+            for reviewer_id, histogram in sorted(by_reviewer.items())
+        ],
+        queue=ModerationQueueAge(pending=pending, oldest_pending_seconds=oldest_seconds),
+        computed_at=moment,
+    )
@@ -4,8 +4,10 @@ from __future__ import annotations
 
 from sqlalchemy.orm import Session
 
+from app.models.milestone import UserMilestoneKind
 from app.models.onboarding import OnboardingSlide, OnboardingState
 from app.models.user import User
+from app.services.milestones import record_milestone
 
 
 def _ensure_state(db: Session, user: User) -> OnboardingState:
@@ -54,6 +56,8 @@ def complete_slide(db: Session, user: User, order: int) -> OnboardingState:
 
     state.last_completed_order = order
     state.is_completed = order == allowed_orders[-1]
+    if state.is_completed:
+        record_milestone(db, user.id, UserMilestoneKind.ONBOARDING_COMPLETED)
     db.add(state)
     db.commit()
     db.refresh(state)
@@ -0,0 +1,58 @@
+"""Число участников и отправок по миссиям.
+
+Считаем одним сгруппированным запросом по ``mission_submissions`` вместо
+загрузки всех отправок миссии. Участником считается любая неотклонённая
+отправка — так же, как при проверке вместимости офлайн-мероприятий.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.mission import MissionSubmission, SubmissionStatus
+
+
+@dataclass(slots=True)
+class MissionParticipation:
+    """Отправки одной миссии по статусам."""
+
+    pending: int = 0
+    approved: int = 0
+    rejected: int = 0
+
+    @property
+    def registered_participants(self) -> int:
+        return self.pending + self.approved
+
+
+def participation_by_mission(
+    db: Session, mission_ids: Iterable[int] | None = None
+) -> dict[int, MissionParticipation]:
+    """Статистика по миссиям из ``mission_ids`` (или по всем); миссий без отправок в ответе нет."""
+
+    query = select(
+        MissionSubmission.mission_id, MissionSubmission.status, func.count(MissionSubmission.id)
+    ).group_by(MissionSubmission.mission_id, MissionSubmission.status)
+    if mission_ids is not None:
+        query = query.where(MissionSubmission.mission_id.in_(list(mission_ids)))
+
+    stats: dict[int, MissionParticipation] = {}
+    for mission_id, submission_status, count in db.execute(query):
+        entry = stats.setdefault(mission_id, MissionParticipation())
+        if submission_status == SubmissionStatus.PENDING:
+            entry.pending = count
+        elif submission_status == SubmissionStatus.APPROVED:
+            entry.approved = count
+        else:
+            entry.rejected = count
+    return stats
+
+
+def mission_participation(db: Session, mission_id: int) -> MissionParticipation:
+    """Статистика одной миссии."""
+
+    return participation_by_mission(db, [mission_id]).get(mission_id, MissionParticipation())
@@ -2,8 +2,6 @@
 
 from __future__ import annotations
 
-import subprocess
-import sys
 from datetime import datetime
 from textwrap import dedent
 from typing import Optional
@@ -11,11 +9,15 @@ from typing import Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.models.challenge_stats import ChallengeKind
 from app.models.mission import Mission, MissionSubmission
 from app.models.python import PythonChallenge, PythonSubmission, PythonUserProgress
 from app.models.user import User
 from app.schemas.python import PythonMissionState, PythonChallengeRead, PythonSubmissionRead
+from app.services.challenge_stats import record_attempt_stats
 from app.services.mission import submit_mission
+from app.utils.python_runner import precheck_user_code, run_user_python_code
+from app.utils.runner_client import RunnerUnavailableError
 
 EVAL_TIMEOUT_SECONDS = 3
 
@@ -116,26 +118,37 @@ def submit_code(db: Session, user: User, mission: Mission, challenge_id: int, co
         )
 
     prepared_code = dedent(code)
+    expected = _normalize_stdout(challenge.expected_output)
 
-    try:
-        completed = subprocess.run(
-            [sys.executable, "-c", prepared_code],
-            input=(challenge.input_data or ""),
-            capture_output=True,
-            text=True,
-            timeout=EVAL_TIMEOUT_SECONDS,
-        )
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Время выполнения превышено")
-
-    stdout = completed.stdout or ""
-    stderr = completed.stderr or ""
+    run_result = precheck_user_code(prepared_code)
+    if run_result is None:
+        try:
+            run_result = run_user_python_code(
+                prepared_code,
+                timeout=EVAL_TIMEOUT_SECONDS,
+                stdin=challenge.input_data or "",
+            )
+        except RunnerUnavailableError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+                headers={"Retry-After": str(exc.retry_after)},
+            ) from exc
+        if run_result.timeout:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Время выполнения превышено")
+
+    stdout = run_result.stdout or ""
+    stderr = run_result.stderr or ""
 
-    expected = _normalize_stdout(challenge.expected_output)
     actual = _normalize_stdout(stdout)
 
-    is_passed = completed.returncode == 0 and actual == expected
+    is_passed = run_result.exit_code == 0 and actual == expected
 
+    previous_attempts = (
+        db.query(PythonSubmission)
+        .filter(PythonSubmission.progress_id == progress.id, PythonSubmission.challenge_id == challenge.id)
+        .count()
+    )
     submission = PythonSubmission(
         progress_id=progress.id,
         challenge_id=challenge.id,
@@ -145,6 +158,17 @@ def submit_code(db: Session, user: User, mission: Mission, challenge_id: int, co
         is_passed=is_passed,
     )
     db.add(submission)
+    # После решения задание закрывается (порядок сдвигается), поэтому успешная попытка всегда первая.
+    record_attempt_stats(
+        db,
+        kind=ChallengeKind.PYTHON,
+        challenge_id=challenge.id,
+        is_passed=is_passed,
+        exit_code=run_result.exit_code,
+        stderr=stderr,
+        previous_attempts=previous_attempts,
+        first_pass=is_passed,
+    )
 
     if is_passed:
         progress.current_order = challenge.order
@@ -2,13 +2,18 @@
 
 from __future__ import annotations
 
+from typing import Iterable
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session, selectinload
 
-from app.models.journal import JournalEventType
+from app.models.journal import JournalEntry, JournalEventType
+from app.models.milestone import UserMilestoneKind
 from app.models.mission import SubmissionStatus
 from app.models.rank import Rank, RankCompetencyRequirement, RankMissionRequirement
 from app.models.user import User
 from app.services.journal import log_event
+from app.services.milestones import is_second_rank, record_milestone, record_milestones
 from app.schemas.progress import (
     ProgressCompetencyRequirement,
     ProgressMissionRequirement,
@@ -18,10 +23,9 @@ from app.schemas.progress import (
 )
 
 
-def _eligible_rank(user: User, db: Session) -> Rank | None:
-    """Определяем максимальный ранг, который доступен пользователю."""
+def _best_rank(user: User, ranks: list[Rank]) -> Rank | None:
+    """Максимальный ранг из ``ranks`` (по возрастанию опыта), условия которого выполнены."""
 
-    ranks = db.query(Rank).order_by(Rank.required_xp).all()
     approved_missions = {
         submission.mission_id
         for submission in user.submissions
@@ -48,12 +52,15 @@ def _eligible_rank(user: User, db: Session) -> Rank | None:
 def apply_rank_upgrade(user: User, db: Session) -> Rank | None:
     """Пытаемся повысить ранг и фиксируем событие."""
 
-    new_rank = _eligible_rank(user, db)
+    ranks = db.query(Rank).order_by(Rank.required_xp).all()
+    new_rank = _best_rank(user, ranks)
     if not new_rank or user.current_rank_id == new_rank.id:
         return None
 
     previous_rank_id = user.current_rank_id
     user.current_rank_id = new_rank.id
+    if is_second_rank(new_rank, ranks):
+        record_milestone(db, user.id, UserMilestoneKind.SECOND_RANK)
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -69,6 +76,50 @@ def apply_rank_upgrade(user: User, db: Session) -> Rank | None:
     return new_rank
 
 
+def apply_rank_upgrades(users: Iterable[User], db: Session) -> dict[int, Rank]:
+    """Повышаем ранги сразу нескольким пилотам: правила читаем один раз, журнал пишем пачкой.
+
+    Возвращает новые ранги по ``user.id``. Коммит за вызывающим: у пилотов должны
+    быть загружены ``submissions`` и ``competencies`` (коммит до вызова сбросил бы
+    их, и каждый пилот догружался бы отдельными запросами).
+    """
+
+    ranks = (
+        db.query(Rank)
+        .options(selectinload(Rank.mission_requirements), selectinload(Rank.competency_requirements))
+        .order_by(Rank.required_xp)
+        .all()
+    )
+    upgraded: dict[int, Rank] = {}
+    entries: list[dict] = []
+    for user in users:
+        new_rank = _best_rank(user, ranks)
+        if not new_rank or user.current_rank_id == new_rank.id:
+            continue
+        entries.append(
+            {
+                "user_id": user.id,
+                "event_type": JournalEventType.RANK_UP,
+                "title": "Повышение ранга",
+                "description": f"Пилот достиг ранга «{new_rank.title}».",
+                "payload": {"previous_rank_id": user.current_rank_id, "new_rank_id": new_rank.id},
+                "xp_delta": 0,
+                "mana_delta": 0,
+            }
+        )
+        user.current_rank_id = new_rank.id
+        upgraded[user.id] = new_rank
+
+    if entries:
+        db.execute(insert(JournalEntry), entries)
+    record_milestones(
+        db,
+        [user_id for user_id, rank in upgraded.items() if is_second_rank(rank, ranks)],
+        UserMilestoneKind.SECOND_RANK,
+    )
+    return upgraded
+
+
 def build_progress_snapshot(user: User, db: Session) -> ProgressSnapshot:
     """Собираем агрегированное представление прогресса пользователя."""
 
@@ -0,0 +1,323 @@
+"""Массовая перепроверка попыток после правки эталонного ответа задания."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.challenge_stats import ChallengeKind
+from app.models.coding import CodingAttempt, CodingChallenge
+from app.models.mission import Mission
+from app.models.python import PythonChallenge, PythonSubmission, PythonUserProgress
+from app.models.regrade import RegradeJob, RegradeJobStatus, RegradeTarget
+from app.models.user import User
+from app.services.challenge_stats import rebuild_challenge_stats
+from app.services.coding import _finalize_mission_if_needed, _normalize_output, rebuild_coding_progress
+from app.services.python_mission import (
+    EVAL_TIMEOUT_SECONDS,
+    _normalize_stdout,
+    ensure_mission_completed,
+)
+from app.services.similarity import drop_signatures, index_attempt
+from app.core.config import settings
+from app.utils.python_runner import DEFAULT_TIMEOUT_SECONDS, precheck_user_code, run_user_python_code
+from app.utils.runner_client import RunnerUnavailableError, get_runner_pool
+
+BATCH_SIZE = 200
+MAX_WORKERS = 4
+# Паузы между повторами, когда воркеры заняты или недоступны; после последней
+# ошибка роняет задачу, и её можно продолжить с контрольной точки.
+RETRY_DELAYS = (1.0, 2.0, 4.0, 8.0, 16.0)
+
+ProgressCallback = Callable[[RegradeJob], None]
+
+
+def _code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def _run_with_backoff(code: str, *, timeout: float, stdin: str | None):
+    for delay in (*RETRY_DELAYS, None):
+        try:
+            return run_user_python_code(code, timeout=timeout, stdin=stdin)
+        except RunnerUnavailableError:
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+def _worker_count(requested: int) -> int:
+    """Перепроверка занимает не больше половины слотов воркеров: остальные — живым запускам пилотов."""
+
+    if not settings.runner_endpoints:
+        return requested
+    pool = get_runner_pool()
+    capacity = pool.capacity()
+    if capacity is None:
+        pool.check_health()
+        capacity = pool.capacity()
+    return requested if capacity is None else max(1, min(requested, capacity // 2))
+
+
+def _grade(code: str, *, expected: str, stdin: str | None, timeout: float, normalize) -> bool:
+    """Запускаем программу и сравниваем вывод с эталоном."""
+
+    result = precheck_user_code(code)
+    if result is None:
+        result = _run_with_backoff(code, timeout=timeout, stdin=stdin)
+    return result.exit_code == 0 and not result.timeout and normalize(result.stdout) == expected
+
+
+def create_regrade_job(db: Session, *, target: RegradeTarget, challenge_id: int) -> RegradeJob:
+    """Регистрируем задачу перепроверки и считаем объём работы."""
+
+    if target == RegradeTarget.CODING:
+        total = db.scalar(
+            select(func.count(CodingAttempt.id)).where(CodingAttempt.challenge_id == challenge_id)
+        )
+    else:
+        total = db.scalar(
+            select(func.count(PythonSubmission.id)).where(PythonSubmission.challenge_id == challenge_id)
+        )
+
+    job = RegradeJob(target=target, challenge_id=challenge_id, total_attempts=total or 0, newly_passed_ids=[])
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _grading_setup(db: Session, job: RegradeJob):
+    """Возвращаем модель попыток, параметры запуска и нормализацию вывода."""
+
+    if job.target == RegradeTarget.CODING:
+        challenge = db.get(CodingChallenge, job.challenge_id)
+        if not challenge:
+            raise ValueError("Задание не найдено")
+        return (
+            CodingAttempt,
+            CodingAttempt.user_id,
+            dict(
+                expected=_normalize_output(challenge.expected_output),
+                stdin=None,
+                timeout=DEFAULT_TIMEOUT_SECONDS,
+                normalize=_normalize_output,
+            ),
+        )
+
+    challenge = db.get(PythonChallenge, job.challenge_id)
+    if not challenge:
+        raise ValueError("Задание не найдено")
+    return (
+        PythonSubmission,
+        PythonSubmission.progress_id,
+        dict(
+            expected=_normalize_stdout(challenge.expected_output),
+            stdin=challenge.input_data or "",
+            timeout=EVAL_TIMEOUT_SECONDS,
+            normalize=_normalize_stdout,
+        ),
+    )
+
+
+def run_regrade_job(
+    db: Session,
+    job: RegradeJob,
+    *,
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = MAX_WORKERS,
+    on_progress: ProgressCallback | None = None,
+) -> RegradeJob:
+    """Перепроверяем попытки пачками по возрастанию id.
+
+    Одинаковые программы запускаются один раз (дедупликация по sha256), уникальные —
+    параллельно. Каждый запуск и так происходит в отдельном процессе интерпретатора,
+    поэтому пул потоков лишь держит несколько таких процессов одновременно; с
+    воркерами запуска — не больше половины их слотов, а занятость воркеров
+    пережидаем с нарастающей паузой. После
+    каждой пачки фиксируем контрольную точку, так что задачу можно продолжить.
+
+    Ранее засчитанные миссии не отзываются: награды уже выданы, поэтому мы только
+    обновляем флаги ``is_passed`` и засчитываем миссии тем, кто теперь её прошёл.
+    """
+
+    job.status = RegradeJobStatus.RUNNING
+    job.error = None
+    job.started_at = job.started_at or datetime.now(timezone.utc)
+    db.commit()
+
+    verdicts: dict[str, bool] = {}
+    newly_passed: set[int] = set(job.newly_passed_ids or [])
+
+    try:
+        # Задание могли удалить после постановки задачи — это тоже ошибка задачи.
+        model, owner_column, grading = _grading_setup(db, job)
+        with ThreadPoolExecutor(max_workers=_worker_count(max_workers)) as pool:
+            while True:
+                rows = db.execute(
+                    select(model.id, model.code, model.is_passed, owner_column)
+                    .where(model.challenge_id == job.challenge_id, model.id > job.last_attempt_id)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+
+                hashes = [_code_hash(row.code) for row in rows]
+                pending = {digest: row.code for digest, row in zip(hashes, rows) if digest not in verdicts}
+                results = pool.map(lambda code: _grade(code, **grading), pending.values())
+                verdicts.update(zip(pending.keys(), results))
+                job.unique_programs += len(pending)
+
+                changes = []
+                changed_owners: set[int] = set()
+                for digest, row in zip(hashes, rows):
+                    verdict = verdicts[digest]
+                    if verdict == row.is_passed:
+                        continue
+                    changes.append({"id": row.id, "is_passed": verdict})
+                    changed_owners.add(row[3])
+                    if verdict:
+                        newly_passed.add(row[3])
+
+                if changes:
+                    db.execute(update(model), changes)
+                    if job.target == RegradeTarget.CODING:
+                        rebuild_coding_progress(db, challenge_id=job.challenge_id, user_ids=changed_owners)
+                        _sync_similarity_index(db, changes)
+
+                job.changed_attempts += len(changes)
+                job.processed_attempts += len(rows)
+                job.last_attempt_id = rows[-1].id
+                job.newly_passed_ids = sorted(newly_passed)
+                db.commit()
+                if on_progress:
+                    on_progress(job)
+
+        if job.target == RegradeTarget.CODING:
+            _complete_coding_missions(db, job.challenge_id, newly_passed)
+        else:
+            _advance_python_progress(db, job.challenge_id, newly_passed)
+        if job.changed_attempts:
+            # Вердикты поменялись задним числом: счётчики задания проще пересчитать по истории.
+            kind = ChallengeKind.CODING if job.target == RegradeTarget.CODING else ChallengeKind.PYTHON
+            rebuild_challenge_stats(db, kind, [job.challenge_id])
+    except Exception as exc:
+        mark_regrade_job_failed(db, job.id, str(exc))
+        raise
+
+    job.status = RegradeJobStatus.COMPLETED
+    job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(job)
+    if on_progress:
+        on_progress(job)
+    return job
+
+
+def mark_regrade_job_failed(db: Session, job_id: int, error: str) -> None:
+    """Откатываем незавершённую пачку и сохраняем ошибку; контрольная точка остаётся прежней."""
+
+    db.rollback()
+    job = db.get(RegradeJob, job_id)
+    if job is None:
+        return
+    job.status = RegradeJobStatus.FAILED
+    job.error = error
+    db.commit()
+
+
+def claim_regrade_job_for_resume(db: Session, job_id: int) -> bool:
+    """Атомарно переводим остановленную задачу в работу; ``False`` — она уже идёт или завершена."""
+
+    claimed = db.execute(
+        update(RegradeJob)
+        .where(
+            RegradeJob.id == job_id,
+            RegradeJob.status.in_([RegradeJobStatus.PENDING, RegradeJobStatus.FAILED]),
+        )
+        .values(status=RegradeJobStatus.RUNNING)
+    ).rowcount
+    db.commit()
+    return bool(claimed)
+
+
+def _sync_similarity_index(db: Session, changes: list[dict]) -> None:
+    """Индекс похожести хранит только успешные попытки — приводим его в соответствие."""
+
+    drop_signatures(db, [change["id"] for change in changes if not change["is_passed"]])
+    passed_ids = [change["id"] for change in changes if change["is_passed"]]
+    if passed_ids:
+        for attempt in db.query(CodingAttempt).filter(CodingAttempt.id.in_(passed_ids)):
+            index_attempt(db, attempt)
+
+
+def _complete_coding_missions(db: Session, challenge_id: int, user_ids: Iterable[int]) -> None:
+    """Засчитываем миссию пилотам, у которых появилось успешное решение."""
+
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    challenge = db.get(CodingChallenge, challenge_id)
+    mission = db.get(Mission, challenge.mission_id) if challenge else None
+    if not mission:
+        return
+
+    challenge_ids = [item.id for item in mission.coding_challenges]
+    for user in db.query(User).filter(User.id.in_(user_ids)).all():
+        _finalize_mission_if_needed(db, mission=mission, user=user, challenge_ids=challenge_ids)
+    db.commit()
+
+
+def _advance_python_progress(db: Session, challenge_id: int, progress_ids: Iterable[int]) -> None:
+    """Сдвигаем прогресс Python-миссии на длину непрерывной цепочки решённых задач."""
+
+    progress_ids = list(progress_ids)
+    if not progress_ids:
+        return
+
+    challenge = db.get(PythonChallenge, challenge_id)
+    if not challenge:
+        return
+    mission = db.get(Mission, challenge.mission_id)
+    orders = (
+        db.execute(
+            select(PythonChallenge.id, PythonChallenge.order)
+            .where(PythonChallenge.mission_id == challenge.mission_id)
+            .order_by(PythonChallenge.order)
+        )
+        .all()
+    )
+
+    for progress in db.query(PythonUserProgress).filter(PythonUserProgress.id.in_(progress_ids)).all():
+        solved = set(
+            db.execute(
+                select(PythonSubmission.challenge_id)
+                .where(PythonSubmission.progress_id == progress.id, PythonSubmission.is_passed.is_(True))
+                .distinct()
+            )
+            .scalars()
+            .all()
+        )
+        current = 0
+        for item_id, order in orders:
+            if item_id not in solved:
+                break
+            current = order
+        if current <= progress.current_order:
+            continue
+
+        progress.current_order = current
+        if current >= len(orders) and progress.completed_at is None:
+            progress.completed_at = datetime.utcnow()
+            user = db.get(User, progress.user_id)
+            if user and mission:
+                ensure_mission_completed(db, user, mission)
+    db.commit()
@@ -0,0 +1,305 @@
+"""Возобновляемая загрузка вложений по частям.
+
+Клиент создаёт сессию с размером файла, отправляет части по порядку с
+указанием смещения и контрольной суммы, а после обрыва спрашивает, сколько
+байт уже принято, и докачивает только остаток. Каждая часть сначала пишется в
+свой временный файл и переносится в ``blobs/.incoming/<id>.part`` только после
+того, как запрос выиграл сдвиг смещения в базе: проигравший или отклонённый
+запрос не трогает уже принятые байты. По завершении файл проверяется так же, как
+обычная загрузка, и переносится в хранилище. Путь из сессии затем передаётся в
+:func:`app.services.mission.submit_mission` вместо multipart-файла.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.upload import UploadSession
+from app.models.user import User
+from app.services.blobs import incoming_dir
+from app.services.storage import (
+    ALLOWED_TYPES,
+    UploadRejectedError,
+    UploadTooLargeError,
+    finalize_staged_upload,
+    max_upload_bytes,
+    register_upload,
+    sniff_mime_type,
+)
+
+UPLOAD_KINDS = ("passport", "photo", "resume")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(moment: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса, хотя пишем мы UTC.
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _expires_at() -> datetime:
+    # Недокачанный файл живёт столько же, сколько временные файлы хранилища.
+    return _now() + timedelta(seconds=settings.blob_grace_seconds)
+
+
+def chunk_max_bytes() -> int:
+    return settings.upload_chunk_max_mb * 1024 * 1024
+
+
+def staging_path(upload: UploadSession) -> Path:
+    return incoming_dir() / f"{upload.id}.part"
+
+
+def create_upload_session(
+    db: Session,
+    *,
+    user: User,
+    kind: str,
+    size: int,
+    filename: str | None = None,
+    sha256: str | None = None,
+) -> UploadSession:
+    """Заводим сессию и пустой файл для частей."""
+
+    if kind not in UPLOAD_KINDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неизвестный вид вложения")
+    limit = max_upload_bytes(kind)
+    if size > limit:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Файл больше {limit // (1024 * 1024)} МБ",
+        )
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        kind=kind,
+        filename=filename,
+        total_size=size,
+        received=0,
+        expected_sha256=sha256.lower() if sha256 else None,
+        expires_at=_expires_at(),
+    )
+    path = staging_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    return upload
+
+
+def get_upload_session(db: Session, *, user: User, upload_id: str) -> UploadSession:
+    """Сессия пилота; чужие и истёкшие сессии не отдаём."""
+
+    upload = db.get(UploadSession, upload_id)
+    if not upload or upload.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Загрузка не найдена")
+    if _aware(upload.expires_at) < _now():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Сессия загрузки истекла")
+    return upload
+
+
+def _offset_conflict(upload: UploadSession, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=detail,
+        headers={"Upload-Offset": str(upload.received)},
+    )
+
+
+def _chunk_path(upload: UploadSession) -> Path:
+    # Уникальное имя: параллельные запросы с одной частью пишут каждый в свой файл.
+    return incoming_dir() / f"{upload.id}.{uuid.uuid4().hex}.chunk"
+
+
+def _copy_chunk(chunk: Path, path: Path, offset: int) -> None:
+    """Переносим часть в файл загрузки с ``offset`` и обрезаем хвост прошлых неудачных записей."""
+
+    with chunk.open("rb") as source, path.open("r+b") as target:
+        target.seek(offset)
+        while data := source.read(1024 * 1024):
+            target.write(data)
+        target.truncate()
+        target.flush()
+        os.fsync(target.fileno())
+
+
+def _accept_chunk(db: Session, upload: UploadSession, *, chunk: Path, offset: int, size: int) -> bool:
+    """Сдвигаем смещение и переносим часть в файл загрузки одной транзакцией.
+
+    Сравнение с прежним смещением выбирает одного победителя среди одновременных
+    запросов с одной частью; до коммита SQLite держит блокировку записи, поэтому
+    переносить часть может только он. Вызывается целиком в пуле потоков: между
+    ``UPDATE`` и коммитом нет ``await``, и запросы в цикле событий не ждут
+    блокировку, которую держит приостановленная корутина.
+    """
+
+    result = db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload.id, UploadSession.received == offset)
+        .values(received=offset + size, expires_at=_expires_at())
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        return False
+    try:
+        _copy_chunk(chunk, staging_path(upload), offset)
+    except BaseException:
+        db.rollback()
+        raise
+    db.commit()
+    return True
+
+
+async def append_chunk(
+    db: Session,
+    upload: UploadSession,
+    *,
+    offset: int,
+    body: AsyncIterator[bytes],
+    checksum: str | None,
+) -> UploadSession:
+    """Дописываем часть, начиная с ``offset``, и сдвигаем счётчик принятых байт.
+
+    Смещение должно совпадать с ``received``: повтор уже принятой части или
+    пропуск отвечают 409 с актуальным смещением в заголовке ``Upload-Offset``.
+    При несовпадении контрольной суммы часть откатывается.
+    """
+
+    if upload.relative_path:
+        raise _offset_conflict(upload, "Загрузка уже завершена")
+    if offset != upload.received:
+        raise _offset_conflict(upload, f"Ожидается часть со смещения {upload.received}")
+
+    path = staging_path(upload)
+    if not path.exists():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Сессия загрузки истекла")
+
+    limit = min(chunk_max_bytes(), upload.total_size - offset)
+    digest = hashlib.sha256()
+    received = 0
+    chunk = _chunk_path(upload)
+    try:
+        handle = await run_in_threadpool(chunk.open, "wb")
+        try:
+            async for piece in body:
+                if not piece:
+                    continue
+                if received + len(piece) > limit:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Часть больше допустимого размера или выходит за конец файла",
+                    )
+                digest.update(piece)
+                await run_in_threadpool(handle.write, piece)
+                received += len(piece)
+        finally:
+            await run_in_threadpool(handle.close)
+
+        # Тип проверяем по первой части, чтобы не докачивать заведомо неподходящий файл.
+        allowed = ALLOWED_TYPES.get(upload.kind)
+        if offset == 0 and received > 0 and allowed is not None:
+            with chunk.open("rb") as source:
+                if sniff_mime_type(source.read(16)) not in allowed:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST, detail="Недопустимый тип файла"
+                    )
+
+        if checksum and not hmac.compare_digest(digest.hexdigest(), checksum.strip().lower()):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Контрольная сумма части не совпала"
+            )
+
+        accepted = await run_in_threadpool(
+            _accept_chunk, db, upload, chunk=chunk, offset=offset, size=received
+        )
+        if not accepted:
+            db.refresh(upload)
+            raise _offset_conflict(upload, "Часть уже принята другим запросом")
+    finally:
+        chunk.unlink(missing_ok=True)
+
+    db.refresh(upload)
+    return upload
+
+
+async def complete_upload(db: Session, upload: UploadSession) -> UploadSession:
+    """Проверяем собранный файл и переносим его в хранилище (повторный вызов безопасен)."""
+
+    if upload.relative_path:
+        return upload
+    if upload.received != upload.total_size:
+        raise _offset_conflict(upload, f"Получено {upload.received} из {upload.total_size} байт")
+
+    path = staging_path(upload)
+    extension = Path(upload.filename or "").suffix[:16] or None
+    try:
+        stored = await run_in_threadpool(finalize_staged_upload, path, kind=upload.kind, extension=extension)
+    except FileNotFoundError as error:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Сессия загрузки истекла") from error
+    except UploadTooLargeError as error:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(error)) from error
+    except UploadRejectedError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)) from error
+
+    if upload.expected_sha256 and stored.sha256 != upload.expected_sha256:
+        # Файл уже в хранилище, но без ссылок его уберёт обычная очистка.
+        db.delete(upload)
+        db.commit()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Контрольная сумма файла не совпала")
+
+    upload.relative_path = register_upload(db, stored)
+    upload.expires_at = _expires_at()
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    return upload
+
+
+def consume_upload(db: Session, *, user: User, upload_id: str, kind: str) -> str:
+    """Забираем путь завершённой загрузки для отправки; сессия удаляется вместе с её коммитом."""
+
+    upload = get_upload_session(db, user=user, upload_id=upload_id)
+    if upload.kind != kind:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Загрузка предназначена для другого поля"
+        )
+    if not upload.relative_path:
+        raise _offset_conflict(upload, "Загрузка ещё не завершена")
+    relative_path = upload.relative_path
+    db.delete(upload)
+    return relative_path
+
+
+def cancel_upload(db: Session, upload: UploadSession) -> None:
+    """Отменяем загрузку и удаляем принятые части."""
+
+    staging_path(upload).unlink(missing_ok=True)
+    db.delete(upload)
+    db.commit()
+
+
+def expire_upload_sessions(db: Session) -> int:
+    """Удаляем истёкшие сессии и их недокачанные файлы."""
+
+    expired = db.query(UploadSession).filter(UploadSession.expires_at < _now()).all()
+    for upload in expired:
+        staging_path(upload).unlink(missing_ok=True)
+        db.delete(upload)
+    db.commit()
+    return len(expired)
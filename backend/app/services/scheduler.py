@@ -0,0 +1,128 @@
+"""Простой планировщик периодических задач внутри процесса API.
+
+Планировщик запущен в каждом процессе API. Задачи, которые нельзя выполнять
+параллельно (``exclusive``), перед запуском берут аренду в таблице
+``job_leases``: за интервал задачу выполняет только один процесс.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.job_lease import JobLease
+
+logger = logging.getLogger(__name__)
+
+JobFunction = Callable[[Session], object]
+
+LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_job_lease(db: Session, name: str, *, ttl: float, now: datetime | None = None) -> bool:
+    """Берём аренду задачи на ``ttl`` секунд, если её никто не держит; коммитим сразу."""
+
+    moment = now or datetime.now(timezone.utc)
+    statement = sqlite_insert(JobLease).values(
+        name=name, holder=LEASE_HOLDER, expires_at=moment + timedelta(seconds=ttl)
+    )
+    result = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"holder": statement.excluded.holder, "expires_at": statement.excluded.expires_at},
+            where=JobLease.expires_at <= moment,
+        )
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def release_job_lease(db: Session, name: str) -> None:
+    """Отдаём аренду досрочно, например после ошибки, чтобы задачу повторил любой процесс."""
+
+    db.execute(
+        update(JobLease)
+        .where(JobLease.name == name, JobLease.holder == LEASE_HOLDER)
+        .values(expires_at=datetime.now(timezone.utc))
+    )
+    db.commit()
+
+
+@dataclass(slots=True)
+class PeriodicJob:
+    """Задача, которую запускаем раз в ``interval`` секунд с отдельной сессией БД."""
+
+    name: str
+    interval: float
+    func: JobFunction
+    exclusive: bool = False
+
+
+class Scheduler:
+    """Один фоновый поток на задачу; остановка — через общее событие."""
+
+    def __init__(self) -> None:
+        self._jobs: list[PeriodicJob] = []
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def add_job(self, name: str, interval: float, func: JobFunction, *, exclusive: bool = False) -> None:
+        """Регистрируем задачу; интервал ``<= 0`` отключает её."""
+
+        if interval > 0:
+            self._jobs.append(PeriodicJob(name=name, interval=interval, func=func, exclusive=exclusive))
+
+    def run_job(self, job: PeriodicJob) -> None:
+        """Выполняем задачу один раз; ошибки пишем в лог и не роняем поток."""
+
+        session = SessionLocal()
+        leased = False
+        try:
+            if job.exclusive:
+                leased = acquire_job_lease(session, job.name, ttl=job.interval)
+                if not leased:
+                    logger.debug("Задачу %s уже выполняет другой процесс", job.name)
+                    return
+            job.func(session)
+        except Exception:  # noqa: BLE001 - следующая итерация попробует снова
+            logger.exception("Периодическая задача %s завершилась с ошибкой", job.name)
+            session.rollback()
+            if leased:
+                try:
+                    release_job_lease(session, job.name)
+                except Exception:  # noqa: BLE001 - аренда истечёт сама
+                    logger.exception("Не удалось снять аренду задачи %s", job.name)
+        finally:
+            session.close()
+
+    def _loop(self, job: PeriodicJob) -> None:
+        while not self._stop.wait(job.interval):
+            self.run_job(job)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for job in self._jobs:
+            thread = threading.Thread(target=self._loop, args=(job,), name=f"job-{job.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+
+scheduler = Scheduler()
@@ -0,0 +1,364 @@
+"""Поиск похожих решений кодовых заданий (MinHash + LSH).
+
+Решение превращается в поток нормализованных токенов: имена переменных,
+строки и числа заменяются заглушками, комментарии и пустые строки выбрасываются.
+Из окон по ``SHINGLE_SIZE`` токенов строим MinHash-подпись, а подпись режем на
+``BANDS`` полос — попытки с совпавшей полосой попадают в одну корзину LSH. Поиск
+кандидатов сводится к индексному запросу по корзинам, а точная оценка сходства
+считается только для них, без попарного сравнения всей истории.
+"""
+
+from __future__ import annotations
+
+import builtins
+import hashlib
+import io
+import keyword
+import random
+import re
+import tokenize
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import and_, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.coding import CodingAttempt
+from app.models.similarity import CodingAttemptLshBucket, CodingAttemptSignature
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+DEFAULT_THRESHOLD = 0.8
+# Короткие программы у всех выглядят одинаково, поэтому в кластеры их не берём.
+MIN_TOKENS = 20
+BACKFILL_BATCH_SIZE = 500
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 61) - 1
+_random = random.Random(20241020)
+_PERMUTATIONS = [
+    (_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+_BUILTINS = frozenset(dir(builtins))
+_FALLBACK_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+@dataclass(slots=True)
+class SimilarAttempt:
+    """Кандидат в дубликаты с оценкой сходства Жаккара."""
+
+    attempt_id: int
+    user_id: int
+    similarity: float
+
+
+@dataclass(slots=True)
+class SimilarityCluster:
+    """Группа похожих решений разных пилотов."""
+
+    attempt_ids: list[int]
+    user_ids: list[int]
+    max_similarity: float
+
+
+def normalize_tokens(code: str) -> list[str]:
+    """Разбиваем код на токены, устойчивые к переименованию и комментариям."""
+
+    tokens: list[str] = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            kind, text = token.type, token.string
+            if kind in (tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER):
+                continue
+            if kind == tokenize.NAME:
+                tokens.append(text if keyword.iskeyword(text) or text in _BUILTINS else "ID")
+            elif kind == tokenize.NUMBER:
+                tokens.append("NUM")
+            elif kind == tokenize.STRING:
+                tokens.append("STR")
+            elif kind == tokenize.NEWLINE:
+                tokens.append("NL")
+            elif kind == tokenize.INDENT:
+                tokens.append("INDENT")
+            elif kind == tokenize.DEDENT:
+                tokens.append("DEDENT")
+            else:
+                tokens.append(text)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Незавершённый код всё равно сравниваем, пусть и грубее.
+        return _FALLBACK_TOKEN.findall(code)
+    return tokens
+
+
+def _shingle_hashes(tokens: list[str]) -> set[int]:
+    if len(tokens) < SHINGLE_SIZE:
+        windows = [tokens] if tokens else []
+    else:
+        windows = [tokens[index : index + SHINGLE_SIZE] for index in range(len(tokens) - SHINGLE_SIZE + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b("\x1f".join(window).encode("utf-8"), digest_size=8).digest(), "big")
+        for window in windows
+    }
+
+
+def compute_minhash(tokens: list[str]) -> list[int]:
+    """MinHash-подпись множества шинглов."""
+
+    shingles = _shingle_hashes(tokens)
+    if not shingles:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [min((a * value + b) % _PRIME for value in shingles) for a, b in _PERMUTATIONS]
+
+
+def band_buckets(signature: list[int]) -> list[str]:
+    """Ключи корзин LSH для каждой полосы подписи."""
+
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        payload = ",".join(str(value) for value in rows).encode("ascii")
+        buckets.append(hashlib.blake2b(payload, digest_size=8).hexdigest())
+    return buckets
+
+
+def estimate_similarity(left: list[int], right: list[int]) -> float:
+    """Доля совпавших позиций подписи — оценка коэффициента Жаккара."""
+
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERMUTATIONS
+
+
+def _signature_rows(attempt: CodingAttempt) -> tuple[CodingAttemptSignature, list[dict]]:
+    tokens = normalize_tokens(attempt.code)
+    signature = compute_minhash(tokens)
+    record = CodingAttemptSignature(
+        attempt_id=attempt.id,
+        challenge_id=attempt.challenge_id,
+        user_id=attempt.user_id,
+        token_count=len(tokens),
+        minhash=signature,
+    )
+    buckets = [
+        {
+            "attempt_id": attempt.id,
+            "challenge_id": attempt.challenge_id,
+            "user_id": attempt.user_id,
+            "band": band,
+            "bucket": bucket,
+        }
+        for band, bucket in enumerate(band_buckets(signature))
+    ]
+    return record, buckets
+
+
+def index_attempt(db: Session, attempt: CodingAttempt) -> bool:
+    """Добавляем успешную попытку в индекс; повторный вызов ничего не делает."""
+
+    if not attempt.is_passed or db.get(CodingAttemptSignature, attempt.id):
+        return False
+
+    record, buckets = _signature_rows(attempt)
+    db.add(record)
+    db.execute(CodingAttemptLshBucket.__table__.insert(), buckets)
+    return True
+
+
+def backfill_signatures(db: Session, *, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Строим индекс по истории пачками; можно прерывать и запускать повторно.
+
+    Берём успешные попытки без подписи по возрастанию ``id`` и фиксируем каждую
+    пачку отдельной транзакцией. Возвращаем число проиндексированных попыток.
+    """
+
+    indexed = 0
+    last_id = 0
+    while True:
+        attempts = (
+            db.query(CodingAttempt)
+            .outerjoin(CodingAttemptSignature, CodingAttemptSignature.attempt_id == CodingAttempt.id)
+            .filter(
+                CodingAttempt.is_passed.is_(True),
+                CodingAttempt.id > last_id,
+                CodingAttemptSignature.attempt_id.is_(None),
+            )
+            .order_by(CodingAttempt.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not attempts:
+            return indexed
+
+        records, buckets = [], []
+        for attempt in attempts:
+            record, attempt_buckets = _signature_rows(attempt)
+            records.append(record)
+            buckets.extend(attempt_buckets)
+        db.add_all(records)
+        db.execute(CodingAttemptLshBucket.__table__.insert(), buckets)
+        db.commit()
+
+        indexed += len(attempts)
+        last_id = attempts[-1].id
+
+
+def find_similar_attempts(
+    db: Session,
+    *,
+    attempt_id: int,
+    threshold: float = DEFAULT_THRESHOLD,
+    limit: int = 20,
+) -> list[SimilarAttempt]:
+    """Похожие решения того же задания от других пилотов."""
+
+    source = db.get(CodingAttemptSignature, attempt_id)
+    if not source:
+        return []
+
+    keys = db.execute(
+        select(CodingAttemptLshBucket.band, CodingAttemptLshBucket.bucket).where(
+            CodingAttemptLshBucket.attempt_id == attempt_id
+        )
+    ).all()
+    candidate_ids = (
+        db.execute(
+            select(CodingAttemptLshBucket.attempt_id)
+            .where(
+                CodingAttemptLshBucket.challenge_id == source.challenge_id,
+                tuple_(CodingAttemptLshBucket.band, CodingAttemptLshBucket.bucket).in_(keys),
+                CodingAttemptLshBucket.user_id != source.user_id,
+            )
+            .distinct()
+        )
+        .scalars()
+        .all()
+    )
+    if not candidate_ids:
+        return []
+
+    matches = []
+    for candidate in db.query(CodingAttemptSignature).filter(
+        CodingAttemptSignature.attempt_id.in_(candidate_ids)
+    ):
+        similarity = estimate_similarity(source.minhash, candidate.minhash)
+        if similarity >= threshold:
+            matches.append(SimilarAttempt(candidate.attempt_id, candidate.user_id, similarity))
+
+    matches.sort(key=lambda item: (-item.similarity, item.attempt_id))
+    return matches[:limit]
+
+
+def find_suspicious_clusters(
+    db: Session,
+    *,
+    challenge_id: int,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_tokens: int = MIN_TOKENS,
+) -> list[SimilarityCluster]:
+    """Группируем похожие решения задания, в которых участвуют разные пилоты.
+
+    Кандидатов дают только корзины, где встретились хотя бы два пилота. Внутри
+    корзины сравниваем каждого участника с первым (линейно, а не попарно) и
+    склеиваем совпадения через систему непересекающихся множеств.
+    """
+
+    shared = (
+        select(CodingAttemptLshBucket.band, CodingAttemptLshBucket.bucket)
+        .where(CodingAttemptLshBucket.challenge_id == challenge_id)
+        .group_by(CodingAttemptLshBucket.band, CodingAttemptLshBucket.bucket)
+        .having(func.count(func.distinct(CodingAttemptLshBucket.user_id)) > 1)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            CodingAttemptLshBucket.band,
+            CodingAttemptLshBucket.bucket,
+            CodingAttemptLshBucket.attempt_id,
+        )
+        .join(
+            shared,
+            and_(
+                shared.c.band == CodingAttemptLshBucket.band,
+                shared.c.bucket == CodingAttemptLshBucket.bucket,
+            ),
+        )
+        .where(CodingAttemptLshBucket.challenge_id == challenge_id)
+        .order_by(CodingAttemptLshBucket.attempt_id)
+    ).all()
+
+    buckets: dict[tuple[int, str], list[int]] = defaultdict(list)
+    for band, bucket, attempt_id in rows:
+        buckets[(band, bucket)].append(attempt_id)
+    if not buckets:
+        return []
+
+    candidate_ids = {attempt_id for members in buckets.values() for attempt_id in members}
+    signatures = {
+        signature.attempt_id: signature
+        for signature in db.query(CodingAttemptSignature)
+        .join(CodingAttempt, CodingAttempt.id == CodingAttemptSignature.attempt_id)
+        .filter(
+            CodingAttemptSignature.attempt_id.in_(candidate_ids),
+            CodingAttemptSignature.token_count >= min_tokens,
+            CodingAttempt.is_passed.is_(True),
+        )
+    }
+
+    parent = {attempt_id: attempt_id for attempt_id in signatures}
+    best = dict.fromkeys(signatures, 0.0)
+
+    def _find(item: int) -> int:
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for members in buckets.values():
+        members = [attempt_id for attempt_id in members if attempt_id in signatures]
+        if len(members) < 2:
+            continue
+        anchor = signatures[members[0]]
+        for attempt_id in members[1:]:
+            other = signatures[attempt_id]
+            if other.user_id == anchor.user_id:
+                continue
+            similarity = estimate_similarity(anchor.minhash, other.minhash)
+            if similarity < threshold:
+                continue
+            best[anchor.attempt_id] = max(best[anchor.attempt_id], similarity)
+            best[attempt_id] = max(best[attempt_id], similarity)
+            parent[_find(attempt_id)] = _find(anchor.attempt_id)
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    for attempt_id in signatures:
+        groups[_find(attempt_id)].append(attempt_id)
+
+    clusters = []
+    for members in groups.values():
+        user_ids = sorted({signatures[attempt_id].user_id for attempt_id in members})
+        if len(user_ids) < 2:
+            continue
+        clusters.append(
+            SimilarityCluster(
+                attempt_ids=sorted(members),
+                user_ids=user_ids,
+                max_similarity=max(best[attempt_id] for attempt_id in members),
+            )
+        )
+    clusters.sort(key=lambda cluster: (-len(cluster.user_ids), -cluster.max_similarity))
+    return clusters
+
+
+def drop_signatures(db: Session, attempt_ids: Iterable[int]) -> None:
+    """Убираем попытки из индекса (например, после перепроверки)."""
+
+    attempt_ids = list(attempt_ids)
+    if not attempt_ids:
+        return
+    db.query(CodingAttemptLshBucket).filter(CodingAttemptLshBucket.attempt_id.in_(attempt_ids)).delete(
+        synchronize_session=False
+    )
+    db.query(CodingAttemptSignature).filter(CodingAttemptSignature.attempt_id.in_(attempt_ids)).delete(
+        synchronize_session=False
+    )
@@ -3,17 +3,92 @@
 from __future__ import annotations
 
 import base64
+import hashlib
 import mimetypes
-import shutil
+import os
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
 
-from pathlib import Path
-import mimetypes
-import base64
-
 from fastapi import UploadFile
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.services.blobs import (
+    OWNER_SUBMISSION,
+    OWNER_USER,
+    blob_relative_path,
+    detach_blob,
+    incoming_dir,
+    is_blob_path,
+    register_blob,
+)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+IMAGE_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+
+# Какие типы (по содержимому, а не по заголовку клиента) допустимы для вложения.
+# Для резюме ограничений нет: текстовые форматы не имеют сигнатуры.
+ALLOWED_TYPES: dict[str, set[str]] = {
+    "passport": {*IMAGE_TYPES, "application/pdf"},
+    "photo": set(IMAGE_TYPES),
+    "profile_photo": set(IMAGE_TYPES),
+}
+
+# Сигнатуры первых байтов файла.
+_MAGIC_NUMBERS: tuple[tuple[bytes, str], ...] = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (b"{\\rtf", "application/rtf"),
+)
+
+
+class UploadRejectedError(ValueError):
+    """Файл не подходит по типу содержимого."""
+
+
+class UploadTooLargeError(UploadRejectedError):
+    """Файл превышает допустимый размер."""
+
+
+@dataclass(slots=True)
+class StoredUpload:
+    """Сохранённый файл: путь относительно каталога загрузок и его характеристики."""
+
+    relative_path: str
+    size: int
+    sha256: str
+    mime_type: str | None
+    extension: str | None = None
+
+
+def sniff_mime_type(head: bytes) -> str | None:
+    """Определяем тип файла по сигнатуре первых байтов."""
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in _MAGIC_NUMBERS:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+def max_upload_bytes(kind: str) -> int:
+    """Лимит размера для вида вложения (``passport``, ``photo``, ``resume``...)."""
+
+    megabytes = settings.upload_max_mb.get(kind, settings.upload_max_mb.get("default", 10))
+    return megabytes * 1024 * 1024
 
 
 def _ensure_within_base(path: Path) -> None:
@@ -25,51 +100,184 @@ def _ensure_within_base(path: Path) -> None:
         raise ValueError("Путь выходит за пределы каталога uploads")
 
 
-def save_submission_document(
-    *, upload: UploadFile, user_id: int, mission_id: int, kind: str
-) -> str:
-    """Сохраняем вложение пользователя и возвращаем относительный путь."""
+def _open_temp_file() -> tuple[int, str]:
+    directory = incoming_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    return tempfile.mkstemp(dir=directory, suffix=".part")
 
-    extension = Path(upload.filename or "").suffix or ".bin"
-    sanitized_extension = extension[:16]
 
-    target_dir = settings.uploads_path / f"user_{user_id}" / f"mission_{mission_id}"
-    target_dir.mkdir(parents=True, exist_ok=True)
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
 
-    target_path = target_dir / f"{kind}{sanitized_extension}"
-    with target_path.open("wb") as buffer:
-        upload.file.seek(0)
-        shutil.copyfileobj(upload.file, buffer)
-    upload.file.seek(0)
 
-    relative_path = target_path.relative_to(settings.uploads_path).as_posix()
-    return relative_path
+def _fsync_directory(path: Path) -> None:
+    directory_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
 
 
-def save_profile_photo(*, upload: UploadFile, user_id: int) -> str:
-    """Сохраняем фото профиля кандидата."""
+def _finalize_temp_file(fd: int, temp_path: str, target_path: Path) -> None:
+    """Сбрасываем данные на диск и атомарно переносим файл в хранилище.
+
+    Если такое содержимое уже есть, временный файл удаляем, а существующему
+    обновляем время изменения, чтобы очистка сирот не удалила его до привязки.
+    """
+
+    os.fsync(fd)
+    os.close(fd)
+    if target_path.exists():
+        os.unlink(temp_path)
+        os.utime(target_path)
+        return
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(temp_path, target_path)
+    _fsync_directory(target_path.parent)
+
 
-    allowed_types = {
-        "image/jpeg": ".jpg",
-        "image/png": ".png",
-        "image/webp": ".webp",
-    }
+def _discard_temp_file(fd: int, temp_path: str) -> None:
+    try:
+        os.close(fd)
+    except OSError:
+        pass
+    try:
+        os.unlink(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def stream_upload(
+    upload: UploadFile,
+    *,
+    kind: str,
+    extension: str | None = None,
+) -> StoredUpload:
+    """Потоково копируем ``UploadFile`` во временный файл и переносим его в хранилище.
+
+    Чтение идёт кусками через ``await upload.read``, запись и ``fsync`` — в пуле
+    потоков, так что цикл событий не блокируется. По дороге считаем sha256 и
+    определяем тип по сигнатуре; превышение лимита прерывает копирование сразу.
+    Файл ложится по адресу содержимого (:func:`blob_relative_path`), поэтому
+    повторная загрузка того же файла места на диске не занимает.
+    """
+
+    limit = max_upload_bytes(kind)
+    if upload.size is not None and upload.size > limit:
+        raise UploadTooLargeError(f"Файл больше {limit // (1024 * 1024)} МБ")
+
+    await upload.seek(0)
+    fd, temp_path = await run_in_threadpool(_open_temp_file)
+    digest = hashlib.sha256()
+    size = 0
+    mime_type: str | None = None
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            if size == 0:
+                mime_type = sniff_mime_type(chunk[:16])
+                allowed = ALLOWED_TYPES.get(kind)
+                if allowed is not None and mime_type not in allowed:
+                    raise UploadRejectedError("Недопустимый тип файла")
+            size += len(chunk)
+            if size > limit:
+                raise UploadTooLargeError(f"Файл больше {limit // (1024 * 1024)} МБ")
+            digest.update(chunk)
+            await run_in_threadpool(_write_all, fd, chunk)
+        if size == 0:
+            # Пустой файл не проходит проверку сигнатуры, которая делается на первом куске.
+            raise UploadRejectedError("Файл пуст")
+
+        sha256 = digest.hexdigest()
+        relative_path = blob_relative_path(sha256)
+        await run_in_threadpool(_finalize_temp_file, fd, temp_path, settings.uploads_path / relative_path)
+    except BaseException:
+        await run_in_threadpool(_discard_temp_file, fd, temp_path)
+        raise
+    finally:
+        await upload.seek(0)
+
+    if extension is None:
+        extension = IMAGE_TYPES.get(mime_type or "") or ".bin"
+    return StoredUpload(
+        relative_path=relative_path,
+        size=size,
+        sha256=sha256,
+        mime_type=mime_type,
+        extension=extension,
+    )
+
+
+def finalize_staged_upload(staged_path: Path, *, kind: str, extension: str | None = None) -> StoredUpload:
+    """Переносим собранный по частям файл в хранилище (синхронно, для пула потоков).
+
+    Проверки те же, что у :func:`stream_upload`: размер, тип по сигнатуре, sha256.
+    """
+
+    limit = max_upload_bytes(kind)
+    size = staged_path.stat().st_size
+    if size > limit:
+        raise UploadTooLargeError(f"Файл больше {limit // (1024 * 1024)} МБ")
+    if size == 0:
+        raise UploadRejectedError("Файл пуст")
+
+    digest = hashlib.sha256()
+    with staged_path.open("rb") as handle:
+        mime_type = sniff_mime_type(handle.read(16))
+        handle.seek(0)
+        while chunk := handle.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    allowed = ALLOWED_TYPES.get(kind)
+    if allowed is not None and mime_type not in allowed:
+        raise UploadRejectedError("Недопустимый тип файла")
+
+    sha256 = digest.hexdigest()
+    relative_path = blob_relative_path(sha256)
+    fd = os.open(staged_path, os.O_RDONLY)
+    _finalize_temp_file(fd, str(staged_path), settings.uploads_path / relative_path)
+
+    if extension is None:
+        extension = IMAGE_TYPES.get(mime_type or "") or ".bin"
+    return StoredUpload(
+        relative_path=relative_path,
+        size=size,
+        sha256=sha256,
+        mime_type=mime_type,
+        extension=extension,
+    )
+
+
+def register_upload(db: Session, stored: StoredUpload) -> str:
+    """Регистрируем файл в хранилище и возвращаем путь для сохранения в модели."""
+
+    register_blob(
+        db,
+        sha256=stored.sha256,
+        size=stored.size,
+        mime_type=stored.mime_type,
+        extension=stored.extension,
+    )
+    return stored.relative_path
+
+
+async def save_submission_document(*, upload: UploadFile, kind: str) -> StoredUpload:
+    """Сохраняем вложение пользователя и возвращаем описание файла."""
 
-    content_type = upload.content_type or mimetypes.guess_type(upload.filename or "")[0]
-    if content_type not in allowed_types:
-        raise ValueError("Допустимы только изображения JPG, PNG или WEBP")
+    extension = Path(upload.filename or "").suffix or ".bin"
+    return await stream_upload(upload, kind=kind, extension=extension[:16])
 
-    extension = allowed_types[content_type]
-    target_dir = settings.uploads_path / f"user_{user_id}" / "profile"
-    target_dir.mkdir(parents=True, exist_ok=True)
 
-    target_path = target_dir / f"photo{extension}"
-    with target_path.open("wb") as buffer:
-        upload.file.seek(0)
-        shutil.copyfileobj(upload.file, buffer)
-    upload.file.seek(0)
+async def save_profile_photo(*, upload: UploadFile) -> StoredUpload:
+    """Сохраняем фото профиля кандидата."""
 
-    return target_path.relative_to(settings.uploads_path).as_posix()
+    try:
+        return await stream_upload(upload, kind="profile_photo")
+    except UploadTooLargeError:
+        raise
+    except UploadRejectedError as error:
+        raise UploadRejectedError("Допустимы только изображения JPG, PNG или WEBP") from error
 
 
 def _delete_relative_file(relative_path: str | None) -> None:
@@ -91,15 +299,36 @@ def _delete_relative_file(relative_path: str | None) -> None:
             parent.rmdir()
 
 
-def delete_submission_document(relative_path: str | None) -> None:
-    """Удаляем файл вложения, если он существует."""
+def delete_submission_document(
+    relative_path: str | None,
+    *,
+    db: Session | None = None,
+    submission_id: int | None = None,
+    kind: str | None = None,
+) -> None:
+    """Освобождаем вложение отправки.
+
+    Файл из хранилища не удаляем сразу — лишь снимаем ссылку поля (если передана
+    сессия и владелец); сам файл уберёт фоновая очистка. Файлы старого формата
+    (``user_<id>/mission_<id>/...``) удаляем с диска.
+    """
 
+    if is_blob_path(relative_path):
+        if db is not None and submission_id is not None and kind:
+            detach_blob(db, owner_type=OWNER_SUBMISSION, owner_id=submission_id, field=kind)
+        return
     _delete_relative_file(relative_path)
 
 
-def delete_profile_photo(relative_path: str | None) -> None:
-    """Удаляем сохранённую фотографию профиля."""
+def delete_profile_photo(
+    relative_path: str | None, *, db: Session | None = None, user_id: int | None = None
+) -> None:
+    """Освобождаем фотографию профиля по тем же правилам, что и вложения."""
 
+    if is_blob_path(relative_path):
+        if db is not None and user_id is not None:
+            detach_blob(db, owner_type=OWNER_USER, owner_id=user_id, field="profile_photo")
+        return
     _delete_relative_file(relative_path)
 
 
@@ -111,7 +340,8 @@ def build_photo_data_url(relative_path: str) -> str:
     if not file_path.exists():
         raise FileNotFoundError("Файл не найден")
 
-    mime_type = mimetypes.guess_type(file_path.name)[0] or "image/jpeg"
     with file_path.open("rb") as fh:
-        encoded = base64.b64encode(fh.read()).decode("ascii")
+        content = fh.read()
+    mime_type = sniff_mime_type(content[:16]) or mimetypes.guess_type(file_path.name)[0] or "image/jpeg"
+    encoded = base64.b64encode(content).decode("ascii")
     return f"data:{mime_type};base64,{encoded}"
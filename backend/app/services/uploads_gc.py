@@ -0,0 +1,449 @@
+"""Сборка мусора в каталоге загрузок и отчёт о занятом месте.
+
+Файлы, на которые не ссылается ни одна отправка и ни один профиль, остаются
+после оборванных транзакций, ручных правок базы и от старой раскладки
+``user_<id>/...``. Очистка сравнивает дерево ``uploads`` с множеством путей из
+базы, переносит «сирот» старше льготного периода в карантин и удаляет
+карантинные партии после срока хранения.
+
+Дерево обходится параллельно по подкаталогам второго уровня через
+``os.scandir``; в память целиком загружаются только ссылки из базы, а сами
+файлы обрабатываются по одному. Файлы хранилища ``blobs/`` не переносим: ими
+владеет :func:`app.services.blobs.sweep_unreferenced_blobs`, здесь лишь снимаем
+устаревшие ссылки, чтобы счётчики сошлись.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.blob import BlobReference, StoredBlob
+from app.models.mission import MissionSubmission
+from app.models.user import User
+from app.services.blobs import (
+    BLOB_DIR,
+    INCOMING_DIR,
+    OWNER_SUBMISSION,
+    OWNER_USER,
+    THUMBS_DIR,
+    blob_relative_path,
+    detach_blob,
+    is_blob_path,
+)
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DIR = ".quarantine"
+QUARANTINE_STAMP = "%Y%m%dT%H%M%S"
+DOCUMENT_KINDS = ("passport", "photo", "resume")
+
+KIND_PROFILE_PHOTO = "profile_photo"
+KIND_THUMBS = "thumbs"
+KIND_ORPHAN = "orphan"
+KIND_UNREFERENCED_BLOB = "unreferenced_blob"
+KIND_INCOMING = "incoming"
+KIND_QUARANTINE = "quarantine"
+
+# Владелец файла: (тип владельца, id владельца, поле, id пользователя).
+Owner = tuple[str, int, str, int]
+
+
+@dataclass(slots=True)
+class Usage:
+    """Число файлов и байт."""
+
+    files: int = 0
+    bytes: int = 0
+
+    def add(self, size: int) -> None:
+        self.files += 1
+        self.bytes += size
+
+
+@dataclass(slots=True)
+class GcReport:
+    """Итог обхода: использование по видам и пользователям, действия очистки.
+
+    Общий файл хранилища учитывается у каждого пользователя, который на него
+    ссылается, а в разбивке по видам — один раз.
+    """
+
+    by_kind: dict[str, Usage] = field(default_factory=dict)
+    by_user: dict[int, Usage] = field(default_factory=dict)
+    quarantined: int = 0
+    quarantined_bytes: int = 0
+    purged_batches: int = 0
+    released_references: int = 0
+
+    def count(self, kind: str, size: int, users: tuple[int, ...] = ()) -> None:
+        self.by_kind.setdefault(kind, Usage()).add(size)
+        for user_id in users:
+            self.by_user.setdefault(user_id, Usage()).add(size)
+
+    def merge(self, other: GcReport) -> None:
+        for source, target in ((other.by_kind, self.by_kind), (other.by_user, self.by_user)):
+            for key, usage in source.items():
+                bucket = target.setdefault(key, Usage())
+                bucket.files += usage.files
+                bucket.bytes += usage.bytes
+        self.quarantined += other.quarantined
+        self.quarantined_bytes += other.quarantined_bytes
+
+    def as_dict(self, *, top_users: int | None = None) -> dict:
+        users = sorted(self.by_user.items(), key=lambda item: item[1].bytes, reverse=True)
+        if top_users is not None:
+            users = users[:top_users]
+        return {
+            "by_kind": {kind: _usage_dict(usage) for kind, usage in sorted(self.by_kind.items())},
+            "by_user": [{"user_id": user_id, **_usage_dict(usage)} for user_id, usage in users],
+            "quarantined": self.quarantined,
+            "quarantined_bytes": self.quarantined_bytes,
+            "purged_batches": self.purged_batches,
+            "released_references": self.released_references,
+        }
+
+
+def _usage_dict(usage: Usage) -> dict[str, int]:
+    return {"files": usage.files, "bytes": usage.bytes}
+
+
+@dataclass(slots=True)
+class _References:
+    """Ссылки из базы: путь файла → владельцы, ключи миниатюр → пользователь."""
+
+    paths: dict[str, list[Owner]] = field(default_factory=dict)
+    thumb_keys: dict[str, int] = field(default_factory=dict)
+
+    def add(self, path: str, owner: Owner) -> None:
+        self.paths.setdefault(path, []).append(owner)
+
+
+def load_references(db: Session, *, batch_size: int = 1000) -> _References:
+    """Читаем ссылки потоково, по ``batch_size`` строк, не создавая ORM-объектов."""
+
+    from app.services.images import variant_key  # noqa: PLC0415 - Pillow нужен только здесь
+
+    references = _References()
+    submissions = db.execute(
+        select(
+            MissionSubmission.id,
+            MissionSubmission.user_id,
+            MissionSubmission.passport_path,
+            MissionSubmission.photo_path,
+            MissionSubmission.resume_path,
+        ).execution_options(yield_per=batch_size)
+    )
+    for row in submissions:
+        for kind, path in zip(DOCUMENT_KINDS, row[2:]):
+            if path:
+                references.add(path, (OWNER_SUBMISSION, row.id, kind, row.user_id))
+
+    users = db.execute(
+        select(User.id, User.profile_photo_path)
+        .where(User.profile_photo_path.is_not(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for user_id, path in users:
+        references.add(path, (OWNER_USER, user_id, KIND_PROFILE_PHOTO, user_id))
+        try:
+            references.thumb_keys[variant_key(path)] = user_id
+        except FileNotFoundError:
+            continue
+    return references
+
+
+def release_stale_references(
+    db: Session,
+    references: _References,
+    *,
+    changed_before: datetime,
+    batch_size: int = 1000,
+) -> int:
+    """Снимаем ссылки хранилища, чьё поле владельца больше не указывает на файл.
+
+    Так бывает после ручных правок базы; после снятия счётчик файла может
+    упасть до нуля, и его удалит обычная очистка хранилища. Ссылки, изменённые
+    после ``changed_before``, не трогаем: их владельца могли сохранить уже после
+    того, как мы прочитали пути из базы.
+    """
+
+    rows = db.execute(
+        select(BlobReference.owner_type, BlobReference.owner_id, BlobReference.field, StoredBlob.sha256)
+        .join(StoredBlob, StoredBlob.id == BlobReference.blob_id)
+        .where(BlobReference.updated_at < changed_before)
+        .execution_options(yield_per=batch_size)
+    )
+    stale = [
+        (owner_type, owner_id, field_name)
+        for owner_type, owner_id, field_name, sha256 in rows
+        if not any(
+            owner[:3] == (owner_type, owner_id, field_name)
+            for owner in references.paths.get(blob_relative_path(sha256), ())
+        )
+    ]
+    for owner_type, owner_id, field_name in stale:
+        detach_blob(db, owner_type=owner_type, owner_id=owner_id, field=field_name)
+    db.commit()
+    return len(stale)
+
+
+class _Scanner:
+    """Обход одного поддерева; экземпляр на задачу, результаты сливаются в конце."""
+
+    def __init__(
+        self,
+        root: Path,
+        references: _References,
+        *,
+        cutoff: float,
+        quarantine: Path | None,
+    ) -> None:
+        self.root = str(root)
+        self.references = references
+        self.cutoff = cutoff
+        self.quarantine = quarantine
+        self.report = GcReport()
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _classify(self, relative: str) -> tuple[str, tuple[int, ...]] | None:
+        """Вид файла и его пользователи; ``None`` — файл никому не нужен."""
+
+        if relative.startswith(f"{BLOB_DIR}/{INCOMING_DIR}/"):
+            return KIND_INCOMING, ()
+        if relative.startswith(f"{THUMBS_DIR}/"):
+            user_id = self.references.thumb_keys.get(relative.split("/", 2)[1])
+            return (KIND_THUMBS, (user_id,)) if user_id is not None else None
+        owners = self.references.paths.get(relative)
+        if owners:
+            return owners[0][2], tuple(dict.fromkeys(owner[3] for owner in owners))
+        if is_blob_path(relative):
+            return KIND_UNREFERENCED_BLOB, ()
+        return None
+
+    def _move_to_quarantine(self, path: str, relative: str) -> bool:
+        target = self.quarantine / relative
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        except OSError:
+            logger.warning("Не удалось перенести %s в карантин", relative, exc_info=True)
+            return False
+        return True
+
+    def visit_file(self, entry: os.DirEntry) -> None:
+        relative = self._relative(entry.path)
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            return
+        classified = self._classify(relative)
+        if classified is not None:
+            kind, users = classified
+            self.report.count(kind, stat.st_size, users)
+            return
+        self.report.count(KIND_ORPHAN, stat.st_size)
+        if self.quarantine is not None and stat.st_mtime <= self.cutoff:
+            if self._move_to_quarantine(entry.path, relative):
+                self.report.quarantined += 1
+                self.report.quarantined_bytes += stat.st_size
+
+    def scan(self, directory: str) -> None:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir():
+                    self.scan(entry.path)
+                else:
+                    self.visit_file(entry)
+
+        # Пустые каталоги старой раскладки и миниатюр убираем; в blobs/ каталоги
+        # создаются параллельно с загрузками, поэтому их не трогаем.
+        if self.quarantine is not None and not self._relative(directory).startswith(f"{BLOB_DIR}/"):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+
+def _scan_task(
+    directory: str, root: Path, references: _References, cutoff: float, quarantine: Path | None
+) -> GcReport:
+    scanner = _Scanner(root, references, cutoff=cutoff, quarantine=quarantine)
+    scanner.scan(directory)
+    return scanner.report
+
+
+def _second_level_dirs(root: Path, top_level: _Scanner) -> Iterator[str]:
+    """Подкаталоги второго уровня (``user_<id>/...``, ``blobs/ab``, ``thumbs/<key>``) — единицы работы.
+
+    Файлы первых двух уровней учитываем сразу в ``top_level``; карантин пропускаем.
+    """
+
+    if not root.is_dir():
+        return
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name == QUARANTINE_DIR or entry.is_symlink():
+                continue
+            if not entry.is_dir():
+                top_level.visit_file(entry)
+                continue
+            with os.scandir(entry.path) as children:
+                for child in children:
+                    if child.is_symlink():
+                        continue
+                    if child.is_dir():
+                        yield child.path
+                    else:
+                        top_level.visit_file(child)
+
+
+def _measure(directory: Path) -> Usage:
+    usage = Usage()
+    for current, _, files in os.walk(directory):
+        for name in files:
+            try:
+                usage.add(os.stat(os.path.join(current, name), follow_symlinks=False).st_size)
+            except FileNotFoundError:
+                continue
+    return usage
+
+
+def purge_quarantine(root: Path, *, retention: timedelta, now: datetime) -> int:
+    """Удаляем партии карантина старше срока хранения; возвращаем их число."""
+
+    quarantine_root = root / QUARANTINE_DIR
+    if not quarantine_root.is_dir():
+        return 0
+    purged = 0
+    for entry in os.scandir(quarantine_root):
+        try:
+            created = datetime.strptime(entry.name, QUARANTINE_STAMP).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if entry.is_dir() and created <= now - retention:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            purged += 1
+    return purged
+
+
+def collect_uploads_garbage(
+    db: Session,
+    *,
+    dry_run: bool = False,
+    grace_seconds: float | None = None,
+    retention_days: float | None = None,
+    workers: int | None = None,
+    now: datetime | None = None,
+) -> GcReport:
+    """Полный проход: ссылки из базы, обход дерева, карантин и очистка старого карантина.
+
+    В режиме ``dry_run`` только считаем: ни файлы, ни ссылки в базе не меняются.
+    """
+
+    root = settings.uploads_path
+    now = now or datetime.now(timezone.utc)
+    grace = settings.uploads_gc_grace_seconds if grace_seconds is None else grace_seconds
+    retention = timedelta(
+        days=settings.uploads_quarantine_days if retention_days is None else retention_days
+    )
+    cutoff = (now - timedelta(seconds=grace)).timestamp()
+    quarantine = None if dry_run else root / QUARANTINE_DIR / now.strftime(QUARANTINE_STAMP)
+
+    references = load_references(db)
+    report = GcReport()
+    if not dry_run:
+        report.released_references = release_stale_references(
+            db, references, changed_before=now - timedelta(seconds=grace)
+        )
+
+    top_level = _Scanner(root, references, cutoff=cutoff, quarantine=quarantine)
+    max_workers = workers or settings.uploads_gc_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: set[Future[GcReport]] = set()
+        for directory in _second_level_dirs(root, top_level):
+            # Держим в очереди ограниченное число задач, чтобы не копить миллионы Future.
+            if len(pending) >= max_workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report.merge(future.result())
+            pending.add(pool.submit(_scan_task, directory, root, references, cutoff, quarantine))
+        for future in pending:
+            report.merge(future.result())
+    report.merge(top_level.report)
+
+    if not dry_run:
+        # Опустевшие каталоги старой раскладки (user_<id>) больше не нужны.
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.name not in {BLOB_DIR, THUMBS_DIR, QUARANTINE_DIR} and entry.is_dir():
+                    try:
+                        os.rmdir(entry.path)
+                    except OSError:
+                        pass
+
+    quarantine_root = root / QUARANTINE_DIR
+    if quarantine_root.is_dir():
+        if not dry_run:
+            report.purged_batches = purge_quarantine(root, retention=retention, now=now)
+        usage = _measure(quarantine_root)
+        if usage.files:
+            report.by_kind[KIND_QUARANTINE] = usage
+
+    logger.info(
+        "Очистка загрузок: в карантин %s файлов (%s байт), удалено партий %s, снято ссылок %s",
+        report.quarantined,
+        report.quarantined_bytes,
+        report.purged_batches,
+        report.released_references,
+    )
+    return report
+
+
+def main() -> None:
+    """CLI: ``python -m app.services.uploads_gc [--dry-run]``."""
+
+    from app.db.session import SessionLocal  # noqa: PLC0415 - сессия нужна только CLI
+
+    parser = argparse.ArgumentParser(description="Очистка каталога загрузок и отчёт о занятом месте")
+    parser.add_argument("--dry-run", action="store_true", help="только отчёт, без переноса и удаления")
+    parser.add_argument("--grace-hours", type=float, default=None, help="не трогать файлы моложе N часов")
+    parser.add_argument("--retention-days", type=float, default=None, help="срок хранения карантина")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top-users", type=int, default=20, help="сколько пользователей вывести")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        report = collect_uploads_garbage(
+            session,
+            dry_run=args.dry_run,
+            grace_seconds=args.grace_hours * 3600 if args.grace_hours is not None else None,
+            retention_days=args.retention_days,
+            workers=args.workers,
+        )
+    finally:
+        session.close()
+    sys.stdout.write(json.dumps(report.as_dict(top_users=args.top_users), ensure_ascii=False, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
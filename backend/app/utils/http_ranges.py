@@ -0,0 +1,58 @@
+"""Разбор заголовка ``Range`` для отдачи файлов по частям."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator
+
+
+class RangeNotSatisfiableError(ValueError):
+    """Запрошенный диапазон лежит за пределами файла."""
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Возвращаем включительные границы ``(start, end)`` или ``None``, если отдаём файл целиком.
+
+    Поддерживаем один диапазон — этого хватает просмотрщикам PDF и плеерам.
+    Несколько диапазонов и синтаксически неверный заголовок игнорируем, как
+    разрешает RFC 9110, и отдаём весь файл.
+    """
+
+    if not header or not header.startswith("bytes=") or size <= 0:
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = (part.strip() for part in spec.split("-", 1))
+    try:
+        if not first:
+            # bytes=-N — последние N байт.
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiableError
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiableError
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def iter_file_range(path: Path, start: int, end: int, *, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Читаем файл с ``start`` по ``end`` включительно кусками."""
+
+    remaining = end - start + 1
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        while remaining > 0:
+            chunk = handle.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
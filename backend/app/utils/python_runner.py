@@ -2,14 +2,31 @@
 
 from __future__ import annotations
 
+import ast
 from dataclasses import dataclass
 import subprocess
 import sys
+import traceback
 from typing import Final
 
+from app.core.config import settings
+
 
 DEFAULT_TIMEOUT_SECONDS: Final[float] = 5.0
 
+# Ограничения предварительной проверки: слишком большие программы не имеет смысла
+# даже компилировать, а огромное AST почти всегда означает сгенерированный код.
+MAX_CODE_BYTES: Final[int] = 20_000
+MAX_AST_NODES: Final[int] = 5_000
+
+# Модули, которые не нужны для учебных задач и дают доступ к системе.
+FORBIDDEN_MODULES: Final[frozenset[str]] = frozenset(
+    {"ctypes", "multiprocessing", "os", "shutil", "signal", "socket", "subprocess"}
+)
+
+# Код возврата интерпретатора при ошибке компиляции или необработанном исключении.
+PRECHECK_EXIT_CODE: Final[int] = 1
+
 
 @dataclass(slots=True)
 class PythonRunResult:
@@ -19,9 +36,92 @@ class PythonRunResult:
     stderr: str
     exit_code: int
     timeout: bool = False
+    # True, если результат получен на этапе предварительной проверки без запуска процесса.
+    prechecked: bool = False
+
+
+def _precheck_failure(message: str) -> PythonRunResult:
+    return PythonRunResult(stdout="", stderr=message, exit_code=PRECHECK_EXIT_CODE, prechecked=True)
+
+
+def _forbidden_import(tree: ast.AST) -> str | None:
+    """Возвращаем имя первого запрещённого модуля из ``import``/``from ... import``."""
 
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            root = name.split(".", 1)[0]
+            if root in FORBIDDEN_MODULES:
+                return root
+    return None
+
+
+def precheck_user_code(code: str) -> PythonRunResult | None:
+    """Проверяем код внутри процесса API до запуска интерпретатора.
+
+    Возвращаем готовый результат, если программа заведомо не пройдёт проверку:
+    синтаксическая ошибка (в том же формате, что печатает ``python -c``), превышение
+    лимитов или запрещённый импорт. Наличие вывода статически не проверяем: его дают
+    и ``map(print, ...)``, и ``pprint``, и ``out = print``. ``None`` означает, что
+    код нужно выполнить по-настоящему.
+    """
+
+    if len(code.encode("utf-8")) > MAX_CODE_BYTES:
+        return _precheck_failure(
+            f"Программа слишком большая: допускается не более {MAX_CODE_BYTES} байт.\n"
+        )
 
-def run_user_python_code(code: str, timeout: float = DEFAULT_TIMEOUT_SECONDS) -> PythonRunResult:
+    try:
+        tree = compile(code, "<string>", "exec", flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+    except (SyntaxError, ValueError) as exc:
+        # ValueError возникает, например, при нулевых байтах в исходнике.
+        return _precheck_failure("".join(traceback.format_exception_only(exc)))
+
+    node_count = sum(1 for _ in ast.walk(tree))
+    if node_count > MAX_AST_NODES:
+        return _precheck_failure(
+            f"Программа слишком сложная: {node_count} узлов AST при лимите {MAX_AST_NODES}.\n"
+        )
+
+    forbidden = _forbidden_import(tree)
+    if forbidden:
+        return _precheck_failure(
+            f"ImportError: модуль '{forbidden}' недоступен в учебной песочнице.\n"
+        )
+
+    return None
+
+
+def run_user_python_code(
+    code: str,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    *,
+    stdin: str | None = None,
+) -> PythonRunResult:
+    """Выполняем код пилота на воркере запуска или, если они не настроены, локально.
+
+    При заданных ``ALABUGA_RUNNER_ENDPOINTS`` код уходит во внешние воркеры, чтобы
+    всплеск запусков не отнимал CPU у остальных эндпоинтов API.
+    """
+
+    if settings.runner_endpoints:
+        from app.utils.runner_client import get_runner_pool  # noqa: PLC0415 - избегаем цикла импортов
+
+        return get_runner_pool().run(code, timeout=timeout, stdin=stdin)
+    return run_python_locally(code, timeout, stdin=stdin)
+
+
+def run_python_locally(
+    code: str,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    *,
+    stdin: str | None = None,
+) -> PythonRunResult:
     """Запускаем код в отдельном процессе и возвращаем stdout/stderr.
 
     Код выполняется через ``sys.executable`` в режиме ``-c``. Таймаут ограничен,
@@ -32,18 +132,19 @@ def run_user_python_code(code: str, timeout: float = DEFAULT_TIMEOUT_SECONDS) ->
     try:
         completed = subprocess.run(  # noqa: PLW1510 - таймаут обрабатываем вручную
             [sys.executable, "-c", code],
+            input=stdin,
             capture_output=True,
             text=True,
             timeout=timeout,
             check=False,
         )
     except subprocess.TimeoutExpired as exc:
-        stderr = exc.stderr or ""
+        stderr = _decode(exc.stderr)
         if stderr:
             stderr = f"{stderr}\nПрограмма превысила лимит {timeout:.1f} сек."
         else:
             stderr = f"Программа превысила лимит {timeout:.1f} сек."
-        return PythonRunResult(stdout=exc.stdout or "", stderr=stderr, exit_code=124, timeout=True)
+        return PythonRunResult(stdout=_decode(exc.stdout), stderr=stderr, exit_code=124, timeout=True)
 
     return PythonRunResult(
         stdout=completed.stdout,
@@ -52,3 +153,12 @@ def run_user_python_code(code: str, timeout: float = DEFAULT_TIMEOUT_SECONDS) ->
         timeout=False,
     )
 
+
+def _decode(value: str | bytes | None) -> str:
+    """``TimeoutExpired`` может вернуть байты даже при ``text=True``."""
+
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
@@ -0,0 +1,372 @@
+"""Долгоживущие интерактивные сессии Python для пилотов.
+
+Каждая сессия — отдельный процесс интерпретатора с драйвером, который хранит
+пространство имён между запусками фрагментов. Процесс сам ограничивает себе
+память и процессорное время, простаивающие сессии закрывает фоновый поток, а их
+общее число ограничено; сессию, в которой прямо сейчас выполняется фрагмент, не
+вытесняем. Если настроены воркеры запуска кода, сессии живут на них
+(:class:`RemoteSessionManager`), а не в процессе API. Проверка итогового решения
+по-прежнему идёт через свежий процесс (:func:`app.services.coding.evaluate_challenge`).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Hashable
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.utils.runner_client import RunnerPool
+
+from app.core.config import settings
+from app.utils.python_runner import PythonRunResult, precheck_user_code
+
+_HEADER = struct.Struct(">I")
+
+# Драйвер не импортирует ничего из приложения: он запускается через ``-c``.
+# Протокол тот же, что у воркеров запуска: JSON с префиксом длины, но по пайпам.
+# Лимиты драйвер выставляет себе сам (argv: память в байтах, секунды CPU): ``preexec_fn``
+# небезопасен в многопоточном процессе API.
+_DRIVER_SOURCE = r"""
+import contextlib, io, json, os, struct, sys, traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None:
+    _memory, _cpu = int(sys.argv[1]), int(sys.argv[2])
+    resource.setrlimit(resource.RLIMIT_AS, (_memory, _memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (_cpu, _cpu))
+
+_reply = os.fdopen(os.dup(1), "wb", buffering=0)
+_requests = os.fdopen(os.dup(0), "rb", buffering=0)
+_devnull = os.open(os.devnull, os.O_RDWR)
+os.dup2(_devnull, 0)
+os.dup2(_devnull, 1)
+_namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+
+
+def _read(size):
+    data = b""
+    while len(data) < size:
+        chunk = _requests.read(size - len(data))
+        if not chunk:
+            sys.exit(0)
+        data += chunk
+    return data
+
+
+while True:
+    (size,) = struct.unpack(">I", _read(4))
+    code = json.loads(_read(size).decode("utf-8"))["code"]
+    out, err = io.StringIO(), io.StringIO()
+    exit_code = 0
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            exec(compile(code, "<session>", "exec"), _namespace)
+        except SystemExit as exc:
+            exit_code = exc.code if isinstance(exc.code, int) else 1
+        except BaseException as exc:
+            exit_code = 1
+            err.write("".join(traceback.format_exception(type(exc), exc, exc.__traceback__.tb_next)))
+    payload = json.dumps(
+        {"stdout": out.getvalue(), "stderr": err.getvalue(), "exit_code": exit_code}
+    ).encode("utf-8")
+    _reply.write(struct.pack(">I", len(payload)) + payload)
+"""
+
+
+class SessionCrashedError(RuntimeError):
+    """Процесс сессии завершился или перестал отвечать."""
+
+
+class SessionsBusyError(RuntimeError):
+    """Лимит сессий исчерпан, и все они сейчас выполняют фрагменты."""
+
+
+def session_key(user_id: int, mission_id: int) -> str:
+    """Ключ сессии: у пилота своя сессия в каждой миссии."""
+
+    return f"{user_id}:{mission_id}"
+
+
+@dataclass(slots=True)
+class SessionLimits:
+    """Ограничения одной сессии."""
+
+    memory_bytes: int = 256 * 1024 * 1024
+    cpu_seconds: int = 60
+
+
+class ReplSession:
+    """Один процесс интерпретатора с сохраняемым пространством имён."""
+
+    def __init__(self, limits: SessionLimits) -> None:
+        self.limits = limits
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.lock = threading.Lock()
+        # Сколько запросов сейчас держат сессию; занятые сессии не вытесняются.
+        self.users = 0
+        self._process: subprocess.Popen | None = None
+
+    def start(self) -> None:
+        """Запускаем интерпретатор; вызывается под ``self.lock``, вне общего замка реестра."""
+
+        self._process = subprocess.Popen(  # noqa: S603 - запускаем собственный драйвер
+            [
+                sys.executable,
+                "-u",
+                "-c",
+                _DRIVER_SOURCE,
+                str(self.limits.memory_bytes),
+                str(self.limits.cpu_seconds),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    @property
+    def started(self) -> bool:
+        return self._process is not None
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def _read_exactly(self, size: int, deadline: float) -> bytes:
+        fd = self._process.stdout.fileno()
+        data = b""
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                raise TimeoutError
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                raise SessionCrashedError("Сессия завершилась")
+            data += chunk
+        return data
+
+    def execute(self, code: str, timeout: float) -> PythonRunResult:
+        """Выполняем фрагмент в пространстве имён сессии."""
+
+        payload = json.dumps({"code": code}).encode("utf-8")
+        try:
+            self._process.stdin.write(_HEADER.pack(len(payload)) + payload)
+            self._process.stdin.flush()
+            deadline = time.monotonic() + timeout
+            (size,) = _HEADER.unpack(self._read_exactly(_HEADER.size, deadline))
+            reply = json.loads(self._read_exactly(size, deadline).decode("utf-8"))
+        except TimeoutError:
+            self.close()
+            return PythonRunResult(
+                stdout="",
+                stderr=f"Фрагмент превысил лимит {timeout:.1f} сек. Сессия перезапущена.",
+                exit_code=124,
+                timeout=True,
+            )
+        except (BrokenPipeError, SessionCrashedError) as exc:
+            self.close()
+            raise SessionCrashedError("Сессия завершилась из-за превышения лимитов") from exc
+        finally:
+            self.last_used = time.monotonic()
+
+        return PythonRunResult(stdout=reply["stdout"], stderr=reply["stderr"], exit_code=reply["exit_code"])
+
+    def close(self) -> None:
+        if self._process is None:
+            return
+        if self.alive:
+            self._process.kill()
+        self._process.wait()
+        for stream in (self._process.stdin, self._process.stdout):
+            if stream:
+                stream.close()
+
+
+class ReplSessionManager:
+    """Реестр сессий с вытеснением по LRU и по времени простоя.
+
+    Общий замок защищает только словарь сессий: процессы запускаются и
+    останавливаются вне его, чтобы медленный ``fork``/``exec`` одной сессии не
+    задерживал запросы к остальным.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int,
+        idle_timeout: float,
+        limits: SessionLimits | None = None,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.limits = limits or SessionLimits()
+        self._sessions: OrderedDict[Hashable, ReplSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _pop_idle(self) -> list[ReplSession]:
+        threshold = time.monotonic() - self.idle_timeout
+        expired = [
+            key
+            for key, session in self._sessions.items()
+            if session.users == 0 and session.last_used < threshold
+        ]
+        return [self._sessions.pop(key) for key in expired]
+
+    def _acquire(self, key: Hashable) -> tuple[ReplSession, list[ReplSession]]:
+        """Берём сессию ключа (новую — ещё без процесса) и список вытесненных."""
+
+        with self._lock:
+            evicted = self._pop_idle()
+            session = self._sessions.get(key)
+            if session is None:
+                while len(self._sessions) >= self.max_sessions:
+                    idle = next((name for name, item in self._sessions.items() if item.users == 0), None)
+                    if idle is None:
+                        raise SessionsBusyError("Все интерактивные сессии заняты, повторите попытку позже")
+                    evicted.append(self._sessions.pop(idle))
+                session = ReplSession(self.limits)
+                self._sessions[key] = session
+            session.users += 1
+            self._sessions.move_to_end(key)
+            return session, evicted
+
+    def _release(self, key: Hashable, session: ReplSession, *, drop: bool = False) -> None:
+        with self._lock:
+            session.users -= 1
+            if drop and session.users == 0 and self._sessions.get(key) is session:
+                del self._sessions[key]
+
+    def run(self, key: Hashable, code: str, *, timeout: float = 5.0) -> tuple[PythonRunResult, bool]:
+        """Выполняем фрагмент; второй элемент — была ли сессия создана заново."""
+
+        rejected = precheck_user_code(code)
+        if rejected is not None:
+            return rejected, False
+
+        session, evicted = self._acquire(key)
+        for stale in evicted:
+            stale.close()
+
+        crashed = False
+        try:
+            with session.lock:
+                created = not session.alive
+                if created:
+                    session.close()
+                    session.start()
+                try:
+                    return session.execute(code, timeout), created
+                except SessionCrashedError as exc:
+                    crashed = True
+                    return PythonRunResult(stdout="", stderr=str(exc), exit_code=137), created
+        finally:
+            self._release(key, session, drop=crashed)
+
+    def reap_idle(self) -> int:
+        """Закрываем простаивающие сессии; возвращаем их число."""
+
+        with self._lock:
+            expired = self._pop_idle()
+        for session in expired:
+            session.close()
+        return len(expired)
+
+    def start_reaper(self, interval: float) -> None:
+        """Фоновый поток, который закрывает простаивающие сессии без новых запросов."""
+
+        if self._reaper or interval <= 0:
+            return
+
+        def _loop() -> None:
+            while not self._stop.wait(interval):
+                self.reap_idle()
+
+        self._stop.clear()
+        self._reaper = threading.Thread(target=_loop, name="repl-reaper", daemon=True)
+        self._reaper.start()
+
+    def close(self, key: Hashable) -> bool:
+        """Закрываем сессию пилота, если она есть."""
+
+        with self._lock:
+            session = self._sessions.pop(key, None)
+        if session is None:
+            return False
+        # Дожидаемся текущего фрагмента, чтобы не убить процесс посреди ответа.
+        with session.lock:
+            session.close()
+        return True
+
+    def close_all(self) -> None:
+        self._stop.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+class RemoteSessionManager:
+    """Сессии на воркерах запуска кода: фрагменты одного ключа уходят на один воркер."""
+
+    def __init__(self, pool: "RunnerPool") -> None:
+        self._pool = pool
+
+    def run(self, key: Hashable, code: str, *, timeout: float = 5.0) -> tuple[PythonRunResult, bool]:
+        rejected = precheck_user_code(code)
+        if rejected is not None:
+            return rejected, False
+        return self._pool.run_session(str(key), code, timeout=timeout)
+
+    def close(self, key: Hashable) -> bool:
+        return self._pool.close_session(str(key))
+
+    def close_all(self) -> None:
+        """Процессы сессий принадлежат воркерам и закрываются вместе с ними."""
+
+
+def build_local_manager() -> ReplSessionManager:
+    """Реестр сессий в текущем процессе с лимитами из настроек и фоновой очисткой."""
+
+    manager = ReplSessionManager(
+        max_sessions=settings.repl_max_sessions,
+        idle_timeout=settings.repl_idle_timeout_seconds,
+        limits=SessionLimits(
+            memory_bytes=settings.repl_memory_limit_mb * 1024 * 1024,
+            cpu_seconds=settings.repl_cpu_limit_seconds,
+        ),
+    )
+    manager.start_reaper(min(settings.repl_idle_timeout_seconds / 2, 30.0))
+    return manager
+
+
+@lru_cache()
+def get_session_manager() -> ReplSessionManager | RemoteSessionManager:
+    """Общий на процесс реестр: на воркерах, если они настроены, иначе локальный."""
+
+    if settings.runner_endpoints:
+        from app.utils.runner_client import get_runner_pool  # noqa: PLC0415 - избегаем цикла импортов
+
+        return RemoteSessionManager(get_runner_pool())
+    return build_local_manager()
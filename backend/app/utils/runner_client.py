@@ -0,0 +1,226 @@
+"""Клиент пула воркеров запуска кода с балансировкой и проверкой здоровья."""
+
+from __future__ import annotations
+
+import hashlib
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Sequence
+
+from app.core.config import settings
+from app.utils.python_runner import PythonRunResult, run_python_locally
+from app.utils.runner_protocol import (
+    ERROR_BUSY,
+    ProtocolError,
+    parse_endpoint,
+    recv_message,
+    send_message,
+)
+
+
+class RunnerUnavailableError(RuntimeError):
+    """Ни один воркер не смог принять задачу, а локальный запуск запрещён."""
+
+    # Через сколько секунд клиенту имеет смысл повторить запрос (заголовок Retry-After).
+    retry_after: int = 5
+
+
+class RunnerBusyError(RunnerUnavailableError):
+    """Воркеры доступны, но все слоты заняты: запрос нужно повторить позже."""
+
+    retry_after = 2
+
+
+@dataclass(slots=True)
+class _WorkerState:
+    # Счётчик in_flight меняется под общим замком пула; остальные поля — одиночные присваивания.
+    endpoint: str
+    in_flight: int = 0
+    healthy: bool = True
+    # До этого момента (time.monotonic) воркер не выбираем после сбоя соединения.
+    retry_at: float = 0.0
+    capacity: int | None = None
+
+
+class RunnerPool:
+    """Распределяем запуски по воркерам: наименее загруженный здоровый — первым.
+
+    Занятый воркер (``busy``) пропускаем и пробуем следующий; недоступный помечаем
+    нездоровым до следующей проверки. Если все ответившие воркеры заняты, поднимаем
+    :class:`RunnerBusyError` — нагрузку не переносим в процесс API. Локальный
+    запуск (только если разрешён) возможен, лишь когда недоступны все воркеры.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[str],
+        *,
+        token: str | None = None,
+        connect_timeout: float = 1.0,
+        retry_seconds: float = 5.0,
+        allow_local_fallback: bool = False,
+    ) -> None:
+        self._workers = [_WorkerState(endpoint=endpoint) for endpoint in endpoints]
+        self._token = token
+        self._connect_timeout = connect_timeout
+        self._retry_seconds = retry_seconds
+        self._allow_local_fallback = allow_local_fallback
+        self._lock = threading.Lock()
+        self._health_thread: threading.Thread | None = None
+
+    def _request(self, worker: _WorkerState, message: dict[str, Any], timeout: float) -> dict[str, Any]:
+        family, address = parse_endpoint(worker.endpoint)
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self._connect_timeout)
+            sock.connect(address)
+            sock.settimeout(timeout)
+            send_message(sock, {**message, "token": self._token})
+            reply = recv_message(sock)
+        if reply is None:
+            raise ProtocolError("Воркер закрыл соединение без ответа")
+        return reply
+
+    def _mark_down(self, worker: _WorkerState) -> None:
+        worker.healthy = False
+        worker.retry_at = time.monotonic() + self._retry_seconds
+
+    def _candidates(self) -> list[_WorkerState]:
+        now = time.monotonic()
+        with self._lock:
+            available = [worker for worker in self._workers if worker.healthy or worker.retry_at <= now]
+            return sorted(available, key=lambda worker: (not worker.healthy, worker.in_flight))
+
+    def run(self, code: str, *, timeout: float, stdin: str | None = None) -> PythonRunResult:
+        """Выполняем код на одном из воркеров."""
+
+        message = {"op": "run", "code": code, "stdin": stdin, "timeout": timeout}
+        busy = False
+        for worker in self._candidates():
+            with self._lock:
+                worker.in_flight += 1
+            try:
+                # Запас сверх лимита программы — на запуск интерпретатора и сеть.
+                reply = self._request(worker, message, timeout=timeout + 5.0)
+            except (OSError, ProtocolError):
+                self._mark_down(worker)
+                continue
+            finally:
+                with self._lock:
+                    worker.in_flight -= 1
+
+            worker.healthy = True
+            if reply.get("ok"):
+                return PythonRunResult(**reply["result"])
+            if reply.get("error") == ERROR_BUSY:
+                busy = True
+            else:
+                self._mark_down(worker)
+
+        if busy:
+            raise RunnerBusyError("Все воркеры запуска кода заняты, повторите попытку через несколько секунд")
+        if self._allow_local_fallback:
+            return run_python_locally(code, timeout, stdin=stdin)
+        raise RunnerUnavailableError("Воркеры запуска кода недоступны")
+
+    def _affinity(self, key: str) -> list[_WorkerState]:
+        """Доступные воркеры в порядке рандеву-хеша ключа: у сессии постоянный «домашний» воркер."""
+
+        def weight(worker: _WorkerState) -> bytes:
+            return hashlib.blake2b(f"{worker.endpoint}|{key}".encode("utf-8"), digest_size=8).digest()
+
+        now = time.monotonic()
+        with self._lock:
+            available = [worker for worker in self._workers if worker.healthy or worker.retry_at <= now]
+        return sorted(available, key=weight, reverse=True)
+
+    def run_session(self, key: str, code: str, *, timeout: float) -> tuple[PythonRunResult, bool]:
+        """Выполняем фрагмент в сессии ``key`` на её воркере; второй элемент — создана ли сессия.
+
+        Занятый домашний воркер не подменяем соседним: там у пилота не было бы его
+        переменных. Недоступный — подменяем, и сессия создаётся заново.
+        """
+
+        message = {"op": "session_run", "key": key, "code": code, "timeout": timeout}
+        for worker in self._affinity(key):
+            with self._lock:
+                worker.in_flight += 1
+            try:
+                reply = self._request(worker, message, timeout=timeout + 5.0)
+            except (OSError, ProtocolError):
+                self._mark_down(worker)
+                continue
+            finally:
+                with self._lock:
+                    worker.in_flight -= 1
+
+            worker.healthy = True
+            if reply.get("ok"):
+                return PythonRunResult(**reply["result"]), bool(reply.get("created"))
+            if reply.get("error") == ERROR_BUSY:
+                raise RunnerBusyError("Воркер сессии занят, повторите попытку через несколько секунд")
+            self._mark_down(worker)
+        raise RunnerUnavailableError("Воркеры запуска кода недоступны")
+
+    def close_session(self, key: str) -> bool:
+        """Закрываем сессию на её воркере; недоступный воркер закроет её сам по простою."""
+
+        for worker in self._affinity(key):
+            try:
+                reply = self._request(worker, {"op": "session_close", "key": key}, timeout=self._connect_timeout)
+            except (OSError, ProtocolError):
+                self._mark_down(worker)
+                continue
+            return bool(reply.get("closed"))
+        return False
+
+    def capacity(self) -> int | None:
+        """Суммарное число слотов здоровых воркеров по последней проверке; ``None`` — неизвестно."""
+
+        known = [worker.capacity for worker in self._workers if worker.healthy and worker.capacity is not None]
+        return sum(known) if known else None
+
+    def check_health(self) -> None:
+        """Пингуем все воркеры и обновляем их состояние."""
+
+        for worker in self._workers:
+            try:
+                reply = self._request(worker, {"op": "ping"}, timeout=self._connect_timeout)
+            except (OSError, ProtocolError):
+                self._mark_down(worker)
+                continue
+            if reply.get("ok"):
+                worker.healthy = True
+                worker.capacity = reply.get("capacity")
+            else:
+                self._mark_down(worker)
+
+    def start_health_checks(self, interval: float) -> None:
+        """Запускаем фоновые проверки здоровья (один поток на пул)."""
+
+        if self._health_thread or interval <= 0:
+            return
+
+        def _loop() -> None:
+            while True:
+                time.sleep(interval)
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=_loop, name="runner-health", daemon=True)
+        self._health_thread.start()
+
+
+@lru_cache()
+def get_runner_pool() -> RunnerPool:
+    """Пул воркеров из настроек; создаётся один раз на процесс."""
+
+    pool = RunnerPool(
+        settings.runner_endpoints,
+        token=settings.runner_token,
+        connect_timeout=settings.runner_connect_timeout,
+        allow_local_fallback=settings.runner_local_fallback,
+    )
+    pool.start_health_checks(settings.runner_health_interval)
+    return pool
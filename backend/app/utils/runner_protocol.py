@@ -0,0 +1,104 @@
+"""Протокол обмена с воркерами запуска кода.
+
+Каждое сообщение — JSON в UTF-8 с префиксом длины (4 байта, big-endian). Одно
+соединение может нести несколько запросов подряд: клиент отправляет кадр и ждёт
+ровно один кадр-ответ.
+
+Запросы::
+
+    {"op": "run", "code": "...", "stdin": "...", "timeout": 5.0, "token": "..."}
+    {"op": "ping", "token": "..."}
+    {"op": "session_run", "key": "7:12", "code": "...", "timeout": 5.0, "token": "..."}
+    {"op": "session_close", "key": "7:12", "token": "..."}
+
+Ответы::
+
+    {"ok": true, "result": {"stdout": "...", "stderr": "...", "exit_code": 0, "timeout": false}}
+    {"ok": true, "result": {...}, "created": true}
+    {"ok": true, "closed": true}
+    {"ok": true, "active": 1, "capacity": 4}
+    {"ok": false, "error": "busy"}
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import struct
+from typing import Any, Final
+
+HEADER: Final = struct.Struct(">I")
+MAX_FRAME_BYTES: Final[int] = 8 * 1024 * 1024
+
+ERROR_BUSY: Final[str] = "busy"
+ERROR_UNAUTHORIZED: Final[str] = "unauthorized"
+ERROR_BAD_REQUEST: Final[str] = "bad_request"
+
+
+class ProtocolError(RuntimeError):
+    """Собеседник прислал некорректный кадр или закрыл соединение."""
+
+
+def encode_frame(message: dict[str, Any]) -> bytes:
+    """Сериализуем сообщение в кадр с префиксом длины."""
+
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    if len(payload) > MAX_FRAME_BYTES:
+        raise ProtocolError("Сообщение превышает допустимый размер кадра")
+    return HEADER.pack(len(payload)) + payload
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks: list[bytes] = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            raise ProtocolError("Соединение закрыто")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock: socket.socket, message: dict[str, Any]) -> None:
+    """Отправляем одно сообщение."""
+
+    sock.sendall(encode_frame(message))
+
+
+def recv_message(sock: socket.socket) -> dict[str, Any] | None:
+    """Читаем одно сообщение; ``None`` — собеседник корректно закрыл соединение."""
+
+    header = sock.recv(HEADER.size)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        header += _recv_exactly(sock, HEADER.size - len(header))
+
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ProtocolError("Слишком большой кадр")
+
+    try:
+        message = json.loads(_recv_exactly(sock, length).decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ProtocolError("Некорректный JSON в кадре") from exc
+    if not isinstance(message, dict):
+        raise ProtocolError("Ожидался JSON-объект")
+    return message
+
+
+def parse_endpoint(endpoint: str) -> tuple[int, str | tuple[str, int]]:
+    """Разбираем адрес вида ``unix:/run/runner.sock`` или ``tcp:host:port``.
+
+    Возвращаем семейство сокета и адрес, пригодный для ``connect``/``bind``.
+    """
+
+    if endpoint.startswith("unix:"):
+        return socket.AF_UNIX, endpoint[len("unix:") :]
+
+    address = endpoint[len("tcp:") :] if endpoint.startswith("tcp:") else endpoint
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Некорректный адрес воркера: {endpoint}")
+    return socket.AF_INET, (host, int(port))
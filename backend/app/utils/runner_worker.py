@@ -0,0 +1,171 @@
+"""Воркер запуска пользовательского кода, вынесенный из процесса API.
+
+Запуск::
+
+    python -m app.utils.runner_worker --listen tcp:0.0.0.0:8765 --concurrency 4
+    python -m app.utils.runner_worker --listen unix:/run/alabuga/runner.sock
+
+Воркер принимает кадры протокола из :mod:`app.utils.runner_protocol`, выполняет
+код тем же способом, что и API в режиме разработки, и отвечает ``busy``, если все
+слоты заняты — клиент в таком случае уходит на другой воркер. Здесь же живут
+интерактивные сессии пилотов (:mod:`app.utils.python_sessions`): фрагмент сессии
+занимает слот так же, как обычный запуск.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import socket
+import socketserver
+import threading
+from dataclasses import asdict
+from typing import Any
+
+from app.utils.python_runner import DEFAULT_TIMEOUT_SECONDS, run_python_locally
+from app.utils.python_sessions import SessionsBusyError, build_local_manager
+from app.utils.runner_protocol import (
+    ERROR_BAD_REQUEST,
+    ERROR_BUSY,
+    ERROR_UNAUTHORIZED,
+    ProtocolError,
+    parse_endpoint,
+    recv_message,
+    send_message,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_TIMEOUT_SECONDS = 30.0
+
+
+class _RunnerHandler(socketserver.BaseRequestHandler):
+    """Обрабатываем запросы одного соединения, пока клиент его не закроет."""
+
+    server: "RunnerServerMixin"
+
+    def handle(self) -> None:
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ProtocolError, OSError):
+                return
+            if message is None:
+                return
+            try:
+                send_message(self.request, self.server.dispatch(message))
+            except OSError:
+                return
+
+
+class RunnerServerMixin:
+    """Общая логика TCP- и Unix-вариантов сервера."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def setup_runner(self, *, concurrency: int, token: str | None) -> None:
+        self.capacity = concurrency
+        self.token = token
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+        self._active = 0
+        self._lock = threading.Lock()
+        self.sessions = build_local_manager()
+
+    def server_close(self) -> None:
+        self.sessions.close_all()
+        super().server_close()  # type: ignore[misc]
+
+    def dispatch(self, message: dict[str, Any]) -> dict[str, Any]:
+        if self.token and message.get("token") != self.token:
+            return {"ok": False, "error": ERROR_UNAUTHORIZED}
+
+        operation = message.get("op")
+        if operation == "ping":
+            return {"ok": True, "active": self._active, "capacity": self.capacity}
+        key = message.get("key")
+        if operation == "session_close":
+            if not isinstance(key, str):
+                return {"ok": False, "error": ERROR_BAD_REQUEST}
+            return {"ok": True, "closed": self.sessions.close(key)}
+        if operation not in ("run", "session_run") or not isinstance(message.get("code"), str):
+            return {"ok": False, "error": ERROR_BAD_REQUEST}
+        if operation == "session_run" and not isinstance(key, str):
+            return {"ok": False, "error": ERROR_BAD_REQUEST}
+
+        # Back-pressure: не ставим запросы в очередь, а сразу сообщаем о занятости.
+        if self._slots is None or not self._slots.acquire(blocking=False):
+            return {"ok": False, "error": ERROR_BUSY}
+        with self._lock:
+            self._active += 1
+        try:
+            timeout = min(float(message.get("timeout") or DEFAULT_TIMEOUT_SECONDS), MAX_TIMEOUT_SECONDS)
+            if operation == "session_run":
+                try:
+                    result, created = self.sessions.run(key, message["code"], timeout=timeout)
+                except SessionsBusyError:
+                    return {"ok": False, "error": ERROR_BUSY}
+                return {"ok": True, "result": asdict(result), "created": created}
+            stdin = message.get("stdin")
+            result = run_python_locally(
+                message["code"], timeout, stdin=stdin if isinstance(stdin, str) else None
+            )
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+        return {"ok": True, "result": asdict(result)}
+
+
+class ThreadingRunnerTCPServer(RunnerServerMixin, socketserver.ThreadingTCPServer):
+    """Воркер, слушающий TCP-порт."""
+
+
+class ThreadingRunnerUnixServer(RunnerServerMixin, socketserver.ThreadingUnixStreamServer):
+    """Воркер, слушающий Unix-сокет."""
+
+
+def create_server(
+    endpoint: str, *, concurrency: int, token: str | None = None
+) -> socketserver.BaseServer:
+    """Создаём сервер воркера на указанном адресе."""
+
+    family, address = parse_endpoint(endpoint)
+    if family == socket.AF_UNIX:
+        if os.path.exists(address):
+            os.unlink(address)
+        server: RunnerServerMixin = ThreadingRunnerUnixServer(address, _RunnerHandler)
+    else:
+        server = ThreadingRunnerTCPServer(address, _RunnerHandler)
+    server.setup_runner(concurrency=concurrency, token=token)
+    return server  # type: ignore[return-value]
+
+
+def main() -> None:
+    """CLI-точка входа воркера."""
+
+    parser = argparse.ArgumentParser(description="Воркер запуска Python-кода пилотов")
+    parser.add_argument("--listen", default=os.environ.get("ALABUGA_RUNNER_LISTEN", "tcp:0.0.0.0:8765"))
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("ALABUGA_RUNNER_CONCURRENCY", os.cpu_count() or 2)),
+    )
+    parser.add_argument("--token", default=os.environ.get("ALABUGA_RUNNER_TOKEN"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = create_server(args.listen, concurrency=args.concurrency, token=args.token)
+    logger.info("Runner worker listening on %s (concurrency=%s)", args.listen, args.concurrency)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
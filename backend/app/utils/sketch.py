@@ -0,0 +1,87 @@
+"""Логарифмическая гистограмма для перцентилей без хранения самих значений.
+
+Значение ``x`` попадает в корзину ``ceil(log(x) / log(gamma))``, где
+``gamma = (1 + a) / (1 - a)``; середина корзины отличается от любого значения в
+ней не больше чем на долю ``a`` (по умолчанию 1%). Гистограммы с одинаковой
+точностью складываются покорзинно, поэтому их можно хранить строками
+``(корзина, количество)`` и увеличивать атомарным ``UPSERT``, а перцентиль по
+нескольким миссиям получить слиянием их корзин.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable, Mapping
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+class LogHistogram:
+    """Счётчики по логарифмическим корзинам с относительной точностью ``relative_accuracy``.
+
+    Значения меньше ``min_value`` учитываются в корзине ``min_value``: для времени
+    проверки в секундах это означает «меньше секунды».
+    """
+
+    def __init__(
+        self,
+        counts: Mapping[int, int] | None = None,
+        *,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        min_value: float = 1.0,
+    ) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy должна быть в (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.counts: dict[int, int] = {}
+        for bucket, count in (counts or {}).items():
+            self.counts[int(bucket)] = self.counts.get(int(bucket), 0) + count
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def bucket(self, value: float) -> int:
+        """Номер корзины для значения."""
+
+        return math.ceil(math.log(max(value, self.min_value)) / self._log_gamma)
+
+    def value(self, bucket: int) -> float:
+        """Представитель корзины ``(gamma^(i-1), gamma^i]`` с минимальной относительной ошибкой."""
+
+        return 2 * self._gamma**bucket / (self._gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        bucket = self.bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        """Добавляем корзины другой гистограммы той же точности."""
+
+        if other.relative_accuracy != self.relative_accuracy or other.min_value != self.min_value:
+            raise ValueError("Складывать можно только гистограммы с одинаковыми параметрами")
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        return self
+
+    def quantile(self, q: float) -> float | None:
+        """Приближённый ``q``-квантиль (0..1) или ``None`` для пустой гистограммы."""
+
+        if not 0 <= q <= 1:
+            raise ValueError("q должен быть в [0, 1]")
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen > rank:
+                return self.value(bucket)
+        return self.value(max(self.counts))
+
+    def quantiles(self, qs: Iterable[float]) -> list[float | None]:
+        return [self.quantile(q) for q in qs]
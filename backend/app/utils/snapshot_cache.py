@@ -0,0 +1,62 @@
+"""Кэш тяжёлого снимка с ограниченным сроком жизни и одним вычислителем.
+
+Пока снимок свежий, его отдают всем. Когда он устарел, пересчитывает только
+первый пришедший поток, остальные ждут его результата, а не запускают те же
+запросы параллельно. Если вычисление упало, ожидающие пробуют сами.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SnapshotCache(Generic[T]):
+    """Снимок со сроком жизни ``ttl_seconds`` и защитой от одновременного пересчёта."""
+
+    def __init__(self, ttl_seconds: Callable[[], float], *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._value: T | None = None
+        self._stored_at = 0.0
+        self._computing = False
+
+    def _fresh(self) -> bool:
+        return self._value is not None and self._clock() - self._stored_at < self._ttl_seconds()
+
+    def get(self, compute: Callable[[], T]) -> T:
+        """Свежий снимок из кэша или результат ``compute`` (один на всех ожидающих)."""
+
+        with self._condition:
+            while True:
+                if self._fresh():
+                    return self._value  # type: ignore[return-value]
+                if not self._computing:
+                    self._computing = True
+                    break
+                self._condition.wait()
+
+        try:
+            value = compute()
+        except BaseException:
+            with self._condition:
+                self._computing = False
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            self._value = value
+            self._stored_at = self._clock()
+            self._computing = False
+            self._condition.notify_all()
+        return value
+
+    def invalidate(self) -> None:
+        """Сбрасываем снимок, следующий запрос пересчитает его."""
+
+        with self._condition:
+            self._value = None
@@ -0,0 +1,32 @@
+"""Разбор stderr пользовательской программы."""
+
+from __future__ import annotations
+
+import builtins
+import re
+
+# Последняя строка трейсбека: «ZeroDivisionError: division by zero», «KeyboardInterrupt»,
+# «json.decoder.JSONDecodeError: ...». Берём имя класса без модуля.
+_EXCEPTION_LINE = re.compile(r"^(?:[A-Za-z_]\w*\.)*([A-Za-z_]\w*)(?::\s|:$|$)")
+_EXCEPTION_SUFFIXES = ("Error", "Exception", "Warning", "Exit", "Interrupt")
+# Исключение почти всегда в последних строках; длинный вывод целиком не разбираем.
+_TAIL_LINES = 20
+
+
+def _looks_like_exception(name: str) -> bool:
+    builtin = getattr(builtins, name, None)
+    if isinstance(builtin, type) and issubclass(builtin, BaseException):
+        return True
+    return name[:1].isupper() and name.endswith(_EXCEPTION_SUFFIXES)
+
+
+def exception_class(stderr: str | None) -> str | None:
+    """Имя класса исключения, которым завершилась программа, или ``None``."""
+
+    if not stderr:
+        return None
+    for line in reversed(stderr.strip().splitlines()[-_TAIL_LINES:]):
+        match = _EXCEPTION_LINE.match(line.strip())
+        if match and _looks_like_exception(match.group(1)):
+            return match.group(1)
+    return None
@@ -0,0 +1,107 @@
+"""Проверяем сводные метрики HR-панели, их счётчики и кэш."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from app.models.branch import Branch, BranchMission
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.stats import StatsCounter
+from app.models.user import User, UserRole
+from app.services.admin_stats import (
+    compute_dashboard_stats,
+    count_stats_ground_truth,
+    reconcile_stats_counters,
+)
+from app.utils.snapshot_cache import SnapshotCache
+
+
+def test_dashboard_stats_are_aggregated_per_branch(db_session):
+    pilots = [
+        User(email=f"p{index}@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+        for index in range(2)
+    ]
+    hr = User(email="hr@alabuga.ru", full_name="HR", role=UserRole.HR, hashed_password="x")
+    missions = [Mission(title=f"M{index}", description="", xp_reward=0, mana_reward=0) for index in range(3)]
+    empty = Branch(title="Б пустая", description="")
+    branch = Branch(title="А основная", description="")
+    db_session.add_all([*pilots, hr, *missions, empty, branch])
+    db_session.flush()
+    db_session.add_all(
+        [
+            BranchMission(branch_id=branch.id, mission_id=missions[0].id, order=1),
+            BranchMission(branch_id=branch.id, mission_id=missions[1].id, order=2),
+            MissionSubmission(user_id=pilots[0].id, mission_id=missions[0].id, status=SubmissionStatus.APPROVED),
+            MissionSubmission(user_id=pilots[0].id, mission_id=missions[1].id, status=SubmissionStatus.APPROVED),
+            MissionSubmission(user_id=pilots[0].id, mission_id=missions[2].id, status=SubmissionStatus.APPROVED),
+            MissionSubmission(user_id=pilots[1].id, mission_id=missions[0].id, status=SubmissionStatus.PENDING),
+            MissionSubmission(user_id=pilots[1].id, mission_id=missions[1].id, status=SubmissionStatus.REJECTED),
+        ]
+    )
+    db_session.commit()
+
+    stats = compute_dashboard_stats(db_session)
+    assert stats.total_users == 2
+    assert stats.active_pilots == 1
+    assert stats.average_completed_missions == 3.0
+    assert stats.submission_stats.model_dump() == {"pending": 1, "approved": 3, "rejected": 1}
+    assert [(item.branch_title, item.completion_rate) for item in stats.branch_completion] == [
+        ("А основная", 0.5),
+        ("Б пустая", 0.0),
+    ]
+    assert stats.computed_at is not None
+
+    # Триггеры отслеживают смену статуса, удаление отправки и связки ветки.
+    approved = db_session.query(MissionSubmission).filter_by(mission_id=missions[0].id, user_id=pilots[0].id).one()
+    approved.status = SubmissionStatus.REJECTED
+    db_session.query(MissionSubmission).filter_by(status=SubmissionStatus.PENDING).delete()
+    db_session.query(BranchMission).filter_by(mission_id=missions[1].id).delete()
+    db_session.commit()
+    stats = compute_dashboard_stats(db_session)
+    assert stats.submission_stats.model_dump() == {"pending": 0, "approved": 2, "rejected": 2}
+    assert stats.active_pilots == 1
+    assert stats.branch_completion[0].completion_rate == 0.0
+    counters = {row.key: row.value for row in db_session.query(StatsCounter) if row.value}
+    assert counters == count_stats_ground_truth(db_session)
+
+
+def test_reconciliation_repairs_drifted_counters(db_session):
+    pilot = User(email="p@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    mission = Mission(title="M", description="", xp_reward=0, mana_reward=0)
+    db_session.add_all([pilot, mission])
+    db_session.flush()
+    db_session.add(MissionSubmission(user_id=pilot.id, mission_id=mission.id, status=SubmissionStatus.APPROVED))
+    db_session.commit()
+    assert reconcile_stats_counters(db_session) == {}
+
+    db_session.query(StatsCounter).filter_by(key="submissions:approved").update({"value": 7})
+    db_session.add(StatsCounter(key="branch_approved:999", value=3))
+    db_session.commit()
+
+    drift = reconcile_stats_counters(db_session)
+    assert drift == {"submissions:approved": (7, 1), "branch_approved:999": (3, 0)}
+    assert compute_dashboard_stats(db_session).submission_stats.approved == 1
+    assert db_session.get(StatsCounter, "branch_approved:999") is None
+
+
+def test_snapshot_cache_computes_once_for_concurrent_readers():
+    now = [0.0]
+    cache: SnapshotCache[int] = SnapshotCache(lambda: 30, clock=lambda: now[0])
+    calls = []
+
+    def compute() -> int:
+        calls.append(1)
+        time.sleep(0.05)
+        return len(calls)
+
+    results: list[int] = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [1] * 8
+
+    now[0] = 31
+    assert cache.get(compute) == 2
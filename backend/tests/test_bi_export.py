@@ -0,0 +1,65 @@
+"""Проверяем инкрементальную выгрузку в Parquet."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.store import Order, StoreItem
+from app.models.user import User, UserRole
+from app.services.bi_export import export_snapshot
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture(autouse=True)
+def _rollback_journal():
+    """Выгрузка переводит базу в WAL; возвращаем обычный журнал, чтобы не оставлять -wal рядом с тестовой БД."""
+
+    yield
+    engine.dispose()
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode=DELETE")
+
+
+def test_export_path_does_not_depend_on_working_directory():
+    """Каталог выгрузки разрешается от корня проекта, как и каталог загрузок."""
+
+    assert settings.bi_export_path.is_absolute()
+
+
+def test_export_is_incremental_by_watermark(db_session, tmp_path):
+    pilot = User(email="bi@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="secret")
+    item = StoreItem(name="Кружка", description="", cost_mana=10, stock=5)
+    db_session.add_all([pilot, item])
+    db_session.flush()
+    db_session.add(Order(user_id=pilot.id, item_id=item.id))
+    db_session.commit()
+
+    later = datetime.now(timezone.utc) + timedelta(minutes=5)
+    first = export_snapshot(db_session, root=tmp_path, batch_rows=1, now=later)
+    assert first.tables["users"].rows == 1
+    assert first.tables["orders"].rows == 1
+    assert first.tables["journal_entries"].file is None
+
+    users = pq.read_table(tmp_path / first.tables["users"].file)
+    assert "hashed_password" not in users.column_names
+    assert users.column("role").to_pylist() == ["pilot"]
+    orders = pq.read_table(tmp_path / first.tables["orders"].file).to_pylist()
+    assert orders[0]["status"] == "created"
+
+    # Второй запуск берёт только изменённые после границы строки.
+    db_session.execute(update(User).values(xp=50, updated_at=later + timedelta(seconds=30)))
+    db_session.commit()
+    second = export_snapshot(db_session, root=tmp_path, now=later + timedelta(minutes=5))
+    assert second.tables["users"].rows == 1
+    assert second.tables["orders"].rows == 0
+    assert pq.read_table(tmp_path / second.tables["users"].file).column("xp").to_pylist() == [50]
+
+    watermarks = json.loads((tmp_path / "watermarks.json").read_text(encoding="utf-8"))
+    assert set(watermarks["tables"]) == set(second.tables)
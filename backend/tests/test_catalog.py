@@ -0,0 +1,99 @@
+"""Проверяем выгрузку и транзакционную загрузку каталога."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.branch import Branch
+from app.models.coding import CodingChallenge
+from app.models.mission import Mission, MissionPrerequisite
+from app.models.rank import Rank
+from app.schemas.catalog import (
+    CatalogBranch,
+    CatalogBranchMission,
+    CatalogBundle,
+    CatalogCodingChallenge,
+    CatalogCompetency,
+    CatalogCompetencyLevel,
+    CatalogMission,
+    CatalogRank,
+)
+from app.services.catalog import export_catalog, import_catalog
+
+
+def _bundle() -> CatalogBundle:
+    return CatalogBundle(
+        competencies=[CatalogCompetency(name="Аналитика", category="analytics")],
+        ranks=[CatalogRank(title="Кадет", required_xp=0), CatalogRank(title="Пилот", required_xp=100, missions=["Старт"])],
+        missions=[
+            CatalogMission(
+                title="Старт",
+                xp_reward=50,
+                event_starts_at=datetime(2024, 10, 1, 9, tzinfo=timezone.utc),
+                competency_rewards=[CatalogCompetencyLevel(competency="Аналитика", level=1)],
+                coding_challenges=[
+                    CatalogCodingChallenge(order=1, title="Привет", prompt="Выведите 1", expected_output="1")
+                ],
+            ),
+            CatalogMission(title="Полёт", minimum_rank="Пилот", prerequisites=["Старт"]),
+        ],
+        branches=[
+            CatalogBranch(
+                title="Основная",
+                missions=[CatalogBranchMission(mission="Старт", order=1), CatalogBranchMission(mission="Полёт", order=2)],
+            )
+        ],
+    )
+
+
+def test_import_applies_bundle_and_reimport_is_noop(db_session):
+    dry = import_catalog(db_session, _bundle(), dry_run=True)
+    assert not dry.applied
+    assert dry.diff["missions"].created == ["Старт", "Полёт"]
+    assert db_session.query(Mission).count() == 0
+
+    report = import_catalog(db_session, _bundle())
+    assert report.applied
+    assert db_session.query(MissionPrerequisite).count() == 1
+    assert db_session.query(CodingChallenge).one().title == "Привет"
+    assert db_session.query(Branch).one().missions[1].mission.title == "Полёт"
+
+    exported = export_catalog(db_session)
+    assert {mission.title for mission in exported.missions} == {"Старт", "Полёт"}
+    again = import_catalog(db_session, exported)
+    assert not again.applied
+    assert all(not diff.created and not diff.updated for diff in again.diff.values())
+
+    changed = _bundle()
+    changed.missions[0].xp_reward = 75
+    changed.missions[0].coding_challenges[0].title = "Здравствуй"
+    report = import_catalog(db_session, changed)
+    assert report.diff["missions"].updated == ["Старт"]
+    assert report.diff["missions"].unchanged == 1
+    db_session.expire_all()
+    assert db_session.query(CodingChallenge).one().title == "Здравствуй"
+
+
+def test_invalid_bundle_is_rejected_without_changes(db_session):
+    import_catalog(db_session, _bundle())
+
+    # «Старт» начинает зависеть от «Полёта», который уже зависит от «Старта».
+    cyclic = CatalogBundle(missions=[CatalogMission(title="Старт", prerequisites=["Полёт"])])
+    with pytest.raises(HTTPException) as cycle:
+        import_catalog(db_session, cyclic)
+    assert cycle.value.status_code == 422
+    assert any("Цикл" in error for error in cycle.value.detail)
+
+    broken = CatalogBundle(
+        ranks=[CatalogRank(title="Кадет", required_xp=999)],
+        missions=[CatalogMission(title="Новая", artifact="Нет такого"), CatalogMission(title="Новая")],
+    )
+    with pytest.raises(HTTPException) as invalid:
+        import_catalog(db_session, broken)
+    assert len(invalid.value.detail) == 2
+    db_session.expire_all()
+    assert db_session.query(Rank).filter_by(title="Кадет").one().required_xp == 0
+    assert db_session.query(Mission).count() == 2
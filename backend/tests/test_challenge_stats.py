@@ -0,0 +1,56 @@
+"""Проверяем статистику сложности заданий."""
+
+from __future__ import annotations
+
+from app.models.challenge_stats import ChallengeKind
+from app.models.coding import CodingChallenge
+from app.models.mission import Mission
+from app.models.user import User, UserRole
+from app.services.challenge_stats import challenge_stats_report, rebuild_challenge_stats
+from app.services.coding import evaluate_challenge
+from app.utils.tracebacks import exception_class
+
+
+def test_exception_class_reads_last_traceback_line():
+    traceback = (
+        "Traceback (most recent call last):\n"
+        '  File "<stdin>", line 1, in <module>\n'
+        "json.decoder.JSONDecodeError: Expecting value: line 1 column 1 (char 0)\n"
+    )
+    assert exception_class(traceback) == "JSONDecodeError"
+    assert exception_class("ZeroDivisionError: division by zero") == "ZeroDivisionError"
+    assert exception_class("KeyboardInterrupt") == "KeyboardInterrupt"
+    assert exception_class("Ошибка: неверный ввод") is None
+    assert exception_class("") is None
+
+
+def _report(db_session, challenge_id: int):
+    report = challenge_stats_report(db_session, ChallengeKind.CODING)
+    (item,) = [row for row in report if row.challenge_id == challenge_id]
+    return item.model_dump(exclude={"last_attempt_at"})
+
+
+def test_attempts_update_stats_and_rebuild_matches(db_session):
+    mission = Mission(title="Задачи", description="", xp_reward=0, mana_reward=0)
+    challenge = CodingChallenge(mission=mission, order=1, title="Сумма", prompt="", expected_output="3")
+    first = User(email="stats1@alabuga.ru", full_name="Первый", role=UserRole.PILOT, hashed_password="x")
+    second = User(email="stats2@alabuga.ru", full_name="Второй", role=UserRole.PILOT, hashed_password="x")
+    db_session.add_all([mission, challenge, first, second])
+    db_session.flush()
+
+    for code in ("print(1 / 0)", "print(2)", "print(3)", "print(3)"):
+        evaluate_challenge(db_session, challenge=challenge, user=first, code=code)
+    evaluate_challenge(db_session, challenge=challenge, user=second, code="print(1 + 2)")
+
+    incremental = _report(db_session, challenge.id)
+    assert (incremental["attempts"], incremental["users"], incremental["passed_users"]) == (5, 2, 2)
+    assert incremental["pass_rate"] == 1.0
+    assert incremental["attempt_pass_rate"] == 0.6
+    assert incremental["first_pass_histogram"] == {"1": 1, "3": 1}
+    assert {item["reason"]: item["count"] for item in incremental["top_failures"]} == {
+        "ZeroDivisionError": 1,
+        "wrong_output": 1,
+    }
+
+    assert rebuild_challenge_stats(db_session, ChallengeKind.CODING) == 1
+    assert _report(db_session, challenge.id) == incremental
@@ -5,10 +5,15 @@ from __future__ import annotations
 import pytest
 from fastapi import HTTPException
 
-from app.models.coding import CodingChallenge
+from app.models.coding import CodingChallenge, CodingProgress
 from app.models.mission import Mission, MissionDifficulty, MissionSubmission, SubmissionStatus
 from app.models.user import User, UserRole
-from app.services.coding import count_completed_challenges, evaluate_challenge
+from app.services.coding import (
+    count_completed_challenges,
+    evaluate_challenge,
+    latest_attempts_by_challenge,
+    list_attempts_page,
+)
 
 
 def _create_user(db_session) -> User:
@@ -105,3 +110,94 @@ def test_failed_attempt_does_not_unlock_next_challenge(db_session):
     follow_up = evaluate_challenge(db_session, challenge=challenge_two, user=user, code="print('Пока')")
     assert follow_up.attempt.is_passed is True
 
+
+
+def test_syntax_error_is_recorded_without_spawning(db_session, monkeypatch):
+    """Синтаксическая ошибка возвращается сразу, интерпретатор не запускается."""
+
+    _, (challenge_one, _) = _create_mission_with_challenges(db_session)
+    user = _create_user(db_session)
+
+    def _fail(*args, **kwargs):  # pragma: no cover - вызов означает ошибку теста
+        raise AssertionError("subprocess не должен запускаться")
+
+    monkeypatch.setattr("app.utils.python_runner.subprocess.run", _fail)
+
+    broken = evaluate_challenge(db_session, challenge=challenge_one, user=user, code="print('Привет'")
+    assert broken.attempt.is_passed is False
+    assert broken.attempt.exit_code == 1
+    assert broken.attempt.stderr.startswith('  File "<string>", line 1')
+    assert "SyntaxError" in broken.attempt.stderr
+
+    forbidden = evaluate_challenge(
+        db_session, challenge=challenge_one, user=user, code="import os\nprint(os.getcwd())"
+    )
+    assert forbidden.attempt.is_passed is False
+    assert forbidden.attempt.stderr.startswith("ImportError")
+
+
+def test_progress_summary_tracks_attempts(db_session):
+    """Сводка хранит число попыток и первую успешную попытку."""
+
+    _, (challenge_one, _) = _create_mission_with_challenges(db_session)
+    user = _create_user(db_session)
+
+    evaluate_challenge(db_session, challenge=challenge_one, user=user, code="print('Не то')")
+    passed = evaluate_challenge(db_session, challenge=challenge_one, user=user, code="print('Привет')")
+    evaluate_challenge(db_session, challenge=challenge_one, user=user, code="print('Привет')")
+
+    progress = (
+        db_session.query(CodingProgress)
+        .filter(CodingProgress.user_id == user.id, CodingProgress.challenge_id == challenge_one.id)
+        .one()
+    )
+    assert progress.attempts == 3
+    assert progress.best_attempt_id == passed.attempt.id
+    assert progress.first_passed_at is not None
+
+
+def test_latest_attempt_and_history_pages(db_session):
+    """Для состояния берём только последнюю попытку, историю отдаём страницами."""
+
+    _, (challenge_one, challenge_two) = _create_mission_with_challenges(db_session)
+    user = _create_user(db_session)
+
+    attempts = [
+        evaluate_challenge(db_session, challenge=challenge_one, user=user, code=f"print({index})").attempt
+        for index in range(3)
+    ]
+
+    latest = latest_attempts_by_challenge(
+        db_session, user=user, challenge_ids=[challenge_one.id, challenge_two.id]
+    )
+    assert list(latest) == [challenge_one.id]
+    assert latest[challenge_one.id].id == attempts[-1].id
+
+    page, next_before_id = list_attempts_page(db_session, user=user, challenge_id=challenge_one.id, limit=2)
+    assert [item.id for item in page] == [attempts[2].id, attempts[1].id]
+    assert next_before_id == attempts[1].id
+
+    page, next_before_id = list_attempts_page(
+        db_session, user=user, challenge_id=challenge_one.id, limit=2, before_id=next_before_id
+    )
+    assert [item.id for item in page] == [attempts[0].id]
+    assert next_before_id is None
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "list(map(print, ['Привет']))",
+        "import builtins\nbuiltins.print('Привет')",
+        "out = print\nout('Привет')",
+        "__import__('sys').stdout.write('Привет\\n')",
+    ],
+)
+def test_output_without_literal_print_call_is_accepted(db_session, code):
+    """Вывод без явного ``print(...)`` не отсекается предварительной проверкой."""
+
+    _, (challenge_one, _) = _create_mission_with_challenges(db_session)
+    user = _create_user(db_session)
+
+    evaluation = evaluate_challenge(db_session, challenge=challenge_one, user=user, code=code)
+    assert evaluation.attempt.is_passed is True
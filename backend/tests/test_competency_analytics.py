@@ -0,0 +1,55 @@
+"""Проверяем тепловую карту уровней компетенций."""
+
+from __future__ import annotations
+
+from app.models.branch import Branch, BranchMission
+from app.models.mission import Mission, MissionCompetencyReward, MissionSubmission
+from app.models.rank import Rank
+from app.models.user import Competency, CompetencyCategory, User, UserCompetency, UserRole
+from app.services import competency_analytics
+from app.services.competency_analytics import build_heatmap, competency_heatmap, load_competency_frame
+from app.services.mission import approve_submission
+
+
+def test_heatmap_groups_levels_by_rank_and_branch(db_session):
+    competency_analytics.invalidate_competency_frame()
+    cadet = Rank(title="Кадет", description="", required_xp=0)
+    analytics = Competency(name="Аналитика", description="", category=CompetencyCategory.ANALYTICS)
+    culture = Competency(name="Культура", description="", category=CompetencyCategory.CULTURE)
+    branch = Branch(title="Основная", description="")
+    mission = Mission(title="Старт", description="", xp_reward=0, mana_reward=0)
+    db_session.add_all([cadet, analytics, culture, branch, mission])
+    db_session.flush()
+    pilots = [
+        User(email=f"h{index}@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+        for index in range(4)
+    ]
+    for pilot in pilots[:3]:
+        pilot.current_rank_id = cadet.id
+    db_session.add_all([*pilots, BranchMission(branch_id=branch.id, mission_id=mission.id, order=1)])
+    db_session.flush()
+    db_session.add_all(
+        UserCompetency(user_id=pilot.id, competency_id=analytics.id, level=level)
+        for pilot, level in zip(pilots, [1, 2, 3, 5])
+    )
+    db_session.add(MissionCompetencyReward(mission_id=mission.id, competency_id=culture.id, level_delta=2))
+    db_session.commit()
+
+    by_rank = build_heatmap(load_competency_frame(db_session), "rank")
+    assert [(group.label, group.pilots) for group in by_rank.groups] == [("—", 1), ("Кадет", 3)]
+    cadets = next(cell for cell in by_rank.cells if cell.group == 1 and cell.competency_id == analytics.id)
+    assert (cadets.mean, cadets.p50, cadets.p90) == (2.0, 2, 2)
+    assert cadets.histogram[:4] == [0, 1, 1, 1]
+
+    # Кэш сбрасывается после коммита, начислившего уровни.
+    before = competency_heatmap(db_session, "branch")
+    assert [group.pilots for group in before.groups] == [4, 0]
+    submission = MissionSubmission(user_id=pilots[0].id, mission_id=mission.id)
+    db_session.add(submission)
+    db_session.flush()
+    approve_submission(db_session, submission)
+
+    after = competency_heatmap(db_session, "branch")
+    assert [group.pilots for group in after.groups] == [3, 1]
+    culture_cell = next(cell for cell in after.cells if cell.group == 1 and cell.competency_id == culture.id)
+    assert culture_cell.p50 == 2
@@ -0,0 +1,120 @@
+"""Проверяем потоковую выгрузку документов кандидатов."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import zipfile
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.models.mission import Mission, MissionSubmission
+from app.models.user import User, UserRole
+from app.services.document_export import collect_export_entries, stream_documents_zip
+from app.services.storage import register_upload, save_submission_document
+
+
+def _store(db, payload: bytes, filename: str, kind: str) -> str:
+    upload = UploadFile(file=io.BytesIO(payload), filename=filename)
+    stored = asyncio.run(save_submission_document(upload=upload, kind=kind))
+    return register_upload(db, stored)
+
+
+def test_zip_is_streamed_in_chunks_with_manifest(db_session, tmp_path, monkeypatch):
+    """Архив собирается кусками, содержит документы и манифест с пропавшими файлами."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    monkeypatch.setattr("app.services.document_export.READ_CHUNK_SIZE", 4096)
+
+    mission = Mission(title="Документы", description="", xp_reward=0, mana_reward=0)
+    other = Mission(title="Другая", description="", xp_reward=0, mana_reward=0)
+    pilots = [
+        User(email=f"p{i}@alabuga.ru", full_name=name, role=UserRole.PILOT, hashed_password="x")
+        for i, name in enumerate(["Иван Петров", "Анна/Смирнова"])
+    ]
+    db_session.add_all([mission, other, *pilots])
+    db_session.flush()
+
+    resume = b"%PDF-1.7\n" + bytes(range(256)) * 200
+    legacy = tmp_path / "submissions" / "legacy.pdf"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_bytes(b"%PDF-1.4 legacy")
+    db_session.add_all(
+        [
+            MissionSubmission(
+                user_id=pilots[0].id,
+                mission_id=mission.id,
+                resume_path=_store(db_session, resume, "cv.pdf", "resume"),
+                passport_path="submissions/legacy.pdf",
+            ),
+            MissionSubmission(
+                user_id=pilots[1].id,
+                mission_id=mission.id,
+                photo_path="submissions/missing.jpg",
+            ),
+            MissionSubmission(
+                user_id=pilots[1].id,
+                mission_id=other.id,
+                resume_path=_store(db_session, b"%PDF-1.4 other", "x.pdf", "resume"),
+            ),
+        ]
+    )
+    db_session.commit()
+
+    entries = collect_export_entries(db_session, mission_id=mission.id)
+    assert [entry.document for entry in entries] == ["passport", "resume", "photo"]
+
+    chunks = list(stream_documents_zip(entries))
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < 4096 * 2
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        names = archive.namelist()
+        first = f"{entries[0].submission_id}_Иван Петров"
+        assert f"{first}/resume.pdf" in names
+        assert archive.read(f"{first}/resume.pdf") == resume
+        assert archive.read(f"{first}/passport.pdf") == b"%PDF-1.4 legacy"
+        assert archive.getinfo(f"{first}/resume.pdf").compress_type == zipfile.ZIP_STORED
+        assert not any("missing" in name or "photo" in name for name in names)
+
+        manifest = list(csv.DictReader(io.StringIO(archive.read("manifest.csv").decode("utf-8-sig"))))
+    assert len(manifest) == 3
+    missing = next(row for row in manifest if row["document"] == "photo")
+    assert missing["included"] == "no"
+    assert missing["full_name"] == "Анна/Смирнова"
+    included = next(row for row in manifest if row["document"] == "resume")
+    assert included["size"] == str(len(resume))
+    assert included["sha256"]
+
+
+def test_paths_outside_uploads_are_not_exported(db_session, tmp_path, monkeypatch):
+    """Пути из базы, выходящие за каталог загрузок, не открываются и не попадают в архив."""
+
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(settings, "uploads_path", uploads)
+    secret = tmp_path / "secret.txt"
+    secret.write_bytes(b"secret")
+    (uploads / "link.pdf").symlink_to(secret)
+
+    mission = Mission(title="Документы", description="", xp_reward=0, mana_reward=0)
+    pilot = User(email="evil@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    db_session.add_all([mission, pilot])
+    db_session.flush()
+    db_session.add(
+        MissionSubmission(
+            user_id=pilot.id,
+            mission_id=mission.id,
+            passport_path="../secret.txt",
+            photo_path=str(secret),
+            resume_path="link.pdf",
+        )
+    )
+    db_session.commit()
+
+    entries = collect_export_entries(db_session, mission_id=mission.id)
+    assert entries == []
+    with zipfile.ZipFile(io.BytesIO(b"".join(stream_documents_zip(entries)))) as archive:
+        assert archive.namelist() == ["manifest.csv"]
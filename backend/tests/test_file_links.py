@@ -0,0 +1,115 @@
+"""Проверяем подписанные ссылки на документы и отдачу по диапазонам."""
+
+from __future__ import annotations
+
+import hashlib
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import files
+from app.core.config import settings
+from app.services.blobs import blob_relative_path
+from app.services.file_links import sign_file_link, verify_file_link
+from app.utils.http_ranges import RangeNotSatisfiableError, parse_byte_range
+
+PAYLOAD = b"%PDF-1.7\n" + bytes(range(256)) * 8
+
+
+@pytest.fixture()
+def stored_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    monkeypatch.setattr(settings, "file_offload_header", None)
+    digest = hashlib.sha256(PAYLOAD).hexdigest()
+    path = tmp_path / blob_relative_path(digest)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(PAYLOAD)
+    return digest
+
+
+@pytest.fixture()
+def client():
+    app = FastAPI()
+    app.include_router(files.router)
+    return TestClient(app)
+
+
+def test_signature_covers_every_field():
+    """Подмена любого поля или истёкший срок делают ссылку недействительной."""
+
+    digest = "a" * 64
+    link = sign_file_link(digest, name="resume.pdf", mime_type="application/pdf", ttl_seconds=60, now=1000)
+    query = {key: values[0] for key, values in parse_qs(urlsplit(link.url).query).items()}
+    assert link.expires == 1060
+    fields = dict(expires=1060, name="resume.pdf", mime_type="application/pdf", signature=query["signature"])
+
+    assert verify_file_link(digest, now=1000, **fields)
+    assert not verify_file_link(digest, now=1061, **fields)
+    assert not verify_file_link("b" * 64, now=1000, **fields)
+    assert not verify_file_link(digest, now=1000, **{**fields, "name": "passport.pdf"})
+    assert not verify_file_link(digest, now=1000, **{**fields, "mime_type": "text/html"})
+    assert not verify_file_link(digest, now=1000, **{**fields, "expires": 99999})
+
+
+def test_parse_byte_range():
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert parse_byte_range("bytes=50-500", 100) == (50, 99)
+    assert parse_byte_range("bytes=0-1,5-6", 100) is None
+    assert parse_byte_range("items=0-1", 100) is None
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_byte_range("bytes=100-", 100)
+
+
+def test_signed_download_supports_ranges_and_etag(stored_file, client):
+    """Файл отдаётся целиком, по диапазону и с 304 по ETag; чужая подпись — 403."""
+
+    url = sign_file_link(stored_file, name="резюме.pdf", mime_type="application/pdf").url
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == PAYLOAD
+    assert full.headers["content-type"] == "application/pdf"
+    assert full.headers["etag"] == f'"{stored_file}"'
+    assert "filename*=utf-8''" in full.headers["content-disposition"]
+
+    part = client.get(url, headers={"Range": "bytes=9-18"})
+    assert part.status_code == 206
+    assert part.content == PAYLOAD[9:19]
+    assert part.headers["content-range"] == f"bytes 9-18/{len(PAYLOAD)}"
+
+    stale = client.get(url, headers={"Range": "bytes=9-18", "If-Range": '"other"'})
+    assert stale.status_code == 200
+    assert stale.content == PAYLOAD
+
+    outside = client.get(url, headers={"Range": f"bytes={len(PAYLOAD)}-"})
+    assert outside.status_code == 416
+    assert outside.headers["content-range"] == f"bytes */{len(PAYLOAD)}"
+
+    cached = client.get(url, headers={"If-None-Match": full.headers["etag"]})
+    assert cached.status_code == 304
+
+    head = client.head(url)
+    assert head.status_code == 200
+    assert head.headers["content-length"] == str(len(PAYLOAD))
+
+    assert client.get(url.replace("signature=", "signature=x")).status_code == 403
+    expired = sign_file_link(stored_file, name="a.pdf", mime_type="application/pdf", ttl_seconds=-1).url
+    assert client.get(expired).status_code == 403
+
+
+def test_offload_returns_internal_path(stored_file, client, monkeypatch):
+    """При включённой отдаче прокси тело не читается, а путь уходит в заголовке."""
+
+    monkeypatch.setattr(settings, "file_offload_header", "X-Accel-Redirect")
+    url = sign_file_link(stored_file, name="resume.pdf", mime_type="application/pdf").url
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/{blob_relative_path(stored_file)}"
+    assert response.headers["content-type"] == "application/pdf"
@@ -0,0 +1,60 @@
+"""Проверяем подготовку WebP-вариантов фото профиля."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from app.core.config import settings
+from app.services.images import (
+    PHOTO_SIZES,
+    InvalidImageError,
+    generate_photo_variants,
+    photo_variant,
+)
+from app.services.storage import save_profile_photo
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color=(200, 40, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_variants_are_webp_and_fit_target_sizes(tmp_path, monkeypatch):
+    """Каждый размер — WebP в пределах стороны, ETag зависит только от содержимого."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    upload = UploadFile(file=io.BytesIO(_png(1600, 800)), filename="me.png")
+    stored = asyncio.run(save_profile_photo(upload=upload))
+
+    key = generate_photo_variants(stored.relative_path)
+    assert key == stored.sha256
+    for size in PHOTO_SIZES:
+        path, etag = photo_variant(stored.relative_path, size)
+        assert etag == f'"{stored.sha256[:32]}-{size}"'
+        with Image.open(path) as variant:
+            assert variant.format == "WEBP"
+            assert max(variant.size) == size
+            assert variant.size[0] == 2 * variant.size[1]
+
+    small = UploadFile(file=io.BytesIO(_png(40, 40)), filename="tiny.png")
+    stored_small = asyncio.run(save_profile_photo(upload=small))
+    path, _ = photo_variant(stored_small.relative_path, 1024)
+    with Image.open(path) as variant:
+        assert variant.size == (40, 40)
+
+
+def test_broken_image_is_rejected(tmp_path, monkeypatch):
+    """Файл с подписью PNG, но без изображения, не превращается в миниатюры."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    upload = UploadFile(file=io.BytesIO(b"\x89PNG\r\n\x1a\n" + b"0" * 64), filename="fake.png")
+    stored = asyncio.run(save_profile_photo(upload=upload))
+
+    with pytest.raises(InvalidImageError):
+        generate_photo_variants(stored.relative_path)
@@ -0,0 +1,89 @@
+"""Проверяем вехи пилотов, воронку и недельные когорты."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+from app.models.milestone import UserMilestone, UserMilestoneKind
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.rank import Rank
+from app.models.user import User, UserRole
+from app.services.milestones import (
+    backfill_milestones,
+    compute_funnel,
+    compute_retention,
+    record_milestone,
+)
+
+MONDAY = datetime(2024, 10, 7, 9, tzinfo=timezone.utc)
+
+
+def _pilot(index: int) -> User:
+    return User(email=f"m{index}@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+
+
+def test_backfill_is_idempotent_and_keeps_first_moment(db_session):
+    base = Rank(title="Кадет", description="", required_xp=0)
+    second = Rank(title="Пилот", description="", required_xp=100)
+    mission = Mission(title="Старт", description="", xp_reward=100, mana_reward=0)
+    pilots = [_pilot(index) for index in range(3)]
+    db_session.add_all([base, second, mission, *pilots])
+    db_session.flush()
+    pilots[0].current_rank_id = second.id
+    pilots[1].current_rank_id = base.id
+    db_session.add_all(
+        [
+            MissionSubmission(user_id=pilots[0].id, mission_id=mission.id, status=SubmissionStatus.APPROVED),
+            MissionSubmission(user_id=pilots[1].id, mission_id=mission.id),
+        ]
+    )
+    db_session.commit()
+
+    early = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    record_milestone(db_session, pilots[2].id, UserMilestoneKind.REGISTERED, reached_at=early)
+    db_session.commit()
+
+    # Регистрации двух пилотов (третья уже есть), две первые отправки, одно одобрение, один ранг.
+    assert backfill_milestones(db_session) == 6
+    assert backfill_milestones(db_session) == 0
+    reached = {(row.user_id, row.milestone) for row in db_session.query(UserMilestone)}
+    assert (pilots[0].id, UserMilestoneKind.SECOND_RANK) in reached
+    assert (pilots[1].id, UserMilestoneKind.SECOND_RANK) not in reached
+    kept = db_session.get(UserMilestone, (pilots[2].id, UserMilestoneKind.REGISTERED))
+    assert kept.reached_at.replace(tzinfo=timezone.utc) == early
+
+
+def test_funnel_and_retention_count_cohort_milestones(db_session):
+    pilots = [_pilot(index) for index in range(4)]
+    db_session.add_all(pilots)
+    db_session.flush()
+    steps = [
+        (UserMilestoneKind.REGISTERED, timedelta()),
+        (UserMilestoneKind.ONBOARDING_COMPLETED, timedelta(hours=2)),
+        (UserMilestoneKind.FIRST_SUBMISSION, timedelta(days=9)),
+    ]
+    for index, pilot in enumerate(pilots):
+        # Первый пилот прошёл три шага, второй — два, остальные только зарегистрировались.
+        for kind, delay in steps[: max(1, 3 - index)]:
+            record_milestone(db_session, pilot.id, kind, reached_at=MONDAY + delay)
+    outsider = _pilot(99)
+    db_session.add(outsider)
+    db_session.flush()
+    record_milestone(db_session, outsider.id, UserMilestoneKind.REGISTERED, reached_at=MONDAY - timedelta(days=30))
+    db_session.commit()
+
+    funnel = compute_funnel(db_session, date_from=MONDAY.date(), date_to=MONDAY.date() + timedelta(days=6))
+    users = {step.milestone: step for step in funnel.steps}
+    assert users[UserMilestoneKind.REGISTERED].users == 4
+    assert users[UserMilestoneKind.ONBOARDING_COMPLETED].users == 2
+    assert users[UserMilestoneKind.ONBOARDING_COMPLETED].conversion_from_previous == 0.5
+    assert users[UserMilestoneKind.ONBOARDING_COMPLETED].average_hours_from_previous == 2.0
+    assert users[UserMilestoneKind.FIRST_SUBMISSION].conversion_from_start == 0.25
+    assert users[UserMilestoneKind.SECOND_RANK].users == 0
+
+    retention = compute_retention(db_session, cohorts=2, weeks=3, today=date(2024, 10, 16))
+    (cohort,) = retention.cohorts
+    assert cohort.week_start == MONDAY.date()
+    assert cohort.size == 4
+    assert cohort.reached_by_week[UserMilestoneKind.ONBOARDING_COMPLETED] == [2, 2, 2]
+    assert cohort.reached_by_week[UserMilestoneKind.FIRST_SUBMISSION] == [0, 1, 1]
@@ -0,0 +1,157 @@
+"""Проверяем очередь модерации с арендой отправок и пакетные решения."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, update
+
+from app.models.artifact import Artifact, ArtifactRarity
+from app.models.journal import JournalEntry
+from app.models.mission import Mission, MissionCompetencyReward, MissionSubmission, SubmissionStatus
+from app.models.rank import Rank
+from app.models.user import Competency, CompetencyCategory, User, UserCompetency, UserRole
+from app.services.mission import reject_submission
+from app.services.moderation import (
+    bulk_review_submissions,
+    claim_submissions,
+    ensure_review_lease,
+    list_queue_page,
+    release_submission,
+)
+
+
+def _seed(db_session, count: int) -> tuple[User, User]:
+    first = User(email="hr1@alabuga.ru", full_name="HR 1", role=UserRole.HR, hashed_password="x")
+    second = User(email="hr2@alabuga.ru", full_name="HR 2", role=UserRole.HR, hashed_password="x")
+    mission = Mission(title="M", description="", xp_reward=10, mana_reward=5)
+    pilots = [
+        User(email=f"p{index}@alabuga.ru", full_name=f"Пилот {index}", role=UserRole.PILOT, hashed_password="x")
+        for index in range(count)
+    ]
+    db_session.add_all([first, second, mission, *pilots])
+    db_session.flush()
+    db_session.add_all([MissionSubmission(user_id=pilot.id, mission_id=mission.id) for pilot in pilots])
+    db_session.commit()
+    return first, second
+
+
+def test_reviewers_claim_disjoint_batches_and_leases_expire(db_session):
+    first, second = _seed(db_session, 5)
+
+    batch_one = claim_submissions(db_session, reviewer=first, limit=3)
+    batch_two = claim_submissions(db_session, reviewer=second, limit=3)
+    assert len(batch_one) == 3 and len(batch_two) == 2
+    assert not {item.id for item in batch_one} & {item.id for item in batch_two}
+    assert batch_one[0].user.full_name == "Пилот 0"
+    assert all(item.review_claimed_by_id == first.id for item in batch_one)
+
+    # Повторный вызов возвращает свои же отправки, чужие недоступны до конца аренды.
+    assert [item.id for item in claim_submissions(db_session, reviewer=first, limit=3)] == [
+        item.id for item in batch_one
+    ]
+    with pytest.raises(HTTPException) as conflict:
+        ensure_review_lease(batch_one[0], second)
+    assert conflict.value.status_code == 409
+
+    reject_submission(db_session, batch_one[0], "Нет фото")
+    assert batch_one[0].review_claimed_by_id is None
+    release_submission(db_session, batch_one[1], reviewer=first)
+    db_session.execute(
+        update(MissionSubmission)
+        .where(MissionSubmission.id == batch_one[2].id)
+        .values(review_lease_expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    )
+    db_session.commit()
+
+    reclaimed = claim_submissions(db_session, reviewer=second, limit=10)
+    assert {item.id for item in reclaimed} == {batch_one[1].id, batch_one[2].id} | {
+        item.id for item in batch_two
+    }
+
+
+def test_queue_pages_follow_keyset_cursor(db_session):
+    _seed(db_session, 5)
+    # Одинаковое время создания не мешает листать страницы.
+    db_session.execute(update(MissionSubmission).values(created_at=datetime(2024, 10, 20, 12, 0, 0)))
+    db_session.commit()
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        items, cursor = list_queue_page(
+            db_session, status_filter=SubmissionStatus.PENDING, limit=2, cursor=cursor
+        )
+        seen.extend(item.id for item in items)
+        if cursor is None:
+            break
+    assert seen == sorted(seen) and len(seen) == 5
+    assert items[-1].mission.title == "M"
+
+
+def test_bulk_approve_applies_rewards_once_per_pilot(db_session):
+    first, second = _seed(db_session, 4)
+    mission = db_session.query(Mission).one()
+    competency = Competency(name="Навигация", description="", category=CompetencyCategory.COMMUNICATION)
+    artifact = Artifact(name="Значок", description="", rarity=ArtifactRarity.COMMON)
+    db_session.add_all([competency, artifact, Rank(title="Кадет", description="", required_xp=10)])
+    db_session.flush()
+    mission.artifact_id = artifact.id
+    db_session.add(MissionCompetencyReward(mission_id=mission.id, competency_id=competency.id, level_delta=2))
+    db_session.commit()
+
+    submissions = db_session.query(MissionSubmission).order_by(MissionSubmission.id).all()
+    claim_submissions(db_session, reviewer=second, limit=1)
+    submissions[1].status = SubmissionStatus.APPROVED
+    db_session.commit()
+
+    ids = [submission.id for submission in submissions]
+    outcomes, rank_ups = bulk_review_submissions(
+        db_session, reviewer=first, submission_ids=[*ids, 999, ids[2]], decision="approve"
+    )
+    assert [(item.submission_id, item.result) for item in outcomes] == [
+        (ids[0], "conflict"),
+        (ids[1], "skipped"),
+        (ids[2], "approved"),
+        (ids[3], "approved"),
+        (999, "not_found"),
+    ]
+    assert rank_ups == 2
+
+    db_session.expire_all()
+    approved = [db_session.get(MissionSubmission, submission_id) for submission_id in ids[2:]]
+    for submission in approved:
+        pilot = submission.user
+        assert submission.status == SubmissionStatus.APPROVED
+        assert (pilot.xp, pilot.mana) == (10, 5)
+        assert pilot.current_rank.title == "Кадет"
+        assert [artifact.artifact_id for artifact in pilot.artifacts] == [artifact.id]
+        assert db_session.query(UserCompetency).filter_by(user_id=pilot.id).one().level == 2
+        # Артефакт, подтверждение миссии и повышение ранга.
+        assert db_session.query(JournalEntry).filter_by(user_id=pilot.id).count() == 3
+
+
+def test_bulk_approve_query_count_does_not_grow_with_batch(db_session):
+    """Пачка одобряется фиксированным числом запросов, включая пересчёт рангов."""
+
+    first, _ = _seed(db_session, 200)
+    db_session.add(Rank(title="Кадет", description="", required_xp=10))
+    db_session.commit()
+    ids = [submission.id for submission in db_session.query(MissionSubmission)]
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        _, rank_ups = bulk_review_submissions(db_session, reviewer=first, submission_ids=ids, decision="approve")
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    assert rank_ups == 200
+    assert len(statements) < 30
@@ -0,0 +1,70 @@
+"""Проверяем историю статусов и перцентили времени до решения HR."""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.submission_history import SubmissionStatusEvent
+from app.models.user import User, UserRole
+from app.services.moderation_sla import change_status, load_histograms, moderation_sla_report
+from app.utils.sketch import LogHistogram
+
+START = datetime(2024, 10, 1, 9, tzinfo=timezone.utc)
+
+
+def test_log_histogram_quantiles_are_relative_accurate_and_mergeable():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(8, 1.5) for _ in range(20000)]
+    left, right = LogHistogram(), LogHistogram()
+    for index, value in enumerate(values):
+        (left if index % 2 else right).add(value)
+    merged = LogHistogram(left.counts).merge(right)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(merged.quantile(q) - exact) / exact <= 0.011
+    assert merged.count == len(values)
+    assert LogHistogram().quantile(0.5) is None
+
+
+def test_decisions_feed_histograms_and_history(db_session):
+    pilot = User(email="sla@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    hr = User(email="sla-hr@alabuga.ru", full_name="HR", role=UserRole.HR, hashed_password="x")
+    missions = [Mission(title=f"Миссия {index}", description="", xp_reward=0, mana_reward=0) for index in range(3)]
+    db_session.add_all([pilot, hr, *missions])
+    db_session.flush()
+    submissions = [MissionSubmission(user_id=pilot.id, mission_id=mission.id) for mission in missions]
+    db_session.add_all(submissions)
+    db_session.flush()
+    change_status(
+        db_session,
+        submissions,
+        SubmissionStatus.PENDING,
+        actor_id=pilot.id,
+        previous={submission.id: None for submission in submissions},
+        now=START,
+    )
+    db_session.commit()
+
+    first, second = submissions[0], submissions[1]
+    change_status(db_session, [first], SubmissionStatus.APPROVED, actor_id=hr.id, now=START + timedelta(hours=1))
+    change_status(db_session, [second], SubmissionStatus.REJECTED, actor_id=hr.id, now=START + timedelta(hours=3))
+    # Повторный переход в тот же статус не пишется, автоматический зачёт не входит в SLA.
+    change_status(db_session, [second], SubmissionStatus.REJECTED, actor_id=hr.id)
+    db_session.commit()
+
+    assert db_session.query(SubmissionStatusEvent).count() == 5
+    assert set(load_histograms(db_session, "mission")) == {missions[0].id, missions[1].id}
+
+    report = moderation_sla_report(db_session, now=START + timedelta(hours=5))
+    assert report.overall.decisions == 2
+    assert abs(report.overall.p50_seconds - 3600) / 3600 < 0.011
+    slow = next(item for item in report.by_mission if item.scope_id == missions[1].id)
+    assert abs(slow.p99_seconds - 3 * 3600) / (3 * 3600) < 0.011
+    (reviewer,) = report.by_reviewer
+    assert (reviewer.scope_id, reviewer.title, reviewer.decisions) == (hr.id, "HR", 2)
+    assert report.queue.pending == 1
+    assert report.queue.oldest_pending_seconds == 5 * 3600
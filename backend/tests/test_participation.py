@@ -0,0 +1,30 @@
+"""Проверяем подсчёт участников миссий сгруппированным запросом."""
+
+from __future__ import annotations
+
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.user import User, UserRole
+from app.services.participation import mission_participation, participation_by_mission
+
+
+def test_participation_counts_statuses_per_mission(db_session):
+    pilots = [
+        User(email=f"p{index}@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+        for index in range(3)
+    ]
+    event = Mission(title="Событие", description="", xp_reward=0, mana_reward=0, capacity=2)
+    quiet = Mission(title="Тихая", description="", xp_reward=0, mana_reward=0)
+    db_session.add_all([*pilots, event, quiet])
+    db_session.flush()
+    statuses = [SubmissionStatus.PENDING, SubmissionStatus.APPROVED, SubmissionStatus.REJECTED]
+    db_session.add_all(
+        MissionSubmission(user_id=pilot.id, mission_id=event.id, status=value)
+        for pilot, value in zip(pilots, statuses)
+    )
+    db_session.commit()
+
+    stats = participation_by_mission(db_session, [event.id, quiet.id])
+    assert list(stats) == [event.id]
+    assert (stats[event.id].pending, stats[event.id].approved, stats[event.id].rejected) == (1, 1, 1)
+    assert stats[event.id].registered_participants == 2
+    assert mission_participation(db_session, quiet.id).registered_participants == 0
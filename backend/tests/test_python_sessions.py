@@ -0,0 +1,92 @@
+"""Проверяем интерактивные сессии Python."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.utils.python_sessions import ReplSessionManager, SessionsBusyError
+
+
+def test_session_keeps_namespace_and_evicts_lru():
+    """Переменные живут между запусками, а лишние сессии вытесняются."""
+
+    manager = ReplSessionManager(max_sessions=1, idle_timeout=60)
+    try:
+        result, started = manager.run(1, "x = 21")
+        assert started is True
+        assert result.exit_code == 0
+
+        result, started = manager.run(1, "print(x * 2)")
+        assert started is False
+        assert result.stdout == "42\n"
+
+        result, _ = manager.run(1, "1 / 0")
+        assert result.exit_code == 1
+        assert "ZeroDivisionError" in result.stderr
+        assert 'File "<session>"' in result.stderr
+
+        # Вторая сессия вытесняет первую: лимит — одна сессия на процесс.
+        _, started = manager.run(2, "y = 1")
+        assert started is True
+        assert len(manager) == 1
+
+        result, started = manager.run(1, "print('x' in globals())")
+        assert started is True
+        assert result.stdout == "False\n"
+    finally:
+        manager.close_all()
+
+
+def test_session_timeout_restarts_interpreter():
+    """Зависший фрагмент прерывается, а следующая команда получает свежую сессию."""
+
+    manager = ReplSessionManager(max_sessions=2, idle_timeout=60)
+    try:
+        result, _ = manager.run(1, "while True:\n    pass", timeout=0.5)
+        assert result.timeout is True
+
+        result, started = manager.run(1, "print('ok')")
+        assert started is True
+        assert result.stdout == "ok\n"
+    finally:
+        manager.close_all()
+
+
+def test_busy_session_is_not_evicted():
+    """Сессию, в которой идёт фрагмент, не вытесняем: новый ключ получает отказ."""
+
+    manager = ReplSessionManager(max_sessions=1, idle_timeout=60)
+    try:
+        manager.run(1, "import time")
+        worker = threading.Thread(target=manager.run, args=(1, "time.sleep(1)"))
+        worker.start()
+        deadline = time.monotonic() + 5
+        while manager._sessions[1].users == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        with pytest.raises(SessionsBusyError):
+            manager.run(2, "y = 1")
+        worker.join()
+
+        result, started = manager.run(1, "print(time.__name__)")
+        assert (result.stdout, started) == ("time\n", False)
+    finally:
+        manager.close_all()
+
+
+def test_reaper_closes_idle_sessions():
+    """Фоновый поток закрывает простаивающие сессии без новых запросов."""
+
+    manager = ReplSessionManager(max_sessions=2, idle_timeout=0.2)
+    try:
+        manager.run(1, "x = 1")
+        manager.start_reaper(0.05)
+        deadline = time.monotonic() + 5
+        while len(manager) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(manager) == 0
+    finally:
+        manager.close_all()
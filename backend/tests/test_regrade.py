@@ -0,0 +1,110 @@
+"""Проверяем массовую перепроверку попыток."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.models.coding import CodingAttempt, CodingChallenge
+from app.models.mission import Mission, MissionSubmission, SubmissionStatus
+from app.models.regrade import RegradeJob, RegradeJobStatus, RegradeTarget
+from app.models.user import User, UserRole
+from app.services import regrade
+from app.services.regrade import claim_regrade_job_for_resume, create_regrade_job, run_regrade_job
+from app.utils.python_runner import PythonRunResult
+from app.utils.runner_client import RunnerBusyError
+
+
+def test_regrade_fixes_wrong_expected_output(db_session):
+    """После исправления эталона старые попытки засчитываются и миссия закрывается."""
+
+    mission = Mission(title="Миссия", description="Одна задача", xp_reward=50, mana_reward=10)
+    challenge = CodingChallenge(
+        mission=mission,
+        order=1,
+        title="Сумма",
+        prompt="Выведите 2 + 2",
+        expected_output="5",
+    )
+    pilots = [
+        User(email=f"pilot{index}@alabuga.space", full_name="Пилот", role=UserRole.PILOT, hashed_password="hash")
+        for index in range(3)
+    ]
+    db_session.add_all([mission, challenge, *pilots])
+    db_session.flush()
+
+    for pilot in pilots:
+        db_session.add(
+            CodingAttempt(challenge_id=challenge.id, user_id=pilot.id, code="print(2 + 2)", stdout="4\n")
+        )
+    db_session.add(
+        CodingAttempt(challenge_id=challenge.id, user_id=pilots[0].id, code="print(5)", stdout="5\n", is_passed=True)
+    )
+    challenge.expected_output = "4"
+    db_session.commit()
+
+    job = create_regrade_job(db_session, target=RegradeTarget.CODING, challenge_id=challenge.id)
+    assert job.total_attempts == 4
+
+    job = run_regrade_job(db_session, job, batch_size=2)
+
+    assert job.status == RegradeJobStatus.COMPLETED
+    assert job.processed_attempts == 4
+    assert job.unique_programs == 2
+    assert job.changed_attempts == 4
+    assert sorted(job.newly_passed_ids) == sorted(pilot.id for pilot in pilots)
+
+    approved = (
+        db_session.query(MissionSubmission)
+        .filter(MissionSubmission.mission_id == mission.id, MissionSubmission.status == SubmissionStatus.APPROVED)
+        .count()
+    )
+    assert approved == 3
+
+
+def test_missing_challenge_fails_job_and_running_job_is_not_resumed(db_session):
+    """Ошибка подготовки сохраняется в задаче; идущую задачу второй раз не запускаем."""
+
+    job = RegradeJob(target=RegradeTarget.CODING, challenge_id=404, total_attempts=0, newly_passed_ids=[])
+    db_session.add(job)
+    db_session.commit()
+
+    with pytest.raises(ValueError):
+        run_regrade_job(db_session, job)
+    db_session.refresh(job)
+    assert job.status == RegradeJobStatus.FAILED
+    assert job.error == "Задание не найдено"
+
+    assert claim_regrade_job_for_resume(db_session, job.id) is True
+    db_session.refresh(job)
+    assert job.status == RegradeJobStatus.RUNNING
+    assert claim_regrade_job_for_resume(db_session, job.id) is False
+
+
+def test_busy_runners_are_retried_instead_of_failing_the_job(db_session, monkeypatch):
+    """Занятость воркеров пережидается, а не роняет всю перепроверку."""
+
+    mission = Mission(title="Миссия", description="", xp_reward=0, mana_reward=0)
+    challenge = CodingChallenge(mission=mission, order=1, title="Ответ", prompt="", expected_output="4")
+    pilot = User(email="busy@alabuga.space", full_name="Пилот", role=UserRole.PILOT, hashed_password="hash")
+    db_session.add_all([mission, challenge, pilot])
+    db_session.flush()
+    db_session.add(CodingAttempt(challenge_id=challenge.id, user_id=pilot.id, code="print(4)", stdout="4\n"))
+    db_session.commit()
+
+    calls = []
+
+    def flaky_runner(code, timeout, *, stdin=None):
+        calls.append(code)
+        if len(calls) < 3:
+            raise RunnerBusyError("заняты")
+        return PythonRunResult(stdout="4\n", stderr="", exit_code=0)
+
+    monkeypatch.setattr(regrade, "run_user_python_code", flaky_runner)
+    monkeypatch.setattr(regrade, "RETRY_DELAYS", (0.0, 0.0, 0.0))
+
+    job = create_regrade_job(db_session, target=RegradeTarget.CODING, challenge_id=challenge.id)
+    job = run_regrade_job(db_session, job)
+
+    assert job.status == RegradeJobStatus.COMPLETED
+    assert job.changed_attempts == 1
+    assert len(calls) == 3
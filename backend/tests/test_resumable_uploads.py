@@ -0,0 +1,190 @@
+"""Проверяем возобновляемую загрузку вложений по частям."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.blob import StoredBlob
+from app.models.upload import UploadSession
+from app.models.user import User, UserRole
+from app.services.blobs import blob_relative_path
+from app.services import resumable_uploads
+from app.services.resumable_uploads import (
+    append_chunk,
+    complete_upload,
+    consume_upload,
+    create_upload_session,
+    expire_upload_sessions,
+    staging_path,
+)
+
+PAYLOAD = b"%PDF-1.7\n" + bytes(range(256)) * 40
+
+
+async def _body(data: bytes, piece: int = 1000):
+    for start in range(0, len(data), piece):
+        yield data[start : start + piece]
+
+
+def _put(db, upload, offset: int, data: bytes, *, checksum: str | None = None):
+    checksum = checksum or hashlib.sha256(data).hexdigest()
+    return asyncio.run(append_chunk(db, upload, offset=offset, body=_body(data), checksum=checksum))
+
+
+def test_chunks_resume_from_offset_and_finalize_into_blob(db_session, tmp_path, monkeypatch):
+    """Повтор и битая часть не сдвигают смещение; готовый файл попадает в хранилище."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    pilot = User(email="up@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    db_session.add(pilot)
+    db_session.commit()
+
+    digest = hashlib.sha256(PAYLOAD).hexdigest()
+    upload = create_upload_session(
+        db_session, user=pilot, kind="passport", size=len(PAYLOAD), filename="scan.pdf", sha256=digest
+    )
+    first, rest = PAYLOAD[:4096], PAYLOAD[4096:]
+
+    upload = _put(db_session, upload, 0, first)
+    assert upload.received == 4096
+
+    with pytest.raises(HTTPException) as conflict:
+        _put(db_session, upload, 0, first)
+    assert conflict.value.status_code == 409
+    assert conflict.value.headers["Upload-Offset"] == "4096"
+
+    with pytest.raises(HTTPException) as corrupted:
+        _put(db_session, upload, 4096, rest, checksum="0" * 64)
+    assert corrupted.value.status_code == 400
+    assert upload.received == 4096
+    assert staging_path(upload).stat().st_size == 4096
+
+    with pytest.raises(HTTPException) as early:
+        asyncio.run(complete_upload(db_session, upload))
+    assert early.value.status_code == 409
+
+    upload = _put(db_session, upload, 4096, rest)
+    assert upload.received == len(PAYLOAD)
+
+    upload = asyncio.run(complete_upload(db_session, upload))
+    assert upload.relative_path == blob_relative_path(digest)
+    assert (tmp_path / upload.relative_path).read_bytes() == PAYLOAD
+    assert not staging_path(upload).exists()
+    blob = db_session.query(StoredBlob).one()
+    assert blob.extension == ".pdf"
+    assert blob.mime_type == "application/pdf"
+
+    with pytest.raises(HTTPException) as wrong_kind:
+        consume_upload(db_session, user=pilot, upload_id=upload.id, kind="photo")
+    assert wrong_kind.value.status_code == 400
+    assert consume_upload(db_session, user=pilot, upload_id=upload.id, kind="passport") == upload.relative_path
+    db_session.commit()
+    assert db_session.query(UploadSession).count() == 0
+
+
+def test_wrong_type_is_rejected_on_first_chunk_and_sessions_expire(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    pilot = User(email="up2@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    db_session.add(pilot)
+    db_session.commit()
+
+    upload = create_upload_session(db_session, user=pilot, kind="photo", size=100)
+    with pytest.raises(HTTPException) as rejected:
+        _put(db_session, upload, 0, b"MZ" + b"\x00" * 98)
+    assert rejected.value.status_code == 400
+    assert upload.received == 0
+
+    with pytest.raises(HTTPException) as too_big:
+        create_upload_session(db_session, user=pilot, kind="photo", size=10**9)
+    assert too_big.value.status_code == 413
+
+    upload.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    db_session.commit()
+    assert expire_upload_sessions(db_session) == 1
+    assert not staging_path(upload).exists()
+
+
+def test_losing_request_does_not_touch_accepted_bytes(db_session, tmp_path, monkeypatch):
+    """Запрос, проигравший гонку за смещение, не обрезает и не перезаписывает файл."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    pilot = User(email="up3@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    db_session.add(pilot)
+    db_session.commit()
+
+    upload = create_upload_session(db_session, user=pilot, kind="passport", size=len(PAYLOAD))
+    upload = _put(db_session, upload, 0, PAYLOAD[:4096])
+
+    # Второй запрос с той же частью прочитал сессию до того, как первый сдвинул смещение.
+    for checksum, code in (("0" * 64, 400), (None, 409)):
+        upload.received = 0
+        with pytest.raises(HTTPException) as lost:
+            _put(db_session, upload, 0, b"%PDF-1.7\n" + b"x" * 4087, checksum=checksum)
+        assert lost.value.status_code == code
+        db_session.refresh(upload)
+        assert upload.received == 4096
+        assert staging_path(upload).read_bytes() == PAYLOAD[:4096]
+
+    assert list(staging_path(upload).parent.glob("*.chunk")) == []
+
+
+def test_chunk_commit_does_not_block_event_loop_writers(db_session, tmp_path, monkeypatch):
+    """Пока часть переносится в файл, запись другого запроса в цикле событий не упирается в блокировку."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    pilot = User(email="up4@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    db_session.add(pilot)
+    db_session.commit()
+
+    done = create_upload_session(db_session, user=pilot, kind="passport", size=len(PAYLOAD))
+    done = asyncio.run(complete_upload(db_session, _put(db_session, done, 0, PAYLOAD)))
+    done_id, done_path = done.id, done.relative_path
+    pending = create_upload_session(db_session, user=pilot, kind="passport", size=len(PAYLOAD))
+
+    copy_chunk = resumable_uploads._copy_chunk
+
+    def slow_copy(*args):
+        # Держим транзакцию с блокировкой записи открытой, пока идёт перенос.
+        time.sleep(0.3)
+        copy_chunk(*args)
+
+    monkeypatch.setattr(resumable_uploads, "_copy_chunk", slow_copy)
+
+    other = SessionLocal()
+
+    async def consume():
+        await asyncio.sleep(0.1)
+        path = consume_upload(other, user=pilot, upload_id=done_id, kind="passport")
+        other.commit()
+        return path
+
+    async def scenario():
+        chunk = PAYLOAD[:4096]
+        return await asyncio.gather(
+            append_chunk(
+                db_session,
+                pending,
+                offset=0,
+                body=_body(chunk),
+                checksum=hashlib.sha256(chunk).hexdigest(),
+            ),
+            consume(),
+        )
+
+    started = time.monotonic()
+    try:
+        appended, consumed = asyncio.run(scenario())
+    finally:
+        other.close()
+    assert time.monotonic() - started < 3
+    assert appended.received == 4096
+    assert consumed == done_path
+    assert db_session.query(UploadSession).count() == 1
@@ -0,0 +1,87 @@
+"""Проверяем вынесенные воркеры запуска кода."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app.utils.runner_client import RunnerBusyError, RunnerPool, RunnerUnavailableError
+from app.utils.runner_worker import create_server
+
+
+@pytest.fixture()
+def worker_endpoint(tmp_path):
+    endpoint = f"unix:{tmp_path / 'runner.sock'}"
+    server = create_server(endpoint, concurrency=2, token="secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield endpoint
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_runs_code_on_worker(worker_endpoint):
+    """Код выполняется воркером, stdin доходит до программы."""
+
+    pool = RunnerPool([worker_endpoint], token="secret", allow_local_fallback=False)
+    result = pool.run("print(input()[::-1])", timeout=5.0, stdin="абв\n")
+
+    assert result.exit_code == 0
+    assert result.stdout == "вба\n"
+
+    pool.check_health()
+    assert pool._workers[0].healthy is True
+    assert pool._workers[0].capacity == 2
+    assert pool.capacity() == 2
+
+
+def test_pool_skips_dead_workers(tmp_path, worker_endpoint):
+    """Недоступный воркер пропускается, а без живых воркеров срабатывает fallback."""
+
+    dead = f"unix:{tmp_path / 'missing.sock'}"
+    pool = RunnerPool([dead, worker_endpoint], token="secret", allow_local_fallback=False)
+    assert pool.run("print(42)", timeout=5.0).stdout == "42\n"
+    assert pool._workers[0].healthy is False
+
+    strict = RunnerPool([dead], allow_local_fallback=False)
+    with pytest.raises(RunnerUnavailableError):
+        strict.run("print(1)", timeout=5.0)
+
+    lenient = RunnerPool([dead], allow_local_fallback=True)
+    assert lenient.run("print(1)", timeout=5.0).stdout == "1\n"
+
+
+def test_sessions_live_on_worker(worker_endpoint):
+    """Фрагменты сессии выполняются на воркере и видят переменные прошлых запусков."""
+
+    pool = RunnerPool([worker_endpoint], token="secret")
+    result, created = pool.run_session("7:1", "x = 21", timeout=5.0)
+    assert (result.exit_code, created) == (0, True)
+
+    result, created = pool.run_session("7:1", "print(x * 2)", timeout=5.0)
+    assert (result.stdout, created) == ("42\n", False)
+
+    # Сессия другой миссии — отдельный интерпретатор.
+    result, _ = pool.run_session("7:2", "print('x' in globals())", timeout=5.0)
+    assert result.stdout == "False\n"
+
+    assert pool.close_session("7:1") is True
+    assert pool.close_session("7:1") is False
+
+
+def test_busy_pool_is_not_offloaded_to_api(tmp_path):
+    """Если все воркеры заняты, код не запускается в процессе API даже с fallback."""
+
+    endpoint = f"unix:{tmp_path / 'busy.sock'}"
+    server = create_server(endpoint, concurrency=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        pool = RunnerPool([endpoint], allow_local_fallback=True)
+        with pytest.raises(RunnerBusyError):
+            pool.run("print(1)", timeout=5.0)
+        assert pool._workers[0].healthy is True
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,91 @@
+"""Проверяем поиск похожих решений."""
+
+from __future__ import annotations
+
+from app.models.coding import CodingAttempt, CodingChallenge
+from app.models.mission import Mission
+from app.models.similarity import CodingAttemptSignature
+from app.models.user import User, UserRole
+from app.services.similarity import (
+    backfill_signatures,
+    find_similar_attempts,
+    find_suspicious_clusters,
+    normalize_tokens,
+)
+
+ORIGINAL = """
+def fibonacci(limit):
+    first, second = 0, 1
+    result = []
+    while first < limit:
+        result.append(first)
+        first, second = second, first + second
+    return result
+
+
+for value in fibonacci(100):
+    print(value)
+"""
+
+# Та же программа с переименованными переменными и комментарием.
+RENAMED = """
+def fib(n):
+    # считаем ряд
+    a, b = 0, 1
+    out = []
+    while a < n:
+        out.append(a)
+        a, b = b, a + b
+    return out
+
+
+for item in fib(100):
+    print(item)
+"""
+
+DIFFERENT = """
+numbers = [int(part) for part in input().split()]
+total = sum(number * number for number in numbers if number % 2 == 0)
+print(f"Сумма квадратов: {total}")
+"""
+
+
+def _setup(db_session) -> tuple[CodingChallenge, list[User]]:
+    mission = Mission(title="Числа", description="Ряды", xp_reward=10, mana_reward=5)
+    challenge = CodingChallenge(
+        mission=mission, order=1, title="Фибоначчи", prompt="Выведите ряд", expected_output="0"
+    )
+    users = [
+        User(email=f"pilot{index}@alabuga.space", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+        for index in range(3)
+    ]
+    db_session.add_all([mission, challenge, *users])
+    db_session.flush()
+    return challenge, users
+
+
+def test_renamed_copy_is_clustered(db_session):
+    """Переименование переменных не скрывает списанное решение."""
+
+    assert normalize_tokens("x = 1  # комментарий") == ["ID", "=", "NUM", "NL"]
+
+    challenge, users = _setup(db_session)
+    attempts = [
+        CodingAttempt(challenge_id=challenge.id, user_id=user.id, code=code, is_passed=True)
+        for user, code in zip(users, [ORIGINAL, RENAMED, DIFFERENT])
+    ]
+    db_session.add_all(attempts)
+    db_session.commit()
+
+    assert backfill_signatures(db_session, batch_size=2) == 3
+    assert backfill_signatures(db_session) == 0
+    assert db_session.query(CodingAttemptSignature).count() == 3
+
+    clusters = find_suspicious_clusters(db_session, challenge_id=challenge.id)
+    assert len(clusters) == 1
+    assert clusters[0].attempt_ids == [attempts[0].id, attempts[1].id]
+    assert clusters[0].user_ids == [users[0].id, users[1].id]
+
+    similar = find_similar_attempts(db_session, attempt_id=attempts[0].id)
+    assert [match.attempt_id for match in similar] == [attempts[1].id]
+    assert similar[0].similarity == 1.0
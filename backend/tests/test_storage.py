@@ -0,0 +1,184 @@
+"""Проверяем потоковое сохранение вложений и хранилище по содержимому."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.models.blob import BlobReference, StoredBlob
+from app.models.mission import Mission, MissionSubmission
+from app.models.user import User, UserRole
+from app.services.blobs import (
+    OWNER_SUBMISSION,
+    OWNER_USER,
+    attach_blob,
+    blob_relative_path,
+    detach_blob,
+    sweep_unreferenced_blobs,
+)
+from app.services.storage import (
+    UploadRejectedError,
+    UploadTooLargeError,
+    register_upload,
+    save_profile_photo,
+    save_submission_document,
+)
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def _upload(data: bytes, filename: str, *, size: int | None = None) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename, size=size)
+
+
+def test_document_is_streamed_with_checksum_and_limits(tmp_path, monkeypatch):
+    """Файл сохраняется целиком с sha256, а слишком большой или чужого типа — отклоняется."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    monkeypatch.setattr(settings, "upload_max_mb", {"passport": 1, "default": 1})
+    monkeypatch.setattr("app.services.storage.UPLOAD_CHUNK_SIZE", 1024)
+
+    payload = b"%PDF-1.7\n" + b"x" * 5000
+    digest = hashlib.sha256(payload).hexdigest()
+    stored = asyncio.run(save_submission_document(upload=_upload(payload, "scan.pdf"), kind="passport"))
+    assert stored.relative_path == blob_relative_path(digest)
+    assert stored.relative_path == f"blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+    assert stored.size == len(payload)
+    assert stored.sha256 == digest
+    assert stored.mime_type == "application/pdf"
+    assert stored.extension == ".pdf"
+    assert (tmp_path / stored.relative_path).read_bytes() == payload
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(
+            save_submission_document(
+                upload=_upload(b"%PDF-" + b"x" * (1024 * 1024), "big.pdf"), kind="passport"
+            )
+        )
+    with pytest.raises(UploadRejectedError):
+        asyncio.run(save_submission_document(upload=_upload(b"MZ\x90\x00", "scan.pdf"), kind="passport"))
+    # Пустой файл не обходит проверку типа.
+    with pytest.raises(UploadRejectedError):
+        asyncio.run(save_submission_document(upload=_upload(b"", "empty.pdf"), kind="passport"))
+
+    # Неудачные загрузки не оставляют временных файлов.
+    assert list((tmp_path / "blobs" / ".incoming").iterdir()) == []
+
+
+def test_profile_photo_type_is_sniffed(tmp_path, monkeypatch):
+    """Тип фото определяем по содержимому, а не по имени файла."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+
+    stored = asyncio.run(save_profile_photo(upload=_upload(PNG_HEADER + b"data", "me.jpg")))
+    assert stored.mime_type == "image/png"
+    assert stored.extension == ".png"
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(save_profile_photo(upload=_upload(PNG_HEADER, "me.png", size=10**9)))
+
+
+def test_same_content_is_stored_once_and_swept_without_references(db_session, tmp_path, monkeypatch):
+    """Один файл на несколько отправок; без ссылок его удаляет очистка."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    payload = b"%PDF-1.4 resume"
+
+    paths = []
+    for submission_id in (1, 2):
+        stored = asyncio.run(save_submission_document(upload=_upload(payload, "cv.pdf"), kind="resume"))
+        path = register_upload(db_session, stored)
+        attach_blob(
+            db_session, relative_path=path, owner_type=OWNER_SUBMISSION, owner_id=submission_id, field="resume"
+        )
+        paths.append(path)
+    db_session.commit()
+
+    assert paths[0] == paths[1]
+    blob = db_session.query(StoredBlob).one()
+    assert blob.ref_count == 2
+
+    detach_blob(db_session, owner_type=OWNER_SUBMISSION, owner_id=1, field="resume")
+    db_session.commit()
+    assert sweep_unreferenced_blobs(db_session, grace_seconds=0) == 0
+    assert (tmp_path / paths[0]).exists()
+
+    detach_blob(db_session, owner_type=OWNER_SUBMISSION, owner_id=2, field="resume")
+    db_session.commit()
+    assert sweep_unreferenced_blobs(db_session, grace_seconds=3600) == 0
+    assert sweep_unreferenced_blobs(db_session, grace_seconds=0) == 1
+    assert not (tmp_path / paths[0]).exists()
+    assert db_session.query(StoredBlob).count() == 0
+
+
+def test_reregistered_stale_content_survives_sweep(db_session, tmp_path, monkeypatch):
+    """Повторная загрузка давно освобождённого содержимого снова получает льготный период."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    payload = b"%PDF-1.4 again"
+    stored = asyncio.run(save_submission_document(upload=_upload(payload, "cv.pdf"), kind="resume"))
+    path = register_upload(db_session, stored)
+    db_session.execute(
+        update(StoredBlob).values(released_at=datetime.now(timezone.utc) - timedelta(days=1))
+    )
+    db_session.commit()
+    file_path = tmp_path / path
+    stale = (datetime.now(timezone.utc) - timedelta(days=1)).timestamp()
+    os.utime(file_path, (stale, stale))
+
+    stored = asyncio.run(save_submission_document(upload=_upload(payload, "cv.pdf"), kind="resume"))
+    assert register_upload(db_session, stored) == path
+    db_session.commit()
+
+    assert sweep_unreferenced_blobs(db_session, grace_seconds=3600) == 0
+    assert file_path.exists()
+    attach_blob(db_session, relative_path=path, owner_type=OWNER_SUBMISSION, owner_id=1, field="resume")
+    db_session.commit()
+    assert db_session.query(StoredBlob).one().ref_count == 1
+
+
+def test_deleting_owners_releases_references(db_session, tmp_path, monkeypatch):
+    """Удаление отправки или пользователя снимает их ссылки на файлы."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    pilot = User(email="blob@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    mission = Mission(title="Документы", description="", xp_reward=0, mana_reward=0)
+    db_session.add_all([pilot, mission])
+    db_session.flush()
+    submission = MissionSubmission(user_id=pilot.id, mission_id=mission.id)
+    db_session.add(submission)
+    db_session.flush()
+
+    stored = asyncio.run(save_submission_document(upload=_upload(b"%PDF-1.4 passport", "p.pdf"), kind="passport"))
+    path = register_upload(db_session, stored)
+    # Одно содержимое в двух полях отправки и в профиле.
+    for owner_type, owner_id, field in (
+        (OWNER_SUBMISSION, submission.id, "passport"),
+        (OWNER_SUBMISSION, submission.id, "photo"),
+        (OWNER_USER, pilot.id, "profile_photo"),
+    ):
+        attach_blob(db_session, relative_path=path, owner_type=owner_type, owner_id=owner_id, field=field)
+    db_session.commit()
+    assert db_session.query(StoredBlob).one().ref_count == 3
+
+    db_session.delete(submission)
+    db_session.commit()
+    blob = db_session.query(StoredBlob).one()
+    db_session.refresh(blob)
+    assert (blob.ref_count, blob.released_at) == (1, None)
+
+    db_session.delete(pilot)
+    db_session.commit()
+    db_session.refresh(blob)
+    assert blob.ref_count == 0
+    assert blob.released_at is not None
+    assert db_session.query(BlobReference).count() == 0
+    assert sweep_unreferenced_blobs(db_session, grace_seconds=0) == 1
@@ -0,0 +1,117 @@
+"""Проверяем очистку каталога загрузок и отчёт о занятом месте."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+from datetime import datetime, timedelta, timezone
+
+from fastapi import UploadFile
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.models.blob import BlobReference, StoredBlob
+from app.models.mission import Mission, MissionSubmission
+from app.models.user import User, UserRole
+from app.services.blobs import OWNER_SUBMISSION, attach_blob
+from app.services.scheduler import PeriodicJob, Scheduler, acquire_job_lease
+from app.services.storage import register_upload, save_submission_document
+from app.services.uploads_gc import QUARANTINE_DIR, collect_uploads_garbage
+
+
+def _write(path, payload: bytes, *, age: timedelta) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(payload)
+    moment = (datetime.now(timezone.utc) - age).timestamp()
+    os.utime(path, (moment, moment))
+
+
+def test_orphans_are_quarantined_then_purged(db_session, tmp_path, monkeypatch):
+    """Сироты старше льготного периода уходят в карантин, используемые файлы остаются."""
+
+    monkeypatch.setattr(settings, "uploads_path", tmp_path)
+    old = timedelta(days=30)
+
+    pilot = User(email="gc@alabuga.ru", full_name="Пилот", role=UserRole.PILOT, hashed_password="x")
+    mission = Mission(title="M", description="", xp_reward=0, mana_reward=0)
+    db_session.add_all([pilot, mission])
+    db_session.flush()
+
+    upload = UploadFile(file=io.BytesIO(b"%PDF-1.4 resume"), filename="cv.pdf")
+    resume = register_upload(db_session, asyncio.run(save_submission_document(upload=upload, kind="resume")))
+    submission = MissionSubmission(
+        user_id=pilot.id,
+        mission_id=mission.id,
+        resume_path=resume,
+        passport_path=f"user_{pilot.id}/mission_{mission.id}/passport.pdf",
+    )
+    db_session.add(submission)
+    db_session.flush()
+    attach_blob(
+        db_session, relative_path=resume, owner_type=OWNER_SUBMISSION, owner_id=submission.id, field="resume"
+    )
+    # Ссылка на поле, которое в базе уже пустое (ручная правка).
+    attach_blob(
+        db_session, relative_path=resume, owner_type=OWNER_SUBMISSION, owner_id=submission.id, field="photo"
+    )
+    db_session.commit()
+
+    _write(tmp_path / submission.passport_path, b"%PDF passport", age=old)
+    _write(tmp_path / "user_99" / "mission_1" / "resume.pdf", b"x" * 100, age=old)
+    _write(tmp_path / "user_98" / "profile" / "photo.png", b"fresh", age=timedelta(minutes=5))
+    _write(tmp_path / "thumbs" / ("f" * 64) / "64.webp", b"thumb", age=old)
+
+    report = collect_uploads_garbage(db_session, dry_run=True, grace_seconds=3600)
+    assert report.by_kind["orphan"].files == 3
+    assert report.by_kind["passport"].files == 1
+    assert report.by_user[pilot.id].files == 2
+    assert report.quarantined == 0
+    assert (tmp_path / "user_99" / "mission_1" / "resume.pdf").exists()
+
+    # Ссылки «состарились» и вышли за льготный период.
+    db_session.execute(update(BlobReference).values(updated_at=datetime.now(timezone.utc) - old))
+    db_session.commit()
+    now = datetime.now(timezone.utc)
+    report = collect_uploads_garbage(db_session, grace_seconds=3600, now=now)
+    assert report.quarantined == 2
+    assert report.quarantined_bytes == 105
+    assert report.released_references == 1
+    assert not (tmp_path / "user_99").exists()
+    assert (tmp_path / "user_98" / "profile" / "photo.png").exists()
+    assert (tmp_path / submission.passport_path).exists()
+    assert (tmp_path / resume).exists()
+    db_session.expire_all()
+    assert db_session.query(StoredBlob).one().ref_count == 1
+
+    batches = list((tmp_path / QUARANTINE_DIR).iterdir())
+    assert len(batches) == 1
+    assert (batches[0] / "user_99" / "mission_1" / "resume.pdf").read_bytes() == b"x" * 100
+
+    later = collect_uploads_garbage(
+        db_session, grace_seconds=3600, retention_days=7, now=now + timedelta(days=8)
+    )
+    assert later.purged_batches == 1
+    assert not batches[0].exists()
+
+
+def test_exclusive_job_runs_once_per_interval_across_processes(db_session):
+    """Очистку за интервал выполняет один процесс; после ошибки аренда снимается."""
+
+    calls = []
+    job = PeriodicJob(name="uploads-gc", interval=3600, func=calls.append, exclusive=True)
+    first, second = Scheduler(), Scheduler()
+    first.run_job(job)
+    second.run_job(job)
+    assert len(calls) == 1
+    assert acquire_job_lease(db_session, "uploads-gc", ttl=60) is False
+
+    def failing(_session):
+        raise RuntimeError("boom")
+
+    broken = PeriodicJob(name="broken", interval=3600, func=failing, exclusive=True)
+    first.run_job(broken)
+    assert acquire_job_lease(db_session, "broken", ttl=60) is True
+
+    later = datetime.now(timezone.utc) + timedelta(hours=2)
+    assert acquire_job_lease(db_session, "uploads-gc", ttl=60, now=later) is True
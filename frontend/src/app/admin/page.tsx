@@ -89,6 +89,7 @@ interface AdminStats {
   average_completed_missions: number;
   submission_stats: SubmissionStats;
   branch_completion: BranchCompletionStat[];
+  computed_at: string;
 }
 
 export default async function AdminPage() {
@@ -125,6 +126,9 @@ export default async function AdminPage() {
       <div className="grid" style={{ gridTemplateColumns: 'repeat(auto-fit, minmax(320px, 1fr))', gap: '1.5rem' }}>
         <div className="card" style={{ gridColumn: '1 / -1', display: 'grid', gap: '1rem' }}>
           <h3>Сводка</h3>
+          <small style={{ color: 'var(--text-muted)' }}>
+            Данные на {new Date(stats.computed_at).toLocaleTimeString('ru-RU')}
+          </small>
           <div className="grid" style={{ gridTemplateColumns: 'repeat(auto-fit, minmax(180px, 1fr))', gap: '1rem' }}>
             <div className="card" style={{ marginBottom: 0 }}>
               <span className="badge">Пилоты</span>
@@ -2,6 +2,7 @@
 
 import { useRef, useState } from 'react';
 import { apiFetch } from '../lib/api';
+import { RESUMABLE_THRESHOLD, uploadResumable } from '../lib/resumableUpload';
 
 type ExistingSubmission = {
   id: number;
@@ -92,21 +93,25 @@ export function MissionSubmissionForm({ missionId, token, locked = false, submis
     formData.append('proof_url', proofUrl.trim());
     formData.append('resume_link', resumeTrimmed);
 
-    if (passportFile) {
-      formData.append('passport', passportFile);
-    }
-
-    if (photoFile) {
-      formData.append('photo', photoFile);
-    }
-
-    if (resumeFile) {
-      formData.append('resume_file', resumeFile);
-    }
-
     try {
       setLoading(true);
       setStatus(null);
+
+      // Крупные файлы загружаем частями заранее, чтобы обрыв связи не начинал всё заново.
+      const attachments: Array<[File | undefined, 'passport' | 'photo' | 'resume', string]> = [
+        [passportFile, 'passport', 'passport'],
+        [photoFile, 'photo', 'photo'],
+        [resumeFile, 'resume', 'resume_file']
+      ];
+      for (const [file, kind, field] of attachments) {
+        if (!file) continue;
+        if (file.size > RESUMABLE_THRESHOLD) {
+          setStatus(`Загружаем файл «${file.name}»...`);
+          formData.append(`${kind}_upload_id`, await uploadResumable(file, kind, token));
+        } else {
+          formData.append(field, file);
+        }
+      }
       const updated = await apiFetch<ExistingSubmission>(`/api/missions/${missionId}/submit`, {
         method: 'POST',
         body: formData,
@@ -37,6 +37,18 @@ export function AdminSubmissionCard({ submission, token }: Props) {
 
     try {
       setError(null);
+      // Документы из хранилища открываем по подписанной ссылке: файл отдаётся без участия API.
+      const linkResponse = await fetch(`${clientApiUrl}${path}/link`, {
+        headers: {
+          Authorization: `Bearer ${token}`
+        }
+      });
+      if (linkResponse.ok) {
+        const { url } = (await linkResponse.json()) as { url: string };
+        window.open(`${clientApiUrl}${url}`, '_blank', 'noopener');
+        return;
+      }
+
       const response = await fetch(`${clientApiUrl}${path}`, {
         headers: {
           Authorization: `Bearer ${token}`
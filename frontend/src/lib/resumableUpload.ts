@@ -0,0 +1,104 @@
+import { clientApiUrl } from './api';
+
+type UploadKind = 'passport' | 'photo' | 'resume';
+
+type UploadSession = {
+  id: string;
+  kind: UploadKind;
+  size: number;
+  offset: number;
+  completed: boolean;
+  chunk_size: number;
+  expires_at: string;
+};
+
+// Файлы меньше этого размера проще отправить обычной формой.
+export const RESUMABLE_THRESHOLD = 4 * 1024 * 1024;
+
+const MAX_ATTEMPTS = 5;
+
+async function sha256Hex(data: ArrayBuffer): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', data);
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+}
+
+async function request(path: string, token: string | undefined, init: RequestInit = {}): Promise<Response> {
+  const headers = new Headers(init.headers);
+  if (token) {
+    headers.set('Authorization', `Bearer ${token}`);
+  }
+  return fetch(`${clientApiUrl}/api/uploads${path}`, { ...init, headers, cache: 'no-store' });
+}
+
+async function readSession(response: Response): Promise<UploadSession> {
+  if (!response.ok) {
+    let detail = '';
+    try {
+      const data = await response.json();
+      detail = data?.detail ? String(data.detail) : '';
+    } catch {
+      // Тело без JSON — оставляем общий текст.
+    }
+    throw new Error(detail || `Загрузка файла завершилась ошибкой (${response.status}).`);
+  }
+  return response.json() as Promise<UploadSession>;
+}
+
+function wait(ms: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+/**
+ * Загружаем файл частями и возвращаем идентификатор загрузки для формы отправки.
+ * После обрыва связи спрашиваем у сервера принятое смещение и докачиваем остаток.
+ */
+export async function uploadResumable(
+  file: File,
+  kind: UploadKind,
+  token?: string,
+  onProgress?: (sent: number, total: number) => void
+): Promise<string> {
+  const fileHash = await sha256Hex(await file.arrayBuffer());
+  let session = await readSession(
+    await request('', token, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ kind, size: file.size, filename: file.name, sha256: fileHash })
+    })
+  );
+
+  let failures = 0;
+  while (session.offset < session.size) {
+    const chunk = file.slice(session.offset, Math.min(session.offset + session.chunk_size, session.size));
+    const buffer = await chunk.arrayBuffer();
+    try {
+      const response = await request(`/${session.id}`, token, {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'Upload-Offset': String(session.offset),
+          'X-Chunk-Sha256': await sha256Hex(buffer)
+        },
+        body: buffer
+      });
+      if (response.status === 409 || response.status >= 500) {
+        throw new Error(`Сервер ответил ${response.status}`);
+      }
+      session = await readSession(response);
+      failures = 0;
+      onProgress?.(session.offset, session.size);
+    } catch (error) {
+      failures += 1;
+      if (failures >= MAX_ATTEMPTS) {
+        throw error instanceof Error ? error : new Error('Не удалось загрузить файл.');
+      }
+      await wait(500 * 2 ** failures);
+      session = await readSession(await request(`/${session.id}`, token));
+    }
+  }
+
+  session = await readSession(await request(`/${session.id}/complete`, token, { method: 'POST' }));
+  return session.id;
+}